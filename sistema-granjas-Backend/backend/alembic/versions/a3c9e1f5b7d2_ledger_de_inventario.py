@@ -0,0 +1,49 @@
+"""ledger de inventario: snapshots diarios e índices de movimientos por fecha
+
+Revision ID: a3c9e1f5b7d2
+Revises: e85995d6b143
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f5b7d2'
+down_revision: Union[str, None] = 'e85995d6b143'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'snapshots_inventario',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo_recurso', sa.String(length=20), nullable=False),
+        sa.Column('recurso_id', sa.Integer(), nullable=False),
+        sa.Column('fecha_corte', sa.DateTime(), nullable=False),
+        sa.Column('cantidad', sa.Float(), nullable=False),
+        sa.Column('salidas_acumuladas', sa.Float(), nullable=False),
+        sa.Column('entradas_acumuladas', sa.Float(), nullable=False),
+        sa.Column('ajuste', sa.Float(), nullable=False),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tipo_recurso', 'recurso_id', 'fecha_corte', name='uq_snapshot_recurso_corte')
+    )
+    op.create_index(op.f('ix_snapshots_inventario_id'), 'snapshots_inventario', ['id'], unique=False)
+    op.create_index('ix_snapshots_inventario_tipo_corte', 'snapshots_inventario', ['tipo_recurso', 'fecha_corte'], unique=False)
+    op.create_index('ix_movimientos_herramientas_herramienta_fecha', 'movimientos_herramientas', ['herramienta_id', 'fecha_movimiento'], unique=False)
+    op.create_index('ix_movimientos_insumos_insumo_fecha', 'movimientos_insumos', ['insumo_id', 'fecha_movimiento'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_movimientos_insumos_insumo_fecha', table_name='movimientos_insumos')
+    op.drop_index('ix_movimientos_herramientas_herramienta_fecha', table_name='movimientos_herramientas')
+    op.drop_index('ix_snapshots_inventario_tipo_corte', table_name='snapshots_inventario')
+    op.drop_index(op.f('ix_snapshots_inventario_id'), table_name='snapshots_inventario')
+    op.drop_table('snapshots_inventario')
@@ -0,0 +1,38 @@
+"""índices (fecha_movimiento, id) para paginar movimientos por cursor
+
+Revision ID: a7d3f9b2c6e4
+Revises: f2b8d4e6a1c3
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f9b2c6e4'
+down_revision: Union[str, None] = 'f2b8d4e6a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El cursor guarda (fecha_movimiento, id): la fecha no puede ser NULL. Los movimientos
+    # siempre la reciben al crearse; si quedó alguno sin fecha, toma la de la migración.
+    for tabla in ('movimientos_herramientas', 'movimientos_insumos'):
+        op.execute(f"UPDATE {tabla} SET fecha_movimiento = CURRENT_TIMESTAMP WHERE fecha_movimiento IS NULL")
+        op.alter_column(tabla, 'fecha_movimiento', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_index('ix_movimientos_herramientas_fecha', 'movimientos_herramientas', ['fecha_movimiento', 'id'], unique=False)
+    op.create_index('ix_movimientos_insumos_fecha', 'movimientos_insumos', ['fecha_movimiento', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_movimientos_insumos_fecha', table_name='movimientos_insumos')
+    op.drop_index('ix_movimientos_herramientas_fecha', table_name='movimientos_herramientas')
+    for tabla in ('movimientos_herramientas', 'movimientos_insumos'):
+        op.alter_column(tabla, 'fecha_movimiento', existing_type=sa.DateTime(), nullable=True)
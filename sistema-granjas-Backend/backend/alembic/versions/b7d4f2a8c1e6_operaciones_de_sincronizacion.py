@@ -0,0 +1,42 @@
+"""operaciones de sincronización offline (deduplicación por id de cliente)
+
+Revision ID: b7d4f2a8c1e6
+Revises: a3c9e1f5b7d2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4f2a8c1e6'
+down_revision: Union[str, None] = 'a3c9e1f5b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sync_operaciones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('cliente_id', sa.String(length=64), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('recurso_id', sa.Integer(), nullable=True),
+        sa.Column('fecha_cliente', sa.DateTime(), nullable=True),
+        sa.Column('fecha_recepcion', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id', 'cliente_id', name='uq_sync_operacion_cliente')
+    )
+    op.create_index(op.f('ix_sync_operaciones_id'), 'sync_operaciones', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sync_operaciones_id'), table_name='sync_operaciones')
+    op.drop_table('sync_operaciones')
@@ -0,0 +1,28 @@
+"""sha256 declarado en las subidas directas (verificado por R2 con el checksum del PUT)
+
+Revision ID: b8e2f6a4d0c7
+Revises: a7d3f9b2c6e4
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f6a4d0c7'
+down_revision: Union[str, None] = 'a7d3f9b2c6e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('evidencias_pendientes', sa.Column('sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('evidencias_pendientes', 'sha256')
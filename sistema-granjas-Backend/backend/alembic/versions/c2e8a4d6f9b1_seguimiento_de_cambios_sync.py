@@ -0,0 +1,54 @@
+"""seguimiento de cambios para sincronización: fecha_actualizacion y tombstones
+
+Revision ID: c2e8a4d6f9b1
+Revises: b7d4f2a8c1e6
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a4d6f9b1'
+down_revision: Union[str, None] = 'b7d4f2a8c1e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLAS = ['labores', 'lotes', 'insumos', 'herramientas']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las filas existentes quedan con la fecha de la migración: la primera sincronización las trae todas
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column(
+            'fecha_actualizacion', sa.DateTime(), nullable=False,
+            server_default=sa.text("(now() at time zone 'utc')")
+        ))
+        op.alter_column(tabla, 'fecha_actualizacion', server_default=None)
+        op.create_index(f'ix_{tabla}_actualizacion', tabla, ['fecha_actualizacion', 'id'], unique=False)
+
+    op.create_table(
+        'sync_eliminaciones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tabla', sa.String(length=50), nullable=False),
+        sa.Column('registro_id', sa.Integer(), nullable=False),
+        sa.Column('fecha_eliminacion', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_eliminaciones_id'), 'sync_eliminaciones', ['id'], unique=False)
+    op.create_index('ix_sync_eliminaciones_fecha', 'sync_eliminaciones', ['fecha_eliminacion', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_eliminaciones_fecha', table_name='sync_eliminaciones')
+    op.drop_index(op.f('ix_sync_eliminaciones_id'), table_name='sync_eliminaciones')
+    op.drop_table('sync_eliminaciones')
+
+    for tabla in reversed(TABLAS):
+        op.drop_index(f'ix_{tabla}_actualizacion', table_name=tabla)
+        op.drop_column(tabla, 'fecha_actualizacion')
@@ -0,0 +1,28 @@
+"""reserva de blobs entregados por /files/upload
+
+Revision ID: c4a9e7d1f3b5
+Revises: b8e2f6a4d0c7
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e7d1f3b5'
+down_revision: Union[str, None] = 'b8e2f6a4d0c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('blobs', sa.Column('reservado_hasta', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('blobs', 'reservado_hasta')
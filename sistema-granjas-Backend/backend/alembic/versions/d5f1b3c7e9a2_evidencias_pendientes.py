@@ -0,0 +1,50 @@
+"""subidas de evidencias directas al bucket pendientes de completar
+
+Revision ID: d5f1b3c7e9a2
+Revises: c2e8a4d6f9b1
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1b3c7e9a2'
+down_revision: Union[str, None] = 'c2e8a4d6f9b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'evidencias_pendientes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=500), nullable=False),
+        sa.Column('upload_id', sa.String(length=500), nullable=True),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('descripcion', sa.Text(), nullable=False),
+        sa.Column('tipo_entidad', sa.String(length=50), nullable=False),
+        sa.Column('entidad_id', sa.Integer(), nullable=False),
+        sa.Column('content_type', sa.String(length=255), nullable=False),
+        sa.Column('tamano', sa.BigInteger(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('evidencia_id', sa.Integer(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+        sa.Column('fecha_expiracion', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['evidencia_id'], ['evidencias.id'], ),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+    )
+    op.create_index(op.f('ix_evidencias_pendientes_id'), 'evidencias_pendientes', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_evidencias_pendientes_id'), table_name='evidencias_pendientes')
+    op.drop_table('evidencias_pendientes')
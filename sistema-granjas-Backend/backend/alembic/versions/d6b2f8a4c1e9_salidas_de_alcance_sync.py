@@ -0,0 +1,28 @@
+"""salidas de alcance en sync_eliminaciones (marcas por usuario)
+
+Revision ID: d6b2f8a4c1e9
+Revises: c4a9e7d1f3b5
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b2f8a4c1e9'
+down_revision: Union[str, None] = 'c4a9e7d1f3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sync_eliminaciones', sa.Column('usuario_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sync_eliminaciones', 'usuario_id')
@@ -0,0 +1,28 @@
+"""fecha de toma de las subidas directas (recuperar las que quedaron completando)
+
+Revision ID: e2c6a8f4b1d7
+Revises: d6b2f8a4c1e9
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c6a8f4b1d7'
+down_revision: Union[str, None] = 'd6b2f8a4c1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('evidencias_pendientes', sa.Column('fecha_toma', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('evidencias_pendientes', 'fecha_toma')
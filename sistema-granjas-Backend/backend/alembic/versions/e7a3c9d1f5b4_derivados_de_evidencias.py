@@ -0,0 +1,31 @@
+"""miniatura y vista previa de las evidencias de imagen
+
+Revision ID: e7a3c9d1f5b4
+Revises: d5f1b3c7e9a2
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9d1f5b4'
+down_revision: Union[str, None] = 'd5f1b3c7e9a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las evidencias existentes se completan con scripts/generar_derivados.py
+    op.add_column('evidencias', sa.Column('url_miniatura', sa.String(length=500), nullable=True))
+    op.add_column('evidencias', sa.Column('url_vista_previa', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('evidencias', 'url_vista_previa')
+    op.drop_column('evidencias', 'url_miniatura')
@@ -0,0 +1,56 @@
+"""almacenamiento de archivos por contenido (sha256) y referencias desde evidencias
+
+Revision ID: f2b8d4e6a1c3
+Revises: e7a3c9d1f5b4
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4e6a1c3'
+down_revision: Union[str, None] = 'e7a3c9d1f5b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('key', sa.String(length=500), nullable=False),
+        sa.Column('tamano', sa.BigInteger(), nullable=False),
+        sa.Column('content_type', sa.String(length=255), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sha256'),
+        sa.UniqueConstraint('key')
+    )
+    op.create_index(op.f('ix_blobs_id'), 'blobs', ['id'], unique=False)
+
+    # Las evidencias existentes quedan sin blob: conservan su URL y no se borran del bucket
+    op.add_column('evidencias', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_evidencias_blob_id'), 'evidencias', ['blob_id'], unique=False)
+    op.create_foreign_key('fk_evidencias_blob_id', 'evidencias', 'blobs', ['blob_id'], ['id'])
+
+    op.add_column('evidencias_pendientes', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_evidencias_pendientes_blob_id', 'evidencias_pendientes', 'blobs', ['blob_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_evidencias_pendientes_blob_id', 'evidencias_pendientes', type_='foreignkey')
+    op.drop_column('evidencias_pendientes', 'blob_id')
+
+    op.drop_constraint('fk_evidencias_blob_id', 'evidencias', type_='foreignkey')
+    op.drop_index(op.f('ix_evidencias_blob_id'), table_name='evidencias')
+    op.drop_column('evidencias', 'blob_id')
+
+    op.drop_index(op.f('ix_blobs_id'), table_name='blobs')
+    op.drop_table('blobs')
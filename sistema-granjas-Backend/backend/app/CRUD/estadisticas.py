@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+
+class Desglose:
+    """Resultado de un conteo agrupado: una fila por combinación de columnas"""
+
+    def __init__(self, filas: List[Dict[str, Any]]):
+        self.filas = filas
+
+    @property
+    def total(self) -> int:
+        return sum(fila["cantidad"] for fila in self.filas)
+
+    def por(self, columna: str, incluir_nulos: bool = False) -> Dict[Any, int]:
+        """Sumar las cantidades agrupando por una de las columnas"""
+        resultado: Dict[Any, int] = {}
+        for fila in self.filas:
+            clave = fila[columna]
+            if clave is None and not incluir_nulos:
+                continue
+            resultado[clave] = resultado.get(clave, 0) + fila["cantidad"]
+        return resultado
+
+    def conteos(self, columna: str, valores: List[str]) -> Dict[str, int]:
+        """Cantidades para una lista fija de valores (0 si no hay filas)"""
+        agrupado = self.por(columna)
+        return {valor: agrupado.get(valor, 0) for valor in valores}
+
+    def suma(self, nombre: str) -> float:
+        return sum(fila[nombre] or 0 for fila in self.filas)
+
+    def promedio(self, suma: str, cantidad: str) -> Optional[float]:
+        """Promedio global a partir de sumas y conteos parciales de cada grupo"""
+        denominador = self.suma(cantidad)
+        return self.suma(suma) / denominador if denominador else None
+
+
+def desglose_agrupado(query: Query, *columnas, **agregados) -> Desglose:
+    """
+    Ejecutar un único GROUP BY sobre una query ya filtrada (p. ej. por rol).
+    Cada fila trae las columnas de agrupación, 'cantidad' y los agregados pedidos,
+    por ejemplo suma_avance=func.sum(Labor.avance_porcentaje).
+    """
+    entidades = [
+        *columnas,
+        func.count().label("cantidad"),
+        *[expresion.label(nombre) for nombre, expresion in agregados.items()]
+    ]
+    filas = query.with_entities(*entidades).group_by(*columnas).all()
+
+    nombres = [columna.key for columna in columnas] + ["cantidad"] + list(agregados)
+    return Desglose([dict(zip(nombres, fila)) for fila in filas])
@@ -2,27 +2,27 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.db.models import Evidencia, Usuario, Labor, Diagnostico, Recomendacion
 from app.schemas.evidencia_schema import EvidenciaCreate
+from app.services.blob_service import BlobService
 
-def crear_evidencia_crud(db: Session, data: EvidenciaCreate, usuario: Usuario):
-    # Verificar que la entidad existe según el tipo
+def _obtener_entidad(db: Session, tipo_entidad: str, entidad_id: int):
+    """Labor, diagnóstico o recomendación a la que se asocia la evidencia (404 si no existe)"""
     entidad = None
-    entidad_nombre = ""
     
-    if data.tipo_entidad == "labor":
-        entidad = db.query(Labor).filter(Labor.id == data.entidad_id).first()
-        if entidad:
-            entidad_nombre = f"Labor: {entidad.id}"
-    elif data.tipo_entidad == "diagnostico":
-        entidad = db.query(Diagnostico).filter(Diagnostico.id == data.entidad_id).first()
-        if entidad:
-            entidad_nombre = f"Diagnóstico: {entidad.tipo}"
-    elif data.tipo_entidad == "recomendacion":
-        entidad = db.query(Recomendacion).filter(Recomendacion.id == data.entidad_id).first()
-        if entidad:
-            entidad_nombre = f"Recomendación: {entidad.titulo}"
+    if tipo_entidad == "labor":
+        entidad = db.query(Labor).filter(Labor.id == entidad_id).first()
+    elif tipo_entidad == "diagnostico":
+        entidad = db.query(Diagnostico).filter(Diagnostico.id == entidad_id).first()
+    elif tipo_entidad == "recomendacion":
+        entidad = db.query(Recomendacion).filter(Recomendacion.id == entidad_id).first()
     
     if not entidad:
-        raise HTTPException(404, f"{data.tipo_entidad.capitalize()} no encontrado")
+        raise HTTPException(404, f"{tipo_entidad.capitalize()} no encontrado")
+    
+    return entidad
+
+def crear_evidencia_crud(db: Session, data: EvidenciaCreate, usuario: Usuario):
+    # Verificar que la entidad existe según el tipo
+    _obtener_entidad(db, data.tipo_entidad, data.entidad_id)
     
     # Crear evidencia
     evidencia = Evidencia(
@@ -40,6 +40,9 @@ def crear_evidencia_crud(db: Session, data: EvidenciaCreate, usuario: Usuario):
     elif data.tipo_entidad == "recomendacion":
         evidencia.recomendacion_id = data.entidad_id
     
+    # Si el archivo se guardó por contenido, referenciar su blob
+    BlobService.vincular(db, evidencia)
+    
     db.add(evidencia)
     db.commit()
     db.refresh(evidencia)
@@ -81,9 +84,13 @@ def eliminar_evidencia_crud(db: Session, evidencia_id: int, usuario: Usuario):
     if evidencia.usuario_id != usuario.id and usuario.rol.nombre != "admin":
         raise HTTPException(403, "Solo el creador o administrador puede eliminar la evidencia")
     
+    blob_id = evidencia.blob_id
     db.delete(evidencia)
     db.commit()
     
+    # Borrar el archivo del bucket si era la última evidencia que lo usaba
+    BlobService.liberar(db, blob_id)
+    
     return {"message": "✅ Evidencia eliminada correctamente"}
 
 def _cargar_relaciones_evidencia(db: Session, evidencia: Evidencia):
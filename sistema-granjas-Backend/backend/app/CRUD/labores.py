@@ -1,6 +1,8 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, select
+from collections import defaultdict
 from datetime import datetime
+from typing import Dict, List, Set
 from fastapi import HTTPException
 from app.db.models import (
     Labor, Usuario, Recomendacion, Lote, Herramienta, Insumo,
@@ -9,9 +11,13 @@ from app.db.models import (
 )
 from app.schemas.labor_schema import (
     LaborCreate, LaborUpdate, AsignacionHerramientaRequest,
-    AsignacionInsumoRequest, RegistroAvanceRequest, LaborWithRecursosResponse,
+    AsignacionInsumoRequest, AsignacionRecursosRequest, RegistroAvanceRequest, LaborWithRecursosResponse,
     LaborListResponse, LaborResponse
 )
+from app.CRUD.estadisticas import desglose_agrupado
+from app.CRUD.paginacion import paginar
+from app.CRUD.movimientos import balance_herramientas_por_labor, balance_insumos_por_labor
+from app.services.stock_service import StockService
 
 def crear_labor_crud(db: Session, data: LaborCreate, usuario: Usuario):
     # Verificar que la recomendación existe
@@ -78,7 +84,9 @@ def listar_labores_crud(
     lote_id: int = None,
     recomendacion_id: int = None,
     tipo_labor_id: int = None,
-    usuario: Usuario = None
+    usuario: Usuario = None,
+    cursor: str = None,
+    con_total: bool = None
 ):
     query = db.query(Labor)
     
@@ -95,39 +103,16 @@ def listar_labores_crud(
         query = query.filter(Labor.tipo_labor_id == tipo_labor_id)
     
     # Permisos según rol
-    if usuario.rol.nombre == "trabajador":
-        query = query.filter(Labor.trabajador_id == usuario.id)
-    elif usuario.rol.nombre == "docente" or usuario.rol.nombre == "asesor":
-        query = query.join(Recomendacion).filter(Recomendacion.docente_id == usuario.id)
-    elif usuario.rol.nombre == "talento_humano":
-        # Obtener IDs de programas del usuario de talento_humano
-        programa_ids = [programa.id for programa in usuario.programas]
-        
-        if programa_ids:
-            # Filtrar trabajadores que tengan al menos uno de los mismos programas
-            query = query.join(Usuario, Labor.trabajador_id == Usuario.id)\
-                        .join(usuario_programa, Usuario.id == usuario_programa.c.usuario_id)\
-                        .filter(usuario_programa.c.programa_id.in_(programa_ids))
-        else:
-            # Si el usuario no tiene programas, no muestra nada
-            query = query.filter(False)
+    query = _filtrar_labores_por_rol(query, usuario)
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_labor()), [Labor.id], "labores", skip, limit, cursor, con_total
+    )
     
-    # Convertir a diccionarios con recursos
-    labores_dict = []
-    for item in items:
-        _cargar_relaciones_labor(item)
-        _cargar_recursos_labor(db, item)
-        labor_dict = _labor_a_dict_con_recursos(item)
-        labores_dict.append(labor_dict)
+    # Convertir a diccionarios con recursos (consultas en lote para toda la página)
+    pagina["items"] = _labores_a_dicts(db, pagina["items"])
     
-    return {
-        "items": labores_dict,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
 # ========== FUNCIONES SEPARADAS PARA OBJETO Y DICCIONARIO ==========
 
@@ -242,102 +227,129 @@ def eliminar_labor_crud(db: Session, labor: Labor, usuario: Usuario):
 
 def asignar_herramienta_crud(db: Session, labor: Labor, data: AsignacionHerramientaRequest, usuario: Usuario):
     _verificar_permisos_labor(labor, usuario, "asignar_recursos")
+    labor_id = labor.id
     
-    herramienta = db.query(Herramienta).filter(Herramienta.id == data.herramienta_id).first()
-    if not herramienta:
-        raise HTTPException(404, "Herramienta no encontrada")
+    StockService.ejecutar_con_reintentos(db, lambda: StockService.salida_herramienta(
+        db, data.herramienta_id, labor_id, data.cantidad, f"Asignado a labor {labor_id}"
+    ))
     
-    if herramienta.cantidad_disponible < data.cantidad:
-        raise HTTPException(400, f"No hay suficiente disponibilidad. Disponible: {herramienta.cantidad_disponible}")
-    
-    movimiento = MovimientoHerramienta(
-        herramienta_id=data.herramienta_id,
-        labor_id=labor.id,
-        cantidad=data.cantidad,
-        tipo_movimiento="salida",
-        observaciones=f"Asignado a labor {labor.id}"
-    )
-    
-    herramienta.cantidad_disponible -= data.cantidad
-    
-    db.add(movimiento)
-    db.commit()
-    db.refresh(labor)
-    _cargar_relaciones_labor(labor)
-    _cargar_recursos_labor(db, labor)
-    
-    return _labor_a_dict_con_recursos(labor)
+    return _labor_con_recursos(db, labor_id)
 
 def asignar_insumo_crud(db: Session, labor: Labor, data: AsignacionInsumoRequest, usuario: Usuario):
     _verificar_permisos_labor(labor, usuario, "asignar_recursos")
+    labor_id = labor.id
     
     insumo = db.query(Insumo).filter(Insumo.id == data.insumo_id).first()
     if not insumo:
         raise HTTPException(404, "Insumo no encontrado")
     
-    if insumo.cantidad_disponible < data.cantidad:
-        raise HTTPException(400, f"No hay suficiente disponibilidad. Disponible: {insumo.cantidad_disponible}")
-    
-    # ========== CORRECCIÓN: Verificación de programa del insumo ==========
-    # Necesitamos obtener el programa del lote o de la recomendación
-    programa_id_labor = None
-    
-    # Primero intentar obtener desde el lote directo de la labor
-    if labor.lote_id:
-        lote = db.query(Lote).filter(Lote.id == labor.lote_id).first()
-        if lote:
-            programa_id_labor = lote.programa_id
-    
-    # Si no tiene lote directo, intentar desde la recomendación
-    if not programa_id_labor and labor.recomendacion_id:
-        recomendacion = db.query(Recomendacion).filter(Recomendacion.id == labor.recomendacion_id).first()
-        if recomendacion and recomendacion.lote_id:
-            lote_rec = db.query(Lote).filter(Lote.id == recomendacion.lote_id).first()
-            if lote_rec:
-                programa_id_labor = lote_rec.programa_id
-    
-    # Si aún no tenemos programa_id, obtenerlo del trabajador
-    if not programa_id_labor:
-        trabajador = db.query(Usuario).filter(Usuario.id == labor.trabajador_id).first()
-        if trabajador and trabajador.programa_id:
-            programa_id_labor = trabajador.programa_id
-    
     # Verificar que el insumo pertenece al programa de la labor
-    if programa_id_labor and insumo.programa_id != programa_id_labor:
-        # Obtener nombres para el mensaje de error
-        programa_insumo = db.query(Programa).filter(Programa.id == insumo.programa_id).first()
-        programa_labor = db.query(Programa).filter(Programa.id == programa_id_labor).first()
-        
-        raise HTTPException(400, 
-            f"El insumo '{insumo.nombre}' pertenece al programa '{programa_insumo.nombre if programa_insumo else 'Desconocido'}', "
-            f"pero la labor está asociada al programa '{programa_labor.nombre if programa_labor else 'Desconocido'}'. "
-            f"Solo puedes asignar insumos del mismo programa."
-        )
-    
-    # ========== FIN CORRECCIÓN ==========
+    programas_labor = _programas_de_labor(labor)
+    if programas_labor and insumo.programa_id not in programas_labor:
+        nombres = _nombres_programas(db, programas_labor | {insumo.programa_id})
+        raise HTTPException(400, _error_programa_insumo(insumo, programas_labor, nombres))
     
-    movimiento = MovimientoInsumo(
-        insumo_id=data.insumo_id,
-        labor_id=labor.id,
-        cantidad=data.cantidad,
-        tipo_movimiento="salida",
-        observaciones=f"Consumido en labor {labor.id}"
-    )
-    
-    insumo.cantidad_disponible -= data.cantidad
+    # La disponibilidad se verifica dentro del UPDATE condicional
+    StockService.ejecutar_con_reintentos(db, lambda: StockService.salida_insumo(
+        db, data.insumo_id, labor_id, data.cantidad, f"Consumido en labor {labor_id}"
+    ))
     
-    db.add(movimiento)
-    db.commit()
-    db.refresh(labor)
+    return _labor_con_recursos(db, labor_id)
+
+def asignar_recursos_crud(db: Session, labor: Labor, data: AsignacionRecursosRequest, usuario: Usuario):
+    """
+    Asignar varias herramientas e insumos a una labor en una sola transacción.
+    Cada descuento es un UPDATE condicional del StockService; se validan todas las
+    cantidades y programas de una vez y, si algo falla, no se registra ningún movimiento.
+    """
+    _verificar_permisos_labor(labor, usuario, "asignar_recursos")
+    labor_id = labor.id
+    
+    # Un mismo recurso repetido en la lista se asigna como una sola cantidad
+    cantidades_herramientas = defaultdict(int)
+    for item in data.herramientas:
+        cantidades_herramientas[item.herramienta_id] += item.cantidad
+    cantidades_insumos = defaultdict(float)
+    for item in data.insumos:
+        cantidades_insumos[item.insumo_id] += item.cantidad
+    
+    herramientas = dict(
+        db.query(Herramienta.id, Herramienta.nombre)
+        .filter(Herramienta.id.in_(list(cantidades_herramientas))).all()
+    ) if cantidades_herramientas else {}
+    insumos = {
+        insumo.id: insumo
+        for insumo in db.query(Insumo).filter(Insumo.id.in_(list(cantidades_insumos))).all()
+    } if cantidades_insumos else {}
+    
+    faltantes = [f"herramienta {id}" for id in cantidades_herramientas if id not in herramientas]
+    faltantes += [f"insumo {id}" for id in cantidades_insumos if id not in insumos]
+    if faltantes:
+        raise HTTPException(404, f"Recursos no encontrados: {', '.join(faltantes)}")
+    
+    # El programa de un insumo no cambia con la concurrencia: se valida antes de escribir
+    programas_labor = _programas_de_labor(labor) if insumos else set()
+    insumos_otro_programa = [
+        insumo for insumo in insumos.values()
+        if programas_labor and insumo.programa_id not in programas_labor
+    ]
+    if insumos_otro_programa:
+        nombres = _nombres_programas(
+            db, programas_labor | {insumo.programa_id for insumo in insumos_otro_programa}
+        )
+        raise HTTPException(400, "No se asignó ningún recurso. " + " | ".join(
+            _error_programa_insumo(insumo, programas_labor, nombres) for insumo in insumos_otro_programa
+        ))
+    nombres_insumos = {insumo_id: insumo.nombre for insumo_id, insumo in insumos.items()}
+    
+    def asignar():
+        # En orden de id: dos asignaciones simultáneas toman las filas en el mismo orden
+        errores = []
+        for herramienta_id in sorted(cantidades_herramientas):
+            cantidad = cantidades_herramientas[herramienta_id]
+            if StockService.intentar_descontar(db, Herramienta, herramienta_id, cantidad) is None:
+                disponible = StockService.disponible(db, Herramienta, herramienta_id)
+                errores.append(f"Herramienta '{herramientas[herramienta_id]}': solicitado {cantidad}, disponible {disponible}")
+        for insumo_id in sorted(cantidades_insumos):
+            cantidad = cantidades_insumos[insumo_id]
+            if StockService.intentar_descontar(db, Insumo, insumo_id, cantidad) is None:
+                disponible = StockService.disponible(db, Insumo, insumo_id)
+                errores.append(f"Insumo '{nombres_insumos[insumo_id]}': solicitado {cantidad}, disponible {disponible}")
+        
+        if errores:
+            # ejecutar_con_reintentos revierte los descuentos que sí se aplicaron
+            raise HTTPException(400, "No se asignó ningún recurso. " + " | ".join(errores))
+        
+        for herramienta_id, cantidad in cantidades_herramientas.items():
+            db.add(MovimientoHerramienta(
+                herramienta_id=herramienta_id,
+                labor_id=labor_id,
+                cantidad=cantidad,
+                tipo_movimiento="salida",
+                observaciones=f"Asignado a labor {labor_id}"
+            ))
+        for insumo_id, cantidad in cantidades_insumos.items():
+            db.add(MovimientoInsumo(
+                insumo_id=insumo_id,
+                labor_id=labor_id,
+                cantidad=cantidad,
+                tipo_movimiento="salida",
+                observaciones=f"Consumido en labor {labor_id}"
+            ))
+    
+    StockService.ejecutar_con_reintentos(db, asignar)
+    
+    return _labor_con_recursos(db, labor_id)
+
+def _labor_con_recursos(db: Session, labor_id: int) -> dict:
+    """Recargar la labor con sus relaciones en una sola consulta (tras un commit) y armar la vista"""
+    labor = db.query(Labor).options(*_opciones_carga_labor()).filter(Labor.id == labor_id).one()
     _cargar_relaciones_labor(labor)
     _cargar_recursos_labor(db, labor)
-    
     return _labor_a_dict_con_recursos(labor)
 
-def registrar_avance_crud(db: Session, labor: Labor, data: RegistroAvanceRequest, usuario: Usuario):
-    if labor.trabajador_id != usuario.id:
-        raise HTTPException(403, "Solo el trabajador asignado puede registrar avance")
-    
+def _aplicar_avance(labor, data: RegistroAvanceRequest):
+    """Reglas de avance sobre la labor (objeto ORM o cualquier objeto con los mismos atributos)"""
     labor.avance_porcentaje = data.avance_porcentaje
     labor.comentario = data.comentario
     
@@ -346,6 +358,12 @@ def registrar_avance_crud(db: Session, labor: Labor, data: RegistroAvanceRequest
         labor.fecha_finalizacion = datetime.utcnow()
     elif data.avance_porcentaje > 0 and labor.estado == "pendiente":
         labor.estado = "en_progreso"
+
+def registrar_avance_crud(db: Session, labor: Labor, data: RegistroAvanceRequest, usuario: Usuario):
+    if labor.trabajador_id != usuario.id:
+        raise HTTPException(403, "Solo el trabajador asignado puede registrar avance")
+    
+    _aplicar_avance(labor, data)
     
     db.commit()
     db.refresh(labor)
@@ -385,20 +403,10 @@ def devolver_herramienta_crud(db: Session, labor: Labor, movimiento_id: int, can
     if cantidad > movimiento.cantidad:
         raise HTTPException(400, "No puede devolver más de lo asignado")
     
-    movimiento_devolucion = MovimientoHerramienta(
-        herramienta_id=movimiento.herramienta_id,
-        labor_id=labor.id,
-        cantidad=cantidad,
-        tipo_movimiento="entrada",
-        observaciones=f"Devolución de labor {labor.id}"
-    )
-    
-    herramienta = db.query(Herramienta).filter(Herramienta.id == movimiento.herramienta_id).first()
-    if herramienta:
-        herramienta.cantidad_disponible += cantidad
-    
-    db.add(movimiento_devolucion)
-    db.commit()
+    herramienta_id, labor_id = movimiento.herramienta_id, labor.id
+    StockService.ejecutar_con_reintentos(db, lambda: StockService.entrada_herramienta(
+        db, herramienta_id, labor_id, cantidad, f"Devolución de labor {labor_id}"
+    ))
     
     return {"message": "✅ Herramienta devuelta correctamente"}
 
@@ -425,28 +433,17 @@ def devolver_insumo_crud(db: Session, labor: Labor, movimiento_id: int, cantidad
     if cantidad > movimiento.cantidad:
         raise HTTPException(400, f"No puede devolver más de lo consumido. Consumido: {movimiento.cantidad}")
     
-    # Crear movimiento de entrada (devolución)
-    movimiento_devolucion = MovimientoInsumo(
-        insumo_id=movimiento.insumo_id,
-        labor_id=labor.id,
-        cantidad=cantidad,
-        tipo_movimiento="entrada",
-        observaciones=f"Devolución de insumo de labor {labor.id}"
-    )
-    
-    # Actualizar disponibilidad del insumo
-    insumo = db.query(Insumo).filter(Insumo.id == movimiento.insumo_id).first()
-    if insumo:
-        insumo.cantidad_disponible += cantidad
-    
-    db.add(movimiento_devolucion)
-    db.commit()
+    # Registrar la devolución y reponer la disponibilidad del insumo
+    insumo_id, labor_id = movimiento.insumo_id, labor.id
+    StockService.ejecutar_con_reintentos(db, lambda: StockService.entrada_insumo(
+        db, insumo_id, labor_id, cantidad, f"Devolución de insumo de labor {labor_id}"
+    ))
     
     return {"message": "✅ Insumo devuelto correctamente"}
 
 # === FUNCIONES ADICIONALES ===
 
-def listar_labores_por_trabajador(db: Session, trabajador_id: int, skip: int = 0, limit: int = 100, estado: str = None, usuario: Usuario = None):
+def listar_labores_por_trabajador(db: Session, trabajador_id: int, skip: int = 0, limit: int = 100, estado: str = None, usuario: Usuario = None, cursor: str = None, con_total: bool = None):
     if usuario.rol.nombre != "admin" and usuario.id != trabajador_id:
         raise HTTPException(403, "No puede ver labores de otros trabajadores")
     
@@ -455,24 +452,16 @@ def listar_labores_por_trabajador(db: Session, trabajador_id: int, skip: int = 0
     if estado:
         query = query.filter(Labor.estado == estado)
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_labor()), [Labor.id], "labores", skip, limit, cursor, con_total
+    )
     
-    # Convertir a diccionarios con recursos
-    labores_dict = []
-    for item in items:
-        _cargar_relaciones_labor(item)
-        _cargar_recursos_labor(db, item)
-        labor_dict = _labor_a_dict_con_recursos(item)
-        labores_dict.append(labor_dict)
+    # Convertir a diccionarios con recursos (consultas en lote para toda la página)
+    pagina["items"] = _labores_a_dicts(db, pagina["items"])
     
-    return {
-        "items": labores_dict,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
-def listar_labores_por_recomendacion(db: Session, recomendacion_id: int, skip: int = 0, limit: int = 100, usuario: Usuario = None):
+def listar_labores_por_recomendacion(db: Session, recomendacion_id: int, skip: int = 0, limit: int = 100, usuario: Usuario = None, cursor: str = None, con_total: bool = None):
     query = db.query(Labor).filter(Labor.recomendacion_id == recomendacion_id)
     
     if usuario.rol.nombre == "docente" or usuario.rol.nombre == "asesor":
@@ -480,61 +469,59 @@ def listar_labores_por_recomendacion(db: Session, recomendacion_id: int, skip: i
         if not recomendacion or recomendacion.docente_id != usuario.id:
             raise HTTPException(403, "No tiene permisos para ver estas labores")
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_labor()), [Labor.id], "labores", skip, limit, cursor, con_total
+    )
     
-    # Convertir a diccionarios con recursos
-    labores_dict = []
-    for item in items:
-        _cargar_relaciones_labor(item)
-        _cargar_recursos_labor(db, item)
-        labor_dict = _labor_a_dict_con_recursos(item)
-        labores_dict.append(labor_dict)
+    # Convertir a diccionarios con recursos (consultas en lote para toda la página)
+    pagina["items"] = _labores_a_dicts(db, pagina["items"])
     
-    return {
-        "items": labores_dict,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
 def obtener_estadisticas_labores_crud(db: Session, usuario: Usuario):
-    query = db.query(Labor)
+    query = _filtrar_labores_por_rol(db.query(Labor), usuario)
+    
+    # Un solo GROUP BY estado; el promedio se arma con las sumas parciales
+    desglose = desglose_agrupado(
+        query,
+        Labor.estado,
+        suma_avance=func.sum(Labor.avance_porcentaje),
+        con_avance=func.count(Labor.avance_porcentaje)
+    )
+    stats = desglose.conteos("estado", ["pendiente", "en_progreso", "completada", "cancelada"])
+    promedio_avance = desglose.promedio("suma_avance", "con_avance") or 0
     
+    return {
+        "total": desglose.total,
+        "pendientes": stats["pendiente"],
+        "en_progreso": stats["en_progreso"],
+        "completadas": stats["completada"],
+        "canceladas": stats["cancelada"],
+        "promedio_avance": round(float(promedio_avance), 2)
+    }
+
+# === FUNCIONES AUXILIARES ===
+
+def _filtrar_labores_por_rol(query, usuario: Usuario):
+    """Restringir una consulta de labores a las que el usuario puede ver"""
     if usuario.rol.nombre == "trabajador":
         query = query.filter(Labor.trabajador_id == usuario.id)
     elif usuario.rol.nombre == "docente" or usuario.rol.nombre == "asesor":
         query = query.join(Recomendacion).filter(Recomendacion.docente_id == usuario.id)
     elif usuario.rol.nombre == "talento_humano":
-        # CORREGIDO: Filtrar por programas del usuario (relación many-to-many)
-        # Obtener IDs de programas del usuario
+        # Obtener IDs de programas del usuario de talento_humano
         programa_ids = [programa.id for programa in usuario.programas]
         
         if programa_ids:
-            # Filtrar trabajadores que compartan al menos un programa
-            query = query.join(Usuario, Labor.trabajador_id == Usuario.id)\
-                         .join(usuario_programa, Usuario.id == usuario_programa.c.usuario_id)\
-                         .filter(usuario_programa.c.programa_id.in_(programa_ids))
+            # Trabajadores que tengan al menos uno de los mismos programas.
+            # Con IN (subconsulta) cada labor aparece una sola vez aunque compartan varios programas
+            trabajadores = select(usuario_programa.c.usuario_id)\
+                .where(usuario_programa.c.programa_id.in_(programa_ids))
+            query = query.filter(Labor.trabajador_id.in_(trabajadores))
         else:
-            # Usuario sin programas asignados - no muestra nada
+            # Si el usuario no tiene programas, no muestra nada
             query = query.filter(False)
-    
-    total = query.count()
-    
-    estados = ["pendiente", "en_progreso", "completada", "cancelada"]
-    stats = {estado: query.filter(Labor.estado == estado).count() for estado in estados}
-    
-    promedio_avance = query.with_entities(func.avg(Labor.avance_porcentaje)).scalar() or 0
-    
-    return {
-        "total": total,
-        "pendientes": stats["pendiente"],
-        "en_progreso": stats["en_progreso"],
-        "completadas": stats["completada"],
-        "canceladas": stats["cancelada"],
-        "promedio_avance": round(float(promedio_avance), 2)
-    }
-
-# === FUNCIONES AUXILIARES ===
+    return query
 
 def _verificar_permisos_labor(labor: Labor, usuario: Usuario, accion: str):
     rol = usuario.rol.nombre
@@ -585,74 +572,111 @@ def _cargar_relaciones_labor(labor: Labor):
         labor.tipo_labor_nombre = labor.tipo_labor.nombre
         labor.tipo_labor_descripcion = labor.tipo_labor.descripcion
 
+def _programas_de_labor(labor: Labor) -> Set[int]:
+    """
+    Programas a los que deben pertenecer los insumos de una labor: el del lote de la labor
+    (o el de su recomendación) y, si no hay lote, los programas del trabajador asignado
+    """
+    lote = labor.lote or (labor.recomendacion.lote if labor.recomendacion else None)
+    if lote and lote.programa_id:
+        return {lote.programa_id}
+    if labor.trabajador:
+        return {programa.id for programa in labor.trabajador.programas}
+    return set()
+
+def _nombres_programas(db: Session, programa_ids: Set[int]) -> Dict[int, str]:
+    return dict(db.query(Programa.id, Programa.nombre).filter(Programa.id.in_(list(programa_ids))).all())
+
+def _error_programa_insumo(insumo: Insumo, programas_labor: Set[int], nombres: Dict[int, str]) -> str:
+    programa_labor = ", ".join(nombres.get(programa_id, "Desconocido") for programa_id in sorted(programas_labor))
+    return (
+        f"El insumo '{insumo.nombre}' pertenece al programa '{nombres.get(insumo.programa_id, 'Desconocido')}', "
+        f"pero la labor está asociada al programa '{programa_labor}'. "
+        f"Solo puedes asignar insumos del mismo programa."
+    )
+
+def _opciones_carga_labor():
+    """Relaciones que _cargar_relaciones_labor lee, cargadas junto con la labor"""
+    return (
+        joinedload(Labor.trabajador),
+        joinedload(Labor.recomendacion),
+        joinedload(Labor.lote).joinedload(Lote.granja),
+        joinedload(Labor.tipo_labor)
+    )
+
 def _cargar_recursos_labor(db: Session, labor: Labor):
+    """Carga recursos de una labor y calcula cantidades netas"""
+    _cargar_recursos_labores(db, [labor])
+
+def _cargar_recursos_labores(db: Session, labores: List[Labor]):
     """
-    ✅ CORREGIDO: Carga recursos de la labor y calcula cantidades netas
+    Carga movimientos, herramientas, insumos, evidencias y creadores de varias labores
+    con un número fijo de consultas IN, sin importar cuántas labores haya
     """
-    print(f"Cargando recursos para labor ID: {labor.id}")
-    # Cargar movimientos de herramientas y calcular cantidades netas
-    movimientos_herramientas = db.query(MovimientoHerramienta).filter(
-        MovimientoHerramienta.labor_id == labor.id
-    ).all()
-    
-    herramientas_info = []
-    herramientas_totales = {}
+    labor_ids = [labor.id for labor in labores]
+    if not labor_ids:
+        return
     
-    for mov in movimientos_herramientas:
-        herramienta_id = mov.herramienta_id
-        
-        # Calcular cantidad neta por herramienta
-        if mov.tipo_movimiento == "salida":  # ✅ SALIDA = Asignación a labor
-            herramientas_totales[herramienta_id] = herramientas_totales.get(herramienta_id, 0) + mov.cantidad
-        elif mov.tipo_movimiento == "entrada":  # ✅ ENTRADA = Devolución a inventario
-            herramientas_totales[herramienta_id] = herramientas_totales.get(herramienta_id, 0) - mov.cantidad
-        
-        herramienta_info = {
+    movimientos_herramientas = defaultdict(list)
+    for mov in db.query(MovimientoHerramienta)\
+            .options(joinedload(MovimientoHerramienta.herramienta))\
+            .filter(MovimientoHerramienta.labor_id.in_(labor_ids))\
+            .order_by(MovimientoHerramienta.id).all():
+        movimientos_herramientas[mov.labor_id].append(mov)
+    
+    movimientos_insumos = defaultdict(list)
+    for mov in db.query(MovimientoInsumo)\
+            .options(joinedload(MovimientoInsumo.insumo))\
+            .filter(MovimientoInsumo.labor_id.in_(labor_ids))\
+            .order_by(MovimientoInsumo.id).all():
+        movimientos_insumos[mov.labor_id].append(mov)
+    
+    evidencias = defaultdict(list)
+    for evidencia in db.query(Evidencia)\
+            .options(joinedload(Evidencia.usuario))\
+            .filter(Evidencia.labor_id.in_(labor_ids))\
+            .order_by(Evidencia.id).all():
+        evidencias[evidencia.labor_id].append(evidencia)
+    
+    # Cantidades netas calculadas en SQL (salidas menos devoluciones)
+    herramientas_netas = balance_herramientas_por_labor(db, labor_ids)
+    insumos_netos = balance_insumos_por_labor(db, labor_ids)
+    
+    for labor in labores:
+        _asignar_herramientas_labor(labor, movimientos_herramientas[labor.id], herramientas_netas[labor.id])
+        _asignar_insumos_labor(labor, movimientos_insumos[labor.id], insumos_netos[labor.id])
+        _asignar_evidencias_labor(labor, evidencias[labor.id])
+
+def _asignar_herramientas_labor(labor: Labor, movimientos: List[MovimientoHerramienta], balances: List[dict]):
+    labor.herramientas_asignadas_info = [
+        {
             "movimiento_id": mov.id,
-            "herramienta_id": herramienta_id,
+            "herramienta_id": mov.herramienta_id,
             "herramienta_nombre": mov.herramienta.nombre if mov.herramienta else None,
             "cantidad": mov.cantidad,
             "tipo_movimiento": mov.tipo_movimiento,
             "fecha_movimiento": mov.fecha_movimiento,
             "observaciones": mov.observaciones
         }
-        herramientas_info.append(herramienta_info)
-    
-    # Crear resumen de herramientas asignadas (cantidad neta actual)
-    herramientas_resumen = []
-    for herramienta_id, cantidad_neta in herramientas_totales.items():
-        if cantidad_neta > 0:  # Solo mostrar herramientas que aún están asignadas
-            herramienta = db.query(Herramienta).filter(Herramienta.id == herramienta_id).first()
-            herramientas_resumen.append({
-                "herramienta_id": herramienta_id,
-                "herramienta_nombre": herramienta.nombre if herramienta else None,
-                "cantidad_actual": cantidad_neta,
-                "unidad_medida": "unidades"
-            })
-    
-    labor.herramientas_asignadas_info = herramientas_info
-    labor.herramientas_resumen = herramientas_resumen
-    
-    # Cargar movimientos de insumos y calcular cantidades netas
-    movimientos_insumos = db.query(MovimientoInsumo).filter(
-        MovimientoInsumo.labor_id == labor.id
-    ).all()
-    
-    insumos_info = []
-    insumos_totales = {}
-    
-    for mov in movimientos_insumos:
-        insumo_id = mov.insumo_id
-        
-        # Calcular cantidad neta por insumo
-        if mov.tipo_movimiento == "salida":  # ✅ SALIDA = Consumo en labor
-            insumos_totales[insumo_id] = insumos_totales.get(insumo_id, 0) + mov.cantidad
-        elif mov.tipo_movimiento == "entrada":  # ✅ ENTRADA = Devolución a inventario
-            insumos_totales[insumo_id] = insumos_totales.get(insumo_id, 0) - mov.cantidad
-        
-        insumo_info = {
+        for mov in movimientos
+    ]
+    
+    # Resumen de herramientas aún asignadas (cantidad neta actual)
+    labor.herramientas_resumen = [
+        {
+            "herramienta_id": balance["herramienta_id"],
+            "herramienta_nombre": balance["herramienta_nombre"],
+            "cantidad_actual": balance["cantidad_neta"],
+            "unidad_medida": "unidades"
+        }
+        for balance in balances
+    ]
+
+def _asignar_insumos_labor(labor: Labor, movimientos: List[MovimientoInsumo], balances: List[dict]):
+    labor.insumos_asignados_info = [
+        {
             "movimiento_id": mov.id,
-            "insumo_id": insumo_id,
+            "insumo_id": mov.insumo_id,
             "insumo_nombre": mov.insumo.nombre if mov.insumo else None,
             "cantidad": mov.cantidad,
             "tipo_movimiento": mov.tipo_movimiento,
@@ -660,35 +684,32 @@ def _cargar_recursos_labor(db: Session, labor: Labor):
             "observaciones": mov.observaciones,
             "unidad_medida": mov.insumo.unidad_medida if mov.insumo else None
         }
-        insumos_info.append(insumo_info)
-    
-    # Crear resumen de insumos consumidos (cantidad neta)
-    insumos_resumen = []
-    for insumo_id, cantidad_neta in insumos_totales.items():
-        if cantidad_neta > 0:  # Solo mostrar insumos que fueron consumidos
-            insumo = db.query(Insumo).filter(Insumo.id == insumo_id).first()
-            insumos_resumen.append({
-                "insumo_id": insumo_id,
-                "insumo_nombre": insumo.nombre if insumo else None,
-                "cantidad_consumida": cantidad_neta,
-                "unidad_medida": insumo.unidad_medida if insumo else "unidades"
-            })
-    
-    labor.insumos_asignados_info = insumos_info
-    labor.insumos_resumen = insumos_resumen
-    
-    # Cargar evidencias
-    evidencias = db.query(Evidencia).filter(Evidencia.labor_id == labor.id).all()
-    
+        for mov in movimientos
+    ]
+    
+    # Resumen de insumos consumidos (cantidad neta)
+    labor.insumos_resumen = [
+        {
+            "insumo_id": balance["insumo_id"],
+            "insumo_nombre": balance["insumo_nombre"],
+            "cantidad_consumida": balance["cantidad_neta"],
+            "unidad_medida": balance["unidad_medida"]
+        }
+        for balance in balances
+    ]
+
+def _asignar_evidencias_labor(labor: Labor, evidencias: List[Evidencia]):
     evidencias_info = []
     for evidencia in evidencias:
-        usuario_creador = db.query(Usuario).filter(Usuario.id == evidencia.usuario_id).first()
+        usuario_creador = evidencia.usuario
         creado_por_nombre = usuario_creador.nombre if usuario_creador else None
         
         evidencia_info = {
             "id": evidencia.id,
             "tipo": evidencia.tipo,
             "url_archivo": evidencia.url_archivo,
+            "url_miniatura": evidencia.url_miniatura,
+            "url_vista_previa": evidencia.url_vista_previa,
             "descripcion": evidencia.descripcion,
             "fecha_creacion": evidencia.fecha_creacion,
             "creado_por_nombre": creado_por_nombre
@@ -697,6 +718,13 @@ def _cargar_recursos_labor(db: Session, labor: Labor):
     
     labor.evidencias_info = evidencias_info
 
+def _labores_a_dicts(db: Session, labores: List[Labor]) -> List[dict]:
+    """Convierte una página de labores a diccionarios cargando sus recursos en lote"""
+    for labor in labores:
+        _cargar_relaciones_labor(labor)
+    _cargar_recursos_labores(db, labores)
+    return [_labor_a_dict_con_recursos(labor) for labor in labores]
+
 def _labor_a_dict_con_recursos(labor: Labor):
     """
     ✅ NUEVA FUNCIÓN: Convierte objeto Labor a diccionario compatible con LaborWithRecursosResponse
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, case, func
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 from fastapi import HTTPException
 
 from app.db.models import MovimientoHerramienta, MovimientoInsumo, Herramienta, Insumo, Labor
+from app.CRUD.paginacion import paginar
 
 def listar_movimientos_herramientas_crud(
     db: Session, 
@@ -14,7 +16,9 @@ def listar_movimientos_herramientas_crud(
     labor_id: Optional[int] = None,
     tipo_movimiento: Optional[str] = None,
     fecha_desde: Optional[datetime] = None,
-    fecha_hasta: Optional[datetime] = None
+    fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    con_total: Optional[bool] = None
 ):
     query = db.query(MovimientoHerramienta)
     
@@ -36,12 +40,15 @@ def listar_movimientos_herramientas_crud(
         fecha_hasta_fin = fecha_hasta.replace(hour=23, minute=59, second=59)
         query = query.filter(MovimientoHerramienta.fecha_movimiento <= fecha_hasta_fin)
     
-    total = query.count()
-    movimientos = query.order_by(MovimientoHerramienta.fecha_movimiento.desc()).offset(skip).limit(limit).all()
+    # Más recientes primero; el id desempata los movimientos con la misma fecha
+    pagina = paginar(
+        query, [MovimientoHerramienta.fecha_movimiento, MovimientoHerramienta.id], "movimientos_herramientas",
+        skip, limit, cursor, con_total, descendente=True
+    )
     
     # Cargar información relacionada
     movimientos_con_info = []
-    for mov in movimientos:
+    for mov in pagina["items"]:
         movimiento_dict = {
             "id": mov.id,
             "herramienta_id": mov.herramienta_id,
@@ -55,11 +62,8 @@ def listar_movimientos_herramientas_crud(
         }
         movimientos_con_info.append(movimiento_dict)
     
-    return {
-        "items": movimientos_con_info,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    pagina["items"] = movimientos_con_info
+    return pagina
 
 def listar_movimientos_insumos_crud(
     db: Session, 
@@ -69,7 +73,9 @@ def listar_movimientos_insumos_crud(
     labor_id: Optional[int] = None,
     tipo_movimiento: Optional[str] = None,
     fecha_desde: Optional[datetime] = None,
-    fecha_hasta: Optional[datetime] = None
+    fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    con_total: Optional[bool] = None
 ):
     query = db.query(MovimientoInsumo)
     
@@ -90,12 +96,14 @@ def listar_movimientos_insumos_crud(
         fecha_hasta_fin = fecha_hasta.replace(hour=23, minute=59, second=59)
         query = query.filter(MovimientoInsumo.fecha_movimiento <= fecha_hasta_fin)
     
-    total = query.count()
-    movimientos = query.order_by(MovimientoInsumo.fecha_movimiento.desc()).offset(skip).limit(limit).all()
+    pagina = paginar(
+        query, [MovimientoInsumo.fecha_movimiento, MovimientoInsumo.id], "movimientos_insumos",
+        skip, limit, cursor, con_total, descendente=True
+    )
     
     # Cargar información relacionada
     movimientos_con_info = []
-    for mov in movimientos:
+    for mov in pagina["items"]:
         movimiento_dict = {
             "id": mov.id,
             "insumo_id": mov.insumo_id,
@@ -110,11 +118,8 @@ def listar_movimientos_insumos_crud(
         }
         movimientos_con_info.append(movimiento_dict)
     
-    return {
-        "items": movimientos_con_info,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    pagina["items"] = movimientos_con_info
+    return pagina
 
 def obtener_movimiento_herramienta_crud(db: Session, movimiento_id: int):
     movimiento = db.query(MovimientoHerramienta).filter(MovimientoHerramienta.id == movimiento_id).first()
@@ -194,4 +199,85 @@ def obtener_estadisticas_movimientos_crud(db: Session, dias: int = 30):
                 "entrada": len([m for m in movimientos_insumos if m.tipo_movimiento == "entrada"])
             }
         }
-    }
\ No newline at end of file
+    }
+
+# ========== BALANCES NETOS POR LABOR ==========
+
+def _cantidad_neta(modelo):
+    """SUM(CASE ...): las salidas hacia la labor suman y las entradas (devoluciones) restan"""
+    return func.sum(case(
+        (modelo.tipo_movimiento == "salida", modelo.cantidad),
+        (modelo.tipo_movimiento == "entrada", -modelo.cantidad),
+        else_=0
+    ))
+
+def balance_herramientas_por_labor(
+    db: Session,
+    labor_ids: Optional[Iterable[int]] = None,
+    solo_asignadas: bool = True
+) -> Dict[int, List[dict]]:
+    """
+    Cantidad neta de cada herramienta en cada labor, calculada en una sola consulta.
+    Sin labor_ids responde para todas las labores. Con solo_asignadas=True omite las
+    herramientas ya devueltas por completo (neto <= 0).
+    """
+    neto = _cantidad_neta(MovimientoHerramienta)
+    query = db.query(
+        MovimientoHerramienta.labor_id,
+        MovimientoHerramienta.herramienta_id,
+        Herramienta.nombre.label("herramienta_nombre"),
+        neto.label("cantidad_neta")
+    ).outerjoin(Herramienta, MovimientoHerramienta.herramienta_id == Herramienta.id)\
+     .group_by(MovimientoHerramienta.labor_id, MovimientoHerramienta.herramienta_id, Herramienta.nombre)\
+     .order_by(MovimientoHerramienta.labor_id, func.min(MovimientoHerramienta.id))
+    
+    if labor_ids is not None:
+        query = query.filter(MovimientoHerramienta.labor_id.in_(list(labor_ids)))
+    if solo_asignadas:
+        query = query.having(neto > 0)
+    
+    balances = defaultdict(list)
+    for fila in query.all():
+        balances[fila.labor_id].append({
+            "herramienta_id": fila.herramienta_id,
+            "herramienta_nombre": fila.herramienta_nombre,
+            "cantidad_neta": fila.cantidad_neta
+        })
+    return balances
+
+def balance_insumos_por_labor(
+    db: Session,
+    labor_ids: Optional[Iterable[int]] = None,
+    solo_consumidos: bool = True
+) -> Dict[int, List[dict]]:
+    """
+    Cantidad neta consumida de cada insumo en cada labor, calculada en una sola consulta.
+    Sin labor_ids responde para todas las labores. Con solo_consumidos=True omite los
+    insumos devueltos por completo (neto <= 0).
+    """
+    neto = _cantidad_neta(MovimientoInsumo)
+    query = db.query(
+        MovimientoInsumo.labor_id,
+        MovimientoInsumo.insumo_id,
+        Insumo.id.label("insumo_registrado"),
+        Insumo.nombre.label("insumo_nombre"),
+        Insumo.unidad_medida,
+        neto.label("cantidad_neta")
+    ).outerjoin(Insumo, MovimientoInsumo.insumo_id == Insumo.id)\
+     .group_by(MovimientoInsumo.labor_id, MovimientoInsumo.insumo_id, Insumo.id, Insumo.nombre, Insumo.unidad_medida)\
+     .order_by(MovimientoInsumo.labor_id, func.min(MovimientoInsumo.id))
+    
+    if labor_ids is not None:
+        query = query.filter(MovimientoInsumo.labor_id.in_(list(labor_ids)))
+    if solo_consumidos:
+        query = query.having(neto > 0)
+    
+    balances = defaultdict(list)
+    for fila in query.all():
+        balances[fila.labor_id].append({
+            "insumo_id": fila.insumo_id,
+            "insumo_nombre": fila.insumo_nombre,
+            "unidad_medida": fila.unidad_medida if fila.insumo_registrado else "unidades",
+            "cantidad_neta": fila.cantidad_neta
+        })
+    return balances
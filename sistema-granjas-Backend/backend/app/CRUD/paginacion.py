@@ -0,0 +1,132 @@
+"""
+Paginación de listados: por offset (skip/limit, la de siempre) o por keyset con un cursor
+opaco sobre (clave de orden, id).
+
+Con cursor cada página es un rango del índice a partir de la última fila de la anterior,
+así la página 500 cuesta lo mismo que la 1, y el total solo se cuenta si se pide
+(con_total). Con offset el total se sigue contando siempre. Las dos formas devuelven
+siguiente_cursor, de modo que un cliente puede pedir la primera página por offset (con
+total) y seguir con cursores. cursor="" pide la primera página en modo cursor.
+
+Los totales exactos pasan por la caché de app/db/cache_conteos.py. Si no se pidió el
+exacto y no hay uno en caché, en PostgreSQL se devuelve la estimación del planner
+(total_estimado=True): cuesta lo que planificar la consulta, no recorrerla.
+"""
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.config import settings
+from app.core.cursores import codificar_cursor, decodificar_cursor
+from app.db.cache_conteos import cache_conteos, tablas_de
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN de un SELECT, con los parámetros ligados como en la consulta original"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compilar_explain(elemento, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(elemento.statement, **kw)
+
+
+def estimar_total(db, statement) -> Optional[int]:
+    """Filas que el planner de PostgreSQL estima para el SELECT; None en otros motores"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    plan = db.connection().execute(_Explain(statement)).scalar()
+    if isinstance(plan, str):
+        # psycopg2 decodifica el JSON; asyncpg lo entrega como texto
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _clave_conteo(db, statement) -> tuple:
+    compilado = statement.compile(dialect=db.get_bind().dialect)
+    return str(compilado), tuple(sorted((nombre, repr(valor)) for nombre, valor in compilado.params.items()))
+
+
+def _posicion(datos: dict, listado: str, orden: Sequence) -> tuple:
+    """Valores de la última fila entregada; el cursor debe ser de este mismo listado"""
+    valores = datos.get("k")
+    if datos.get("l") != listado or not isinstance(valores, list) or len(valores) != len(orden):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    try:
+        return tuple(
+            datetime.fromisoformat(valor) if isinstance(columna.type, DateTime) else int(valor)
+            for columna, valor in zip(orden, valores)
+        )
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def paginar(
+    query,
+    orden: Sequence,
+    listado: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    con_total: Optional[bool] = None,
+    descendente: bool = False
+) -> dict:
+    """
+    Página de `query` ordenada por `orden` (columnas DateTime o enteras sin NULL; la última
+    debe ser el id para que el orden sea total). Devuelve items, total, total_estimado,
+    paginas y siguiente_cursor (None en la última página); total y paginas son None si no
+    se contaron ni se pudieron estimar.
+    """
+    por_cursor = cursor is not None
+    exacto = con_total if con_total is not None else not por_cursor
+    total, total_estimado = None, False
+    if exacto or settings.LISTADOS_TOTAL_ESTIMADO:
+        db = query.session
+        statement = query.enable_eagerloads(False).statement
+        clave, tablas = _clave_conteo(db, statement), tablas_de(statement)
+        pendientes = cache_conteos.escrituras_pendientes(db.connection())
+        if exacto:
+            total = cache_conteos.contar(clave, tablas, query.count, pendientes)
+        else:
+            # Un total exacto reciente sale gratis; si no, la estimación
+            total = cache_conteos.obtener(clave, tablas, pendientes)
+            if total is None:
+                total = estimar_total(db, statement)
+                total_estimado = total is not None
+
+    datos = decodificar_cursor(cursor) if por_cursor else {}
+    if datos:
+        desde = _posicion(datos, listado, orden)
+        clave = tuple_(*orden) if len(orden) > 1 else orden[0]
+        desde = desde if len(orden) > 1 else desde[0]
+        query = query.filter(clave < desde if descendente else clave > desde)
+
+    query = query.order_by(*[columna.desc() if descendente else columna.asc() for columna in orden])
+    if not por_cursor:
+        query = query.offset(skip)
+    # Una fila de más indica si hay página siguiente sin contar
+    items = query.limit(limit + 1).all()
+
+    siguiente_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        ultima = items[-1]
+        siguiente_cursor = codificar_cursor({
+            "l": listado, "k": [getattr(ultima, columna.key) for columna in orden]
+        })
+
+    return {
+        "items": items,
+        "total": total,
+        "total_estimado": total_estimado,
+        "paginas": (total + limit - 1) // limit if total is not None else None,
+        "siguiente_cursor": siguiente_cursor
+    }
@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.db.models import Programa, Usuario, Granja
 from app.schemas.programa_schema import ProgramaCreate, ProgramaUpdate
+from app.core.cache_principal import cache_principales
+from app.services.cambios_service import CambiosService
 
 # Funciones existentes (las mantienes)
 def get_programas(db: Session):
@@ -51,7 +53,9 @@ def asignar_usuario_programa(db: Session, programa_id: int, usuario_id: int):
         raise HTTPException(status_code=400, detail="El usuario ya está asignado a este programa")
     
     programa.usuarios.append(usuario)
+    CambiosService.registrar_cambio_de_programa(db, programa.id, usuario)
     db.commit()
+    cache_principales.invalidar_usuario(usuario_id)
     
     return programa
 
@@ -69,7 +73,9 @@ def desasignar_usuario_programa(db: Session, programa_id: int, usuario_id: int):
         raise HTTPException(status_code=400, detail="El usuario no está asignado a este programa")
     
     programa.usuarios.remove(usuario)
+    CambiosService.registrar_cambio_de_programa(db, programa.id, usuario)
     db.commit()
+    cache_principales.invalidar_usuario(usuario_id)
     
     return {"message": "Usuario desasignado correctamente del programa"}
 
@@ -1,9 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 from datetime import datetime
 from app.db.models import Recomendacion, Labor, Usuario, Lote, Diagnostico
 from app.schemas.recomendacion_schema import RecomendacionCreate, RecomendacionUpdate, AprobacionRecomendacionRequest
 from fastapi import HTTPException
+from app.CRUD.estadisticas import desglose_agrupado
+from app.CRUD.paginacion import paginar
 
 def crear_recomendacion(db: Session, data: RecomendacionCreate, usuario_id: int):
     # CORRECCIÓN: Usar docente_id en lugar de usuario_id
@@ -29,7 +31,9 @@ def listar_recomendaciones(
     tipo: str = None,
     lote_id: int = None,
     docente_id: int = None,
-    usuario: Usuario = None
+    usuario: Usuario = None,
+    cursor: str = None,
+    con_total: bool = None
 ):
     query = db.query(Recomendacion)
     
@@ -48,18 +52,16 @@ def listar_recomendaciones(
         query = query.filter(Recomendacion.docente_id == usuario.id)
     # Estudiantes no pueden ver recomendaciones directamente
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_recomendacion()), [Recomendacion.id], "recomendaciones",
+        skip, limit, cursor, con_total
+    )
     
     # Cargar relaciones
-    for item in items:
+    for item in pagina["items"]:
         _cargar_relaciones_recomendacion(item)
     
-    return {
-        "items": items,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
 def obtener_recomendacion(db: Session, id: int, usuario: Usuario = None):
     rec = db.query(Recomendacion).filter(Recomendacion.id == id).first()
@@ -142,25 +144,23 @@ def obtener_recomendacion_con_labores(db: Session, id: int, usuario: Usuario):
                 
     return rec
 
-def listar_recomendaciones_por_diagnostico(db: Session, diagnostico_id: int, skip: int = 0, limit: int = 100, usuario: Usuario = None):
+def listar_recomendaciones_por_diagnostico(db: Session, diagnostico_id: int, skip: int = 0, limit: int = 100, usuario: Usuario = None, cursor: str = None, con_total: bool = None):
     query = db.query(Recomendacion).filter(Recomendacion.diagnostico_id == diagnostico_id)
     
     if usuario and usuario.rol.nombre == "docente":
         query = query.filter(Recomendacion.docente_id == usuario.id)
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_recomendacion()), [Recomendacion.id], "recomendaciones",
+        skip, limit, cursor, con_total
+    )
     
-    for item in items:
+    for item in pagina["items"]:
         _cargar_relaciones_recomendacion(item)
     
-    return {
-        "items": items,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
-def listar_recomendaciones_por_lote(db: Session, lote_id: int, skip: int = 0, limit: int = 100, estado: str = None, usuario: Usuario = None):
+def listar_recomendaciones_por_lote(db: Session, lote_id: int, skip: int = 0, limit: int = 100, estado: str = None, usuario: Usuario = None, cursor: str = None, con_total: bool = None):
     query = db.query(Recomendacion).filter(Recomendacion.lote_id == lote_id)
     
     if estado:
@@ -169,35 +169,31 @@ def listar_recomendaciones_por_lote(db: Session, lote_id: int, skip: int = 0, li
     if usuario and usuario.rol.nombre == "docente":
         query = query.filter(Recomendacion.docente_id == usuario.id)
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_recomendacion()), [Recomendacion.id], "recomendaciones",
+        skip, limit, cursor, con_total
+    )
     
-    for item in items:
+    for item in pagina["items"]:
         _cargar_relaciones_recomendacion(item)
     
-    return {
-        "items": items,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
-def listar_recomendaciones_por_usuario(db: Session, usuario_id: int, skip: int = 0, limit: int = 100, usuario_actual: Usuario = None):
+def listar_recomendaciones_por_usuario(db: Session, usuario_id: int, skip: int = 0, limit: int = 100, usuario_actual: Usuario = None, cursor: str = None, con_total: bool = None):
     # Solo admin puede ver recomendaciones de otros usuarios
     if usuario_actual.rol.nombre != "admin" and usuario_actual.id != usuario_id:
         raise HTTPException(403, "No puede ver recomendaciones de otros usuarios")
     
     query = db.query(Recomendacion).filter(Recomendacion.docente_id == usuario_id)
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_recomendacion()), [Recomendacion.id], "recomendaciones",
+        skip, limit, cursor, con_total
+    )
     
-    for item in items:
+    for item in pagina["items"]:
         _cargar_relaciones_recomendacion(item)
     
-    return {
-        "items": items,
-        "total": total,
-        "paginas": (total + limit - 1) // limit
-    }
+    return pagina
 
 def obtener_estadisticas_recomendaciones(db: Session, usuario: Usuario):
     query = db.query(Recomendacion)
@@ -205,17 +201,13 @@ def obtener_estadisticas_recomendaciones(db: Session, usuario: Usuario):
     if usuario.rol.nombre == "docente":
         query = query.filter(Recomendacion.docente_id == usuario.id)
     
-    total = query.count()
-    
-    estados = ["pendiente", "aprobada", "en_ejecucion", "completada", "cancelada"]
-    stats = {estado: query.filter(Recomendacion.estado == estado).count() for estado in estados}
-    
-    # Estadísticas por tipo
-    tipos = db.query(Recomendacion.tipo).distinct().all()
-    por_tipo = {tipo[0]: query.filter(Recomendacion.tipo == tipo[0]).count() for tipo in tipos if tipo[0]}
+    # Estados y tipos salen de un solo GROUP BY estado, tipo
+    desglose = desglose_agrupado(query, Recomendacion.estado, Recomendacion.tipo)
+    stats = desglose.conteos("estado", ["pendiente", "aprobada", "en_ejecucion", "completada", "cancelada"])
+    por_tipo = {tipo: cantidad for tipo, cantidad in desglose.por("tipo").items() if tipo}
     
     return {
-        "total": total,
+        "total": desglose.total,
         "pendientes": stats["pendiente"],
         "aprobadas": stats["aprobada"],
         "en_ejecucion": stats["en_ejecucion"],
@@ -237,6 +229,15 @@ def actualizar_estado_por_labores(db: Session, recomendacion_id: int):
             db.commit()
 
 # === FUNCIÓN AUXILIAR ===
+def _opciones_carga_recomendacion():
+    """Relaciones que _cargar_relaciones_recomendacion lee, cargadas junto con la recomendación"""
+    return (
+        joinedload(Recomendacion.docente),
+        joinedload(Recomendacion.lote).joinedload(Lote.granja),
+        joinedload(Recomendacion.lote).joinedload(Lote.programa),
+        joinedload(Recomendacion.diagnostico),
+    )
+
 def _cargar_relaciones_recomendacion(recomendacion: Recomendacion):
     """Cargar información relacionada de la recomendación"""
     if recomendacion.docente:
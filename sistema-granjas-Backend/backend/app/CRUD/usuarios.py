@@ -1,8 +1,9 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_
 from app.db.models import Usuario
 from app.schemas.usuario_schema import UsuarioCreate, UsuarioUpdate
 from app.core.security import get_password_hash
+from app.core.cache_principal import cache_principales
 
 def get_usuario_by_id(db: Session, usuario_id: int):
     return db.query(Usuario).filter(Usuario.id == usuario_id, Usuario.activo == True).first()
@@ -10,6 +11,13 @@ def get_usuario_by_id(db: Session, usuario_id: int):
 def get_usuario_by_email(db: Session, email: str):
     return db.query(Usuario).filter(Usuario.email == email, Usuario.activo == True).first()
 
+def get_usuario_autenticado(db: Session, email: str):
+    """Usuario activo con rol y programas cargados en la misma consulta (para la autenticación)"""
+    return db.query(Usuario).options(
+        joinedload(Usuario.rol),
+        joinedload(Usuario.programas)
+    ).filter(Usuario.email == email, Usuario.activo == True).first()
+
 def get_usuarios(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Usuario).filter(Usuario.activo == True).offset(skip).limit(limit).all()
 
@@ -39,6 +47,7 @@ def update_usuario(db: Session, usuario_id: int, usuario_update: UsuarioUpdate):
             setattr(db_usuario, field, value)
         db.commit()
         db.refresh(db_usuario)
+        cache_principales.invalidar_usuario(usuario_id)
     return db_usuario
 
 def delete_usuario(db: Session, usuario_id: int):
@@ -46,6 +55,7 @@ def delete_usuario(db: Session, usuario_id: int):
     if db_usuario:
         db_usuario.activo = False
         db.commit()
+        cache_principales.invalidar_usuario(usuario_id)
         return True
     return False
 
@@ -55,6 +65,7 @@ def cambiar_rol_usuario(db: Session, usuario_id: int, nuevo_rol_id: int):
         db_usuario.rol_id = nuevo_rol_id
         db.commit()
         db.refresh(db_usuario)
+        cache_principales.invalidar_usuario(usuario_id)
         return db_usuario
     return None
 
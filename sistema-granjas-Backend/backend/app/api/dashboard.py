@@ -0,0 +1,19 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.core.dependencies import require_any_role
+from app.schemas.dashboard_schema import ResumenSistemaResponse
+from app.services.summary_service import SystemSummary
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+
+@router.get("/resumen", response_model=ResumenSistemaResponse)
+def obtener_resumen(
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin", "docente"]))
+):
+    """Totales globales del sistema para el tablero principal"""
+    return {**SystemSummary.obtener(db), "fecha_generacion": datetime.now()}
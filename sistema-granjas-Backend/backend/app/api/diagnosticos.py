@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from datetime import datetime
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.db.models import Diagnostico, Usuario, Lote, Recomendacion
 from app.schemas.diagnostico_schema import (
     DiagnosticoCreate, DiagnosticoUpdate, DiagnosticoResponse,
@@ -10,7 +11,9 @@ from app.schemas.diagnostico_schema import (
     AsignacionDocenteRequest, CierreDiagnosticoRequest,
     EstadisticasDiagnosticosResponse
 )
-from app.core.dependencies import get_current_user, require_any_role
+from app.core.dependencies import get_current_user, require_any_role, require_any_role_async
+from app.CRUD.estadisticas import desglose_agrupado
+from app.CRUD.paginacion import paginar
 
 router = APIRouter(prefix="/diagnosticos", tags=["diagnosticos"])
 
@@ -25,7 +28,7 @@ def get_or_404(db, model, id, msg="Recurso no encontrado"):
 
 # === LISTAR ===
 @router.get("/", response_model=DiagnosticoListResponse)
-def listar_diagnosticos(
+async def listar_diagnosticos(
     skip: int = 0,
     limit: int = 100,
     estado: Optional[str] = None,
@@ -33,9 +36,20 @@ def listar_diagnosticos(
     lote_id: Optional[int] = None,
     estudiante_id: Optional[int] = None,
     docente_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    user: Usuario = Depends(require_any_role(["admin", "docente", "asesor", "estudiante"]))
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
+    db: AsyncSession = Depends(get_async_db),
+    user: Usuario = Depends(require_any_role_async(["admin", "docente", "asesor", "estudiante"]))
 ):
+    return await db.run_sync(
+        _listar_diagnosticos, skip, limit, estado, tipo, lote_id, estudiante_id, docente_id, user, cursor, con_total
+    )
+
+
+def _listar_diagnosticos(
+    db: Session, skip, limit, estado, tipo, lote_id, estudiante_id, docente_id, user: Usuario,
+    cursor: Optional[str] = None, con_total: Optional[bool] = None
+) -> DiagnosticoListResponse:
     query = db.query(Diagnostico)
 
     # Permisos por rol
@@ -60,17 +74,15 @@ def listar_diagnosticos(
     if docente_id and rol in ["docente", "admin"]:
         query = query.filter(Diagnostico.docente_id == docente_id)
 
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    pagina = paginar(
+        query.options(*_opciones_carga_diagnostico()), [Diagnostico.id], "diagnosticos",
+        skip, limit, cursor, con_total
+    )
 
-    for d in items:
+    for d in pagina["items"]:
         _cargar_relaciones(d)
 
-    return DiagnosticoListResponse(
-        items=items,
-        total=total,
-        paginas=(total + limit - 1) // limit
-    )
+    return DiagnosticoListResponse(**pagina)
 
 
 # === CREAR ===
@@ -238,17 +250,13 @@ def obtener_estadisticas(
     if user.rol.nombre not in ["docente", "asesor"]:
         query = query.filter(Diagnostico.docente_id == user.id)
 
-    total = query.count()
-
-    estados = ["abierto", "en_revision", "cerrado"]
-    stats = {s: query.filter(Diagnostico.estado == s).count() for s in estados}
-
-    tipos = {t[0]: query.filter(Diagnostico.tipo == t[0]).count()
-             for t in db.query(Diagnostico.tipo).distinct()
-             if t[0]}
+    # Estados y tipos salen de un solo GROUP BY estado, tipo
+    desglose = desglose_agrupado(query, Diagnostico.estado, Diagnostico.tipo)
+    stats = desglose.conteos("estado", ["abierto", "en_revision", "cerrado"])
+    tipos = {tipo: cantidad for tipo, cantidad in desglose.por("tipo").items() if tipo}
 
     return EstadisticasDiagnosticosResponse(
-        total=total,
+        total=desglose.total,
         abiertos=stats["abierto"],
         en_revision=stats["en_revision"],
         cerrados=stats["cerrado"],
@@ -294,6 +302,15 @@ def _check_edit_permission(obj: Diagnostico, user: Usuario, data: DiagnosticoUpd
     raise HTTPException(403, "No tiene permisos para editar este diagnóstico")
 
 # === RELACIONES ===
+def _opciones_carga_diagnostico():
+    """Relaciones que _cargar_relaciones lee, cargadas junto con el diagnóstico"""
+    return (
+        joinedload(Diagnostico.estudiante),
+        joinedload(Diagnostico.docente),
+        joinedload(Diagnostico.lote).joinedload(Lote.granja),
+        joinedload(Diagnostico.lote).joinedload(Lote.programa),
+    )
+
 def _cargar_relaciones(obj: Diagnostico):
     obj.estudiante_nombre = obj.estudiante.nombre if obj.estudiante else None
     obj.docente_nombre = obj.docente.nombre if obj.docente else None
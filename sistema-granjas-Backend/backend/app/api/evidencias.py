@@ -2,8 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.core.dependencies import get_current_user
-from app.schemas.evidencia_schema import EvidenciaCreate, EvidenciaResponse, EvidenciaListResponse
+from app.schemas.evidencia_schema import (
+    EvidenciaCreate, EvidenciaResponse, EvidenciaListResponse,
+    SubidaEvidenciaCreate, SubidaEvidenciaResponse, CompletarSubidaRequest
+)
 from app.CRUD.evidencias import crear_evidencia_crud, listar_evidencias_entidad_crud, eliminar_evidencia_crud
+from app.services.evidencia_subida_service import SubidaEvidenciaService
+from app.services.derivados_service import generador_derivados
 
 router = APIRouter(prefix="/evidencias", tags=["Evidencias"])
 
@@ -14,7 +19,42 @@ def crear_evidencia(
     usuario = Depends(get_current_user)
 ):
     """Crear una nueva evidencia para cualquier entidad"""
-    return crear_evidencia_crud(db, data, usuario)
+    evidencia = crear_evidencia_crud(db, data, usuario)
+    generador_derivados.programar([evidencia])
+    return evidencia
+
+@router.post("/subidas", response_model=SubidaEvidenciaResponse)
+def iniciar_subida_evidencia(
+    data: SubidaEvidenciaCreate,
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """
+    Iniciar la subida directa de un archivo al bucket. Devuelve una URL prefirmada (PUT)
+    o, para archivos grandes, una URL por parte. Después llamar a /subidas/{id}/completar.
+    """
+    return SubidaEvidenciaService.iniciar(db, data, usuario)
+
+@router.post("/subidas/{subida_id}/completar", response_model=EvidenciaResponse)
+def completar_subida_evidencia(
+    subida_id: int,
+    data: CompletarSubidaRequest = CompletarSubidaRequest(),
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """Verificar el archivo subido (tamaño y tipo) y crear la evidencia"""
+    evidencia = SubidaEvidenciaService.completar(db, subida_id, data.partes, usuario)
+    generador_derivados.programar([evidencia])
+    return evidencia
+
+@router.delete("/subidas/{subida_id}")
+def cancelar_subida_evidencia(
+    subida_id: int,
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """Cancelar una subida pendiente y descartar lo que se haya subido"""
+    return SubidaEvidenciaService.cancelar(db, subida_id, usuario)
 
 @router.get("/{tipo_entidad}/{entidad_id}", response_model=EvidenciaListResponse)
 def listar_evidencias_entidad(
@@ -24,7 +64,10 @@ def listar_evidencias_entidad(
     usuario = Depends(get_current_user)
 ):
     """Listar evidencias de una entidad específica"""
-    return listar_evidencias_entidad_crud(db, tipo_entidad, entidad_id)
+    resultado = listar_evidencias_entidad_crud(db, tipo_entidad, entidad_id)
+    # Imágenes sin miniatura (anteriores a los derivados o fallidas): generarlas en segundo plano
+    generador_derivados.programar(resultado["items"])
+    return resultado
 
 @router.delete("/{evidencia_id}")
 def eliminar_evidencia(
@@ -1,27 +1,82 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
 from app.core.dependencies import get_current_user, require_any_role
 from app.export import ExportService
+from app.export.exportJobs import gestor_trabajos, TIPOS_EXPORTACION, ESTADO_COMPLETADO
+from app.export.streamingWriter import MEDIA_TYPE_XLSX
+from app.schemas.export_schema import TrabajoExportacionCreate, TrabajoExportacionResponse
 
 router = APIRouter(prefix="/export", tags=["Exportación"])
 
+# Las rutas de exportación son síncronas (def) para que FastAPI las ejecute en su
+# pool de hilos y no bloqueen el event loop mientras se arma el archivo.
+
+# ========================== TRABAJOS EN SEGUNDO PLANO ==========================
+@router.post("/jobs", response_model=TrabajoExportacionResponse, status_code=status.HTTP_202_ACCEPTED)
+def crear_trabajo_exportacion(
+    datos: TrabajoExportacionCreate,
+    usuario = Depends(get_current_user)
+):
+    if datos.tipo not in TIPOS_EXPORTACION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de exportación no válido. Opciones: {', '.join(TIPOS_EXPORTACION)}"
+        )
+
+    roles, _, _ = TIPOS_EXPORTACION[datos.tipo]
+    if usuario.rol.nombre not in roles and usuario.rol.nombre != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail=f"Se requiere uno de los siguientes roles: {', '.join(roles)}"
+        )
+
+    return gestor_trabajos.crear(datos.tipo, usuario).to_dict()
+
+@router.get("/jobs/{trabajo_id}", response_model=TrabajoExportacionResponse)
+def obtener_trabajo_exportacion(
+    trabajo_id: str,
+    usuario = Depends(get_current_user)
+):
+    trabajo = gestor_trabajos.obtener(trabajo_id, usuario)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo de exportación no encontrado")
+    return trabajo.to_dict()
+
+@router.get("/jobs/{trabajo_id}/descargar")
+def descargar_trabajo_exportacion(
+    trabajo_id: str,
+    token: str = Query(..., description="Token de descarga entregado al completar el trabajo")
+):
+    trabajo = gestor_trabajos.obtener_para_descarga(trabajo_id, token)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo de exportación no encontrado")
+    if trabajo.estado != ESTADO_COMPLETADO:
+        raise HTTPException(status_code=409, detail=f"El trabajo aún no está listo (estado: {trabajo.estado})")
+
+    return FileResponse(trabajo.ruta, media_type=MEDIA_TYPE_XLSX, filename=trabajo.nombre_archivo)
+
 # ========================== BACKUP COMPLETO ==========================
 @router.get("/backup/excel")
-async def export_backup_excel(
+def export_backup_excel(
+    streaming: bool = Query(True),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente"]))
 ):
     try:
-        return ExportService(db, usuario).export_todo_excel()
+        servicio = ExportService(db, usuario)
+        if streaming:
+            return servicio.export_todo_excel_streaming()
+        return servicio.export_todo_excel()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # ========================== GRANJAS ==========================
 @router.get("/granjas/excel")
-async def export_granjas(
+def export_granjas(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente", "asesor"]))
@@ -33,7 +88,7 @@ async def export_granjas(
 
 # ========================== LOTES ==========================
 @router.get("/lotes/excel")
-async def export_lotes(
+def export_lotes(
     detallado: bool = Query(False),
     lote_id: int = Query(None),
     db: Session = Depends(get_db),
@@ -50,7 +105,7 @@ async def export_lotes(
 
 # ========================== DIAGNÓSTICOS ==========================
 @router.get("/diagnosticos/excel")
-async def export_diagnosticos(
+def export_diagnosticos(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente", "asesor"]))
@@ -62,7 +117,7 @@ async def export_diagnosticos(
 
 # ========================== RECOMENDACIONES ==========================
 @router.get("/recomendaciones/excel")
-async def export_recomendaciones(
+def export_recomendaciones(
     estado: str = Query(None),
     tipo: str = Query(None),
     db: Session = Depends(get_db),
@@ -82,7 +137,7 @@ async def export_recomendaciones(
 
 # ========================== LABORES ==========================
 @router.get("/labores/excel")
-async def export_labores(
+def export_labores(
     estado: str = Query(None),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
@@ -99,7 +154,7 @@ async def export_labores(
 
 # ========================== INVENTARIO COMPLETO ==========================
 @router.get("/inventario/excel")
-async def export_inventario(
+def export_inventario(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente", "asesor"]))
@@ -111,7 +166,7 @@ async def export_inventario(
 
 # ========================== USUARIOS ==========================
 @router.get("/usuarios/excel")
-async def export_usuarios(
+def export_usuarios(
     rol: str = Query(None),
     activo: bool = Query(None),
     db: Session = Depends(get_db),
@@ -131,7 +186,7 @@ async def export_usuarios(
 
 # ========================== PROGRAMAS ==========================
 @router.get("/programas/excel")
-async def export_programas(
+def export_programas(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente"]))
@@ -143,7 +198,7 @@ async def export_programas(
 
 # ========================== CULTIVOS ==========================
 @router.get("/cultivos/excel")
-async def export_cultivos(
+def export_cultivos(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente", "asesor"]))
@@ -155,7 +210,7 @@ async def export_cultivos(
 
 # ========================== MOVIMIENTOS ==========================
 @router.get("/movimientos/excel")
-async def export_movimientos(
+def export_movimientos(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente"]))
@@ -167,7 +222,7 @@ async def export_movimientos(
 
 # ========================== RESUMEN / ESTADÍSTICAS ==========================
 @router.get("/resumen/excel")
-async def export_resumen(
+def export_resumen(
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "docente"]))
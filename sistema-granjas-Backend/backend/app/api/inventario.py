@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional, List
+from datetime import date, datetime
+
+from app.db.database import get_db
+from app.db.models import SnapshotInventario
+from app.core.dependencies import require_any_role
+from app.services.inventario_service import InventarioService
+from app.schemas.inventario_schema import (
+    TipoRecurso,
+    SaldoInventarioResponse,
+    ConsumoMensualResponse,
+    SnapshotInventarioResponse,
+    ConciliacionResponse,
+    GeneracionSnapshotsResponse
+)
+
+router = APIRouter(prefix="/inventario", tags=["Ledger de Inventario"])
+
+
+@router.get("/saldo", response_model=SaldoInventarioResponse)
+def saldo_en_fecha(
+    tipo: TipoRecurso,
+    recurso_id: int,
+    fecha: datetime,
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin", "talento_humano", "docente"]))
+):
+    """
+    Disponibilidad de una herramienta o insumo en una fecha (UTC)
+    """
+    return InventarioService.saldo_en(db, tipo, recurso_id, fecha)
+
+
+@router.get("/consumo-mensual", response_model=ConsumoMensualResponse)
+def consumo_mensual(
+    tipo: TipoRecurso,
+    desde: date = Query(..., description="Cualquier día del mes inicial"),
+    hasta: date = Query(..., description="Cualquier día del mes final"),
+    recurso_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin", "talento_humano", "docente"]))
+):
+    """
+    Salidas, entradas y consumo neto por recurso y mes
+    """
+    return InventarioService.consumo_mensual(db, tipo, desde, hasta, recurso_id)
+
+
+@router.get("/snapshots", response_model=List[SnapshotInventarioResponse])
+def listar_snapshots(
+    tipo: TipoRecurso,
+    recurso_id: Optional[int] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None,
+    solo_ajustes: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin", "talento_humano"]))
+):
+    """
+    Listar snapshots; con solo_ajustes=true, los cortes que registraron cambios fuera de movimientos
+    """
+    query = db.query(SnapshotInventario).filter(SnapshotInventario.tipo_recurso == tipo)
+    if recurso_id is not None:
+        query = query.filter(SnapshotInventario.recurso_id == recurso_id)
+    if fecha_desde:
+        query = query.filter(SnapshotInventario.fecha_corte >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(SnapshotInventario.fecha_corte <= fecha_hasta)
+    if solo_ajustes:
+        query = query.filter(SnapshotInventario.ajuste != 0)
+    return query.order_by(SnapshotInventario.fecha_corte.desc(), SnapshotInventario.recurso_id)\
+        .offset(skip).limit(limit).all()
+
+
+@router.get("/conciliacion", response_model=ConciliacionResponse)
+def conciliacion(
+    tipo: Optional[TipoRecurso] = None,
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin"]))
+):
+    """
+    Recursos cuya cantidad_disponible no coincide con el último snapshot más los movimientos posteriores
+    """
+    return InventarioService.conciliar(db, tipo)
+
+
+@router.post("/snapshots/generar", response_model=GeneracionSnapshotsResponse)
+def generar_snapshots(
+    db: Session = Depends(get_db),
+    _ = Depends(require_any_role(["admin"]))
+):
+    """
+    Generar los snapshots pendientes hasta hoy y conciliar
+    """
+    generados = InventarioService.generar_snapshots(db)
+    return {"generados": generados, "conciliacion": InventarioService.conciliar(db)}
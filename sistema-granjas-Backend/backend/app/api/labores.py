@@ -1,21 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.core.dependencies import require_any_role, get_current_user
+from app.db.database import get_db, get_async_db
+from app.core.dependencies import require_any_role, require_any_role_async, get_current_user
 from app.CRUD.labores import (
     crear_labor_crud, listar_labores_crud, obtener_labor_objeto, 
     obtener_labor_dict, actualizar_labor_crud, eliminar_labor_crud,
-    asignar_herramienta_crud, asignar_insumo_crud, registrar_avance_crud,
-    completar_labor_crud, devolver_herramienta_crud, listar_labores_por_trabajador,
+    asignar_herramienta_crud, asignar_insumo_crud, asignar_recursos_crud, registrar_avance_crud,
+    completar_labor_crud, devolver_herramienta_crud, devolver_insumo_crud, listar_labores_por_trabajador,
     listar_labores_por_recomendacion, obtener_estadisticas_labores_crud
 )
 from app.schemas.labor_schema import (
     LaborCreate, LaborUpdate, LaborResponse, LaborListResponse,
     LaborWithRecursosResponse, AsignacionHerramientaRequest,
-    AsignacionInsumoRequest, RegistroAvanceRequest,
+    AsignacionInsumoRequest, AsignacionRecursosRequest, RegistroAvanceRequest,
     EstadisticasLaboresResponse
 )
+from app.services.derivados_service import generador_derivados
 
 router = APIRouter(prefix="/labores", tags=["Labores"])
 
@@ -34,7 +36,7 @@ def crear_labor(
 
 
 @router.get("/", response_model=LaborListResponse)
-def listar_labores(
+async def listar_labores(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     estado: Optional[str] = None,
@@ -42,12 +44,15 @@ def listar_labores(
     lote_id: Optional[int] = None,
     recomendacion_id: Optional[int] = None,
     tipo_labor_id: Optional[int] = None,  # ✅ AGREGADO: Filtro por tipo de labor
-    db: Session = Depends(get_db),
-    usuario = Depends(require_any_role(["admin", "talento_humano", "estudiante", "docente", "asesor", "trabajador"]))
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
+    db: AsyncSession = Depends(get_async_db),
+    usuario = Depends(require_any_role_async(["admin", "talento_humano", "estudiante", "docente", "asesor", "trabajador"]))
 ):
-    """Listar labores con filtros"""
-    return listar_labores_crud(
-        db, skip, limit, estado, trabajador_id, lote_id, recomendacion_id, tipo_labor_id, usuario
+    """Listar labores con filtros (async: no ocupa un hilo del threadpool)"""
+    return await db.run_sync(
+        listar_labores_crud, skip, limit, estado, trabajador_id, lote_id, recomendacion_id, tipo_labor_id, usuario,
+        cursor, con_total
     )
 
 
@@ -64,6 +69,7 @@ def obtener_labor(
     labor = obtener_labor_dict(db, id, usuario)  # Usar obtener_labor_dict para respuesta
     if not labor:
         raise HTTPException(404, "Labor no encontrada")
+    generador_derivados.programar(labor["evidencias"])
     return labor
 
 
@@ -129,6 +135,21 @@ def asignar_insumo(
     return asignar_insumo_crud(db, labor, data, usuario)
 
 
+@router.post("/{id}/asignar-recursos", response_model=LaborWithRecursosResponse)
+def asignar_recursos(
+    id: int,
+    data: AsignacionRecursosRequest,
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user),
+    _ = Depends(require_any_role(["admin", "talento_humano", "trabajador"]))
+):
+    """Asignar varias herramientas e insumos a la vez (todo o nada)"""
+    labor = obtener_labor_objeto(db, id, usuario)
+    if not labor:
+        raise HTTPException(404, "Labor no encontrada")
+    return asignar_recursos_crud(db, labor, data, usuario)
+
+
 @router.post("/{id}/registrar-avance", response_model=LaborResponse)
 def registrar_avance(
     id: int,
@@ -178,7 +199,7 @@ def devolver_insumo(
     labor = obtener_labor_objeto(db, id, usuario)
     if not labor:
         raise HTTPException(404, "Labor no encontrada")
-    return devolver_insumo(db, labor, movimiento_id, cantidad, usuario)
+    return devolver_insumo_crud(db, labor, movimiento_id, cantidad, usuario)
 
 
 # === ENDPOINTS ADICIONALES ===
@@ -187,13 +208,15 @@ def listar_labores_trabajador(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     estado: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(require_any_role(["admin", "talento_humano", "trabajador"]))
 ):
     if usuario.rol.nombre not in ["trabajador", "admin"]:
         raise HTTPException(403, "Solo disponible para trabajadores")
     
-    return listar_labores_por_trabajador(db, usuario.id, skip, limit, estado, usuario)
+    return listar_labores_por_trabajador(db, usuario.id, skip, limit, estado, usuario, cursor, con_total)
 
 
 @router.get("/recomendacion/{recomendacion_id}", response_model=LaborListResponse)
@@ -201,10 +224,12 @@ def listar_labores_recomendacion(
     recomendacion_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user)
 ):
-    return listar_labores_por_recomendacion(db, recomendacion_id, skip, limit, usuario)
+    return listar_labores_por_recomendacion(db, recomendacion_id, skip, limit, usuario, cursor, con_total)
 
 
 @router.get("/estadisticas/resumen", response_model=EstadisticasLaboresResponse)
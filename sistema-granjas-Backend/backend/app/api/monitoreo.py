@@ -0,0 +1,91 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.db.database import engine, async_engine
+from app.db.pool_metrics import metricas_pool, metricas_pool_async
+from app.db.consultas_metricas import estadisticas_consultas
+from app.db.consultas_lentas import consultas_lentas
+from app.core.dependencies import require_any_role
+from app.schemas.monitoreo_schema import (
+    EstadisticasPoolesResponse, EstadisticasConsultasResponse, ConsultaLentaResponse,
+    ConsultaLentaDetalleResponse, ResumenConsultaLentaResponse
+)
+
+router = APIRouter(prefix="/monitoreo", tags=["Monitoreo"])
+
+
+def _estadisticas_pooles():
+    return {
+        "sync": metricas_pool.estadisticas(engine.pool),
+        "async": metricas_pool_async.estadisticas(async_engine.sync_engine.pool),
+    }
+
+
+@router.get("/pool", response_model=EstadisticasPoolesResponse)
+def estadisticas_pool(_ = Depends(require_any_role(["admin"]))):
+    """Estado de los pools de conexiones (motor sync y async) del worker que atiende la petición"""
+    return _estadisticas_pooles()
+
+
+@router.post("/pool/reiniciar", response_model=EstadisticasPoolesResponse)
+def reiniciar_estadisticas_pool(_ = Depends(require_any_role(["admin"]))):
+    """Poner a cero los contadores acumulados (esperas, checkouts, timeouts) de ambos pools"""
+    metricas_pool.reiniciar()
+    metricas_pool_async.reiniciar()
+    return _estadisticas_pooles()
+
+
+@router.get("/consultas", response_model=EstadisticasConsultasResponse)
+def estadisticas_consultas_por_ruta(
+    orden: Literal["consultas_total", "consultas_promedio", "consultas_max", "tiempo_db_total_ms",
+                   "tiempo_db_promedio_ms", "pedidos"] = Query("consultas_total", description="Campo por el que ordenar (mayor primero)"),
+    limite: int = Query(50, ge=1, le=500),
+    _ = Depends(require_any_role(["admin"]))
+):
+    """Consultas SQL y tiempo en la base de datos por ruta, en el worker que atiende la petición"""
+    return estadisticas_consultas.estadisticas(orden, limite)
+
+
+@router.post("/consultas/reiniciar", response_model=EstadisticasConsultasResponse)
+def reiniciar_estadisticas_consultas(_ = Depends(require_any_role(["admin"]))):
+    """Poner a cero los agregados por ruta"""
+    estadisticas_consultas.reiniciar()
+    return estadisticas_consultas.estadisticas()
+
+
+@router.get("/consultas-lentas", response_model=List[ConsultaLentaResponse])
+def listar_consultas_lentas(
+    ruta: Optional[str] = Query(None, description="Filtrar por ruta (contiene, p. ej. /api/labores)"),
+    huella: Optional[str] = Query(None, description="Solo las de esta consulta normalizada"),
+    orden: Literal["recientes", "duracion"] = Query("recientes"),
+    limite: int = Query(50, ge=1, le=500),
+    _ = Depends(require_any_role(["admin"]))
+):
+    """Consultas que superaron el umbral, en el worker que atiende la petición (sin el plan)"""
+    return consultas_lentas.entradas(ruta, huella, orden, limite)
+
+
+@router.get("/consultas-lentas/resumen", response_model=List[ResumenConsultaLentaResponse])
+def resumen_consultas_lentas(
+    limite: int = Query(50, ge=1, le=500),
+    _ = Depends(require_any_role(["admin"]))
+):
+    """Consultas lentas agrupadas por SQL normalizado, las de mayor tiempo total primero"""
+    return consultas_lentas.resumen(limite)
+
+
+@router.get("/consultas-lentas/{entrada_id}", response_model=ConsultaLentaDetalleResponse)
+def obtener_consulta_lenta(entrada_id: int, _ = Depends(require_any_role(["admin"]))):
+    """Una consulta lenta con su plan de ejecución"""
+    entrada = consultas_lentas.entrada(entrada_id)
+    if not entrada:
+        raise HTTPException(status_code=404, detail="Consulta lenta no encontrada (el buffer es circular)")
+    return entrada
+
+
+@router.post("/consultas-lentas/reiniciar")
+def reiniciar_consultas_lentas(_ = Depends(require_any_role(["admin"]))):
+    """Vaciar el registro de consultas lentas"""
+    consultas_lentas.limpiar()
+    return {"message": "Registro de consultas lentas vaciado"}
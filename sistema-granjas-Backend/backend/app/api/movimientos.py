@@ -29,6 +29,8 @@ def listar_movimientos_herramientas(
     tipo_movimiento: Optional[str] = Query(None, regex="^(salida|entrada)$"),
     fecha_desde: Optional[datetime] = None,
     fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "talento_humano", "docente"]))
@@ -37,7 +39,7 @@ def listar_movimientos_herramientas(
     Listar movimientos de herramientas con filtros
     """
     return listar_movimientos_herramientas_crud(
-        db, skip, limit, herramienta_id, labor_id, tipo_movimiento, fecha_desde, fecha_hasta
+        db, skip, limit, herramienta_id, labor_id, tipo_movimiento, fecha_desde, fecha_hasta, cursor, con_total
     )
 
 @router.get("/insumos", response_model=dict)
@@ -49,6 +51,8 @@ def listar_movimientos_insumos(
     tipo_movimiento: Optional[str] = Query(None, regex="^(salida|entrada)$"),
     fecha_desde: Optional[datetime] = None,
     fecha_hasta: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user),
     _ = Depends(require_any_role(["admin", "talento_humano", "docente"]))
@@ -57,7 +61,7 @@ def listar_movimientos_insumos(
     Listar movimientos de insumos con filtros
     """
     return listar_movimientos_insumos_crud(
-        db, skip, limit, insumo_id, labor_id, tipo_movimiento, fecha_desde, fecha_hasta
+        db, skip, limit, insumo_id, labor_id, tipo_movimiento, fecha_desde, fecha_hasta, cursor, con_total
     )
 
 @router.get("/herramientas/{movimiento_id}")
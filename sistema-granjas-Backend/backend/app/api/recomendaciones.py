@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.core.dependencies import require_any_role, get_current_user
+from app.db.database import get_db, get_async_db
+from app.core.dependencies import require_any_role, get_current_user, get_current_user_async
 from app.CRUD.recomendaciones import *
 from app.schemas.recomendacion_schema import (
     RecomendacionCreate, RecomendacionUpdate, RecomendacionResponse,
@@ -24,17 +25,24 @@ def crear(
     return crear_recomendacion(db, data, usuario.id)
 
 @router.get("/", response_model=RecomendacionListResponse)
-def listar(
+async def listar(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     estado: Optional[str] = None,
     tipo: Optional[str] = None,
     lote_id: Optional[int] = None,
     docente_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    usuario = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
+    db: AsyncSession = Depends(get_async_db),
+    usuario = Depends(get_current_user_async)
 ):
-    return listar_recomendaciones(db, skip, limit, estado, tipo, lote_id, docente_id, usuario)
+    # La respuesta se valida dentro de run_sync, donde aún se pueden leer los objetos ORM
+    return await db.run_sync(
+        lambda sesion: RecomendacionListResponse.model_validate(
+            listar_recomendaciones(sesion, skip, limit, estado, tipo, lote_id, docente_id, usuario, cursor, con_total)
+        )
+    )
 
 @router.get("/{id}", response_model=RecomendacionResponse)
 def obtener(
@@ -103,11 +111,13 @@ def listar_por_diagnostico(
     diagnostico_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user)
 ):
     """Listar recomendaciones por diagnóstico específico"""
-    return listar_recomendaciones_por_diagnostico(db, diagnostico_id, skip, limit, usuario)
+    return listar_recomendaciones_por_diagnostico(db, diagnostico_id, skip, limit, usuario, cursor, con_total)
 
 @router.get("/lote/{lote_id}", response_model=RecomendacionListResponse)
 def listar_por_lote(
@@ -115,11 +125,13 @@ def listar_por_lote(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     estado: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario = Depends(get_current_user)
 ):
     """Listar recomendaciones por lote específico"""
-    return listar_recomendaciones_por_lote(db, lote_id, skip, limit, estado, usuario)
+    return listar_recomendaciones_por_lote(db, lote_id, skip, limit, estado, usuario, cursor, con_total)
 
 @router.get("/estadisticas/resumen", response_model=EstadisticasRecomendacionesResponse)
 def obtener_estadisticas(
@@ -144,8 +156,10 @@ def listar_por_usuario(
     usuario_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="siguiente_cursor de la página anterior; vacío para empezar por cursor"),
+    con_total: Optional[bool] = Query(None, description="Contar el total (por defecto solo sin cursor)"),
     db: Session = Depends(get_db),
     usuario_actual = Depends(get_current_user)
 ):
     """Listar recomendaciones creadas por un usuario específico"""
-    return listar_recomendaciones_por_usuario(db, usuario_id, skip, limit, usuario_actual)
\ No newline at end of file
+    return listar_recomendaciones_por_usuario(db, usuario_id, skip, limit, usuario_actual, cursor, con_total)
\ No newline at end of file
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.db.database import get_db
+from app.core.cache_principal import cache_principales
 from app.schemas.rol_schema import (
     RolCreate, 
     RolUpdate, 
@@ -99,6 +100,8 @@ def actualizar_rol(rol_id: int, rol_update: RolUpdate, db: Session = Depends(get
     
     db.commit()
     db.refresh(rol)
+    # Los principales en caché guardan el nombre del rol
+    cache_principales.limpiar()
     return rol
 
 @router.delete("/roles/{rol_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -123,6 +126,7 @@ def eliminar_rol(rol_id: int, db: Session = Depends(get_db)):
     # Soft delete - marcar como inactivo
     rol.activo = False
     db.commit()
+    cache_principales.limpiar()
     return None
 
 @router.post("/roles/inicializar-roles", response_model=List[str])
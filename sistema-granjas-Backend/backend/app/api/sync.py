@@ -1,17 +1,50 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-
-router = APIRouter()
-
-# Modelo de datos que recibimos desde IndexedDB
-class SyncItem(BaseModel):
-    tipo: str
-    data: dict
-    synced: bool | None = None
-    createdAt: str | None = None
-
-@router.post("/sync")
-async def sync_data(item: SyncItem):
-    print(f"📥 Recibido desde frontend: {item}")
-    # Aquí en el futuro guardarás en la base de datos
-    return {"status": "ok", "received": item}
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.database import get_db
+from app.core.dependencies import get_current_user
+from app.services.sync_service import SyncService
+from app.services.cambios_service import CambiosService
+from app.schemas.sync_schema import SyncItem, SyncBatchRequest, SyncBatchResponse, SyncItemResultado, CambiosResponse
+
+router = APIRouter(prefix="/sync", tags=["Sincronización"])
+
+
+@router.post("/batch", response_model=SyncBatchResponse)
+def sync_batch(
+    data: SyncBatchRequest,
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """
+    Aplicar en una transacción los registros creados offline (hasta 1000 por lote).
+    Cada ítem lleva un cliente_id único; reenviar un ítem ya aplicado no lo duplica.
+    """
+    return SyncService.procesar_lote(db, usuario, data.items)
+
+
+@router.post("", response_model=SyncItemResultado)
+def sync_item(
+    item: SyncItem,
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """
+    Aplicar un solo ítem (clientes anteriores a /sync/batch)
+    """
+    return SyncService.procesar_lote(db, usuario, [item])["resultados"][0]
+
+
+@router.get("/changes", response_model=CambiosResponse)
+def sync_changes(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la llamada anterior; vacío para la carga completa"),
+    limit: int = Query(500, ge=1, le=5000, description="Máximo de filas por tabla"),
+    db: Session = Depends(get_db),
+    usuario = Depends(get_current_user)
+):
+    """
+    Labores, lotes, insumos y herramientas modificados desde el cursor, con el alcance
+    del rol del usuario, más los ids eliminados. Repetir con el nuevo cursor mientras hay_mas.
+    """
+    return CambiosService.cambios(db, usuario, since, limit)
@@ -1,22 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.db.database import get_db
 from app.services.file_service import FileService
-from app.services.storage_service import upload_file_r2
+from app.services.blob_service import BlobService
 
 router = APIRouter(prefix="/files", tags=["Archivos"])
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
     try:
-        contents = await file.read()
-
-        url = upload_file_r2(
-            file_bytes=contents,
-            file_name=file.filename,
-            content_type=file.content_type
+        # Se guarda por contenido desde el archivo temporal de la petición, fuera del event
+        # loop: si el mismo archivo ya se subió (p. ej. un reintento), no se vuelve a subir
+        blob, duplicado = await run_in_threadpool(
+            BlobService.guardar_stream,
+            db,
+            file.file,
+            file.filename,
+            file.content_type
         )
 
-        return {"message": "Archivo subido correctamente", "url": url}
+        return {
+            "message": "Archivo subido correctamente",
+            "url": BlobService.url(blob),
+            "sha256": blob.sha256,
+            "duplicado": duplicado
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.CRUD.usuarios import (
     get_usuarios, 
     get_usuario_by_id, 
@@ -14,7 +15,7 @@ from app.CRUD.usuarios import (
 )
 from app.CRUD.roles import get_rol_by_id
 from app.schemas.usuario_schema import UsuarioResponse, UsuarioUpdate
-from app.core.dependencies import get_current_user, require_any_role
+from app.core.dependencies import get_current_user, get_current_user_async, require_any_role
 from app.db.models import Usuario
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
@@ -172,11 +173,15 @@ def eliminar_usuario(
     return {"message": "Usuario eliminado correctamente"}
 
 @router.get("/me/perfil", response_model=UsuarioResponse)
-def obtener_mi_perfil(current_user: Usuario = Depends(get_current_user)):
+async def obtener_mi_perfil(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Usuario = Depends(get_current_user_async)
+):
     """
     Obtener el perfil del usuario actual (cualquier usuario autenticado)
     """
-    return UsuarioResponse(
+    # nombre y fecha_creacion no están en la caché: se leen dentro de run_sync
+    return await db.run_sync(lambda _: UsuarioResponse(
         id=current_user.id,
         nombre=current_user.nombre,
         email=current_user.email,
@@ -184,7 +189,7 @@ def obtener_mi_perfil(current_user: Usuario = Depends(get_current_user)):
         rol_nombre=current_user.rol.nombre,
         activo=current_user.activo,
         fecha_creacion=current_user.fecha_creacion
-    )
+    ))
 
 @router.get("/email/{email}")
 def buscar_usuario_por_email(
@@ -0,0 +1,156 @@
+"""
+Caché del usuario autenticado (principal) para no consultar la base de datos en cada petición
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class Principal:
+    """Datos mínimos del usuario autenticado que usan los chequeos de permisos"""
+
+    __slots__ = ("id", "email", "activo", "rol_id", "rol_nombre", "programa_ids")
+
+    def __init__(self, id: int, email: str, activo: bool, rol_id: int, rol_nombre: str, programa_ids: List[int]):
+        self.id = id
+        self.email = email
+        self.activo = activo
+        self.rol_id = rol_id
+        self.rol_nombre = rol_nombre
+        self.programa_ids = tuple(programa_ids)
+
+    @classmethod
+    def desde_usuario(cls, usuario: Usuario) -> "Principal":
+        return cls(
+            id=usuario.id,
+            email=usuario.email,
+            activo=usuario.activo,
+            rol_id=usuario.rol_id,
+            rol_nombre=usuario.rol.nombre if usuario.rol else None,
+            programa_ids=[programa.id for programa in usuario.programas],
+        )
+
+
+class _RolCacheado:
+    __slots__ = ("id", "nombre")
+
+    def __init__(self, id: int, nombre: str):
+        self.id = id
+        self.nombre = nombre
+
+
+class _ProgramaCacheado:
+    __slots__ = ("id",)
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+class UsuarioActual:
+    """
+    Usuario autenticado construido desde la caché.
+
+    id, email, activo, rol_id, rol.nombre y programas[].id se responden sin consultar.
+    Cualquier otro atributo (nombre, fecha_creacion, relaciones...) carga la fila
+    Usuario de la sesión de la petición la primera vez que se pide.
+    """
+
+    def __init__(self, principal: Principal, db: Session):
+        self._principal = principal
+        self._db = db
+        self._usuario: Optional[Usuario] = None
+        self.id = principal.id
+        self.email = principal.email
+        self.activo = principal.activo
+        self.rol_id = principal.rol_id
+        self.rol = _RolCacheado(principal.rol_id, principal.rol_nombre)
+        self.programas = [_ProgramaCacheado(programa_id) for programa_id in principal.programa_ids]
+
+    @property
+    def usuario(self) -> Usuario:
+        """Fila Usuario completa (se carga una sola vez por petición)"""
+        if self._usuario is None:
+            self._usuario = self._db.get(Usuario, self._principal.id)
+        return self._usuario
+
+    def __getattr__(self, nombre):
+        # Solo se llama para atributos que no están en la caché
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        return getattr(self.usuario, nombre)
+
+    def __repr__(self):
+        return f"<UsuarioActual id={self.id} email={self.email} rol={self.rol.nombre}>"
+
+
+class CachePrincipales:
+    """Caché LRU con TTL de principales, indexada por el subject (email) del token"""
+
+    def __init__(self, ttl_segundos: float = 60, max_entradas: int = 1024):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._emails_por_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, email: str) -> Optional[Principal]:
+        if self.ttl_segundos <= 0:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(email)
+            if entrada is None:
+                return None
+            expira, principal = entrada
+            if expira < time.monotonic():
+                self._eliminar(email)
+                return None
+            self._entradas.move_to_end(email)
+            return principal
+
+    def guardar(self, email: str, principal: Principal):
+        if self.ttl_segundos <= 0:
+            return
+        with self._lock:
+            self._entradas[email] = (time.monotonic() + self.ttl_segundos, principal)
+            self._entradas.move_to_end(email)
+            self._emails_por_id[principal.id] = email
+            while len(self._entradas) > self.max_entradas:
+                email_antiguo, (_, principal_antiguo) = self._entradas.popitem(last=False)
+                self._limpiar_indice(email_antiguo, principal_antiguo)
+
+    def invalidar_usuario(self, usuario_id: int):
+        """Descartar el principal de un usuario (cambió su fila, rol o programas)"""
+        with self._lock:
+            email = self._emails_por_id.get(usuario_id)
+            if email is not None:
+                self._eliminar(email)
+                logger.debug(f"Principal del usuario {usuario_id} invalidado")
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._emails_por_id.clear()
+
+    def _eliminar(self, email: str):
+        entrada = self._entradas.pop(email, None)
+        if entrada is not None:
+            self._limpiar_indice(email, entrada[1])
+
+    def _limpiar_indice(self, email: str, principal: Principal):
+        if self._emails_por_id.get(principal.id) == email:
+            del self._emails_por_id[principal.id]
+
+
+cache_principales = CachePrincipales(
+    ttl_segundos=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entradas=settings.AUTH_CACHE_MAX_ENTRIES,
+)
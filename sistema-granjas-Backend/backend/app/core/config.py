@@ -37,6 +37,58 @@ class Settings(BaseSettings):
     R2_BUCKET_NAME: str
     R2_ENDPOINT: str
     R2_PUBLIC_URL: str
+    R2_TAMANO_PARTE_MB: int = 8  # subidas por partes: memoria por subida acotada a una parte (mínimo 5)
+    R2_URL_FIRMADA_MINUTOS: int = 60  # vigencia de las URLs de subida directa al bucket
+    EVIDENCIA_TAMANO_MAXIMO_MB: int = 500
+    EVIDENCIA_COMPLETAR_TIMEOUT_SEGUNDOS: int = 120  # una subida "completando" más antigua se puede volver a tomar
+    BLOB_RESERVA_MINUTOS: int = 60  # un archivo entregado por /files/upload no se borra antes, aunque ninguna evidencia lo use aún
+    # Derivados de evidencias de imagen (WebP sin EXIF, junto al original en el bucket)
+    EVIDENCIA_MINIATURA_PX: int = 320
+    EVIDENCIA_VISTA_PREVIA_PX: int = 1280
+    EVIDENCIA_DERIVADOS_WORKERS: int = 2  # procesos del pool de Pillow
+
+    # === Base de datos ===
+    # Motor async (asyncpg / aiosqlite); por defecto se deriva de DATABASE_URL
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Pool de conexiones por worker (cada motor, sync y async, tiene el suyo)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos; -1 para no reciclar
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_SLOW_CHECKOUT_MS: int = 500  # esperas mayores se registran como warning
+    SQL_CONSULTAS_ALERTA: int = 50  # peticiones con más consultas se registran como warning; 0 desactiva
+    DEBUG: bool = False  # encabezados X-DB-* (consultas y tiempo en la base de datos) en cada respuesta
+
+    # === Registro de consultas lentas ===
+    CONSULTAS_LENTAS_UMBRAL_MS: int = 200  # sentencias más lentas se registran; 0 desactiva
+    CONSULTAS_LENTAS_MAX_ENTRADAS: int = 200  # buffer circular por worker
+    CONSULTAS_LENTAS_EXPLAIN: bool = True  # tomar el plan en segundo plano
+    CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S: int = 300  # como mucho un plan por consulta normalizada en este lapso
+    CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS: int = 5000  # statement_timeout del EXPLAIN ANALYZE
+
+    # === Movimientos de inventario ===
+    STOCK_MAX_REINTENTOS: int = 3  # ante deadlocks o fallos de serialización
+    STOCK_REINTENTO_ESPERA_MS: int = 50  # espera base, se duplica en cada intento
+    INVENTARIO_SNAPSHOT_REVISION_MINUTOS: int = 60  # cada cuánto se generan snapshots pendientes; 0 desactiva el hilo
+
+    # === Sincronización offline ===
+    SYNC_MARGEN_SEGUNDOS: int = 5  # /sync/changes no entrega filas más recientes que esto (commits tardíos, relojes)
+
+    # === Listados paginados ===
+    LISTADOS_CONTEO_TTL_SEGUNDOS: int = 30  # caché de totales por filtros y rol; 0 la desactiva
+    LISTADOS_CONTEO_MAX_ENTRADAS: int = 2048
+    LISTADOS_TOTAL_ESTIMADO: bool = True  # sin total exacto pedido, estimarlo con el planner (solo PostgreSQL)
+
+    # === Caché del usuario autenticado ===
+    AUTH_CACHE_TTL_SECONDS: int = 60  # 0 desactiva la caché
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+
+    # === Exportaciones en segundo plano ===
+    EXPORT_DIR: Optional[str] = None  # por defecto, el directorio temporal del sistema
+    EXPORT_MAX_WORKERS: int = 2
+    EXPORT_JOB_TTL_MINUTES: int = 30
+    EXPORT_JOB_DEDUP_SECONDS: int = 60
 
     # === Variables de negocio ===
     ROLES_POR_DEFECTO: Optional[Dict] = None
@@ -0,0 +1,44 @@
+"""
+Cursores opacos para paginación por keyset y feeds de cambios.
+
+El cliente recibe un string base64url con un JSON compacto y lo devuelve tal cual;
+no debe interpretarlo. Las fechas viajan en ISO 8601.
+"""
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+def codificar_cursor(datos: dict) -> str:
+    texto = json.dumps(datos, separators=(",", ":"), default=lambda valor: valor.isoformat())
+    return base64.urlsafe_b64encode(texto.encode()).rstrip(b"=").decode()
+
+
+def decodificar_cursor(cursor: Optional[str]) -> dict:
+    """Cursor vacío -> {}; cursor mal formado -> 400"""
+    if not cursor:
+        return {}
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    if not isinstance(datos, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    return datos
+
+
+def posicion(datos: dict, clave: str) -> Optional[tuple]:
+    """Leer una posición keyset (fecha, id) guardada como [iso, id]"""
+    valor = datos.get(clave)
+    if valor is None:
+        return None
+    try:
+        fecha, registro_id = valor
+        return datetime.fromisoformat(fecha), int(registro_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
@@ -1,20 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.security import verify_token
-from app.db.database import get_db
-from app.CRUD.usuarios import get_usuario_by_email
+from app.db.database import get_db, get_async_db
+from app.CRUD.usuarios import get_usuario_autenticado
+from app.core.cache_principal import cache_principales, Principal, UsuarioActual
 from app.db.models import Usuario
 
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security), 
-    db: Session = Depends(get_db)
-):
-    """
-    Obtener el usuario actual desde el JWT
-    """
+def _email_del_token(credentials: HTTPAuthorizationCredentials) -> str:
     token = credentials.credentials
     payload = verify_token(token)
     if not payload:
@@ -23,39 +19,88 @@ def get_current_user(
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     email = payload.get("sub")
     if not email:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
         )
-    
-    user = get_usuario_by_email(db, email=email)
+    return email
+
+def _cargar_principal(db: Session, email: str) -> Principal:
+    """Consultar el usuario (con rol y programas) y guardarlo en la caché"""
+    user = get_usuario_autenticado(db, email=email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario no encontrado",
         )
-    
-    if not user.activo:
+    principal = Principal.desde_usuario(user)
+    cache_principales.guardar(email, principal)
+    return principal
+
+def _verificar_activo(principal: Principal):
+    if not principal.activo:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario inactivo",
         )
-    
-    return user
+
+def _verificar_roles(current_user, roles: list):
+    if (current_user.rol.nombre not in roles and
+        current_user.rol.nombre != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Se requiere uno de los siguientes roles: {', '.join(roles)}"
+        )
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener el usuario actual desde el JWT
+    """
+    email = _email_del_token(credentials)
+
+    # El principal (id, rol, programas) se toma de la caché si está vigente
+    principal = cache_principales.obtener(email) or _cargar_principal(db, email)
+    _verificar_activo(principal)
+
+    return UsuarioActual(principal, db)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Igual que get_current_user, para endpoints async. Con la caché vigente no toca la base de datos.
+    Los atributos fuera de la caché solo pueden leerse dentro de db.run_sync(...).
+    """
+    email = _email_del_token(credentials)
+
+    principal = cache_principales.obtener(email)
+    if principal is None:
+        principal = await db.run_sync(_cargar_principal, email)
+    _verificar_activo(principal)
+
+    return UsuarioActual(principal, db.sync_session)
 
 def require_any_role(roles: list):
     """
     Dependency para requerir cualquiera de los roles especificados
     """
     def role_checker(current_user: Usuario = Depends(get_current_user)):
-        if (current_user.rol.nombre not in roles and 
-            current_user.rol.nombre != "admin"):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Se requiere uno de los siguientes roles: {', '.join(roles)}"
-            )
+        _verificar_roles(current_user, roles)
+        return current_user
+    return role_checker  # ✅ SOLO retornamos la función, sin Depends()
+
+def require_any_role_async(roles: list):
+    """
+    Versión de require_any_role para endpoints que usan get_async_db
+    """
+    async def role_checker(current_user: Usuario = Depends(get_current_user_async)):
+        _verificar_roles(current_user, roles)
         return current_user
-    return role_checker  # ✅ SOLO retornamos la función, sin Depends()
\ No newline at end of file
+    return role_checker
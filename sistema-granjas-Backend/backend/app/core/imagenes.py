@@ -0,0 +1,34 @@
+"""
+Generación de derivados de imágenes (miniatura y vista previa) para las evidencias.
+
+Corre en un pool de procesos (ver app/services/derivados_service.py), por eso este módulo
+no importa nada de la aplicación: cada proceso hijo solo carga Pillow.
+"""
+from io import BytesIO
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps
+
+
+def generar_derivados(contenido: bytes, tamanos: Dict[str, Tuple[int, int]]) -> Dict[str, bytes]:
+    """
+    Redimensionar la imagen a cada tamaño {nombre: (lado máximo px, calidad)} y devolver
+    WebP sin metadatos. La orientación EXIF se aplica antes de descartarla.
+    """
+    lado_mayor = max(lado for lado, _ in tamanos.values())
+
+    with Image.open(BytesIO(contenido)) as original:
+        # En JPEG el decodificador puede reducir hasta 1/8 al leer: mucho más rápido
+        original.draft("RGB", (lado_mayor, lado_mayor))
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+
+        derivados = {}
+        for nombre, (lado, calidad) in sorted(tamanos.items(), key=lambda item: -item[1][0]):
+            imagen.thumbnail((lado, lado), Image.LANCZOS)
+            salida = BytesIO()
+            # Sin exif= ni icc_profile= no se copia ningún metadato del original
+            imagen.save(salida, "WEBP", quality=calidad, method=4)
+            derivados[nombre] = salida.getvalue()
+        return derivados
@@ -0,0 +1,170 @@
+"""
+Caché de los totales de los listados paginados (el COUNT de cada página).
+
+La clave es el SELECT compilado con sus parámetros: incluye los filtros y el alcance por
+rol (p. ej. el IN sobre usuario_programa de talento_humano), así dos pedidos con el mismo
+conjunto de filas comparten la entrada aunque lleguen de usuarios distintos.
+
+Cada tabla tiene un número de versión que sube con cada INSERT/UPDATE/DELETE ejecutado
+por este proceso y otra vez al confirmar o revertir la transacción; una entrada solo vale
+mientras las versiones de las tablas que consulta sean las mismas que al contar. Un total
+contado en una transacción con escrituras sin confirmar sobre esas tablas no se guarda ni
+se lee de la caché: incluiría (o le faltarían) filas que las demás sesiones no ven. Las
+escrituras de otros workers no se ven: el TTL acota cuánto puede quedar desactualizado.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.sql.expression import Alias, TableClause
+from sqlalchemy.sql.util import find_tables
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PREFIJOS_ESCRITURA = ("INSERT", "UPDATE", "DELETE")
+
+
+def tablas_de(statement) -> FrozenSet[str]:
+    """Tablas que lee un SELECT, incluidas las de subconsultas y joins"""
+    tablas = set()
+    for tabla in find_tables(statement, check_columns=True, include_aliases=True, include_joins=True, include_selects=True):
+        while isinstance(tabla, Alias):
+            tabla = tabla.element
+        if isinstance(tabla, TableClause):
+            tablas.add(tabla.name)
+    return frozenset(tablas)
+
+
+class CacheConteos:
+    """Caché LRU con TTL de totales, invalidada por versión de tabla"""
+
+    def __init__(self, ttl_segundos: float = 30, max_entradas: int = 2048):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[Tuple, Tuple[float, FrozenSet[str], Tuple[int, ...], int]]" = OrderedDict()
+        self._versiones: Dict[str, int] = defaultdict(int)
+        self._version_global = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _firma(self, tablas: FrozenSet[str]) -> Tuple[int, ...]:
+        return (self._version_global,) + tuple(self._versiones[tabla] for tabla in sorted(tablas))
+
+    @staticmethod
+    def escrituras_pendientes(conexion) -> FrozenSet:
+        """Tablas con escrituras sin confirmar en la transacción de la conexión (None: desconocidas)"""
+        return frozenset(conexion.info.get("cache_conteos_tablas", ()))
+
+    @staticmethod
+    def _afectadas(tablas: FrozenSet[str], pendientes: FrozenSet) -> bool:
+        return bool(pendientes) and (None in pendientes or not tablas.isdisjoint(pendientes))
+
+    def obtener(self, clave: Tuple, tablas: FrozenSet[str], pendientes: FrozenSet = frozenset()) -> Optional[int]:
+        """Total cacheado; pendientes son las escrituras sin confirmar de quien pregunta"""
+        if self.ttl_segundos <= 0 or self._afectadas(tablas, pendientes):
+            return None
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic() or entrada[2] != self._firma(tablas):
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[3]
+
+    def contar(self, clave: Tuple, tablas: FrozenSet[str], contar: Callable[[], int],
+               pendientes: FrozenSet = frozenset()) -> int:
+        """
+        Total cacheado o, si no hay, el de contar(), que se guarda salvo que la transacción
+        tenga escrituras sin confirmar (pendientes) sobre alguna de las tablas
+        """
+        if self._afectadas(tablas, pendientes):
+            return contar()
+        total = self.obtener(clave, tablas)
+        if total is not None:
+            return total
+        # Versiones tomadas antes de contar: una escritura durante el COUNT invalida el resultado
+        with self._lock:
+            firma = self._firma(tablas)
+        total = contar()
+        if self.ttl_segundos > 0:
+            with self._lock:
+                self._entradas[clave] = (time.monotonic() + self.ttl_segundos, tablas, firma, total)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return total
+
+    def invalidar(self, tablas=None):
+        """Invalidar los totales de esas tablas (o todos si tablas es None)"""
+        with self._lock:
+            if tablas is None:
+                self._version_global += 1
+            else:
+                for tabla in tablas:
+                    self._versiones[tabla] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "ttl_segundos": self.ttl_segundos,
+            }
+
+    # ==================== INVALIDACIÓN ====================
+
+    def _al_ejecutar(self, conn, cursor, statement, parameters, context, executemany):
+        if context.isinsert or context.isupdate or context.isdelete:
+            tabla = getattr(getattr(context.compiled, "statement", None), "table", None)
+            tablas = {tabla.name} if isinstance(tabla, TableClause) else None
+        elif statement.lstrip()[:6].upper() in _PREFIJOS_ESCRITURA:
+            # SQL textual: no se sabe qué tabla toca
+            tablas = None
+        else:
+            return
+        pendientes = conn.info.setdefault("cache_conteos_tablas", set())
+        if tablas is None:
+            pendientes.add(None)
+            self.invalidar()
+        else:
+            pendientes.update(tablas)
+            self.invalidar(tablas)
+
+    def _al_confirmar(self, conn):
+        pendientes = conn.info.pop("cache_conteos_tablas", None)
+        if not pendientes:
+            return
+        if None in pendientes:
+            self.invalidar()
+        else:
+            self.invalidar(pendientes)
+
+    def _al_revertir(self, conn):
+        # Un total contado mientras las escrituras estaban aplicadas ya no vale
+        self._al_confirmar(conn)
+
+    def instrumentar(self, engine):
+        """Registrar los listeners de escritura, commit y rollback en el engine"""
+        event.listen(engine, "after_cursor_execute", self._al_ejecutar)
+        event.listen(engine, "commit", self._al_confirmar)
+        event.listen(engine, "rollback", self._al_revertir)
+
+
+cache_conteos = CacheConteos(
+    ttl_segundos=settings.LISTADOS_CONTEO_TTL_SEGUNDOS,
+    max_entradas=settings.LISTADOS_CONTEO_MAX_ENTRADAS,
+)
@@ -0,0 +1,293 @@
+"""
+Registro de consultas lentas: cada sentencia que supera CONSULTAS_LENTAS_UMBRAL_MS queda
+en un buffer circular (por worker) con su SQL normalizado, la forma de sus parámetros (los
+tipos, nunca los valores), la ruta que la originó y un plan de ejecución.
+
+El plan se toma en un hilo aparte, después de la consulta y con una conexión propia, para
+no sumar su costo a la petición: EXPLAIN (ANALYZE, BUFFERS) en PostgreSQL para los SELECT
+de solo lectura (ANALYZE vuelve a ejecutar la consulta), EXPLAIN simple para el resto y
+EXPLAIN QUERY PLAN en SQLite. Como mucho un plan por consulta normalizada cada
+CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S, para no duplicar la carga de una consulta frecuente.
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import count, groupby
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.consultas_metricas import ruta_actual
+
+logger = logging.getLogger(__name__)
+
+MAX_LARGO_SQL = 4000
+MAX_HUELLAS = 500  # agregados por consulta normalizada (las menos recientes se descartan)
+MAX_PLANES_PENDIENTES = 20
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_MARCADORES = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):(?!:)\w+|\?")
+_NUMERO = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_LISTA_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_ESPACIOS = re.compile(r"\s+")
+_DOLAR = re.compile(r"\$(\d+)")
+_EXPLICABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|VALUES)\b", re.IGNORECASE)
+_ESCRITURA = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b", re.IGNORECASE)
+
+
+def normalizar_sql(sql: str) -> str:
+    """SQL con literales y marcadores reemplazados por ? y las listas IN / VALUES colapsadas"""
+    sql = _LITERAL_TEXTO.sub("?", sql)
+    sql = _MARCADORES.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _LISTA_IN.sub("IN (...)", sql)
+    sql = _VALUES.sub("VALUES (...)", sql)
+    return _ESPACIOS.sub(" ", sql).strip()
+
+
+def forma_parametros(parametros, executemany: bool = False):
+    """Tipos de los parámetros (nunca los valores): {"nombre_1": "str"} o ["str", "int*3"]"""
+    if executemany:
+        filas = list(parametros or [])
+        return {"filas": len(filas), "forma": forma_parametros(filas[0]) if filas else None}
+    if isinstance(parametros, dict):
+        return {nombre: _tipo(valor) for nombre, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        # Las repeticiones seguidas se colapsan ("int*50"): un IN con muchos ids no llena la entrada
+        forma = []
+        for tipo, grupo in groupby(_tipo(valor) for valor in parametros):
+            veces = len(list(grupo))
+            forma.append(f"{tipo}*{veces}" if veces > 1 else tipo)
+        return forma
+    return None
+
+
+def _tipo(valor) -> str:
+    if valor is None:
+        return "None"
+    if isinstance(valor, (list, tuple)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+
+class RegistroConsultasLentas:
+    """Buffer circular de consultas lentas y agregados por consulta normalizada"""
+
+    def __init__(self, umbral_ms: float = 200, max_entradas: int = 200, explicar: bool = True,
+                 intervalo_explain_s: float = 300, timeout_explain_ms: int = 5000):
+        self.umbral_ms = umbral_ms
+        self.explicar = explicar
+        self.intervalo_explain_s = intervalo_explain_s
+        self.timeout_explain_ms = timeout_explain_ms
+        self._lock = threading.Lock()
+        self._entradas: deque = deque(maxlen=max_entradas)
+        self._huellas: "OrderedDict[str, Dict]" = OrderedDict()
+        self._ids = count(1)
+        self._hilo: Optional[ThreadPoolExecutor] = None
+        self._planes_pendientes = 0
+        # engine de la sesión que ejecutó -> engine con el que se toma el plan (el async no sirve en un hilo)
+        self._engines_explain = {}
+        self._hilo_explain = threading.local()  # lo que ejecuta el propio EXPLAIN no se registra
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._huellas.clear()
+
+    # ==================== CAPTURA ====================
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._inicio_lenta = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_lenta", None)
+        if inicio is None or not self.umbral_ms or getattr(self._hilo_explain, "activo", False):
+            return
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if duracion_ms < self.umbral_ms or statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        self.registrar(conn, statement, parameters, executemany, duracion_ms)
+
+    def registrar(self, conn, statement: str, parameters, executemany: bool, duracion_ms: float):
+        normalizado = normalizar_sql(statement)
+        huella = hashlib.sha1(normalizado.encode()).hexdigest()[:12]
+        ruta = ruta_actual()
+        entrada = {
+            "id": next(self._ids),
+            "fecha": datetime.now(),
+            "duracion_ms": round(duracion_ms, 3),
+            "ruta": ruta,
+            "huella": huella,
+            "sql": normalizado[:MAX_LARGO_SQL],
+            "parametros": forma_parametros(parameters, executemany),
+            "motor": f"{conn.dialect.name}+{conn.dialect.driver}",
+            "estado_plan": "desactivado",
+            "plan": None,
+        }
+        ahora = time.monotonic()
+        with self._lock:
+            datos = self._huellas.pop(huella, None) or {
+                "huella": huella, "sql": entrada["sql"], "veces": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "rutas": set(), "ultima": None, "ultimo_plan": -float("inf"),
+            }
+            datos["veces"] += 1
+            datos["total_ms"] += duracion_ms
+            datos["max_ms"] = max(datos["max_ms"], duracion_ms)
+            datos["rutas"].add(ruta or "(fuera de petición)")
+            datos["ultima"] = entrada["fecha"]
+            self._huellas[huella] = datos
+            while len(self._huellas) > MAX_HUELLAS:
+                self._huellas.popitem(last=False)
+
+            pedir_plan = self.explicar and ahora - datos["ultimo_plan"] >= self.intervalo_explain_s
+            if self.explicar and not pedir_plan:
+                entrada["estado_plan"] = "omitido (plan reciente de la misma consulta)"
+            if pedir_plan and (executemany or not _EXPLICABLE.match(statement)):
+                entrada["estado_plan"], pedir_plan = "omitido (no explicable)", False
+            if pedir_plan and self._planes_pendientes >= MAX_PLANES_PENDIENTES:
+                entrada["estado_plan"], pedir_plan = "omitido (cola llena)", False
+            if pedir_plan:
+                datos["ultimo_plan"] = ahora
+                self._planes_pendientes += 1
+                entrada["estado_plan"] = "pendiente"
+            self._entradas.append(entrada)
+
+        logger.warning(f"Consulta lenta ({duracion_ms:.0f} ms) en {ruta or 'fuera de petición'}: {normalizado[:300]}")
+        if pedir_plan:
+            engine_explain = self._engines_explain.get(conn.engine, conn.engine)
+            self._ejecutor().submit(
+                self._tomar_plan, entrada, engine_explain, statement, _copiar(parameters), conn.dialect.paramstyle
+            )
+
+    # ==================== PLANES ====================
+
+    def _ejecutor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = ThreadPoolExecutor(1, thread_name_prefix="explain")
+            return self._hilo
+
+    def _tomar_plan(self, entrada: Dict, engine, statement: str, parametros, paramstyle: str):
+        self._hilo_explain.activo = True
+        try:
+            plan = self._explicar(engine, statement, parametros, paramstyle)
+            estado = "capturado" if plan is not None else "no disponible"
+        except Exception as e:
+            plan, estado = None, f"error: {e}"[:500]
+            logger.info(f"No se pudo tomar el plan de la consulta lenta {entrada['id']}: {e}")
+        finally:
+            self._hilo_explain.activo = False
+        with self._lock:
+            self._planes_pendientes -= 1
+            entrada["plan"], entrada["estado_plan"] = plan, estado
+
+    def _explicar(self, engine, statement: str, parametros, paramstyle: str) -> Optional[str]:
+        dialecto = engine.dialect
+        if dialecto.name == "sqlite":
+            if paramstyle != dialecto.paramstyle:
+                return None
+            with engine.connect() as conn:
+                filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parametros or ()).fetchall()
+                return "\n".join(fila[-1] for fila in filas)
+        if dialecto.name != "postgresql":
+            return None
+
+        if paramstyle == "numeric_dollar" and dialecto.paramstyle in ("pyformat", "format"):
+            # Sentencia de asyncpg ($1, $2...) ejecutada con psycopg2 (%s posicionales)
+            statement, parametros = _dolar_a_format(statement, parametros)
+        elif paramstyle != dialecto.paramstyle:
+            return None
+
+        # ANALYZE ejecuta la consulta: solo para lecturas puras; lo demás, plan estimado
+        opciones = "ANALYZE, BUFFERS" if not _ESCRITURA.search(statement) else "COSTS"
+        with engine.connect() as conn:
+            transaccion = conn.begin()
+            try:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.timeout_explain_ms)}")
+                filas = conn.exec_driver_sql(f"EXPLAIN ({opciones}) " + statement, parametros).fetchall()
+            finally:
+                transaccion.rollback()
+        return "\n".join(fila[0] for fila in filas)
+
+    # ==================== LECTURA ====================
+
+    def entradas(self, ruta: Optional[str] = None, huella: Optional[str] = None,
+                 orden: str = "recientes", limite: int = 50) -> List[Dict]:
+        with self._lock:
+            entradas = [dict(entrada) for entrada in self._entradas]
+        if ruta:
+            entradas = [e for e in entradas if e["ruta"] and ruta.lower() in e["ruta"].lower()]
+        if huella:
+            entradas = [e for e in entradas if e["huella"] == huella]
+        if orden == "duracion":
+            entradas.sort(key=lambda e: e["duracion_ms"], reverse=True)
+        else:
+            entradas.reverse()
+        return entradas[:limite]
+
+    def entrada(self, entrada_id: int) -> Optional[Dict]:
+        with self._lock:
+            return next((dict(e) for e in self._entradas if e["id"] == entrada_id), None)
+
+    def resumen(self, limite: int = 50) -> List[Dict]:
+        """Por consulta normalizada: veces, duración media y máxima, rutas que la emiten"""
+        with self._lock:
+            filas = [
+                {
+                    "huella": datos["huella"], "sql": datos["sql"], "veces": datos["veces"],
+                    "promedio_ms": round(datos["total_ms"] / datos["veces"], 3),
+                    "max_ms": round(datos["max_ms"], 3), "total_ms": round(datos["total_ms"], 3),
+                    "rutas": sorted(datos["rutas"]), "ultima": datos["ultima"],
+                }
+                for datos in self._huellas.values()
+            ]
+        filas.sort(key=lambda fila: fila["total_ms"], reverse=True)
+        return filas[:limite]
+
+    def instrumentar(self, engine, engine_explain=None):
+        """
+        Registrar los listeners en el engine; engine_explain es el engine sync con el que
+        tomar los planes de lo que ejecute este (necesario para el motor async).
+        """
+        if engine_explain is not None:
+            self._engines_explain[engine] = engine_explain
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+
+
+def _copiar(parametros):
+    if isinstance(parametros, dict):
+        return dict(parametros)
+    if isinstance(parametros, list):
+        return list(parametros)
+    return parametros
+
+
+def _dolar_a_format(statement: str, parametros):
+    """$n -> %s en orden de aparición, con los parámetros reordenados; % literal -> %%"""
+    orden = []
+
+    def reemplazar(coincidencia):
+        orden.append(int(coincidencia.group(1)) - 1)
+        return "%s"
+
+    statement = _DOLAR.sub(reemplazar, statement.replace("%", "%%"))
+    parametros = tuple(parametros or ())
+    return statement, tuple(parametros[indice] for indice in orden)
+
+
+consultas_lentas = RegistroConsultasLentas(
+    umbral_ms=settings.CONSULTAS_LENTAS_UMBRAL_MS,
+    max_entradas=settings.CONSULTAS_LENTAS_MAX_ENTRADAS,
+    explicar=settings.CONSULTAS_LENTAS_EXPLAIN,
+    intervalo_explain_s=settings.CONSULTAS_LENTAS_EXPLAIN_INTERVALO_S,
+    timeout_explain_ms=settings.CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS,
+)
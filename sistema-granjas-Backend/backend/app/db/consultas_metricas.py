@@ -0,0 +1,223 @@
+"""
+Consultas SQL por petición: cuántas sentencias emite cada ruta, cuánto tiempo pasa en la
+base de datos y cuál fue la más lenta. Los listeners del engine suman a la medición de la
+petición en curso (un ContextVar que el middleware abre por petición y que se propaga al
+threadpool de los endpoints sync y a run_sync de los async); lo que se ejecuta fuera de
+una petición (hilos de fondo, scripts) no se mide salvo dentro de medir_consultas().
+
+Los agregados por ruta son por proceso (por worker). Con DEBUG las respuestas llevan los
+encabezados X-DB-Consultas, X-DB-Tiempo-Ms y X-DB-Consulta-Lenta-Ms.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_LARGO_SQL = 1000  # la sentencia más lenta se guarda recortada (sin parámetros)
+
+
+class MedicionConsultas:
+    """Consultas de una petición (o de un bloque medir_consultas)"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_ms = 0.0
+        self.lenta_ms = 0.0
+        self.lenta_sql: Optional[str] = None
+        self.scope: Optional[dict] = None  # el de la petición HTTP, si la hay
+        # Peticiones HTTP terminadas mientras el bloque estaba abierto: (método, ruta, medición)
+        self.peticiones: List[Tuple[str, str, "MedicionConsultas"]] = []
+
+    def registrar(self, sql: str, milisegundos: float):
+        self.consultas += 1
+        self.tiempo_ms += milisegundos
+        if milisegundos >= self.lenta_ms:
+            self.lenta_ms = milisegundos
+            self.lenta_sql = sql
+
+    def __repr__(self):
+        return f"<MedicionConsultas {self.consultas} consultas, {self.tiempo_ms:.1f} ms>"
+
+
+_medicion_actual: ContextVar[Optional[MedicionConsultas]] = ContextVar("medicion_consultas", default=None)
+
+
+def ruta_actual() -> Optional[str]:
+    """Método y plantilla de la ruta de la petición en curso (None fuera de una petición)"""
+    medicion = _medicion_actual.get()
+    if medicion is None or medicion.scope is None:
+        return None
+    scope = medicion.scope
+    # El router deja la ruta en el scope antes de llamar al endpoint
+    return f"{scope['method']} {getattr(scope.get('route'), 'path', None) or scope['path']}"
+
+
+class EstadisticasConsultas:
+    """Agregados por ruta (método + plantilla de la ruta) de las mediciones de cada petición"""
+
+    def __init__(self, alerta_consultas: int = 50):
+        self.alerta_consultas = alerta_consultas
+        self._lock = threading.Lock()
+        self._observadores: List[MedicionConsultas] = []
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Poner a cero los agregados"""
+        with self._lock:
+            self.inicio = datetime.now()
+            self._rutas: Dict[Tuple[str, str], Dict] = {}
+
+    def registrar(self, metodo: str, ruta: str, medicion: MedicionConsultas, duracion_ms: float):
+        with self._lock:
+            datos = self._rutas.get((metodo, ruta))
+            if datos is None:
+                datos = self._rutas[(metodo, ruta)] = {
+                    "pedidos": 0, "consultas_total": 0, "consultas_max": 0, "tiempo_db_total_ms": 0.0,
+                    "tiempo_db_max_ms": 0.0, "duracion_total_ms": 0.0, "lenta_ms": 0.0, "lenta_sql": None,
+                }
+            datos["pedidos"] += 1
+            datos["consultas_total"] += medicion.consultas
+            datos["consultas_max"] = max(datos["consultas_max"], medicion.consultas)
+            datos["tiempo_db_total_ms"] += medicion.tiempo_ms
+            datos["tiempo_db_max_ms"] = max(datos["tiempo_db_max_ms"], medicion.tiempo_ms)
+            datos["duracion_total_ms"] += duracion_ms
+            if medicion.lenta_sql is not None and medicion.lenta_ms >= datos["lenta_ms"]:
+                datos["lenta_ms"] = medicion.lenta_ms
+                datos["lenta_sql"] = medicion.lenta_sql[:MAX_LARGO_SQL]
+            for observador in self._observadores:
+                observador.peticiones.append((metodo, ruta, medicion))
+        if self.alerta_consultas and medicion.consultas > self.alerta_consultas:
+            logger.warning(
+                f"{metodo} {ruta}: {medicion.consultas} consultas SQL en una petición "
+                f"({medicion.tiempo_ms:.0f} ms en la base de datos)"
+            )
+
+    def estadisticas(self, orden: str = "consultas_total", limite: int = 50) -> Dict:
+        with self._lock:
+            rutas = []
+            for (metodo, ruta), datos in self._rutas.items():
+                pedidos = datos["pedidos"]
+                rutas.append({
+                    "metodo": metodo,
+                    "ruta": ruta,
+                    "pedidos": pedidos,
+                    "consultas_total": datos["consultas_total"],
+                    "consultas_promedio": round(datos["consultas_total"] / pedidos, 2),
+                    "consultas_max": datos["consultas_max"],
+                    "tiempo_db_total_ms": round(datos["tiempo_db_total_ms"], 3),
+                    "tiempo_db_promedio_ms": round(datos["tiempo_db_total_ms"] / pedidos, 3),
+                    "tiempo_db_max_ms": round(datos["tiempo_db_max_ms"], 3),
+                    "duracion_promedio_ms": round(datos["duracion_total_ms"] / pedidos, 3),
+                    "consulta_lenta_ms": round(datos["lenta_ms"], 3),
+                    "consulta_lenta_sql": datos["lenta_sql"],
+                })
+            inicio = self.inicio
+        rutas.sort(key=lambda fila: fila[orden], reverse=True)
+        return {"pid": os.getpid(), "desde": inicio, "rutas": rutas[:limite]}
+
+    # ==================== LISTENERS ====================
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        if _medicion_actual.get() is not None and context is not None:
+            context._inicio_consulta = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        medicion = _medicion_actual.get()
+        inicio = getattr(context, "_inicio_consulta", None)
+        if medicion is not None and inicio is not None:
+            medicion.registrar(statement, (time.perf_counter() - inicio) * 1000)
+
+    def instrumentar(self, engine):
+        """Registrar los listeners de ejecución en el engine"""
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+
+
+estadisticas_consultas = EstadisticasConsultas(alerta_consultas=settings.SQL_CONSULTAS_ALERTA)
+
+
+class MiddlewareConsultas:
+    """Abre una medición por petición HTTP y la agrega a su ruta al terminar"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicion = MedicionConsultas()
+        medicion.scope = scope
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if settings.DEBUG and mensaje["type"] == "http.response.start":
+                # Las consultas hechas hasta que empieza la respuesta (las de un streaming, no)
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-db-consultas", str(medicion.consultas).encode()),
+                    (b"x-db-tiempo-ms", f"{medicion.tiempo_ms:.1f}".encode()),
+                    (b"x-db-consulta-lenta-ms", f"{medicion.lenta_ms:.1f}".encode()),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion_actual.reset(token)
+            # FastAPI deja la ruta resuelta en el scope; sin ella (404) se agrupa aparte
+            ruta = getattr(scope.get("route"), "path", None) or "(sin ruta)"
+            estadisticas_consultas.registrar(
+                scope["method"], ruta, medicion, (time.perf_counter() - inicio) * 1000
+            )
+
+
+# ==================== MEDICIÓN EN PRUEBAS Y SCRIPTS ====================
+
+@contextmanager
+def medir_consultas():
+    """
+    Medir las consultas del bloque: las ejecutadas en este contexto (llamadas directas a
+    CRUD o servicios) suman a la medición, y cada petición HTTP que termine dentro del
+    bloque (TestClient incluido) queda en medicion.peticiones con la suya.
+    """
+    medicion = MedicionConsultas()
+    token = _medicion_actual.set(medicion)
+    with estadisticas_consultas._lock:
+        estadisticas_consultas._observadores.append(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+        with estadisticas_consultas._lock:
+            estadisticas_consultas._observadores.remove(medicion)
+
+
+@contextmanager
+def presupuesto_consultas(maximo: int):
+    """
+    Fallar (AssertionError) si alguna petición del bloque emite más de `maximo` consultas,
+    o, si en el bloque no hubo peticiones HTTP, si las llamadas directas lo superan. Para
+    pytest:
+
+        with presupuesto_consultas(6):
+            cliente.get("/api/labores/", headers=headers)
+    """
+    with medir_consultas() as medicion:
+        yield medicion
+    mediciones = [(f"{metodo} {ruta}", m) for metodo, ruta, m in medicion.peticiones] or [("bloque", medicion)]
+    excedidas = [
+        f"{nombre}: {m.consultas} consultas (la más lenta, {m.lenta_ms:.1f} ms: {(m.lenta_sql or '')[:200]})"
+        for nombre, m in mediciones if m.consultas > maximo
+    ]
+    assert not excedidas, f"Presupuesto de {maximo} consultas superado:\n" + "\n".join(excedidas)
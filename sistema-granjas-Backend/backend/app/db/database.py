@@ -1,11 +1,32 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool_metrics import (
+    QueuePoolInstrumentado, AsyncQueuePoolInstrumentado, metricas_pool, metricas_pool_async
+)
+from app.db.cache_conteos import cache_conteos
+from app.db.consultas_metricas import estadisticas_consultas
+from app.db.consultas_lentas import consultas_lentas
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+OPCIONES_POOL = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_engine(DATABASE_URL, poolclass=QueuePoolInstrumentado, **OPCIONES_POOL)
+metricas_pool.instrumentar(engine)
+cache_conteos.instrumentar(engine)
+estadisticas_consultas.instrumentar(engine)
+consultas_lentas.instrumentar(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -15,3 +36,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ==================== MOTOR ASYNC ====================
+
+def _url_async(url: str):
+    """Cambiar el driver de DATABASE_URL por su equivalente async (asyncpg / aiosqlite)"""
+    url = make_url(url)
+    connect_args = {}
+    if url.get_backend_name() == "postgresql":
+        # asyncpg no entiende sslmode en la URL; se le pasa como argumento ssl
+        sslmode = url.query.get("sslmode")
+        if sslmode:
+            url = url.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url, connect_args
+
+
+if settings.ASYNC_DATABASE_URL:
+    ASYNC_DATABASE_URL, _connect_args_async = settings.ASYNC_DATABASE_URL, {}
+else:
+    ASYNC_DATABASE_URL, _connect_args_async = _url_async(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=AsyncQueuePoolInstrumentado,
+    connect_args=_connect_args_async,
+    **OPCIONES_POOL
+)
+metricas_pool_async.instrumentar(async_engine.sync_engine)
+cache_conteos.instrumentar(async_engine.sync_engine)
+estadisticas_consultas.instrumentar(async_engine.sync_engine)
+# Los planes de lo que ejecuta el motor async se toman con el sync, desde el hilo del EXPLAIN
+consultas_lentas.instrumentar(async_engine.sync_engine, engine_explain=engine)
+
+# expire_on_commit=False: tras el commit no se puede recargar un atributo fuera de await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    """
+    Sesión async para endpoints de solo lectura con mucho tráfico.
+    El código ORM existente se reutiliza con `await db.run_sync(funcion, *args)`,
+    que recibe la sesión sync equivalente y puede hacer lazy loads.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
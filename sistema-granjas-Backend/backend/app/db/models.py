@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Boolean, Text, Table
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Float, DateTime, Boolean, Text, Table, Index, UniqueConstraint, event, insert, inspect, select
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -122,6 +122,7 @@ class Lote(Base):
     fecha_inicio = Column(DateTime)
     estado = Column(String(50), default="activo")
     cultivo_id = Column(Integer, ForeignKey("cultivos_especies.id"))
+    fecha_actualizacion = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     cultivo = relationship("CultivoEspecie", back_populates="lotes")
     tipo_lote = relationship("TipoLote")
@@ -132,6 +133,10 @@ class Lote(Base):
     diagnosticos = relationship("Diagnostico", back_populates="lote")
     recomendaciones = relationship("Recomendacion", back_populates="lote")
 
+    __table_args__ = (
+        Index("ix_lotes_actualizacion", "fecha_actualizacion", "id"),
+    )
+
 
 class CategoriaInventario(Base):
     __tablename__ = "categorias_inventario"
@@ -151,11 +156,16 @@ class Herramienta(Base):
     cantidad_total = Column(Integer, default=0)
     cantidad_disponible = Column(Integer, default=0)
     estado = Column(String(50), default="disponible")
+    fecha_actualizacion = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     categoria = relationship("CategoriaInventario")
     movimientos = relationship("MovimientoHerramienta", back_populates="herramienta")
     asignaciones = relationship("AsignacionHerramienta", back_populates="herramienta")
 
+    __table_args__ = (
+        Index("ix_herramientas_actualizacion", "fecha_actualizacion", "id"),
+    )
+
 
 class Insumo(Base):
     __tablename__ = "insumos"
@@ -170,10 +180,15 @@ class Insumo(Base):
     nivel_alerta = Column(Float, default=0.0)
     fecha_vencimiento = Column(DateTime, nullable=True)
     estado = Column(String(50), default="disponible")
+    fecha_actualizacion = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     programa = relationship("Programa", back_populates="insumos")
     movimientos = relationship("MovimientoInsumo", back_populates="insumo")
 
+    __table_args__ = (
+        Index("ix_insumos_actualizacion", "fecha_actualizacion", "id"),
+    )
+
 
 class TipoLabor(Base):
     __tablename__ = "tipos_labor"
@@ -213,6 +228,11 @@ class Evidencia(Base):
     tipo = Column(String(50), nullable=False)  # imagen, video, documento, audio, otro
     descripcion = Column(Text, nullable=False)
     url_archivo = Column(String(500), nullable=False)
+    # Derivados WebP de las imágenes; None mientras no se han generado
+    url_miniatura = Column(String(500))
+    url_vista_previa = Column(String(500))
+    # Archivo por contenido; None en evidencias con URL externa o anteriores a los blobs
+    blob_id = Column(Integer, ForeignKey("blobs.id"), index=True)
     
     # Relaciones polimórficas - puede pertenecer a diferentes entidades
     labor_id = Column(Integer, ForeignKey("labores.id"), nullable=True)
@@ -227,6 +247,57 @@ class Evidencia(Base):
     diagnostico = relationship("Diagnostico", back_populates="evidencias")
     recomendacion = relationship("Recomendacion", back_populates="evidencias")
     usuario = relationship("Usuario")
+    blob = relationship("Blob")
+
+
+class Blob(Base):
+    """
+    Archivo guardado una sola vez por contenido: la key del bucket se deriva del sha256,
+    así que subir de nuevo el mismo archivo no ocupa más espacio. Las evidencias lo
+    referencian por blob_id; cuando ninguna lo referencia, se elimina del bucket (salvo
+    que esté reservado: /files/upload entregó su URL y la evidencia todavía no se creó).
+    """
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    key = Column(String(500), nullable=False, unique=True)
+    tamano = Column(BigInteger, nullable=False)
+    content_type = Column(String(255))
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    reservado_hasta = Column(DateTime)
+
+
+class EvidenciaPendiente(Base):
+    """
+    Subida de evidencia directa al bucket (URL prefirmada) aún no confirmada. La
+    Evidencia se crea al completar, después de verificar tamaño y tipo del objeto.
+    Una subida completada sin blob_id espera que se consolide su contenido (en segundo plano).
+    estado: pendiente | completando | completada | rechazada | cancelada. Una subida que
+    quedó "completando" (el worker se cayó) se puede volver a tomar pasado
+    EVIDENCIA_COMPLETAR_TIMEOUT_SEGUNDOS desde fecha_toma.
+    """
+    __tablename__ = "evidencias_pendientes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(500), nullable=False, unique=True)
+    upload_id = Column(String(500))  # solo en subidas multipart
+    tipo = Column(String(50), nullable=False)
+    descripcion = Column(Text, nullable=False)
+    tipo_entidad = Column(String(50), nullable=False)
+    entidad_id = Column(Integer, nullable=False)
+    content_type = Column(String(255), nullable=False)
+    tamano = Column(BigInteger, nullable=False)  # bytes declarados por el cliente
+    estado = Column(String(20), nullable=False, default="pendiente")
+    evidencia_id = Column(Integer, ForeignKey("evidencias.id"))
+    blob_id = Column(Integer, ForeignKey("blobs.id"))  # el contenido ya existía: no hay que subir nada
+    sha256 = Column(String(64))  # declarado por el cliente; en un PUT simple lo verifica R2
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    fecha_expiracion = Column(DateTime, nullable=False)
+    fecha_toma = Column(DateTime)  # cuándo pasó a "completando"
+
+
 class Labor(Base):
     __tablename__ = "labores"
 
@@ -242,6 +313,7 @@ class Labor(Base):
 
     fecha_asignacion = Column(DateTime, default=datetime.utcnow)
     fecha_finalizacion = Column(DateTime, nullable=True)
+    fecha_actualizacion = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     recomendacion_id = Column(Integer, ForeignKey("recomendaciones.id"), nullable=False)
     trabajador_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
@@ -259,6 +331,10 @@ class Labor(Base):
     uso_herramientas = relationship("MovimientoHerramienta", back_populates="labor")
     uso_insumos = relationship("MovimientoInsumo", back_populates="labor")
 
+    __table_args__ = (
+        Index("ix_labores_actualizacion", "fecha_actualizacion", "id"),
+    )
+
 
 class Diagnostico(Base):
     __tablename__ = "diagnosticos"
@@ -290,12 +366,19 @@ class MovimientoHerramienta(Base):
     labor_id = Column(Integer, ForeignKey("labores.id"))
     cantidad = Column(Integer, nullable=False)
     tipo_movimiento = Column(String(50), nullable=False)
-    fecha_movimiento = Column(DateTime, default=datetime.utcnow)
+    fecha_movimiento = Column(DateTime, nullable=False, default=datetime.utcnow)
     observaciones = Column(Text)
 
     herramienta = relationship("Herramienta", back_populates="movimientos")
     labor = relationship("Labor", back_populates="uso_herramientas")
 
+    __table_args__ = (
+        # Saldos y consumos por herramienta en un rango de fechas (ledger de inventario)
+        Index("ix_movimientos_herramientas_herramienta_fecha", "herramienta_id", "fecha_movimiento"),
+        # Listado paginado por keyset (más recientes primero)
+        Index("ix_movimientos_herramientas_fecha", "fecha_movimiento", "id"),
+    )
+
 class MovimientoInsumo(Base):
     __tablename__ = "movimientos_insumos"
 
@@ -304,12 +387,17 @@ class MovimientoInsumo(Base):
     labor_id = Column(Integer, ForeignKey("labores.id"))
     cantidad = Column(Float, nullable=False)
     tipo_movimiento = Column(String(50), nullable=False)
-    fecha_movimiento = Column(DateTime, default=datetime.utcnow)
+    fecha_movimiento = Column(DateTime, nullable=False, default=datetime.utcnow)
     observaciones = Column(Text)
 
     insumo = relationship("Insumo", back_populates="movimientos")
     labor = relationship("Labor", back_populates="uso_insumos")
 
+    __table_args__ = (
+        Index("ix_movimientos_insumos_insumo_fecha", "insumo_id", "fecha_movimiento"),
+        Index("ix_movimientos_insumos_fecha", "fecha_movimiento", "id"),
+    )
+
 class AsignacionHerramienta(Base):
     __tablename__ = "asignaciones_herramientas"
 
@@ -336,3 +424,152 @@ class CultivoEspecie(Base):
     granja = relationship("Granja", back_populates="cultivos")
 
     lotes = relationship("Lote", back_populates="cultivo")
+
+
+class SnapshotInventario(Base):
+    """
+    Foto diaria del inventario de una herramienta o insumo al inicio de fecha_corte.
+    cantidad es la disponibilidad en ese instante; salidas/entradas_acumuladas suman todos
+    los movimientos anteriores al corte, y ajuste es la diferencia con lo que predecían el
+    snapshot anterior y los movimientos (cambios hechos fuera de movimientos).
+    """
+    __tablename__ = "snapshots_inventario"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo_recurso = Column(String(20), nullable=False)  # herramienta / insumo
+    recurso_id = Column(Integer, nullable=False)
+    fecha_corte = Column(DateTime, nullable=False)
+    cantidad = Column(Float, nullable=False)
+    salidas_acumuladas = Column(Float, nullable=False, default=0.0)
+    entradas_acumuladas = Column(Float, nullable=False, default=0.0)
+    ajuste = Column(Float, nullable=False, default=0.0)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("tipo_recurso", "recurso_id", "fecha_corte", name="uq_snapshot_recurso_corte"),
+        Index("ix_snapshots_inventario_tipo_corte", "tipo_recurso", "fecha_corte"),
+    )
+
+
+class SyncOperacion(Base):
+    """
+    Registro de cada ítem de sincronización offline ya aplicado. (usuario_id, cliente_id)
+    es único: si el cliente reenvía un ítem (reintento tras perder la respuesta), se
+    responde con el recurso creado la primera vez en lugar de aplicarlo de nuevo.
+    """
+    __tablename__ = "sync_operaciones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    cliente_id = Column(String(64), nullable=False)  # id generado en el dispositivo
+    tipo = Column(String(50), nullable=False)
+    recurso_id = Column(Integer)
+    fecha_cliente = Column(DateTime)
+    fecha_recepcion = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "cliente_id", name="uq_sync_operacion_cliente"),
+    )
+
+
+class SyncEliminacion(Base):
+    """
+    Marca de borrado (tombstone) de una fila de una tabla sincronizada con los clientes
+    offline, para que /sync/changes pueda informar eliminaciones físicas. Con usuario_id,
+    la fila solo salió del alcance de ese usuario (p. ej. la labor pasó a otro trabajador);
+    con tabla TABLA_ALCANCE, cambió el alcance entero del usuario (registro_id es el
+    usuario) y su cliente debe recargar la caché completa.
+    """
+    __tablename__ = "sync_eliminaciones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tabla = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    fecha_eliminacion = Column(DateTime, nullable=False, default=datetime.utcnow)
+    usuario_id = Column(Integer)  # None: eliminada para todos
+
+    __table_args__ = (
+        Index("ix_sync_eliminaciones_fecha", "fecha_eliminacion", "id"),
+    )
+
+
+# Tablas que los clientes offline mantienen en caché (ver app/services/cambios_service.py).
+# Los lotes se eliminan de forma lógica (estado "eliminado"), el resto con DELETE.
+TABLAS_SINCRONIZADAS = {"labores": Labor, "lotes": Lote, "insumos": Insumo, "herramientas": Herramienta}
+
+
+def _registrar_eliminacion(mapper, connection, target):
+    connection.execute(insert(SyncEliminacion).values(
+        tabla=target.__tablename__, registro_id=target.id, fecha_eliminacion=datetime.utcnow()
+    ))
+
+
+for _modelo in (Labor, Insumo, Herramienta):
+    event.listen(_modelo, "after_delete", _registrar_eliminacion)
+
+
+TABLA_ALCANCE = "alcance"
+
+
+def registrar_salidas_alcance(connection, tabla: str, registro_id: int, usuarios):
+    """Marcar que la fila dejó de estar al alcance de esos usuarios"""
+    ahora = datetime.utcnow()
+    filas = [
+        {"tabla": tabla, "registro_id": registro_id, "usuario_id": usuario_id, "fecha_eliminacion": ahora}
+        for usuario_id in set(usuarios) if usuario_id is not None
+    ]
+    if filas:
+        connection.execute(insert(SyncEliminacion), filas)
+
+
+def registrar_cambios_alcance(connection, usuarios):
+    """Marcar que cambió el alcance entero de esos usuarios (recargan su caché)"""
+    for usuario_id in set(usuarios):
+        registrar_salidas_alcance(connection, TABLA_ALCANCE, usuario_id, [usuario_id])
+
+
+def _cambio(target, *atributos) -> bool:
+    estado = inspect(target)
+    return any(estado.attrs[atributo].history.has_changes() for atributo in atributos)
+
+
+@event.listens_for(Labor, "before_update")
+def _labor_sale_de_alcance(mapper, connection, target):
+    """
+    Al cambiar el trabajador o la recomendación, la labor sale del alcance del trabajador
+    anterior, de talento_humano de sus programas y del docente de la recomendación anterior.
+    Quienes la siguen viendo se descartan al armar el feed.
+    """
+    if not _cambio(target, "trabajador_id", "recomendacion_id"):
+        return
+    # Antes del UPDATE la fila conserva los valores anteriores
+    trabajador_id, recomendacion_id = connection.execute(
+        select(Labor.trabajador_id, Labor.recomendacion_id).where(Labor.id == target.id)
+    ).one()
+    usuarios = set()
+    if trabajador_id is not None and trabajador_id != target.trabajador_id:
+        usuarios.add(trabajador_id)
+        programas = select(usuario_programa.c.programa_id).where(usuario_programa.c.usuario_id == trabajador_id)
+        usuarios.update(connection.execute(
+            select(usuario_programa.c.usuario_id)
+            .join(Usuario, Usuario.id == usuario_programa.c.usuario_id)
+            .join(Rol, Rol.id == Usuario.rol_id)
+            .where(Rol.nombre == "talento_humano", usuario_programa.c.programa_id.in_(programas))
+        ).scalars())
+    if recomendacion_id is not None and recomendacion_id != target.recomendacion_id:
+        usuarios.add(connection.execute(
+            select(Recomendacion.docente_id).where(Recomendacion.id == recomendacion_id)
+        ).scalar())
+    registrar_salidas_alcance(connection, "labores", target.id, usuarios)
+
+
+@event.listens_for(Recomendacion, "before_update")
+def _recomendacion_cambia_docente(mapper, connection, target):
+    """Las labores no cambian de fecha_actualizacion: ambos docentes recargan su caché"""
+    if not _cambio(target, "docente_id"):
+        return
+    anterior = connection.execute(
+        select(Recomendacion.docente_id).where(Recomendacion.id == target.id)
+    ).scalar()
+    if anterior != target.docente_id:
+        registrar_cambios_alcance(connection, [u for u in (anterior, target.docente_id) if u is not None])
@@ -0,0 +1,167 @@
+"""
+Métricas del pool de conexiones: esperas al pedir conexión, conexiones prestadas,
+overflow y edad de las conexiones abiertas. Son por proceso (por worker).
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los buckets del histograma de espera
+BUCKETS_ESPERA_MS = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+
+class MetricasPool:
+    """Contadores alimentados por los eventos del pool"""
+
+    def __init__(self, umbral_espera_lenta_ms: float = 500):
+        self.umbral_espera_lenta_ms = umbral_espera_lenta_ms
+        self._lock = threading.Lock()
+        # id del registro de conexión -> momento de creación (sobrevive a reiniciar())
+        self._creacion: Dict[int, float] = {}
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Poner a cero los contadores acumulados"""
+        with self._lock:
+            self.inicio = datetime.now()
+            self.checkouts = 0
+            self.checkins = 0
+            self.conexiones_creadas = 0
+            self.conexiones_cerradas = 0
+            self.invalidaciones = 0
+            self.timeouts = 0
+            self.espera_total_ms = 0.0
+            self.espera_maxima_ms = 0.0
+            self.histograma = [0] * (len(BUCKETS_ESPERA_MS) + 1)
+
+    # ==================== REGISTRO ====================
+
+    def registrar_espera(self, milisegundos: float, agotado: bool = False):
+        with self._lock:
+            if agotado:
+                self.timeouts += 1
+            self.espera_total_ms += milisegundos
+            self.espera_maxima_ms = max(self.espera_maxima_ms, milisegundos)
+            indice = next(
+                (i for i, limite in enumerate(BUCKETS_ESPERA_MS) if milisegundos <= limite),
+                len(BUCKETS_ESPERA_MS)
+            )
+            self.histograma[indice] += 1
+        if agotado:
+            logger.warning(f"Timeout esperando conexión del pool tras {milisegundos:.0f} ms")
+        elif milisegundos >= self.umbral_espera_lenta_ms:
+            logger.warning(f"Espera lenta por conexión del pool: {milisegundos:.0f} ms")
+
+    def _al_conectar(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.conexiones_creadas += 1
+            self._creacion[id(connection_record)] = time.time()
+
+    def _al_cerrar(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.conexiones_cerradas += 1
+            self._creacion.pop(id(connection_record), None)
+
+    def _al_invalidar(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidaciones += 1
+
+    def _al_prestar(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _al_devolver(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def instrumentar(self, engine):
+        """Registrar los listeners en el pool del engine"""
+        event.listen(engine, "connect", self._al_conectar)
+        event.listen(engine, "close", self._al_cerrar)
+        event.listen(engine, "invalidate", self._al_invalidar)
+        event.listen(engine, "checkout", self._al_prestar)
+        event.listen(engine, "checkin", self._al_devolver)
+
+    # ==================== LECTURA ====================
+
+    def _edades(self) -> List[float]:
+        ahora = time.time()
+        return [ahora - creada for creada in self._creacion.values()]
+
+    def estadisticas(self, pool) -> Dict:
+        """Instantánea del pool y de los contadores acumulados"""
+        with self._lock:
+            edades = self._edades()
+            esperas = sum(self.histograma)
+            limites = [f"<={limite}ms" for limite in BUCKETS_ESPERA_MS] + [f">{BUCKETS_ESPERA_MS[-1]}ms"]
+            return {
+                "pid": os.getpid(),
+                "clase_pool": type(pool).__name__,
+                "tamano": _llamar(pool, "size"),
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                "prestadas": _llamar(pool, "checkedout"),
+                "disponibles": _llamar(pool, "checkedin"),
+                # QueuePool cuenta el overflow desde -pool_size; solo interesan las conexiones extra
+                "overflow": max(_llamar(pool, "overflow") or 0, 0),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "conexiones_creadas": self.conexiones_creadas,
+                "conexiones_cerradas": self.conexiones_cerradas,
+                "invalidaciones": self.invalidaciones,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": round(self.espera_total_ms / esperas, 3) if esperas else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima_ms, 3),
+                "histograma_espera": dict(zip(limites, self.histograma)),
+                "conexiones_abiertas": len(edades),
+                "edad_promedio_s": round(sum(edades) / len(edades), 1) if edades else 0.0,
+                "edad_maxima_s": round(max(edades), 1) if edades else 0.0,
+                "desde": self.inicio,
+            }
+
+
+def _llamar(pool, metodo: str) -> Optional[int]:
+    # Los pools que no son QueuePool (p. ej. SQLite en memoria) no exponen todos los contadores
+    funcion = getattr(pool, metodo, None)
+    try:
+        return funcion() if funcion else None
+    except (TypeError, NotImplementedError):
+        return None
+
+
+metricas_pool = MetricasPool(umbral_espera_lenta_ms=settings.DB_POOL_SLOW_CHECKOUT_MS)
+metricas_pool_async = MetricasPool(umbral_espera_lenta_ms=settings.DB_POOL_SLOW_CHECKOUT_MS)
+
+
+class _EsperaInstrumentada:
+    """Mide cuánto espera cada petición por una conexión del pool"""
+
+    metricas: MetricasPool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            self.metricas.registrar_espera((time.perf_counter() - inicio) * 1000, agotado=True)
+            raise
+        self.metricas.registrar_espera((time.perf_counter() - inicio) * 1000)
+        return conexion
+
+
+class QueuePoolInstrumentado(_EsperaInstrumentada, QueuePool):
+    metricas = metricas_pool
+
+
+class AsyncQueuePoolInstrumentado(_EsperaInstrumentada, AsyncAdaptedQueuePool):
+    metricas = metricas_pool_async
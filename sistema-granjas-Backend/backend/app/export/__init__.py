@@ -5,5 +5,6 @@ Paquete de exportación para el sistema de gestión de granjas
 from app.export.exportService import ExportService
 from app.export.dataframeFetchers import DataframeFetchers
 from app.export.formatters import DataFrameFormatter
+from app.export.streamingWriter import StreamingExcelWriter
 
-__all__ = ['ExportService', 'DataframeFetchers', 'DataFrameFormatter']
\ No newline at end of file
+__all__ = ['ExportService', 'DataframeFetchers', 'DataFrameFormatter', 'StreamingExcelWriter']
\ No newline at end of file
@@ -1,483 +1,585 @@
 """
 Módulo para obtener DataFrames de diferentes modelos
 """
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterator, List, Any, Optional
 import pandas as pd
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import case, func, select
+import numpy as np
 import logging
 from datetime import datetime
 
+from app.export.formatters import DataFrameFormatter
+
 logger = logging.getLogger(__name__)
 
+TAMANO_LOTE = 2000
+
 class DataframeFetchers:
-    """Clase para obtener DataFrames de diferentes entidades"""
+    """Clase para obtener DataFrames de diferentes entidades.
+
+    Cada entidad se consulta con un SELECT de Core de solo las columnas exportadas,
+    recorrido con cursor del lado del servidor (yield_per). Los métodos iter_*_batches
+    producen DataFrames por lotes para los escritores en streaming; los get_*_dataframe
+    concatenan esos lotes para quien necesita la hoja completa.
+
+    Con estricto=True cualquier error de lectura se propaga en lugar de convertirse en una
+    hoja "Error" (los trabajos en segundo plano no deben entregar un libro incompleto).
+    """
     
-    def __init__(self, db: Session, usuario=None):
+    def __init__(self, db: Session, usuario=None, tamano_lote: int = TAMANO_LOTE, estricto: bool = False):
         self.db = db
         self.usuario = usuario
+        self.tamano_lote = tamano_lote
+        self.estricto = estricto
+    
+    # ==================== CAPA DE LECTURA POR LOTES ====================
+    
+    def _iterar_select(self, stmt) -> Iterator[pd.DataFrame]:
+        """Ejecutar un SELECT con cursor del lado del servidor y producir lotes en columnas"""
+        result = self.db.execute(stmt.execution_options(yield_per=self.tamano_lote))
+        columnas = list(result.keys())
+        for filas in result.partitions():
+            # dtype object conserva los valores tal como llegan (enteros con nulos no pasan a float)
+            yield pd.DataFrame(dict(zip(columnas, zip(*filas))), columns=columnas, dtype=object)
+    
+    def _lotes(self, entidad: str, consultas: List[Any], transformar: Callable[[pd.DataFrame], pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Recorrer las consultas de una entidad aplicando su transformación a cada lote. Si
+        falla antes del primer lote, la hoja es un "Error" con el motivo; si falla después,
+        la excepción se propaga: la hoja ya tiene filas y cortarla en silencio perdería datos.
+        """
+        producidos = 0
+        try:
+            for stmt in consultas:
+                for lote in self._iterar_select(stmt):
+                    producidos += 1
+                    yield self._format_dataframe(transformar(lote))
+        except Exception as e:
+            logger.error(f"Error obteniendo {entidad}: {str(e)}")
+            if producidos > 0 or self.estricto:
+                raise
+            yield pd.DataFrame({"Error": [f"No se pudieron obtener {entidad}: {str(e)}"]})
+            producidos += 1
+        if producidos == 0:
+            yield self._format_dataframe(pd.DataFrame())
+    
+    @staticmethod
+    def _concatenar(lotes: Iterator[pd.DataFrame]) -> pd.DataFrame:
+        return pd.concat(list(lotes), ignore_index=True)
+    
+    # ==================== GRANJAS ====================
+    
+    def iter_granjas_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import Granja, Lote
+        
+        lotes = select(Lote.granja_id, func.count(Lote.id).label('cantidad_lotes'))\
+            .group_by(Lote.granja_id).subquery()
+        stmt = select(
+            Granja.id, Granja.nombre, Granja.ubicacion, Granja.activo, Granja.fecha_creacion,
+            func.coalesce(lotes.c.cantidad_lotes, 0).label('cantidad_lotes')
+        ).outerjoin(lotes, lotes.c.granja_id == Granja.id).order_by(Granja.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'ubicacion': df['ubicacion'],
+                'estado': DataFrameFormatter.formatear_banderas(df['activo'], 'Activa', 'Inactiva'),
+                'fecha_creacion': DataFrameFormatter.formatear_fechas(df['fecha_creacion'], '%Y-%m-%d %H:%M'),
+                'cantidad_lotes': df['cantidad_lotes'],
+                'descripcion': ('Granja en ' + df['ubicacion'].astype(str)).where(
+                    df['ubicacion'].notna() & df['ubicacion'].astype(bool), ''
+                )
+            })
+        
+        return self._lotes('granjas', [stmt], transformar)
     
     def get_granjas_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de granjas bien formateado"""
-        from app.db.models import Granja
+        return self._concatenar(self.iter_granjas_batches())
+    
+    # ==================== LOTES ====================
+    
+    def iter_lotes_batches(self, lote_id: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        from app.db.models import Lote, Granja, Programa, CultivoEspecie, TipoLote
         
-        try:
-            granjas = self.db.query(Granja).all()
-            
-            data = []
-            for g in granjas:
-                # Contar lotes
-                lotes_count = len(g.lotes) if hasattr(g, 'lotes') else 0
-                
-                data.append({
-                    'id': g.id,
-                    'nombre': g.nombre,
-                    'ubicacion': g.ubicacion,
-                    'estado': 'Activa' if g.activo else 'Inactiva',
-                    'fecha_creacion': g.fecha_creacion.strftime('%Y-%m-%d %H:%M') if g.fecha_creacion else '',
-                    'cantidad_lotes': lotes_count,
-                    'descripcion': f'Granja en {g.ubicacion}' if g.ubicacion else ''
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo granjas: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener granjas: {str(e)}"]})
+        stmt = select(
+            Lote.id, Lote.nombre,
+            Granja.nombre.label('granja'),
+            Programa.nombre.label('programa'),
+            CultivoEspecie.nombre.label('cultivo'),
+            Lote.nombre_cultivo, Lote.estado, Lote.fecha_inicio,
+            TipoLote.nombre.label('tipo_lote')
+        ).outerjoin(Granja, Lote.granja_id == Granja.id)\
+         .outerjoin(Programa, Lote.programa_id == Programa.id)\
+         .outerjoin(CultivoEspecie, Lote.cultivo_id == CultivoEspecie.id)\
+         .outerjoin(TipoLote, Lote.tipo_lote_id == TipoLote.id)\
+         .order_by(Lote.id)
+        if lote_id:
+            stmt = stmt.where(Lote.id == lote_id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'granja': DataFrameFormatter.valor_o_defecto(df['granja']),
+                'programa': DataFrameFormatter.valor_o_defecto(df['programa']),
+                'cultivo': DataFrameFormatter.valor_o_defecto(df['cultivo'].where(df['cultivo'].notna(), df['nombre_cultivo'])),
+                'estado': df['estado'],
+                'fecha_inicio': DataFrameFormatter.formatear_fechas(df['fecha_inicio'], '%Y-%m-%d'),
+                'tipo_lote': DataFrameFormatter.valor_o_defecto(df['tipo_lote'])
+            })
+        
+        return self._lotes('lotes', [stmt], transformar)
     
-    def get_lotes_dataframe(self) -> pd.DataFrame:
+    def get_lotes_dataframe(self, lote_id: Optional[int] = None) -> pd.DataFrame:
         """Obtener DataFrame de lotes bien formateado"""
-        from app.db.models import Lote
+        return self._concatenar(self.iter_lotes_batches(lote_id))
+    
+    # ==================== DIAGNÓSTICOS ====================
+    
+    def iter_diagnosticos_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import Diagnostico, Lote, Usuario
         
-        try:
-            lotes = self.db.query(Lote).options(
-                joinedload(Lote.granja),
-                joinedload(Lote.programa),
-                joinedload(Lote.cultivo)
-            ).all()
-            
-            data = []
-            for l in lotes:
-                data.append({
-                    'id': l.id,
-                    'nombre': l.nombre,
-                    'granja': l.granja.nombre if l.granja else '',
-                    'programa': l.programa.nombre if l.programa else '',
-                    'cultivo': l.cultivo.nombre if l.cultivo else l.nombre_cultivo or '',
-                    'tipo_gestion': l.tipo_gestion or '',
-                    'estado': l.estado,
-                    'fecha_inicio': l.fecha_inicio.strftime('%Y-%m-%d') if l.fecha_inicio else '',
-                    'duracion_dias': l.duracion_dias or '',
-                    'tipo_lote': l.tipo_lote.nombre if l.tipo_lote else ''
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo lotes: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener lotes: {str(e)}"]})
+        estudiante = aliased(Usuario)
+        docente = aliased(Usuario)
+        stmt = select(
+            Diagnostico.id, Diagnostico.tipo, Diagnostico.descripcion,
+            Lote.nombre.label('lote'),
+            estudiante.nombre.label('estudiante'),
+            docente.nombre.label('docente'),
+            Diagnostico.estado, Diagnostico.fecha_creacion, Diagnostico.fecha_revision,
+            Diagnostico.observaciones
+        ).outerjoin(Lote, Diagnostico.lote_id == Lote.id)\
+         .outerjoin(estudiante, Diagnostico.estudiante_id == estudiante.id)\
+         .outerjoin(docente, Diagnostico.docente_id == docente.id)\
+         .order_by(Diagnostico.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'tipo': df['tipo'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'lote': DataFrameFormatter.valor_o_defecto(df['lote']),
+                'estudiante': DataFrameFormatter.valor_o_defecto(df['estudiante']),
+                'docente': DataFrameFormatter.valor_o_defecto(df['docente']),
+                'estado': df['estado'],
+                'fecha_creacion': DataFrameFormatter.formatear_fechas(df['fecha_creacion'], '%Y-%m-%d %H:%M'),
+                'fecha_revision': DataFrameFormatter.formatear_fechas(df['fecha_revision'], '%Y-%m-%d %H:%M'),
+                'observaciones': DataFrameFormatter.valor_o_defecto(df['observaciones'])
+            })
+        
+        return self._lotes('diagnósticos', [stmt], transformar)
     
     def get_diagnosticos_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de diagnósticos bien formateado"""
-        from app.db.models import Diagnostico
+        return self._concatenar(self.iter_diagnosticos_batches())
+    
+    # ==================== RECOMENDACIONES ====================
+    
+    def iter_recomendaciones_batches(self, estado: Optional[str] = None, tipo: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        from app.db.models import Recomendacion, Usuario, Lote, Diagnostico, Labor
         
-        try:
-            diagnosticos = self.db.query(Diagnostico).options(
-                joinedload(Diagnostico.estudiante),
-                joinedload(Diagnostico.docente),
-                joinedload(Diagnostico.lote)
-            ).all()
-            
-            data = []
-            for d in diagnosticos:
-                data.append({
-                    'id': d.id,
-                    'tipo': d.tipo,
-                    'descripcion': d.descripcion or '',
-                    'lote': d.lote.nombre if d.lote else '',
-                    'estudiante': d.estudiante.nombre if d.estudiante else '',
-                    'docente': d.docente.nombre if d.docente else '',
-                    'estado': d.estado,
-                    'fecha_creacion': d.fecha_creacion.strftime('%Y-%m-%d %H:%M') if d.fecha_creacion else '',
-                    'fecha_revision': d.fecha_revision.strftime('%Y-%m-%d %H:%M') if d.fecha_revision else '',
-                    'observaciones': d.observaciones or ''
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo diagnósticos: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener diagnósticos: {str(e)}"]})
+        labores = select(
+            Labor.recomendacion_id,
+            func.count(Labor.id).label('labores_totales'),
+            func.sum(case((Labor.estado == 'completada', 1), else_=0)).label('labores_completadas')
+        ).group_by(Labor.recomendacion_id).subquery()
+        stmt = select(
+            Recomendacion.id, Recomendacion.titulo, Recomendacion.descripcion, Recomendacion.tipo,
+            Recomendacion.estado,
+            Usuario.nombre.label('docente'),
+            Usuario.email.label('email_docente'),
+            Lote.nombre.label('lote'),
+            Diagnostico.tipo.label('diagnostico'),
+            Recomendacion.fecha_creacion, Recomendacion.fecha_aprobacion,
+            func.coalesce(labores.c.labores_totales, 0).label('labores_totales'),
+            func.coalesce(labores.c.labores_completadas, 0).label('labores_completadas')
+        ).outerjoin(Usuario, Recomendacion.docente_id == Usuario.id)\
+         .outerjoin(Lote, Recomendacion.lote_id == Lote.id)\
+         .outerjoin(Diagnostico, Recomendacion.diagnostico_id == Diagnostico.id)\
+         .outerjoin(labores, labores.c.recomendacion_id == Recomendacion.id)\
+         .order_by(Recomendacion.id)
+        if estado:
+            stmt = stmt.where(Recomendacion.estado == estado)
+        if tipo:
+            stmt = stmt.where(Recomendacion.tipo == tipo)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'titulo': df['titulo'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'tipo': DataFrameFormatter.valor_o_defecto(df['tipo']),
+                'estado': df['estado'],
+                'docente': DataFrameFormatter.valor_o_defecto(df['docente']),
+                'email_docente': DataFrameFormatter.valor_o_defecto(df['email_docente']),
+                'lote': DataFrameFormatter.valor_o_defecto(df['lote']),
+                'diagnostico': DataFrameFormatter.valor_o_defecto(df['diagnostico']),
+                'fecha_creacion': DataFrameFormatter.formatear_fechas(df['fecha_creacion'], '%Y-%m-%d %H:%M'),
+                'fecha_aprobacion': DataFrameFormatter.formatear_fechas(df['fecha_aprobacion'], '%Y-%m-%d %H:%M'),
+                'labores_totales': df['labores_totales'],
+                'labores_completadas': df['labores_completadas'],
+                'porcentaje_avance': DataFrameFormatter.formatear_porcentajes(
+                    df['labores_completadas'], df['labores_totales'], defecto='0%'
+                )
+            })
+        
+        return self._lotes('recomendaciones', [stmt], transformar)
     
-    def get_recomendaciones_dataframe(self) -> pd.DataFrame:
+    def get_recomendaciones_dataframe(self, estado: Optional[str] = None, tipo: Optional[str] = None) -> pd.DataFrame:
         """Obtener DataFrame de recomendaciones bien formateado"""
-        from app.db.models import Recomendacion
+        return self._concatenar(self.iter_recomendaciones_batches(estado, tipo))
+    
+    # ==================== LABORES ====================
+    
+    def iter_labores_batches(self, estado: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        from app.db.models import Labor, Usuario, Recomendacion, Lote, TipoLabor, MovimientoInsumo, MovimientoHerramienta
         
-        try:
-            recomendaciones = self.db.query(Recomendacion).options(
-                joinedload(Recomendacion.docente),
-                joinedload(Recomendacion.lote),
-                joinedload(Recomendacion.diagnostico),
-                joinedload(Recomendacion.labores)
-            ).all()
-            
-            data = []
-            for r in recomendaciones:
-                # Contar labores
-                labores_count = len(r.labores)
-                labores_completadas = sum(1 for l in r.labores if l.estado == 'completada')
-                
-                data.append({
-                    'id': r.id,
-                    'titulo': r.titulo,
-                    'descripcion': r.descripcion or '',
-                    'tipo': r.tipo or '',
-                    'estado': r.estado,
-                    'docente': r.docente.nombre if r.docente else '',
-                    'email_docente': r.docente.email if r.docente else '',
-                    'lote': r.lote.nombre if r.lote else '',
-                    'diagnostico': r.diagnostico.tipo if r.diagnostico else '',
-                    'fecha_creacion': r.fecha_creacion.strftime('%Y-%m-%d %H:%M') if r.fecha_creacion else '',
-                    'fecha_aprobacion': r.fecha_aprobacion.strftime('%Y-%m-%d %H:%M') if r.fecha_aprobacion else '',
-                    'labores_totales': labores_count,
-                    'labores_completadas': labores_completadas,
-                    'porcentaje_avance': f"{(labores_completadas/labores_count*100):.1f}%" if labores_count > 0 else "0%"
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo recomendaciones: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener recomendaciones: {str(e)}"]})
+        insumos = select(
+            MovimientoInsumo.labor_id,
+            func.count(MovimientoInsumo.id).label('insumos_utilizados'),
+            func.sum(MovimientoInsumo.cantidad).label('total_insumos_cantidad')
+        ).group_by(MovimientoInsumo.labor_id).subquery()
+        herramientas = select(
+            MovimientoHerramienta.labor_id,
+            func.count(MovimientoHerramienta.id).label('herramientas_utilizadas')
+        ).group_by(MovimientoHerramienta.labor_id).subquery()
+        stmt = select(
+            Labor.id, Labor.comentario,
+            TipoLabor.nombre.label('tipo_labor'),
+            Labor.estado, Labor.avance_porcentaje,
+            Usuario.nombre.label('trabajador'),
+            Usuario.email.label('email_trabajador'),
+            Recomendacion.titulo.label('recomendacion'),
+            Lote.nombre.label('lote'),
+            Labor.fecha_asignacion, Labor.fecha_finalizacion,
+            func.coalesce(insumos.c.insumos_utilizados, 0).label('insumos_utilizados'),
+            func.coalesce(herramientas.c.herramientas_utilizadas, 0).label('herramientas_utilizadas'),
+            func.coalesce(insumos.c.total_insumos_cantidad, 0).label('total_insumos_cantidad')
+        ).outerjoin(TipoLabor, Labor.tipo_labor_id == TipoLabor.id)\
+         .outerjoin(Usuario, Labor.trabajador_id == Usuario.id)\
+         .outerjoin(Recomendacion, Labor.recomendacion_id == Recomendacion.id)\
+         .outerjoin(Lote, Labor.lote_id == Lote.id)\
+         .outerjoin(insumos, insumos.c.labor_id == Labor.id)\
+         .outerjoin(herramientas, herramientas.c.labor_id == Labor.id)\
+         .order_by(Labor.id)
+        if estado:
+            stmt = stmt.where(Labor.estado == estado)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            # Calcular duración
+            dias = (
+                pd.to_datetime(df['fecha_finalizacion'], errors='coerce')
+                - pd.to_datetime(df['fecha_asignacion'], errors='coerce')
+            ).dt.days
+            duracion = pd.Series(
+                np.where(dias.notna(), dias.fillna(0).astype('int64').astype(str) + ' días', ''),
+                index=df.index
+            )
+            return pd.DataFrame({
+                'id': df['id'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['comentario'], 'Sin descripción'),
+                'tipo_labor': DataFrameFormatter.valor_o_defecto(df['tipo_labor']),
+                'estado': df['estado'],
+                'avance_porcentaje': df['avance_porcentaje'],
+                'trabajador': DataFrameFormatter.valor_o_defecto(df['trabajador']),
+                'email_trabajador': DataFrameFormatter.valor_o_defecto(df['email_trabajador']),
+                'recomendacion': DataFrameFormatter.valor_o_defecto(df['recomendacion']),
+                'lote': DataFrameFormatter.valor_o_defecto(df['lote']),
+                'fecha_asignacion': DataFrameFormatter.formatear_fechas(df['fecha_asignacion'], '%Y-%m-%d %H:%M'),
+                'fecha_finalizacion': DataFrameFormatter.formatear_fechas(df['fecha_finalizacion'], '%Y-%m-%d %H:%M'),
+                'insumos_utilizados': df['insumos_utilizados'],
+                'herramientas_utilizadas': df['herramientas_utilizadas'],
+                'total_insumos_cantidad': df['total_insumos_cantidad'],
+                'duracion': duracion
+            })
+        
+        return self._lotes('labores', [stmt], transformar)
     
-    def get_labores_dataframe(self) -> pd.DataFrame:
+    def get_labores_dataframe(self, estado: Optional[str] = None) -> pd.DataFrame:
         """Obtener DataFrame de labores bien formateado"""
-        from app.db.models import Labor
+        return self._concatenar(self.iter_labores_batches(estado))
+    
+    # ==================== USUARIOS ====================
+    
+    def iter_usuarios_batches(self, rol: Optional[str] = None, activo: Optional[bool] = None) -> Iterator[pd.DataFrame]:
+        from app.db.models import Usuario, Rol, Labor
         
-        try:
-            labores = self.db.query(Labor).options(
-                joinedload(Labor.trabajador),
-                joinedload(Labor.recomendacion),
-                joinedload(Labor.lote),
-                joinedload(Labor.tipo_labor),
-                joinedload(Labor.uso_insumos),
-                joinedload(Labor.uso_herramientas)
-            ).all()
-            
-            data = []
-            for l in labores:
-                # Contar recursos
-                insumos_count = len(l.uso_insumos)
-                herramientas_count = len(l.uso_herramientas)
-                
-                # Sumar cantidades de insumos
-                total_insumos = sum(mov.cantidad for mov in l.uso_insumos)
-                
-                # Calcular duración
-                duracion = ''
-                if l.fecha_asignacion and l.fecha_finalizacion:
-                    duracion_dias = (l.fecha_finalizacion - l.fecha_asignacion).days
-                    duracion = f"{duracion_dias} días"
-                
-                data.append({
-                    'id': l.id,
-                    'descripcion': l.comentario or 'Sin descripción',
-                    'tipo_labor': l.tipo_labor.nombre if l.tipo_labor else '',
-                    'estado': l.estado,
-                    'avance_porcentaje': l.avance_porcentaje,
-                    'trabajador': l.trabajador.nombre if l.trabajador else '',
-                    'email_trabajador': l.trabajador.email if l.trabajador else '',
-                    'recomendacion': l.recomendacion.titulo if l.recomendacion else '',
-                    'lote': l.lote.nombre if l.lote else '',
-                    'fecha_asignacion': l.fecha_asignacion.strftime('%Y-%m-%d %H:%M') if l.fecha_asignacion else '',
-                    'fecha_finalizacion': l.fecha_finalizacion.strftime('%Y-%m-%d %H:%M') if l.fecha_finalizacion else '',
-                    'insumos_utilizados': insumos_count,
-                    'herramientas_utilizadas': herramientas_count,
-                    'total_insumos_cantidad': total_insumos,
-                    'duracion': duracion
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo labores: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener labores: {str(e)}"]})
+        labores = select(Labor.trabajador_id, func.count(Labor.id).label('labores_asignadas'))\
+            .group_by(Labor.trabajador_id).subquery()
+        stmt = select(
+            Usuario.id, Usuario.nombre, Usuario.email,
+            Rol.nombre.label('rol'),
+            Usuario.activo, Usuario.fecha_creacion,
+            func.coalesce(labores.c.labores_asignadas, 0).label('labores_asignadas'),
+            Usuario.auth_provider
+        ).outerjoin(Rol, Usuario.rol_id == Rol.id)\
+         .outerjoin(labores, labores.c.trabajador_id == Usuario.id)\
+         .order_by(Usuario.id)
+        if rol:
+            stmt = stmt.where(Rol.nombre == rol)
+        if activo is not None:
+            stmt = stmt.where(Usuario.activo == activo)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'email': df['email'],
+                'rol': DataFrameFormatter.valor_o_defecto(df['rol']),
+                'estado': DataFrameFormatter.formatear_banderas(df['activo'], 'Activo', 'Inactivo'),
+                'fecha_registro': DataFrameFormatter.formatear_fechas(df['fecha_creacion'], '%Y-%m-%d %H:%M'),
+                'labores_asignadas': df['labores_asignadas'],
+                'proveedor_autenticacion': DataFrameFormatter.valor_o_defecto(df['auth_provider'], 'Sistema')
+            })
+        
+        return self._lotes('usuarios', [stmt], transformar)
     
-    def get_usuarios_dataframe(self) -> pd.DataFrame:
+    def get_usuarios_dataframe(self, rol: Optional[str] = None, activo: Optional[bool] = None) -> pd.DataFrame:
         """Obtener DataFrame de usuarios bien formateado"""
-        from app.db.models import Usuario
+        return self._concatenar(self.iter_usuarios_batches(rol, activo))
+    
+    # ==================== INVENTARIO ====================
+    
+    def iter_insumos_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import Insumo, Programa
         
-        try:
-            usuarios = self.db.query(Usuario).options(
-                joinedload(Usuario.rol)
-            ).all()
-            
-            data = []
-            for u in usuarios:
-                # Contar labores asignadas
-                labores_count = len(u.labores_asignadas)
-                
-                data.append({
-                    'id': u.id,
-                    'nombre': u.nombre,
-                    'email': u.email,
-                    'rol': u.rol.nombre if u.rol else '',
-                    'estado': 'Activo' if u.activo else 'Inactivo',
-                    'fecha_registro': u.fecha_creacion.strftime('%Y-%m-%d %H:%M') if u.fecha_creacion else '',
-                    'labores_asignadas': labores_count,
-                    'proveedor_autenticacion': u.auth_provider or 'Sistema'
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo usuarios: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener usuarios: {str(e)}"]})
+        stmt = select(
+            Insumo.id, Insumo.nombre, Insumo.descripcion,
+            Programa.nombre.label('programa'),
+            Insumo.cantidad_total, Insumo.cantidad_disponible, Insumo.unidad_medida,
+            Insumo.nivel_alerta, Insumo.estado
+        ).outerjoin(Programa, Insumo.programa_id == Programa.id).order_by(Insumo.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'programa': DataFrameFormatter.valor_o_defecto(df['programa']),
+                'cantidad_total': df['cantidad_total'],
+                'cantidad_disponible': df['cantidad_disponible'],
+                'unidad_medida': DataFrameFormatter.valor_o_defecto(df['unidad_medida']),
+                'nivel_alerta': df['nivel_alerta'],
+                'estado': df['estado'],
+                'porcentaje_disponible': DataFrameFormatter.formatear_porcentajes(
+                    df['cantidad_disponible'], df['cantidad_total']
+                ),
+                'disponibilidad': DataFrameFormatter.formatear_banderas(
+                    pd.to_numeric(df['cantidad_disponible']) > pd.to_numeric(df['nivel_alerta']),
+                    'Suficiente', 'Bajo stock'
+                )
+            })
+        
+        return self._lotes('insumos', [stmt], transformar)
     
     def get_insumos_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de insumos bien formateado"""
-        from app.db.models import Insumo
+        return self._concatenar(self.iter_insumos_batches())
+    
+    def iter_herramientas_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import Herramienta, CategoriaInventario
         
-        try:
-            insumos = self.db.query(Insumo).options(
-                joinedload(Insumo.programa)
-            ).all()
-            
-            data = []
-            for i in insumos:
-                porcentaje = 0
-                if i.cantidad_total > 0:
-                    porcentaje = (i.cantidad_disponible / i.cantidad_total) * 100
-                
-                data.append({
-                    'id': i.id,
-                    'nombre': i.nombre,
-                    'descripcion': i.descripcion or '',
-                    'programa': i.programa.nombre if i.programa else '',
-                    'cantidad_total': i.cantidad_total,
-                    'cantidad_disponible': i.cantidad_disponible,
-                    'unidad_medida': i.unidad_medida or '',
-                    'nivel_alerta': i.nivel_alerta,
-                    'estado': i.estado,
-                    'porcentaje_disponible': f"{porcentaje:.1f}%",
-                    'disponibilidad': 'Suficiente' if i.cantidad_disponible > i.nivel_alerta else 'Bajo stock'
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo insumos: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener insumos: {str(e)}"]})
+        stmt = select(
+            Herramienta.id, Herramienta.nombre, Herramienta.descripcion,
+            CategoriaInventario.nombre.label('categoria'),
+            Herramienta.cantidad_total, Herramienta.cantidad_disponible, Herramienta.estado
+        ).outerjoin(CategoriaInventario, Herramienta.categoria_id == CategoriaInventario.id)\
+         .order_by(Herramienta.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'categoria': DataFrameFormatter.valor_o_defecto(df['categoria']),
+                'cantidad_total': df['cantidad_total'],
+                'cantidad_disponible': df['cantidad_disponible'],
+                'estado': df['estado'],
+                'porcentaje_disponible': DataFrameFormatter.formatear_porcentajes(
+                    df['cantidad_disponible'], df['cantidad_total']
+                ),
+                'disponibilidad': DataFrameFormatter.formatear_banderas(
+                    pd.to_numeric(df['cantidad_disponible']) > 0, 'Disponible', 'No disponible'
+                )
+            })
+        
+        return self._lotes('herramientas', [stmt], transformar)
     
     def get_herramientas_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de herramientas bien formateado"""
-        from app.db.models import Herramienta
+        return self._concatenar(self.iter_herramientas_batches())
+    
+    # ==================== PROGRAMAS ====================
+    
+    def iter_programas_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import Programa, Lote, usuario_programa
         
-        try:
-            herramientas = self.db.query(Herramienta).options(
-                joinedload(Herramienta.categoria)
-            ).all()
-            
-            data = []
-            for h in herramientas:
-                porcentaje = 0
-                if h.cantidad_total > 0:
-                    porcentaje = (h.cantidad_disponible / h.cantidad_total) * 100
-                
-                data.append({
-                    'id': h.id,
-                    'nombre': h.nombre,
-                    'descripcion': h.descripcion or '',
-                    'categoria': h.categoria.nombre if h.categoria else '',
-                    'cantidad_total': h.cantidad_total,
-                    'cantidad_disponible': h.cantidad_disponible,
-                    'estado': h.estado,
-                    'porcentaje_disponible': f"{porcentaje:.1f}%",
-                    'disponibilidad': 'Disponible' if h.cantidad_disponible > 0 else 'No disponible'
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo herramientas: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener herramientas: {str(e)}"]})
+        lotes = select(Lote.programa_id, func.count(Lote.id).label('cantidad_lotes'))\
+            .group_by(Lote.programa_id).subquery()
+        usuarios = select(
+            usuario_programa.c.programa_id,
+            func.count(usuario_programa.c.usuario_id).label('cantidad_usuarios')
+        ).group_by(usuario_programa.c.programa_id).subquery()
+        stmt = select(
+            Programa.id, Programa.nombre, Programa.descripcion, Programa.tipo,
+            Programa.activo, Programa.fecha_creacion,
+            func.coalesce(lotes.c.cantidad_lotes, 0).label('cantidad_lotes'),
+            func.coalesce(usuarios.c.cantidad_usuarios, 0).label('cantidad_usuarios')
+        ).outerjoin(lotes, lotes.c.programa_id == Programa.id)\
+         .outerjoin(usuarios, usuarios.c.programa_id == Programa.id)\
+         .order_by(Programa.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'tipo': df['tipo'],
+                'estado': DataFrameFormatter.formatear_banderas(df['activo'], 'Activo', 'Inactivo'),
+                'fecha_creacion': DataFrameFormatter.formatear_fechas(df['fecha_creacion'], '%Y-%m-%d %H:%M'),
+                'cantidad_lotes': df['cantidad_lotes'],
+                'cantidad_usuarios': df['cantidad_usuarios']
+            })
+        
+        return self._lotes('programas', [stmt], transformar)
     
     def get_programas_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de programas bien formateado"""
-        from app.db.models import Programa
+        return self._concatenar(self.iter_programas_batches())
+    
+    # ==================== CULTIVOS ====================
+    
+    def iter_cultivos_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import CultivoEspecie, Granja
         
-        try:
-            programas = self.db.query(Programa).all()
-            
-            data = []
-            for p in programas:
-                # Contar lotes del programa
-                lotes_count = len(p.lotes)
-                
-                data.append({
-                    'id': p.id,
-                    'nombre': p.nombre,
-                    'descripcion': p.descripcion or '',
-                    'tipo': p.tipo,
-                    'estado': 'Activo' if p.activo else 'Inactivo',
-                    'fecha_creacion': p.fecha_creacion.strftime('%Y-%m-%d %H:%M') if p.fecha_creacion else '',
-                    'cantidad_lotes': lotes_count,
-                    'cantidad_usuarios': len(p.usuarios) if hasattr(p, 'usuarios') else 0
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo programas: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener programas: {str(e)}"]})
+        stmt = select(
+            CultivoEspecie.id, CultivoEspecie.nombre, CultivoEspecie.tipo, CultivoEspecie.descripcion,
+            Granja.nombre.label('granja'),
+            CultivoEspecie.estado, CultivoEspecie.fecha_inicio, CultivoEspecie.duracion_dias
+        ).outerjoin(Granja, CultivoEspecie.granja_id == Granja.id).order_by(CultivoEspecie.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            return pd.DataFrame({
+                'id': df['id'],
+                'nombre': df['nombre'],
+                'tipo': df['tipo'],
+                'descripcion': DataFrameFormatter.valor_o_defecto(df['descripcion']),
+                'granja': DataFrameFormatter.valor_o_defecto(df['granja']),
+                'estado': df['estado'],
+                'fecha_inicio': DataFrameFormatter.formatear_fechas(df['fecha_inicio'], '%Y-%m-%d'),
+                'duracion_dias': DataFrameFormatter.valor_o_defecto(df['duracion_dias'])
+            })
+        
+        return self._lotes('cultivos', [stmt], transformar)
     
     def get_cultivos_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de cultivos bien formateado"""
-        from app.db.models import CultivoEspecie
+        return self._concatenar(self.iter_cultivos_batches())
+    
+    # ==================== MOVIMIENTOS ====================
+    
+    def iter_movimientos_batches(self) -> Iterator[pd.DataFrame]:
+        from app.db.models import MovimientoInsumo, MovimientoHerramienta, Insumo, Herramienta, Labor, Recomendacion
         
-        try:
-            cultivos = self.db.query(CultivoEspecie).options(
-                joinedload(CultivoEspecie.granja)
-            ).all()
-            
-            data = []
-            for c in cultivos:
-                data.append({
-                    'id': c.id,
-                    'nombre': c.nombre,
-                    'tipo': c.tipo,
-                    'descripcion': c.descripcion or '',
-                    'granja': c.granja.nombre if c.granja else '',
-                    'estado': c.estado,
-                    'fecha_inicio': c.fecha_inicio.strftime('%Y-%m-%d') if c.fecha_inicio else '',
-                    'duracion_dias': c.duracion_dias or ''
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo cultivos: {str(e)}")
-            return pd.DataFrame({"Error": [f"No se pudieron obtener cultivos: {str(e)}"]})
+        # Movimientos de insumos
+        insumos = select(
+            MovimientoInsumo.id.label('id_movimiento'),
+            Insumo.nombre.label('recurso'),
+            MovimientoInsumo.cantidad, MovimientoInsumo.tipo_movimiento,
+            Insumo.unidad_medida.label('unidad'),
+            Labor.comentario.label('labor'),
+            Recomendacion.titulo.label('recomendacion'),
+            MovimientoInsumo.fecha_movimiento, MovimientoInsumo.observaciones
+        ).outerjoin(Insumo, MovimientoInsumo.insumo_id == Insumo.id)\
+         .outerjoin(Labor, MovimientoInsumo.labor_id == Labor.id)\
+         .outerjoin(Recomendacion, Labor.recomendacion_id == Recomendacion.id)\
+         .order_by(MovimientoInsumo.id)
+        
+        # Movimientos de herramientas
+        herramientas = select(
+            MovimientoHerramienta.id.label('id_movimiento'),
+            Herramienta.nombre.label('recurso'),
+            MovimientoHerramienta.cantidad, MovimientoHerramienta.tipo_movimiento,
+            Labor.comentario.label('labor'),
+            Recomendacion.titulo.label('recomendacion'),
+            MovimientoHerramienta.fecha_movimiento, MovimientoHerramienta.observaciones
+        ).outerjoin(Herramienta, MovimientoHerramienta.herramienta_id == Herramienta.id)\
+         .outerjoin(Labor, MovimientoHerramienta.labor_id == Labor.id)\
+         .outerjoin(Recomendacion, Labor.recomendacion_id == Recomendacion.id)\
+         .order_by(MovimientoHerramienta.id)
+        
+        def transformar(df: pd.DataFrame) -> pd.DataFrame:
+            datos = {
+                'tipo_recurso': 'INSUMO' if 'unidad' in df.columns else 'HERRAMIENTA',
+                'id_movimiento': df['id_movimiento'],
+                'recurso': DataFrameFormatter.valor_o_defecto(df['recurso']),
+                'cantidad': df['cantidad'],
+                'tipo_movimiento': df['tipo_movimiento'],
+            }
+            if 'unidad' in df.columns:
+                datos['unidad'] = DataFrameFormatter.valor_o_defecto(df['unidad'])
+            datos.update({
+                'labor': (df['labor'].astype(str).str.slice(0, 50) + '...').where(
+                    df['labor'].notna() & df['labor'].astype(bool), ''
+                ),
+                'recomendacion': DataFrameFormatter.valor_o_defecto(df['recomendacion']),
+                'fecha_movimiento': DataFrameFormatter.formatear_fechas(df['fecha_movimiento'], '%Y-%m-%d %H:%M'),
+                'observaciones': DataFrameFormatter.valor_o_defecto(df['observaciones'])
+            })
+            return pd.DataFrame(datos)
+        
+        return self._lotes('movimientos', [insumos, herramientas], transformar)
     
     def get_movimientos_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de movimientos bien formateado"""
-        from app.db.models import MovimientoInsumo, MovimientoHerramienta, Labor
-        
-        try:
-            data = []
-            
-            # Movimientos de insumos
-            movimientos_insumos = self.db.query(MovimientoInsumo).options(
-                joinedload(MovimientoInsumo.insumo),
-                joinedload(MovimientoInsumo.labor).joinedload(Labor.recomendacion)
-            ).all()
-            
-            for mov in movimientos_insumos:
-                data.append({
-                    'tipo_recurso': 'INSUMO',
-                    'id_movimiento': mov.id,
-                    'recurso': mov.insumo.nombre if mov.insumo else '',
-                    'cantidad': mov.cantidad,
-                    'tipo_movimiento': mov.tipo_movimiento,
-                    'unidad': mov.insumo.unidad_medida if mov.insumo else '',
-                    'labor': mov.labor.comentario[:50] + '...' if mov.labor and mov.labor.comentario else '',
-                    'recomendacion': mov.labor.recomendacion.titulo if mov.labor and mov.labor.recomendacion else '',
-                    'fecha_movimiento': mov.fecha_movimiento.strftime('%Y-%m-%d %H:%M') if mov.fecha_movimiento else '',
-                    'observaciones': mov.observaciones or ''
-                })
-            
-            # Movimientos de herramientas
-            movimientos_herramientas = self.db.query(MovimientoHerramienta).options(
-                joinedload(MovimientoHerramienta.herramienta),
-                joinedload(MovimientoHerramienta.labor).joinedload(Labor.recomendacion)
-            ).all()
-            
-            for mov in movimientos_herramientas:
-                data.append({
-                    'tipo_recurso': 'HERRAMIENTA',
-                    'id_movimiento': mov.id,
-                    'recurso': mov.herramienta.nombre if mov.herramienta else '',
-                    'cantidad': mov.cantidad,
-                    'tipo_movimiento': mov.tipo_movimiento,
-                    'labor': mov.labor.comentario[:50] + '...' if mov.labor and mov.labor.comentario else '',
-                    'recomendacion': mov.labor.recomendacion.titulo if mov.labor and mov.labor.recomendacion else '',
-                    'fecha_movimiento': mov.fecha_movimiento.strftime('%Y-%m-%d %H:%M') if mov.fecha_movimiento else '',
-                    'observaciones': mov.observaciones or ''
-                })
-            
-            df = pd.DataFrame(data)
-            return self._format_dataframe(df)
-        except Exception as e:
-            logger.error(f"Error obteniendo movimientos: {str(e)}")
-            return pd.DataFrame()
+        return self._concatenar(self.iter_movimientos_batches())
     
     def get_resumen_dataframe(self) -> pd.DataFrame:
         """Obtener DataFrame de resumen bien formateado"""
-        from app.db.models import (
-            Granja, Lote, Diagnostico, Recomendacion, 
-            Labor, Usuario, Insumo, Herramienta, Programa
-        )
+        from app.services.summary_service import SystemSummary
         
         try:
-            # Calcular estadísticas
-            total_granjas = self.db.query(func.count(Granja.id)).scalar() or 0
-            total_lotes = self.db.query(func.count(Lote.id)).scalar() or 0
-            total_diagnosticos = self.db.query(func.count(Diagnostico.id)).scalar() or 0
-            total_recomendaciones = self.db.query(func.count(Recomendacion.id)).scalar() or 0
-            total_labores = self.db.query(func.count(Labor.id)).scalar() or 0
-            total_usuarios = self.db.query(func.count(Usuario.id)).scalar() or 0
-            total_insumos = self.db.query(func.count(Insumo.id)).scalar() or 0
-            total_herramientas = self.db.query(func.count(Herramienta.id)).scalar() or 0
-            total_programas = self.db.query(func.count(Programa.id)).scalar() or 0
-            
-            # Contar por estado
-            labores_completadas = self.db.query(func.count(Labor.id)).filter(
-                Labor.estado == 'completada'
-            ).scalar() or 0
-            
-            recomendaciones_aprobadas = self.db.query(func.count(Recomendacion.id)).filter(
-                Recomendacion.estado == 'aprobada'
-            ).scalar() or 0
-            
-            usuarios_activos = self.db.query(func.count(Usuario.id)).filter(
-                Usuario.activo == True
-            ).scalar() or 0
+            # Todas las estadísticas en una sola consulta
+            resumen = SystemSummary.obtener(self.db)
             
             data = [{
                 'Métrica': 'Total Granjas',
-                'Valor': total_granjas,
+                'Valor': resumen['total_granjas'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Total Lotes',
-                'Valor': total_lotes,
+                'Valor': resumen['total_lotes'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Total Diagnósticos',
-                'Valor': total_diagnosticos,
+                'Valor': resumen['total_diagnosticos'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Total Recomendaciones',
-                'Valor': total_recomendaciones,
-                'Detalle': f'Aprobadas: {recomendaciones_aprobadas}'
+                'Valor': resumen['total_recomendaciones'],
+                'Detalle': f'Aprobadas: {resumen["recomendaciones_aprobadas"]}'
             }, {
                 'Métrica': 'Total Labores',
-                'Valor': total_labores,
-                'Detalle': f'Completadas: {labores_completadas}'
+                'Valor': resumen['total_labores'],
+                'Detalle': f'Completadas: {resumen["labores_completadas"]}'
             }, {
                 'Métrica': 'Total Usuarios',
-                'Valor': total_usuarios,
-                'Detalle': f'Activos: {usuarios_activos}'
+                'Valor': resumen['total_usuarios'],
+                'Detalle': f'Activos: {resumen["usuarios_activos"]}'
             }, {
                 'Métrica': 'Total Insumos',
-                'Valor': total_insumos,
+                'Valor': resumen['total_insumos'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Total Herramientas',
-                'Valor': total_herramientas,
+                'Valor': resumen['total_herramientas'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Total Programas',
-                'Valor': total_programas,
+                'Valor': resumen['total_programas'],
                 'Detalle': ''
             }, {
                 'Métrica': 'Fecha Generación',
@@ -493,6 +595,8 @@ class DataframeFetchers:
             return df
         except Exception as e:
             logger.error(f"Error obteniendo resumen: {str(e)}")
+            if self.estricto:
+                raise
             return pd.DataFrame({"Error": [f"No se pudo generar resumen: {str(e)}"]})
     
     def _format_dataframe(self, df: pd.DataFrame, title: str = "") -> pd.DataFrame:
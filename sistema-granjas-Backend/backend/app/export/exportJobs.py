@@ -0,0 +1,253 @@
+"""
+Trabajos de exportación en segundo plano - el libro se escribe en un pool de hilos
+y el cliente consulta el progreso por hoja hasta poder descargarlo
+"""
+import os
+import uuid
+import secrets
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.export.dataframeFetchers import DataframeFetchers
+from app.export.exportService import ExportService
+from app.export.streamingWriter import StreamingExcelWriter, FuenteHoja
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_PROGRESO = "en_progreso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_FALLIDO = "fallido"
+
+# tipo -> (roles permitidos, hojas del libro, prefijo del archivo)
+TIPOS_EXPORTACION: Dict[str, tuple] = {
+    "backup": (
+        ["admin", "docente"],
+        ExportService._hojas_backup,
+        "backup_completo",
+    ),
+    "inventario": (
+        ["admin", "docente", "asesor"],
+        lambda fetcher: {
+            "Insumos": fetcher.iter_insumos_batches,
+            "Herramientas": fetcher.iter_herramientas_batches,
+        },
+        "inventario",
+    ),
+    "movimientos": (
+        ["admin", "docente"],
+        lambda fetcher: {"Movimientos": fetcher.iter_movimientos_batches},
+        "movimientos",
+    ),
+}
+
+
+class TrabajoExportacion:
+    """Estado de un trabajo de exportación"""
+
+    def __init__(self, tipo: str, nombres_hojas: List[str], usuario_id: int):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.estado = ESTADO_PENDIENTE
+        self.token = secrets.token_urlsafe(32)
+        self.solicitantes = {usuario_id}
+        self.hojas = [{"nombre": nombre, "estado": ESTADO_PENDIENTE, "filas": 0} for nombre in nombres_hojas]
+        self.error: Optional[str] = None
+        self.ruta: Optional[str] = None
+        self.nombre_archivo: Optional[str] = None
+        self.fecha_creacion = datetime.utcnow()
+        self.fecha_finalizacion: Optional[datetime] = None
+
+    @property
+    def activo(self) -> bool:
+        return self.estado in (ESTADO_PENDIENTE, ESTADO_EN_PROGRESO)
+
+    @property
+    def hojas_completadas(self) -> int:
+        return sum(1 for hoja in self.hojas if hoja["estado"] == ESTADO_COMPLETADO)
+
+    def marcar_hoja(self, nombre: str, estado: str, filas: int = 0):
+        for hoja in self.hojas:
+            if hoja["nombre"] == nombre:
+                hoja["estado"] = estado
+                hoja["filas"] = filas
+
+    def to_dict(self) -> Dict:
+        total = len(self.hojas)
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "progreso": round(self.hojas_completadas / total * 100, 1) if total else 0.0,
+            "hojas_completadas": self.hojas_completadas,
+            "total_hojas": total,
+            "hojas": [dict(hoja) for hoja in self.hojas],
+            "error": self.error,
+            "nombre_archivo": self.nombre_archivo,
+            "token_descarga": self.token if self.estado == ESTADO_COMPLETADO else None,
+            "fecha_creacion": self.fecha_creacion,
+            "fecha_finalizacion": self.fecha_finalizacion,
+        }
+
+
+class GestorTrabajosExportacion:
+    """Crea, ejecuta y expira trabajos de exportación.
+
+    Solicitudes del mismo tipo que llegan mientras otra está en curso (o recién
+    terminada) reutilizan ese trabajo en lugar de generar el libro otra vez.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        directorio: Optional[str] = None,
+        ttl: timedelta = timedelta(minutes=30),
+        ventana_reutilizacion: timedelta = timedelta(seconds=60),
+        session_factory: Callable = SessionLocal,
+    ):
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), "granjas_exports")
+        self.ttl = ttl
+        self.ventana_reutilizacion = ventana_reutilizacion
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._trabajos: Dict[str, TrabajoExportacion] = {}
+        self._lock = threading.Lock()
+
+    # ==================== API ====================
+
+    def crear(self, tipo: str, usuario) -> TrabajoExportacion:
+        """Crear un trabajo o reutilizar uno equivalente en curso"""
+        _, construir_hojas, _ = TIPOS_EXPORTACION[tipo]
+        with self._lock:
+            self._purgar_expirados()
+
+            existente = self._buscar_reutilizable(tipo)
+            if existente:
+                existente.solicitantes.add(usuario.id)
+                logger.info(f"Reutilizando trabajo de exportación {existente.id} ({tipo})")
+                return existente
+
+            # Las fuentes no consultan nada hasta que se iteran; aquí solo interesan los nombres
+            nombres = list(construir_hojas(DataframeFetchers(None)).keys())
+            trabajo = TrabajoExportacion(tipo, nombres, usuario.id)
+            self._trabajos[trabajo.id] = trabajo
+
+        self._executor.submit(self._ejecutar, trabajo)
+        logger.info(f"Trabajo de exportación {trabajo.id} ({tipo}) encolado")
+        return trabajo
+
+    def obtener(self, trabajo_id: str, usuario) -> Optional[TrabajoExportacion]:
+        """Obtener un trabajo solo si el usuario lo solicitó"""
+        with self._lock:
+            self._purgar_expirados()
+            trabajo = self._trabajos.get(trabajo_id)
+        if not trabajo or usuario.id not in trabajo.solicitantes:
+            return None
+        return trabajo
+
+    def obtener_para_descarga(self, trabajo_id: str, token: str) -> Optional[TrabajoExportacion]:
+        """Obtener un trabajo completado validando su token de descarga"""
+        with self._lock:
+            self._purgar_expirados()
+            trabajo = self._trabajos.get(trabajo_id)
+        if not trabajo or not secrets.compare_digest(trabajo.token, token or ""):
+            return None
+        return trabajo
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ==================== EJECUCIÓN ====================
+
+    def _ejecutar(self, trabajo: TrabajoExportacion):
+        _, construir_hojas, prefijo = TIPOS_EXPORTACION[trabajo.tipo]
+        trabajo.estado = ESTADO_EN_PROGRESO
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, f"{trabajo.id}.xlsx")
+        temporal = f"{ruta}.part"
+
+        db = self.session_factory()
+        try:
+            # Estricto: un error de lectura hace fallar el trabajo en vez de entregar un libro con hojas "Error"
+            fetcher = DataframeFetchers(db, estricto=True)
+            hojas: Dict[str, FuenteHoja] = construir_hojas(fetcher)
+            fuentes = {nombre: self._fuente_con_progreso(trabajo, nombre, fuente) for nombre, fuente in hojas.items()}
+
+            writer = StreamingExcelWriter(
+                fuentes,
+                on_hoja_completada=lambda nombre, filas: trabajo.marcar_hoja(nombre, ESTADO_COMPLETADO, filas),
+            )
+            with open(temporal, "wb") as archivo:
+                for fragmento in writer.generar():
+                    archivo.write(fragmento)
+            os.replace(temporal, ruta)
+
+            trabajo.ruta = ruta
+            trabajo.nombre_archivo = f"{prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            trabajo.estado = ESTADO_COMPLETADO
+            logger.info(f"Trabajo de exportación {trabajo.id} completado")
+        except Exception as e:
+            logger.error(f"Error en trabajo de exportación {trabajo.id}: {str(e)}")
+            trabajo.estado = ESTADO_FALLIDO
+            trabajo.error = str(e)
+            for hoja in trabajo.hojas:
+                if hoja["estado"] == ESTADO_EN_PROGRESO:
+                    hoja["estado"] = ESTADO_FALLIDO
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        finally:
+            trabajo.fecha_finalizacion = datetime.utcnow()
+            db.close()
+
+    @staticmethod
+    def _fuente_con_progreso(trabajo: TrabajoExportacion, nombre: str, fuente: FuenteHoja) -> FuenteHoja:
+        def iniciar():
+            trabajo.marcar_hoja(nombre, ESTADO_EN_PROGRESO)
+            return fuente()
+        return iniciar
+
+    # ==================== MANTENIMIENTO ====================
+
+    def _buscar_reutilizable(self, tipo: str) -> Optional[TrabajoExportacion]:
+        ahora = datetime.utcnow()
+        for trabajo in self._trabajos.values():
+            if trabajo.tipo != tipo:
+                continue
+            if trabajo.activo:
+                return trabajo
+            if (
+                trabajo.estado == ESTADO_COMPLETADO
+                and trabajo.fecha_finalizacion
+                and ahora - trabajo.fecha_finalizacion <= self.ventana_reutilizacion
+            ):
+                return trabajo
+        return None
+
+    def _purgar_expirados(self):
+        """Eliminar trabajos terminados cuyo TTL venció (se llama con el lock tomado)"""
+        limite = datetime.utcnow() - self.ttl
+        expirados = [
+            trabajo_id for trabajo_id, trabajo in self._trabajos.items()
+            if not trabajo.activo and trabajo.fecha_finalizacion and trabajo.fecha_finalizacion < limite
+        ]
+        for trabajo_id in expirados:
+            trabajo = self._trabajos.pop(trabajo_id)
+            if trabajo.ruta and os.path.exists(trabajo.ruta):
+                try:
+                    os.remove(trabajo.ruta)
+                except OSError as e:
+                    logger.warning(f"No se pudo eliminar {trabajo.ruta}: {str(e)}")
+
+
+gestor_trabajos = GestorTrabajosExportacion(
+    max_workers=settings.EXPORT_MAX_WORKERS,
+    directorio=settings.EXPORT_DIR,
+    ttl=timedelta(minutes=settings.EXPORT_JOB_TTL_MINUTES),
+    ventana_reutilizacion=timedelta(seconds=settings.EXPORT_JOB_DEDUP_SECONDS),
+)
@@ -8,7 +8,12 @@ import io
 from fastapi.responses import StreamingResponse
 import logging
 from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from app.db.database import SessionLocal
+from app.db.models import Usuario
 from app.export.dataframeFetchers import DataframeFetchers
+from app.export.formatters import DataFrameFormatter
+from app.export.streamingWriter import StreamingExcelWriter, FuenteHoja, MEDIA_TYPE_XLSX
 
 logger = logging.getLogger(__name__)
 
@@ -41,13 +46,9 @@ class ExportService:
                     worksheet = writer.sheets[safe_sheet_name]
                     
                     # Ajustar ancho de columnas automáticamente
-                    for column in df.columns:
-                        column_length = max(
-                            df[column].astype(str).map(len).max(),
-                            len(str(column))
-                        )
-                        col_idx = df.columns.get_loc(column)
-                        worksheet.column_dimensions[chr(65 + col_idx)].width = min(column_length + 2, 50)
+                    anchos = DataFrameFormatter.anchos_columnas(df)
+                    for col_idx, column in enumerate(df.columns, start=1):
+                        worksheet.column_dimensions[get_column_letter(col_idx)].width = anchos[column]
                     
                     # Formatear encabezados SIN usar _default_cell_style
                     for cell in worksheet[1]:
@@ -67,6 +68,16 @@ class ExportService:
             logger.error(f"Error creando Excel: {str(e)}")
             raise
     
+    def _create_streaming_excel_response(self, generador, filename: str) -> StreamingResponse:
+        """Crear respuesta Excel (.xlsx) que se envía al cliente a medida que se escribe"""
+        return StreamingResponse(
+            generador,
+            media_type=MEDIA_TYPE_XLSX,
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}.xlsx"
+            }
+        )
+    
     def _create_single_excel_response(self, df: pd.DataFrame, filename: str, sheet_name: str = "Datos") -> StreamingResponse:
         """Crear respuesta Excel con una sola hoja"""
         return self._create_excel_response({sheet_name: df}, filename)
@@ -105,6 +116,24 @@ class ExportService:
         return df[existing_cols + other_cols]
     
     # ==================== EXPORTACIÓN COMPLETA EN EXCEL ====================
+    @staticmethod
+    def _hojas_backup(fetcher: DataframeFetchers) -> Dict[str, FuenteHoja]:
+        """Hojas del backup completo; cada una se lee por lotes solo cuando se va a escribir"""
+        return {
+            '00_Resumen': lambda: [fetcher.get_resumen_dataframe()],
+            '01_Granjas': fetcher.iter_granjas_batches,
+            '02_Lotes': fetcher.iter_lotes_batches,
+            '03_Diagnosticos': fetcher.iter_diagnosticos_batches,
+            '04_Recomendaciones': fetcher.iter_recomendaciones_batches,
+            '05_Labores': fetcher.iter_labores_batches,
+            '06_Usuarios': fetcher.iter_usuarios_batches,
+            '07_Insumos': fetcher.iter_insumos_batches,
+            '08_Herramientas': fetcher.iter_herramientas_batches,
+            '09_Programas': fetcher.iter_programas_batches,
+            '10_Cultivos': fetcher.iter_cultivos_batches,
+            '11_Movimientos': fetcher.iter_movimientos_batches,
+        }
+    
     def export_todo_excel(self) -> StreamingResponse:
         """
         Exporta TODA la base de datos en un Excel con múltiples hojas
@@ -154,6 +183,27 @@ class ExportService:
         
         return self._create_excel_response(dataframes, filename)
     
+    def export_todo_excel_streaming(self) -> StreamingResponse:
+        """
+        Exporta TODA la base de datos escribiendo una hoja a la vez.
+        Cada hoja se envía al cliente en cuanto termina, sin armar el libro en memoria.
+        """
+        usuario_id = self.usuario.id if self.usuario else None
+        
+        def generar():
+            # La sesión de la petición se cierra antes de que empiece el streaming,
+            # así que el generador usa una sesión propia
+            db = SessionLocal()
+            try:
+                usuario = db.get(Usuario, usuario_id) if usuario_id else None
+                fetcher = DataframeFetchers(db, usuario)
+                yield from StreamingExcelWriter(self._hojas_backup(fetcher)).generar()
+            finally:
+                db.close()
+        
+        fecha = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self._create_streaming_excel_response(generar(), f"backup_completo_{fecha}")
+    
     # ==================== MÉTODOS PÚBLICOS SIMPLIFICADOS ====================
     
     def export_granjas_excel(self) -> StreamingResponse:
@@ -164,9 +214,7 @@ class ExportService:
     
     def export_lotes_excel(self, detallado: bool = False, lote_id: Optional[int] = None) -> StreamingResponse:
         """Exportar lotes en Excel"""
-        df = self.dataframe_fetcher.get_lotes_dataframe()
-        if lote_id:
-            df = df[df['id'] == lote_id]
+        df = self.dataframe_fetcher.get_lotes_dataframe(lote_id)
         
         fecha = datetime.now().strftime("%Y%m%d")
         filename = f"lotes_detallados_{fecha}" if detallado else f"lotes_{fecha}"
@@ -180,23 +228,18 @@ class ExportService:
     
     def export_recomendaciones_excel(self, **filters) -> StreamingResponse:
         """Exportar recomendaciones en Excel"""
-        df = self.dataframe_fetcher.get_recomendaciones_dataframe()
-        
-        # Aplicar filtros básicos
-        if filters.get('estado'):
-            df = df[df['estado'] == filters['estado']]
-        if filters.get('tipo'):
-            df = df[df['tipo'] == filters['tipo']]
+        # Los filtros se aplican en la consulta
+        df = self.dataframe_fetcher.get_recomendaciones_dataframe(
+            estado=filters.get('estado'),
+            tipo=filters.get('tipo')
+        )
         
         fecha = datetime.now().strftime("%Y%m%d")
         return self._create_single_excel_response(df, f"recomendaciones_{fecha}", "Recomendaciones")
     
     def export_labores_excel(self, **filters) -> StreamingResponse:
         """Exportar labores en Excel"""
-        df = self.dataframe_fetcher.get_labores_dataframe()
-        
-        if filters.get('estado'):
-            df = df[df['estado'] == filters['estado']]
+        df = self.dataframe_fetcher.get_labores_dataframe(estado=filters.get('estado'))
         
         fecha = datetime.now().strftime("%Y%m%d")
         return self._create_single_excel_response(df, f"labores_{fecha}", "Labores")
@@ -216,13 +259,10 @@ class ExportService:
     
     def export_usuarios_excel(self, **filters) -> StreamingResponse:
         """Exportar usuarios en Excel"""
-        df = self.dataframe_fetcher.get_usuarios_dataframe()
-        
-        if filters.get('rol'):
-            df = df[df['rol'] == filters['rol']]
-        if filters.get('activo') is not None:
-            estado = 'Activo' if filters['activo'] else 'Inactivo'
-            df = df[df['estado'] == estado]
+        df = self.dataframe_fetcher.get_usuarios_dataframe(
+            rol=filters.get('rol'),
+            activo=filters.get('activo')
+        )
         
         fecha = datetime.now().strftime("%Y%m%d")
         return self._create_single_excel_response(df, f"usuarios_{fecha}", "Usuarios")
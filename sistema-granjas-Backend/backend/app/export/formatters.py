@@ -1,6 +1,7 @@
 """
 Utilidades para formatear DataFrames para Excel
 """
+import numpy as np
 import pandas as pd
 from typing import Dict, List
 
@@ -60,4 +61,50 @@ class DataFrameFormatter:
                     'Detalle': ''
                 })
         
-        return pd.DataFrame(data)
\ No newline at end of file
+        return pd.DataFrame(data)
+    
+    # ==================== FORMATO POR COLUMNAS ====================
+    
+    @staticmethod
+    def formatear_fechas(serie: pd.Series, formato: str) -> pd.Series:
+        """Formatear una columna de fechas con strftime vectorizado; los nulos quedan como ''"""
+        fechas = pd.to_datetime(serie, errors='coerce')
+        return fechas.dt.strftime(formato).fillna('')
+    
+    @staticmethod
+    def formatear_banderas(serie: pd.Series, verdadero: str, falso: str) -> pd.Series:
+        """Traducir una columna booleana a texto; los nulos cuentan como falso"""
+        return pd.Series(
+            np.where(serie.notna() & serie.astype(bool), verdadero, falso),
+            index=serie.index
+        )
+    
+    @staticmethod
+    def valor_o_defecto(serie: pd.Series, defecto='') -> pd.Series:
+        """Equivalente por columna de `valor or defecto`"""
+        return serie.where(serie.notna() & serie.astype(bool), defecto)
+    
+    @staticmethod
+    def formatear_porcentajes(parte, total, defecto: str = '0.0%') -> pd.Series:
+        """parte/total como texto '12.3%'; cuando total no es positivo se usa el defecto"""
+        parte, total = pd.Series(parte), pd.Series(total)
+        indice = parte.index
+        parte = pd.to_numeric(parte, errors='coerce').to_numpy(dtype=float)
+        total = pd.to_numeric(total, errors='coerce').to_numpy(dtype=float)
+        validos = total > 0
+        # Dividir y después multiplicar, como el cálculo por fila: el orden cambia el redondeo
+        porcentajes = np.divide(parte, total, out=np.zeros_like(parte), where=validos) * 100
+        return pd.Series(np.where(validos, np.char.mod('%.1f%%', porcentajes), defecto), index=indice)
+    
+    @staticmethod
+    def anchos_columnas(df: pd.DataFrame, maximo: int = 50) -> Dict[str, int]:
+        """Ancho de cada columna según el texto más largo (encabezado incluido), calculado una sola vez"""
+        anchos = {}
+        for column in df.columns:
+            column_length = len(str(column))
+            if len(df):
+                mas_largo = df[column].astype(str).str.len().max()
+                if pd.notna(mas_largo):
+                    column_length = max(int(mas_largo), column_length)
+            anchos[column] = min(column_length + 2, maximo)
+        return anchos
@@ -0,0 +1,248 @@
+"""
+Escritor XLSX en streaming - genera el libro hoja por hoja sin mantenerlo completo en memoria
+"""
+import math
+import numbers
+import re
+import zipfile
+import logging
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+from app.export.formatters import DataFrameFormatter
+
+logger = logging.getLogger(__name__)
+
+# Una fuente de hoja devuelve un iterable de DataFrames (lotes de filas con las mismas columnas)
+FuenteHoja = Callable[[], Iterable[pd.DataFrame]]
+
+MEDIA_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MAX_ANCHO_COLUMNA = 50
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Caracteres de control no permitidos en XML 1.0
+_CARACTERES_INVALIDOS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Estilos: índice 0 = celda normal, índice 1 = encabezado (negrita, fondo gris)
+_STYLES_XML = (
+    _XML_DECL
+    + f'<styleSheet xmlns="{_NS_MAIN}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FF000000"/><name val="Calibri"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFDDDDDD"/><bgColor indexed="64"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+
+
+class _BufferSalida:
+    """Destino de escritura para ZipFile que acumula bytes hasta que se envían al cliente.
+
+    Expone tell() pero no seek(), así ZipFile escribe en modo no posicionable
+    (descriptores de datos) y nunca necesita volver atrás en el flujo.
+    """
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def write(self, data) -> int:
+        self._partes.append(bytes(data))
+        self._posicion += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        data = b"".join(self._partes)
+        self._partes = []
+        return data
+
+
+class StreamingExcelWriter:
+    """Genera un archivo XLSX como flujo de bytes, consumiendo cada hoja por lotes"""
+
+    def __init__(
+        self,
+        hojas: Dict[str, FuenteHoja],
+        on_hoja_completada: Optional[Callable[[str, int], None]] = None,
+    ):
+        self.hojas = hojas
+        self.on_hoja_completada = on_hoja_completada
+        self.nombres_hojas = self._nombres_seguros(list(hojas.keys()))
+
+    def generar(self) -> Iterator[bytes]:
+        """Producir el archivo por fragmentos; se vacía el buffer tras cada lote y cada hoja"""
+        buffer = _BufferSalida()
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", self._content_types_xml())
+            zf.writestr("_rels/.rels", self._rels_xml())
+            zf.writestr("xl/workbook.xml", self._workbook_xml())
+            zf.writestr("xl/_rels/workbook.xml.rels", self._workbook_rels_xml())
+            zf.writestr("xl/styles.xml", _STYLES_XML)
+            yield buffer.vaciar()
+
+            for indice, (clave, nombre) in enumerate(zip(self.hojas.keys(), self.nombres_hojas), start=1):
+                filas = 0
+                with zf.open(f"xl/worksheets/sheet{indice}.xml", mode="w") as hoja:
+                    for filas in self._escribir_hoja(hoja, self.hojas[clave]):
+                        data = buffer.vaciar()
+                        if data:
+                            yield data
+                data = buffer.vaciar()
+                if data:
+                    yield data
+                logger.info(f"Hoja '{nombre}' exportada ({filas} filas)")
+                if self.on_hoja_completada:
+                    self.on_hoja_completada(clave, filas)
+
+        yield buffer.vaciar()
+
+    # ==================== HOJAS ====================
+
+    def _escribir_hoja(self, hoja, fuente: FuenteHoja) -> Iterator[int]:
+        """Escribir el XML de una hoja; produce el total de filas escritas tras cada lote"""
+        hoja.write(f'{_XML_DECL}<worksheet xmlns="{_NS_MAIN}">'.encode("utf-8"))
+
+        columnas = None
+        filas = 0
+        for lote in fuente():
+            if lote is None or (lote.empty and columnas is not None):
+                continue
+            if columnas is None:
+                # El primer lote define encabezados y anchos de columna
+                columnas = list(lote.columns)
+                hoja.write(self._cols_xml(lote).encode("utf-8"))
+                hoja.write(b"<sheetData>")
+                hoja.write(self._fila_xml(columnas, estilo=1).encode("utf-8"))
+            elif list(lote.columns) != columnas:
+                lote = lote.reindex(columns=columnas)
+
+            partes = [self._fila_xml(fila) for fila in lote.itertuples(index=False, name=None)]
+            hoja.write("".join(partes).encode("utf-8"))
+            filas += len(partes)
+            yield filas
+
+        if columnas is None:
+            hoja.write(b"<sheetData>")
+        hoja.write(b"</sheetData></worksheet>")
+        yield filas
+
+    @staticmethod
+    def _cols_xml(df: pd.DataFrame) -> str:
+        """Anchos de columna calculados a partir del primer lote"""
+        anchos = DataFrameFormatter.anchos_columnas(df, MAX_ANCHO_COLUMNA)
+        definiciones = [
+            f'<col min="{posicion}" max="{posicion}" width="{anchos[column]}" customWidth="1"/>'
+            for posicion, column in enumerate(df.columns, start=1)
+        ]
+        return f"<cols>{''.join(definiciones)}</cols>"
+
+    @classmethod
+    def _fila_xml(cls, valores, estilo: int = 0) -> str:
+        return "<row>" + "".join(cls._celda_xml(valor, estilo) for valor in valores) + "</row>"
+
+    @staticmethod
+    def _celda_xml(valor, estilo: int = 0) -> str:
+        atributo_estilo = f' s="{estilo}"' if estilo else ""
+
+        if valor is None or valor is pd.NaT or valor is pd.NA or (isinstance(valor, str) and not valor):
+            return f"<c{atributo_estilo}/>"
+        if isinstance(valor, (bool, np.bool_)):
+            return f'<c{atributo_estilo} t="b"><v>{int(bool(valor))}</v></c>'
+        if isinstance(valor, numbers.Integral):
+            return f"<c{atributo_estilo}><v>{int(valor)}</v></c>"
+        if isinstance(valor, numbers.Real):
+            numero = float(valor)
+            if math.isnan(numero):
+                return f"<c{atributo_estilo}/>"
+            if not math.isinf(numero):
+                return f"<c{atributo_estilo}><v>{repr(numero)}</v></c>"
+        if isinstance(valor, (datetime, date)):
+            valor = valor.strftime("%Y-%m-%d %H:%M:%S") if isinstance(valor, datetime) else valor.isoformat()
+
+        texto = _CARACTERES_INVALIDOS.sub("", str(valor))
+        preservar = ' xml:space="preserve"' if texto != texto.strip() else ""
+        return f'<c{atributo_estilo} t="inlineStr"><is><t{preservar}>{escape(texto)}</t></is></c>'
+
+    # ==================== ESTRUCTURA DEL LIBRO ====================
+
+    @staticmethod
+    def _nombres_seguros(nombres: List[str]) -> List[str]:
+        """Limitar a 31 caracteres (limitación de Excel) y evitar nombres repetidos"""
+        usados = set()
+        resultado = []
+        for nombre in nombres:
+            base = re.sub(r"[\[\]\*\?/\\:]", "_", str(nombre))[:31] or "Hoja"
+            candidato, sufijo = base, 1
+            while candidato.lower() in usados:
+                sufijo += 1
+                candidato = f"{base[:31 - len(str(sufijo)) - 1]}_{sufijo}"
+            usados.add(candidato.lower())
+            resultado.append(candidato)
+        return resultado
+
+    def _content_types_xml(self) -> str:
+        hojas = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(self.nombres_hojas) + 1)
+        )
+        return (
+            _XML_DECL
+            + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{hojas}</Types>"
+        )
+
+    @staticmethod
+    def _rels_xml() -> str:
+        return (
+            _XML_DECL
+            + f'<Relationships xmlns="{_NS_PKG_REL}">'
+            f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>"
+        )
+
+    def _workbook_xml(self) -> str:
+        hojas = "".join(
+            f'<sheet name={quoteattr(nombre)} sheetId="{i}" r:id="rId{i}"/>'
+            for i, nombre in enumerate(self.nombres_hojas, start=1)
+        )
+        return _XML_DECL + f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{hojas}</sheets></workbook>'
+
+    def _workbook_rels_xml(self) -> str:
+        total = len(self.nombres_hojas)
+        hojas = "".join(
+            f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, total + 1)
+        )
+        return (
+            _XML_DECL
+            + f'<Relationships xmlns="{_NS_PKG_REL}">{hojas}'
+            f'<Relationship Id="rId{total + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+            "</Relationships>"
+        )
@@ -21,9 +21,13 @@ from app.api import (
     upload,
     movimientos,
     roles,
-    exportRoutes
+    exportRoutes,
+    dashboard,
+    monitoreo,
+    inventario
 )
 from app.db.database import engine, Base
+from app.db.consultas_metricas import MiddlewareConsultas
 from app.db.models import Usuario, Granja, Programa, Lote, Labor, Rol
 import logging
 import time  # <-- Añade esto
@@ -82,6 +86,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Consultas SQL por petición (agregados en /api/monitoreo/consultas)
+app.add_middleware(MiddlewareConsultas)
+
 # ========== ENDPOINT DE DIAGNÓSTICO R2 ==========
 @app.get("/debug/r2")
 async def debug_r2():
@@ -216,6 +223,9 @@ app.include_router(upload.router, prefix="/api")
 app.include_router(movimientos.router, prefix="/api")
 app.include_router(roles.router, prefix="/api")
 app.include_router(exportRoutes.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
+app.include_router(monitoreo.router, prefix="/api")
+app.include_router(inventario.router, prefix="/api")
 
 @app.get("/")
 def root():
@@ -266,4 +276,29 @@ async def startup_event():
         else:
             logger.warning("⚠️  Cliente R2 no inicializado")
     except Exception as e:
-        logger.error(f"❌ Error testing R2 on startup: {e}")
\ No newline at end of file
+        logger.error(f"❌ Error testing R2 on startup: {e}")
+
+    # Snapshots periódicos del ledger de inventario
+    from app.services.inventario_service import programador_snapshots
+    programador_snapshots.iniciar()
+
+    # Subidas directas que quedaron sin consolidar (el proceso se detuvo antes)
+    from app.services.blob_service import consolidador_blobs
+    try:
+        consolidador_blobs.reanudar()
+    except Exception as e:
+        logger.error(f"❌ Error reanudando la consolidación de subidas: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener el pool de trabajos de exportación y cerrar las conexiones async"""
+    from app.export.exportJobs import gestor_trabajos
+    from app.db.database import async_engine
+    from app.services.inventario_service import programador_snapshots
+    from app.services.derivados_service import generador_derivados
+    from app.services.blob_service import consolidador_blobs
+    gestor_trabajos.cerrar()
+    programador_snapshots.detener()
+    generador_derivados.cerrar()
+    consolidador_blobs.cerrar()
+    await async_engine.dispose()
\ No newline at end of file
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ResumenSistemaResponse(BaseModel):
+    total_granjas: int
+    total_lotes: int
+    total_diagnosticos: int
+    total_recomendaciones: int
+    total_labores: int
+    total_usuarios: int
+    total_insumos: int
+    total_herramientas: int
+    total_programas: int
+    labores_completadas: int
+    recomendaciones_aprobadas: int
+    usuarios_activos: int
+    fecha_generacion: datetime
@@ -97,8 +97,10 @@ class DiagnosticoWithRecomendacionesResponse(DiagnosticoResponse):
 # Listado paginado
 class DiagnosticoListResponse(BaseModel):
     items: List[DiagnosticoResponse]
-    total: int
-    paginas: int
+    total: Optional[int] = None  # None si no se contó (paginación por cursor)
+    total_estimado: bool = False  # total aproximado (estadísticas del planner)
+    paginas: Optional[int] = None
+    siguiente_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
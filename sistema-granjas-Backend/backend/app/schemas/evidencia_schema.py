@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -49,6 +49,10 @@ class EvidenciaResponse(EvidenciaBase):
     usuario_id: int
     fecha_creacion: datetime
     
+    # Derivados WebP (solo imágenes); None mientras se generan: usar url_archivo
+    url_miniatura: Optional[str] = None
+    url_vista_previa: Optional[str] = None
+    
     # Información relacionada
     usuario_nombre: Optional[str] = None
     entidad_nombre: Optional[str] = None
@@ -61,4 +65,52 @@ class EvidenciaListResponse(BaseModel):
     total: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# === Subida directa al bucket ===
+class SubidaEvidenciaCreate(BaseModel):
+    tipo: TipoEvidencia = Field(..., description="Tipo de evidencia")
+    descripcion: str = Field(..., min_length=5, max_length=500, description="Descripción de la evidencia")
+    tipo_entidad: TipoEntidad = Field(..., description="Tipo de entidad a la que pertenece")
+    entidad_id: int = Field(..., gt=0, description="ID de la entidad (labor, diagnóstico o recomendación)")
+    nombre_archivo: str = Field(..., min_length=1, max_length=255, description="Nombre original del archivo")
+    content_type: str = Field(..., min_length=3, max_length=255, description="MIME type con el que se subirá")
+    tamano: int = Field(..., gt=0, description="Tamaño del archivo en bytes")
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$", description="Si ya hay un archivo con este contenido, no hace falta subirlo")
+
+    @validator('descripcion')
+    def descripcion_no_vacia(cls, v):
+        if not v.strip():
+            raise ValueError('La descripción no puede estar vacía')
+        return v.strip()
+
+    @validator('sha256')
+    def sha256_minusculas(cls, v):
+        return v.lower() if v else v
+
+    @validator('content_type')
+    def content_type_normalizado(cls, v):
+        return v.strip().lower()
+
+class ParteSubida(BaseModel):
+    numero: int
+    url: str
+
+class SubidaEvidenciaResponse(BaseModel):
+    id: int
+    key: str
+    metodo: Literal["put", "multipart", "existente"]  # existente: no subir nada, solo completar
+    url: Optional[str] = None  # metodo put: PUT con el header Content-Type declarado
+    partes: List[ParteSubida] = []  # metodo multipart: un PUT por parte, guardando el ETag de cada respuesta
+    tamano_parte: Optional[int] = None
+    content_type: str
+    checksum_sha256: Optional[str] = None  # metodo put con sha256 declarado: enviar como header x-amz-checksum-sha256
+    fecha_expiracion: datetime
+
+class ParteCompletada(BaseModel):
+    numero: int = Field(..., ge=1, le=10000)
+    etag: str = Field(..., min_length=1)
+
+class CompletarSubidaRequest(BaseModel):
+    partes: List[ParteCompletada] = Field(default_factory=list, description="Solo en subidas multipart")
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class TrabajoExportacionCreate(BaseModel):
+    tipo: str = Field("backup", description="Tipo de exportación: backup, inventario o movimientos")
+
+
+class HojaProgresoResponse(BaseModel):
+    nombre: str
+    estado: str
+    filas: int = 0
+
+
+class TrabajoExportacionResponse(BaseModel):
+    id: str
+    tipo: str
+    estado: str
+    progreso: float = Field(..., description="Porcentaje de hojas completadas")
+    hojas_completadas: int
+    total_hojas: int
+    hojas: List[HojaProgresoResponse]
+    error: Optional[str] = None
+    nombre_archivo: Optional[str] = None
+    token_descarga: Optional[str] = Field(None, description="Disponible cuando el trabajo termina")
+    fecha_creacion: datetime
+    fecha_finalizacion: Optional[datetime] = None
@@ -0,0 +1,72 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+
+TipoRecurso = Literal["herramienta", "insumo"]
+
+
+class SaldoInventarioResponse(BaseModel):
+    tipo_recurso: TipoRecurso
+    recurso_id: int
+    fecha: datetime
+    cantidad: float
+    origen: Literal["snapshot", "actual"]
+    fecha_base: datetime
+    cantidad_base: float
+    movimientos_aplicados: int
+
+
+class ConsumoMes(BaseModel):
+    mes: str
+    salidas: float
+    entradas: float
+    consumo_neto: float
+
+
+class ConsumoRecurso(BaseModel):
+    recurso_id: int
+    nombre: str
+    meses: List[ConsumoMes]
+
+
+class ConsumoMensualResponse(BaseModel):
+    tipo_recurso: TipoRecurso
+    desde: str
+    hasta: str
+    items: List[ConsumoRecurso]
+
+
+class SnapshotInventarioResponse(BaseModel):
+    id: int
+    tipo_recurso: TipoRecurso
+    recurso_id: int
+    fecha_corte: datetime
+    cantidad: float
+    salidas_acumuladas: float
+    entradas_acumuladas: float
+    ajuste: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DiferenciaInventario(BaseModel):
+    tipo_recurso: TipoRecurso
+    recurso_id: int
+    nombre: str
+    cantidad_disponible: float
+    esperado: float
+    diferencia: float
+    fecha_snapshot: datetime
+
+
+class ConciliacionResponse(BaseModel):
+    revisados: int
+    sin_snapshot: int
+    con_diferencia: int
+    diferencias: List[DiferenciaInventario]
+    fecha: datetime
+
+
+class GeneracionSnapshotsResponse(BaseModel):
+    generados: Dict[str, int]
+    conciliacion: Optional[ConciliacionResponse] = None
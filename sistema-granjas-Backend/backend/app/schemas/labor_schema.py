@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -78,6 +78,18 @@ class AsignacionInsumoRequest(BaseModel):
     cantidad: float = Field(..., gt=0)
 
 
+class AsignacionRecursosRequest(BaseModel):
+    """Varias herramientas e insumos asignados a una labor en una sola transacción"""
+    herramientas: List[AsignacionHerramientaRequest] = Field(default_factory=list, max_length=100)
+    insumos: List[AsignacionInsumoRequest] = Field(default_factory=list, max_length=100)
+
+    @model_validator(mode="after")
+    def validar_no_vacia(self):
+        if not self.herramientas and not self.insumos:
+            raise ValueError("Debe indicar al menos una herramienta o un insumo")
+        return self
+
+
 class RegistroAvanceRequest(BaseModel):
     avance_porcentaje: int = Field(..., ge=0, le=100)
     comentario: Optional[str] = Field(None, max_length=2000)
@@ -91,6 +103,8 @@ class EvidenciaBasicResponse(BaseModel):
     tipo: str
     descripcion: str
     url_archivo: str
+    url_miniatura: Optional[str] = None
+    url_vista_previa: Optional[str] = None
     fecha_creacion: datetime
     creado_por_nombre: Optional[str] = None
 
@@ -133,8 +147,10 @@ class LaborWithRecursosResponse(LaborResponse):
 
 class LaborListResponse(BaseModel):
     items: List[LaborResponse]
-    total: int
-    paginas: int
+    total: Optional[int] = None  # None si no se contó (paginación por cursor)
+    total_estimado: bool = False  # total aproximado (estadísticas del planner)
+    paginas: Optional[int] = None
+    siguiente_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,82 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+
+class EstadisticasPoolResponse(BaseModel):
+    pid: int
+    clase_pool: str
+    tamano: Optional[int] = None
+    max_overflow: Optional[int] = None
+    prestadas: Optional[int] = None
+    disponibles: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    checkins: int
+    conexiones_creadas: int
+    conexiones_cerradas: int
+    invalidaciones: int
+    timeouts: int
+    espera_promedio_ms: float
+    espera_maxima_ms: float
+    histograma_espera: Dict[str, int]
+    conexiones_abiertas: int
+    edad_promedio_s: float
+    edad_maxima_s: float
+    desde: datetime
+
+
+class EstadisticasPoolesResponse(BaseModel):
+    """Cada motor tiene su pool (ver app/db/database.py)"""
+    sync: EstadisticasPoolResponse
+    async_: EstadisticasPoolResponse = Field(alias="async")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ConsultasRutaResponse(BaseModel):
+    metodo: str
+    ruta: str
+    pedidos: int
+    consultas_total: int
+    consultas_promedio: float
+    consultas_max: int
+    tiempo_db_total_ms: float
+    tiempo_db_promedio_ms: float
+    tiempo_db_max_ms: float
+    duracion_promedio_ms: float
+    consulta_lenta_ms: float
+    consulta_lenta_sql: Optional[str] = None
+
+
+class EstadisticasConsultasResponse(BaseModel):
+    pid: int
+    desde: datetime
+    rutas: List[ConsultasRutaResponse]
+
+
+class ConsultaLentaResponse(BaseModel):
+    id: int
+    fecha: datetime
+    duracion_ms: float
+    ruta: Optional[str] = None
+    huella: str
+    sql: str
+    parametros: Optional[Union[Dict[str, Any], List[str]]] = None
+    motor: str
+    estado_plan: str
+
+
+class ConsultaLentaDetalleResponse(ConsultaLentaResponse):
+    plan: Optional[str] = None
+
+
+class ResumenConsultaLentaResponse(BaseModel):
+    huella: str
+    sql: str
+    veces: int
+    promedio_ms: float
+    max_ms: float
+    total_ms: float
+    rutas: List[str]
+    ultima: datetime
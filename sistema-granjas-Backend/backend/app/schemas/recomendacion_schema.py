@@ -87,8 +87,10 @@ class RecomendacionResponse(RecomendacionBase):
 
 class RecomendacionListResponse(BaseModel):
     items: List[RecomendacionResponse]
-    total: int
-    paginas: int
+    total: Optional[int] = None  # None si no se contó (paginación por cursor)
+    total_estimado: bool = False  # total aproximado (estadísticas del planner)
+    paginas: Optional[int] = None
+    siguiente_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
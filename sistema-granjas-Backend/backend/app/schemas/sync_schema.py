@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from app.schemas.labor_schema import RegistroAvanceRequest
+
+
+# Ítem que el frontend guarda en IndexedDB mientras no hay conexión
+class SyncItem(BaseModel):
+    cliente_id: str = Field(..., min_length=1, max_length=64, description="Id único generado en el dispositivo (UUID)")
+    tipo: str = Field(..., description="Tipo de registro: diagnostico, avance_labor")
+    data: dict
+    synced: Optional[bool] = None
+    createdAt: Optional[datetime] = None
+
+
+class SyncBatchRequest(BaseModel):
+    items: List[SyncItem] = Field(..., min_length=1, max_length=1000)
+
+
+class SyncItemResultado(BaseModel):
+    cliente_id: str
+    tipo: str
+    estado: Literal["aplicado", "duplicado", "rechazado"]
+    recurso_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class SyncBatchResponse(BaseModel):
+    procesados: int
+    aplicados: int
+    duplicados: int
+    rechazados: int
+    resultados: List[SyncItemResultado]
+
+
+class CambiosResponse(BaseModel):
+    cambios: Dict[str, List[Dict[str, Any]]]
+    eliminados: Dict[str, List[int]]
+    cursor: str
+    hay_mas: bool
+    completo: bool
+    fecha_servidor: datetime
+
+
+# === Datos de cada tipo ===
+class AvanceLaborSync(RegistroAvanceRequest):
+    labor_id: int = Field(..., gt=0)
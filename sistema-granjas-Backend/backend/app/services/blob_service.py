@@ -0,0 +1,326 @@
+"""
+Almacenamiento por contenido: cada archivo se guarda una vez en blobs/<xx>/<sha256><ext>.
+
+- Subidas a través de la API (/files/upload): se calcula el sha256 leyendo el archivo
+  temporal de la petición y, si ese contenido ya existe, no se sube nada.
+- Subidas directas al bucket (/evidencias/subidas): el cliente sube a una key temporal.
+  Si declaró el sha256 y fue un PUT simple, R2 lo verificó al recibirlo (checksum
+  firmado): al completar se copia (del lado de R2) a su key por contenido, o se descarta
+  si ya existía. Si no hay hash verificado (multipart, o sin sha256 declarado), la
+  evidencia se crea con la key temporal y ConsolidadorBlobs calcula el hash en segundo
+  plano: la API nunca lee el archivo dentro de la petición. Si el cliente declara el
+  sha256 de un contenido ya guardado, ni siquiera sube el archivo.
+
+Las evidencias referencian el blob con blob_id; al eliminar la última que lo usa se
+borran del bucket el original y sus derivados. /files/upload entrega una URL que la
+evidencia referencia después: el blob queda reservado BLOB_RESERVA_MINUTOS para que otra
+evidencia que se elimina mientras tanto no lo borre; si nadie lo usó, se libera al
+reiniciar (ConsolidadorBlobs.reanudar).
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Blob, Evidencia, EvidenciaPendiente
+from app.services.storage_service import (
+    subir_stream_r2, sha256_r2, copiar_r2, eliminar_r2, key_de_url_r2, url_publica_r2
+)
+from app.services.derivados_service import keys_derivados, generador_derivados
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+def key_blob(sha256: str, nombre: Optional[str]) -> str:
+    extension = Path(nombre or "").suffix.lower()[:10]
+    return f"blobs/{sha256[:2]}/{sha256}{extension}"
+
+
+class BlobService:
+
+    @staticmethod
+    def por_sha256(db: Session, sha256: str) -> Optional[Blob]:
+        return db.query(Blob).filter(Blob.sha256 == sha256).first()
+
+    @staticmethod
+    def guardar_stream(db: Session, file_obj: BinaryIO, nombre: str, content_type: str) -> Tuple[Blob, bool]:
+        """
+        Guardar un archivo (posicionable, p. ej. UploadFile.file) una sola vez por contenido.
+        Devuelve (blob, duplicado); si duplicado es True no se subió nada. El blob queda
+        reservado hasta que la evidencia lo referencie (ver liberar). Bloqueante.
+        """
+        digest = hashlib.sha256()
+        tamano = 0
+        for bloque in iter(lambda: file_obj.read(TAMANO_BLOQUE), b""):
+            digest.update(bloque)
+            tamano += len(bloque)
+        sha256 = digest.hexdigest()
+
+        existente = BlobService.por_sha256(db, sha256)
+        # Si liberar lo borró entre la consulta y la reserva, se sube de nuevo
+        if existente and BlobService._reservar(db, existente):
+            logger.info(f"{nombre}: contenido ya almacenado en {existente.key}, no se sube")
+            return existente, True
+
+        file_obj.seek(0)
+        key = key_blob(sha256, nombre)
+        subir_stream_r2(file_obj, key, content_type)
+        blob, duplicado = BlobService._registrar(db, sha256, key, tamano, content_type, _fin_reserva())
+        if duplicado:
+            BlobService._reservar(db, blob)
+        return blob, duplicado
+
+    @staticmethod
+    def _reservar(db: Session, blob: Blob) -> bool:
+        """Extender la reserva del blob; False si ya no existe"""
+        reservado = db.query(Blob).filter(Blob.id == blob.id).update(
+            {"reservado_hasta": _fin_reserva()}, synchronize_session=False
+        )
+        db.commit()
+        return bool(reservado)
+
+    @staticmethod
+    def consolidar_r2(db: Session, key_temporal: str, content_type: str, sha256: str, tamano: int) -> Tuple[Blob, bool]:
+        """
+        Pasar un objeto subido directamente a una key temporal a su key por contenido, con
+        un sha256 ya verificado por R2 (no se lee el objeto). Devuelve (blob, duplicado).
+        La key temporal se elimina en ambos casos.
+        """
+        existente = BlobService.por_sha256(db, sha256)
+        if existente:
+            eliminar_r2(key_temporal)
+            return existente, True
+
+        key = key_blob(sha256, key_temporal)
+        copiar_r2(key_temporal, key)
+        eliminar_r2(key_temporal)
+        return BlobService._registrar(db, sha256, key, tamano, content_type)
+
+    @staticmethod
+    def _registrar(db: Session, sha256: str, key: str, tamano: int, content_type: str,
+                   reservado_hasta: Optional[datetime] = None) -> Tuple[Blob, bool]:
+        blob = Blob(sha256=sha256, key=key, tamano=tamano, content_type=content_type,
+                    reservado_hasta=reservado_hasta)
+        db.add(blob)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otra petición registró el mismo contenido a la vez (y escribió la misma key)
+            db.rollback()
+            return BlobService.por_sha256(db, sha256), True
+        db.refresh(blob)
+        return blob, False
+
+    @staticmethod
+    def vincular(db: Session, evidencia: Evidencia):
+        """
+        Asociar la evidencia a su blob según url_archivo (sin commit). Si otra evidencia del
+        mismo blob ya tiene derivados, se reutilizan en lugar de generarlos de nuevo.
+        """
+        key = key_de_url_r2(evidencia.url_archivo)
+        blob = db.query(Blob).filter(Blob.key == key).first() if key else None
+        if not blob:
+            return
+        evidencia.blob_id = blob.id
+        con_derivados = db.query(Evidencia.url_miniatura, Evidencia.url_vista_previa).filter(
+            Evidencia.blob_id == blob.id,
+            Evidencia.url_miniatura.isnot(None),
+            Evidencia.url_vista_previa.isnot(None)
+        ).first()
+        if con_derivados:
+            evidencia.url_miniatura, evidencia.url_vista_previa = con_derivados
+
+    @staticmethod
+    def url(blob: Blob) -> str:
+        return url_publica_r2(blob.key)
+
+    @staticmethod
+    def liberar(db: Session, blob_id: Optional[int]):
+        """
+        Eliminar el blob y sus objetos si ya ninguna evidencia (ni subida en curso) lo usa y
+        no está reservado
+        """
+        if blob_id is None:
+            return
+        en_uso = db.query(Evidencia.id).filter(Evidencia.blob_id == blob_id).first() or \
+            db.query(EvidenciaPendiente.id).filter(
+                EvidenciaPendiente.blob_id == blob_id,
+                EvidenciaPendiente.estado.in_(["pendiente", "completando"])
+            ).first()
+        if en_uso:
+            return
+
+        blob = db.query(Blob).filter(Blob.id == blob_id).first()
+        ahora = datetime.utcnow()
+        if not blob or (blob.reservado_hasta and blob.reservado_hasta > ahora):
+            return
+        key = blob.key
+        try:
+            # Condicional: /files/upload puede haberlo reservado después de la consulta
+            borrados = db.query(Blob).filter(
+                Blob.id == blob_id,
+                or_(Blob.reservado_hasta.is_(None), Blob.reservado_hasta <= ahora)
+            ).delete(synchronize_session=False)
+            db.commit()
+        except IntegrityError:
+            # Una evidencia nueva lo referenció entre la consulta y el borrado
+            db.rollback()
+            return
+
+        if borrados:
+            _eliminar_objetos(key)
+
+    @staticmethod
+    def liberar_vencidos(db: Session) -> int:
+        """Liberar los blobs cuya reserva venció sin que ninguna evidencia los usara"""
+        ids = [fila.id for fila in db.query(Blob.id).filter(
+            Blob.reservado_hasta <= datetime.utcnow(),
+            ~db.query(Evidencia.id).filter(Evidencia.blob_id == Blob.id).exists()
+        )]
+        for blob_id in ids:
+            BlobService.liberar(db, blob_id)
+        return len(ids)
+
+
+def _fin_reserva() -> datetime:
+    return datetime.utcnow() + timedelta(minutes=settings.BLOB_RESERVA_MINUTOS)
+
+
+def _eliminar_objetos(key: str):
+    """Eliminar del bucket el original y sus derivados"""
+    for objeto in [key] + keys_derivados(key):
+        try:
+            eliminar_r2(objeto)
+        except Exception as e:
+            logger.warning(f"No se pudo eliminar {objeto} del bucket: {e}")
+
+
+class ConsolidadorBlobs:
+    """
+    Consolidación en segundo plano de las subidas directas sin sha256 verificado: la
+    evidencia ya apunta a la key temporal; aquí se calcula el hash leyendo el objeto y,
+    si el contenido es nuevo, la key temporal queda registrada como su blob (la URL no
+    cambia); si ya existía, la evidencia pasa al blob existente y la key temporal se borra.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hilos: Optional[ThreadPoolExecutor] = None
+        self._en_curso = set()
+
+    def programar(self, pendiente_id: int):
+        with self._lock:
+            if pendiente_id in self._en_curso:
+                return
+            self._en_curso.add(pendiente_id)
+            if self._hilos is None:
+                self._hilos = ThreadPoolExecutor(1, thread_name_prefix="blobs")
+            hilos = self._hilos
+        hilos.submit(self._consolidar_en_cola, pendiente_id)
+
+    def reanudar(self):
+        """
+        Programar las subidas completadas que quedaron sin consolidar (p. ej. tras un
+        reinicio) y liberar los blobs reservados que nadie usó
+        """
+        db = SessionLocal()
+        try:
+            ids = [fila.id for fila in db.query(EvidenciaPendiente.id).filter(
+                EvidenciaPendiente.estado == "completada",
+                EvidenciaPendiente.blob_id.is_(None),
+                EvidenciaPendiente.evidencia_id.isnot(None)
+            )]
+            liberados = BlobService.liberar_vencidos(db)
+        finally:
+            db.close()
+        if liberados:
+            logger.info(f"{liberados} blobs reservados por /files/upload que nadie usó")
+        for pendiente_id in ids:
+            self.programar(pendiente_id)
+        if ids:
+            logger.info(f"{len(ids)} subidas pendientes de consolidar")
+
+    def _consolidar_en_cola(self, pendiente_id: int):
+        try:
+            self.consolidar(pendiente_id)
+        except Exception as e:
+            logger.error(f"Error consolidando la subida {pendiente_id}: {e}")
+        finally:
+            with self._lock:
+                self._en_curso.discard(pendiente_id)
+
+    def consolidar(self, pendiente_id: int):
+        """Calcular el hash de la subida y asociarla a su blob (bloqueante)"""
+        db = SessionLocal()
+        try:
+            pendiente = db.get(EvidenciaPendiente, pendiente_id)
+            if not pendiente or pendiente.blob_id or pendiente.estado != "completada":
+                return
+            url_temporal = url_publica_r2(pendiente.key)
+            # Solo si la evidencia sigue apuntando a la key temporal
+            de_la_evidencia = db.query(Evidencia).filter(
+                Evidencia.id == pendiente.evidencia_id, Evidencia.url_archivo == url_temporal
+            )
+            if not de_la_evidencia.first():
+                # La evidencia se eliminó antes de consolidar: nadie más usa la key temporal
+                _eliminar_objetos(pendiente.key)
+                pendiente.estado = "cancelada"
+                db.commit()
+                return
+
+            sha256, tamano = sha256_r2(pendiente.key)
+            blob = BlobService.por_sha256(db, sha256)
+            if blob is None:
+                blob, _ = BlobService._registrar(db, sha256, pendiente.key, tamano, pendiente.content_type)
+
+            if blob.key == pendiente.key:
+                # Contenido nuevo: el objeto se queda donde está (y sus derivados también)
+                actualizadas = de_la_evidencia.update({"blob_id": blob.id}, synchronize_session=False)
+                pendiente.blob_id = blob.id
+                db.commit()
+                if not actualizadas:
+                    BlobService.liberar(db, blob.id)
+                return
+
+            # Contenido repetido: la evidencia pasa al blob existente (y a sus derivados, si hay)
+            con_derivados = db.query(Evidencia.url_miniatura, Evidencia.url_vista_previa).filter(
+                Evidencia.blob_id == blob.id,
+                Evidencia.url_miniatura.isnot(None),
+                Evidencia.url_vista_previa.isnot(None)
+            ).first()
+            actualizadas = de_la_evidencia.update({
+                "url_archivo": BlobService.url(blob),
+                "blob_id": blob.id,
+                "url_miniatura": con_derivados[0] if con_derivados else None,
+                "url_vista_previa": con_derivados[1] if con_derivados else None,
+            }, synchronize_session=False)
+            pendiente.blob_id = blob.id
+            db.commit()
+            _eliminar_objetos(pendiente.key)
+            logger.info(f"Subida {pendiente_id}: contenido repetido, se reutiliza {blob.key}")
+            if actualizadas and not con_derivados:
+                evidencia = db.get(Evidencia, pendiente.evidencia_id)
+                if evidencia:
+                    generador_derivados.programar([evidencia])
+        finally:
+            db.close()
+
+    def cerrar(self):
+        with self._lock:
+            if self._hilos is not None:
+                self._hilos.shutdown(wait=False, cancel_futures=True)
+            self._hilos = None
+
+
+consolidador_blobs = ConsolidadorBlobs()
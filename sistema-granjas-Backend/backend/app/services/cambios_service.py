@@ -0,0 +1,177 @@
+"""
+Feed de cambios para los clientes offline (/sync/changes).
+
+Cada tabla sincronizada se recorre por keyset (fecha_actualizacion, id) desde la posición
+guardada en el cursor, con el mismo alcance por rol que su listado. Las eliminaciones
+físicas salen de sync_eliminaciones y los lotes con estado "eliminado" se informan como
+eliminados.
+
+Una fila que sale del alcance de un usuario (labor reasignada a otro trabajador o a otra
+recomendación) también se informa como eliminada, solo a él: sync_eliminaciones guarda
+la marca con su usuario_id (ver los listeners en app/db/models.py). Si cuando se arma el
+feed la vuelve a ver, la marca se descarta. Los cambios que mueven muchas filas sin
+tocarlas (el docente de una recomendación, los programas de un usuario) marcan el
+alcance entero y la siguiente respuesta del usuario es completa.
+
+Solo se entregan filas con fecha_actualizacion <= ahora - SYNC_MARGEN_SEGUNDOS: una
+transacción que tomó su fecha antes de otra pero confirmó después no queda detrás del
+cursor, siempre que dure menos que el margen (que cubre también el desfase de relojes
+entre workers).
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.cursores import codificar_cursor, decodificar_cursor, posicion
+from app.db.models import (
+    Labor, Lote, Rol, SyncEliminacion, Usuario, TABLAS_SINCRONIZADAS, TABLA_ALCANCE, registrar_cambios_alcance,
+    usuario_programa
+)
+from app.CRUD.labores import _filtrar_labores_por_rol
+
+VERSION_CURSOR = 1
+
+# Roles que pueden sincronizar cada tabla (los mismos de su listado); None = todos
+ROLES_POR_TABLA = {
+    "labores": None,
+    "lotes": None,
+    "insumos": ["admin", "asesor", "talento_humano"],
+    "herramientas": None,
+}
+
+
+def _tablas_visibles(usuario):
+    return [
+        tabla for tabla, roles in ROLES_POR_TABLA.items()
+        if roles is None or usuario.rol.nombre in roles or usuario.rol.nombre == "admin"
+    ]
+
+
+def _aplicar_alcance(tabla: str, query, usuario):
+    if tabla == "labores":
+        return _filtrar_labores_por_rol(query, usuario)
+    return query
+
+
+def _alcance_cambiado(db: Session, usuario, desde, hasta) -> bool:
+    return db.query(SyncEliminacion.id).filter(
+        SyncEliminacion.tabla == TABLA_ALCANCE,
+        SyncEliminacion.usuario_id == usuario.id,
+        tuple_(SyncEliminacion.fecha_eliminacion, SyncEliminacion.id) > desde,
+        SyncEliminacion.fecha_eliminacion <= hasta,
+    ).first() is not None
+
+
+class CambiosService:
+
+    @staticmethod
+    def cambios(db: Session, usuario, since: Optional[str], limite: int) -> Dict:
+        """
+        Filas modificadas desde el cursor `since` (todas si no hay cursor). Si hay_mas es
+        True, el cliente debe pedir de nuevo con el cursor devuelto. Si completo es True,
+        la respuesta reemplaza la caché local (primera sincronización o cambio de rol).
+        """
+        datos = decodificar_cursor(since)
+        completo = (
+            datos.get("v") != VERSION_CURSOR
+            or datos.get("u") != usuario.id
+            or datos.get("r") != usuario.rol.nombre
+        )
+        posiciones = {} if completo else dict(datos.get("p") or {})
+        hasta = datetime.utcnow() - timedelta(seconds=settings.SYNC_MARGEN_SEGUNDOS)
+        desde = posicion(posiciones, "eliminaciones")
+        if desde and _alcance_cambiado(db, usuario, desde, hasta):
+            completo, posiciones = True, {}
+        tablas = _tablas_visibles(usuario)
+
+        cambios = {tabla: [] for tabla in tablas}
+        eliminados = {tabla: [] for tabla in tablas}
+        hay_mas = False
+
+        for tabla in tablas:
+            modelo = TABLAS_SINCRONIZADAS[tabla]
+            clave = tuple_(modelo.fecha_actualizacion, modelo.id)
+
+            query = _aplicar_alcance(tabla, db.query(*modelo.__table__.columns), usuario)
+            desde = posicion(posiciones, tabla)
+            if desde:
+                query = query.filter(clave > desde)
+            elif modelo is Lote:
+                # En la carga completa los lotes eliminados no hace falta informarlos
+                query = query.filter(Lote.estado != "eliminado")
+            filas = query.filter(modelo.fecha_actualizacion <= hasta)\
+                .order_by(modelo.fecha_actualizacion, modelo.id)\
+                .limit(limite + 1).all()
+
+            if len(filas) > limite:
+                hay_mas = True
+                filas = filas[:limite]
+            if filas:
+                posiciones[tabla] = [filas[-1].fecha_actualizacion, filas[-1].id]
+
+            for fila in filas:
+                if modelo is Lote and fila.estado == "eliminado":
+                    eliminados[tabla].append(fila.id)
+                else:
+                    cambios[tabla].append(dict(fila._mapping))
+
+        # Eliminaciones físicas. En la carga completa basta con las posteriores a este corte
+        desde = posicion(posiciones, "eliminaciones")
+        if desde is None:
+            posiciones["eliminaciones"] = [hasta, 0]
+        else:
+            marcas = db.query(SyncEliminacion).filter(
+                SyncEliminacion.tabla.in_(tablas),
+                or_(SyncEliminacion.usuario_id.is_(None), SyncEliminacion.usuario_id == usuario.id),
+                tuple_(SyncEliminacion.fecha_eliminacion, SyncEliminacion.id) > desde,
+                SyncEliminacion.fecha_eliminacion <= hasta,
+            ).order_by(SyncEliminacion.fecha_eliminacion, SyncEliminacion.id).limit(limite + 1).all()
+            if len(marcas) > limite:
+                hay_mas = True
+                marcas = marcas[:limite]
+            salidas = {}
+            for marca in marcas:
+                if marca.usuario_id is None:
+                    eliminados[marca.tabla].append(marca.registro_id)
+                else:
+                    salidas.setdefault(marca.tabla, set()).add(marca.registro_id)
+            for tabla, ids in salidas.items():
+                # Las que volvió a ver (p. ej. la labor regresó a él) ya salen o saldrán en cambios
+                modelo = TABLAS_SINCRONIZADAS[tabla]
+                visibles = {fila.id for fila in _aplicar_alcance(
+                    tabla, db.query(modelo.id), usuario
+                ).filter(modelo.id.in_(ids))}
+                eliminados[tabla].extend(sorted(ids - visibles))
+            if marcas:
+                posiciones["eliminaciones"] = [marcas[-1].fecha_eliminacion, marcas[-1].id]
+
+        return {
+            "cambios": cambios,
+            "eliminados": eliminados,
+            "cursor": codificar_cursor({
+                "v": VERSION_CURSOR, "u": usuario.id, "r": usuario.rol.nombre, "p": posiciones
+            }),
+            "hay_mas": hay_mas,
+            "completo": completo,
+            "fecha_servidor": datetime.utcnow(),
+        }
+
+    @staticmethod
+    def registrar_cambio_de_programa(db: Session, programa_id: int, usuario):
+        """
+        Al asignar o quitar un programa (sin commit): cambia qué labores ve talento_humano,
+        el propio usuario si es de ese rol, o los de ese programa si el usuario tiene labores
+        """
+        if usuario.rol.nombre == "talento_humano":
+            afectados = [usuario.id]
+        elif db.query(Labor.id).filter(Labor.trabajador_id == usuario.id).first():
+            afectados = [fila.usuario_id for fila in db.query(usuario_programa.c.usuario_id)
+                         .join(Usuario, Usuario.id == usuario_programa.c.usuario_id)
+                         .join(Rol, Rol.id == Usuario.rol_id)
+                         .filter(usuario_programa.c.programa_id == programa_id, Rol.nombre == "talento_humano")]
+        else:
+            return
+        registrar_cambios_alcance(db.connection(), afectados)
@@ -0,0 +1,169 @@
+"""
+Derivados de las evidencias de imagen: miniatura y vista previa WebP sin EXIF, guardadas
+junto al original en el bucket (<key>_miniatura.webp, <key>_vista_previa.webp).
+
+Se generan al crear la evidencia y, para las que aún no los tienen (anteriores o fallidas),
+al listarlas; mientras tanto las URLs van en None y el cliente usa el original. Pillow
+corre en un pool de procesos (spawn) para no competir por el GIL con los workers de la
+API; un pool de hilos descarga el original, espera al proceso y sube los derivados.
+"""
+import logging
+import multiprocessing
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.imagenes import generar_derivados
+from app.db.database import SessionLocal
+from app.db.models import Evidencia
+from app.services.storage_service import key_de_url_r2, descargar_r2, subir_stream_r2, url_publica_r2, eliminar_r2
+
+logger = logging.getLogger(__name__)
+
+# Segundos máximos por imagen en el pool de procesos
+TIMEOUT_GENERACION = 120
+
+
+def _tamanos():
+    return {
+        "miniatura": (settings.EVIDENCIA_MINIATURA_PX, 70),
+        "vista_previa": (settings.EVIDENCIA_VISTA_PREVIA_PX, 80),
+    }
+
+
+def _key_derivado(key: str, nombre: str) -> str:
+    base, punto, extension = key.rpartition(".")
+    if not punto or "/" in extension:
+        base = key
+    return f"{base}_{nombre}.webp"
+
+
+def keys_derivados(key: str) -> list:
+    return [_key_derivado(key, nombre) for nombre in _tamanos()]
+
+
+def _campo(evidencia, nombre):
+    # Acepta modelos Evidencia o los diccionarios de las respuestas de labores
+    return evidencia.get(nombre) if isinstance(evidencia, dict) else getattr(evidencia, nombre, None)
+
+
+def pendiente_de_derivados(evidencia) -> bool:
+    return _campo(evidencia, "tipo") == "imagen" and not (
+        _campo(evidencia, "url_miniatura") and _campo(evidencia, "url_vista_previa")
+    )
+
+
+class GeneradorDerivados:
+    """Cola de generación de derivados con deduplicación por evidencia dentro del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procesos: Optional[ProcessPoolExecutor] = None
+        self._hilos: Optional[ThreadPoolExecutor] = None
+        self._en_curso = set()
+        # Originales que Pillow no pudo abrir: no se reintentan hasta reiniciar
+        self._fallidas = set()
+
+    def _pools(self):
+        with self._lock:
+            workers = max(1, settings.EVIDENCIA_DERIVADOS_WORKERS)
+            if self._procesos is None:
+                # spawn: hacer fork de un proceso con hilos (uvicorn, pools) puede bloquearse
+                self._procesos = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            if self._hilos is None:
+                self._hilos = ThreadPoolExecutor(workers, thread_name_prefix="derivados")
+            return self._procesos, self._hilos
+
+    def programar(self, evidencias: Iterable) -> int:
+        """Encolar las evidencias de imagen sin derivados; devuelve cuántas se encolaron"""
+        ids = [_campo(e, "id") for e in evidencias if pendiente_de_derivados(e)]
+        with self._lock:
+            ids = [i for i in ids if i not in self._en_curso and i not in self._fallidas]
+            self._en_curso.update(ids)
+        if not ids:
+            return 0
+        _, hilos = self._pools()
+        for evidencia_id in ids:
+            hilos.submit(self._generar_en_cola, evidencia_id)
+        return len(ids)
+
+    def _generar_en_cola(self, evidencia_id: int):
+        try:
+            self.generar(evidencia_id)
+        except Exception as e:
+            logger.error(f"Error generando derivados de la evidencia {evidencia_id}: {e}")
+        finally:
+            with self._lock:
+                self._en_curso.discard(evidencia_id)
+
+    def generar(self, evidencia_id: int) -> bool:
+        """Generar y subir los derivados de una evidencia (bloqueante). False si no aplica"""
+        db = SessionLocal()
+        try:
+            evidencia = db.query(Evidencia).filter(Evidencia.id == evidencia_id).first()
+            if not evidencia or not pendiente_de_derivados(evidencia):
+                return False
+            key = key_de_url_r2(evidencia.url_archivo)
+            if not key:
+                logger.info(f"Evidencia {evidencia_id}: el original no está en el bucket, sin derivados")
+                return False
+
+            contenido = descargar_r2(key)
+            procesos, _ = self._pools()
+            try:
+                derivados = procesos.submit(generar_derivados, contenido, _tamanos()).result(TIMEOUT_GENERACION)
+            except BrokenProcessPool:
+                # Un proceso hijo murió (p. ej. sin memoria): se recrea el pool en el próximo uso
+                with self._lock:
+                    if self._procesos is procesos:
+                        self._procesos = None
+                raise
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                # Pillow no reconoce el archivo, está dañado o es desproporcionado
+                with self._lock:
+                    self._fallidas.add(evidencia_id)
+                logger.warning(f"Evidencia {evidencia_id}: no se pudo procesar la imagen ({e})")
+                return False
+            finally:
+                del contenido
+
+            urls = {}
+            for nombre, datos in derivados.items():
+                key_derivado = _key_derivado(key, nombre)
+                subir_stream_r2(BytesIO(datos), key_derivado, "image/webp")
+                urls[f"url_{nombre}"] = url_publica_r2(key_derivado)
+
+            # Si mientras tanto la evidencia pasó a otro original (consolidación de un
+            # contenido repetido), estos derivados ya no son de nadie
+            actualizadas = db.query(Evidencia).filter(
+                Evidencia.id == evidencia_id, Evidencia.url_archivo == evidencia.url_archivo
+            ).update(urls, synchronize_session=False)
+            db.commit()
+            if not actualizadas:
+                en_uso = db.query(Evidencia.id).filter(Evidencia.url_miniatura == urls["url_miniatura"]).first()
+                if not en_uso:
+                    for key_derivado in keys_derivados(key):
+                        eliminar_r2(key_derivado)
+                return False
+            logger.info(
+                f"Evidencia {evidencia_id}: derivados generados "
+                f"({', '.join(f'{n} {len(d) // 1024} KB' for n, d in derivados.items())})"
+            )
+            return True
+        finally:
+            db.close()
+
+    def cerrar(self):
+        with self._lock:
+            for pool in (self._hilos, self._procesos):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._hilos = self._procesos = None
+
+
+generador_derivados = GeneradorDerivados()
@@ -0,0 +1,301 @@
+"""
+Subida de evidencias directa al bucket R2: los bytes no pasan por la API.
+
+1. POST /evidencias/subidas valida entidad, tipo y tamaño declarados y devuelve una URL
+   prefirmada para un PUT (archivos de hasta una parte) o una URL por parte (multipart).
+   Queda registrada una EvidenciaPendiente con la key asignada.
+2. El cliente sube el archivo directamente a R2 con esas URLs.
+3. POST /evidencias/subidas/{id}/completar cierra el multipart si aplica, verifica con un
+   HEAD que el objeto tenga el tamaño y el content type declarados y crea la Evidencia con
+   crear_evidencia_crud. Si el PUT se firmó con el sha256 declarado, el HEAD trae el hash
+   que verificó R2 y el objeto pasa a su key por contenido en el momento; si no, queda en
+   la key temporal y se consolida en segundo plano (ver app/services/blob_service.py).
+   En ningún caso la API lee los bytes del archivo.
+
+Si el cliente declara el sha256 y ese contenido ya está guardado, la subida es "existente":
+no se firma ninguna URL y completar solo crea la evidencia. Conocer el sha256 de un archivo
+equivale en la práctica a tenerlo, por eso basta para reutilizarlo.
+
+Las subidas que nunca se completan dejan la fila pendiente y, en multipart, partes en R2:
+conviene una regla de ciclo de vida del bucket que aborte multiparts incompletos.
+"""
+import math
+import logging
+from uuid import uuid4
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import EvidenciaPendiente, Evidencia, Blob
+from app.schemas.evidencia_schema import EvidenciaCreate, SubidaEvidenciaCreate, ParteCompletada
+from app.CRUD.evidencias import crear_evidencia_crud, _obtener_entidad, _cargar_relaciones_evidencia
+from app.services.blob_service import BlobService, consolidador_blobs
+from app.services.storage_service import (
+    _tamano_parte, url_subida_r2, iniciar_multipart_r2, urls_partes_r2,
+    completar_multipart_r2, abortar_multipart_r2, metadatos_r2, eliminar_r2,
+    sha256_base64, url_publica_r2
+)
+
+logger = logging.getLogger(__name__)
+
+# Prefijos de content type aceptados por tipo de evidencia; None = cualquiera
+TIPOS_CONTENIDO = {
+    "imagen": ("image/",),
+    "video": ("video/",),
+    "audio": ("audio/",),
+    "documento": ("application/pdf", "application/msword", "application/vnd.", "text/"),
+    "otro": None,
+}
+
+
+def _obtener_subida(db: Session, subida_id: int, usuario) -> EvidenciaPendiente:
+    pendiente = db.query(EvidenciaPendiente).filter(EvidenciaPendiente.id == subida_id).first()
+    if not pendiente:
+        raise HTTPException(404, "Subida no encontrada")
+    if pendiente.usuario_id != usuario.id and usuario.rol.nombre != "admin":
+        raise HTTPException(403, "Solo quien inició la subida puede completarla o cancelarla")
+    return pendiente
+
+
+def _liberar(db: Session, pendiente: EvidenciaPendiente, estado: str = "pendiente"):
+    pendiente.estado = estado
+    db.commit()
+
+
+def _toma_vencida():
+    """Condición de una subida "completando" cuyo worker ya no la va a terminar"""
+    limite = datetime.utcnow() - timedelta(seconds=settings.EVIDENCIA_COMPLETAR_TIMEOUT_SEGUNDOS)
+    return and_(
+        EvidenciaPendiente.estado == "completando",
+        or_(EvidenciaPendiente.fecha_toma.is_(None), EvidenciaPendiente.fecha_toma < limite)
+    )
+
+
+def _disponible(db: Session, pendiente: EvidenciaPendiente) -> bool:
+    """Pendiente, o "completando" con la toma vencida"""
+    return pendiente.estado == "pendiente" or db.query(EvidenciaPendiente.id).filter(
+        EvidenciaPendiente.id == pendiente.id, _toma_vencida()
+    ).first() is not None
+
+
+def _descartar_objeto(pendiente: EvidenciaPendiente):
+    try:
+        if pendiente.upload_id:
+            abortar_multipart_r2(pendiente.key, pendiente.upload_id)
+        eliminar_r2(pendiente.key)
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(f"No se pudo eliminar {pendiente.key} de R2: {e}")
+
+
+class SubidaEvidenciaService:
+
+    @staticmethod
+    def iniciar(db: Session, data: SubidaEvidenciaCreate, usuario) -> dict:
+        """Registrar la subida pendiente y firmar las URLs para el cliente"""
+        permitidos = TIPOS_CONTENIDO[data.tipo.value]
+        if permitidos and not data.content_type.startswith(permitidos):
+            raise HTTPException(400, f"Un archivo {data.content_type} no es válido para una evidencia de tipo {data.tipo.value}")
+        if data.tamano > settings.EVIDENCIA_TAMANO_MAXIMO_MB * 1024 * 1024:
+            raise HTTPException(413, f"El archivo supera el máximo de {settings.EVIDENCIA_TAMANO_MAXIMO_MB} MB")
+        _obtener_entidad(db, data.tipo_entidad.value, data.entidad_id)
+
+        extension = Path(data.nombre_archivo).suffix.lower()[:10]
+        key = f"evidencias/{data.tipo_entidad.value}/{data.entidad_id}/{uuid4().hex}{extension}"
+        segundos = settings.R2_URL_FIRMADA_MINUTOS * 60
+        tamano_parte = _tamano_parte()
+        upload_id, url, partes = None, None, []
+
+        blob = BlobService.por_sha256(db, data.sha256) if data.sha256 else None
+        if blob and (blob.tamano != data.tamano or blob.content_type != data.content_type):
+            blob = None
+
+        try:
+            if blob:
+                logger.info(f"Subida {key}: el contenido ya está en {blob.key}, no se firma ninguna URL")
+            elif data.tamano <= tamano_parte:
+                # Con sha256 declarado, R2 verifica el hash al recibir el archivo
+                url = url_subida_r2(key, data.content_type, segundos, sha256=data.sha256)
+            else:
+                upload_id = iniciar_multipart_r2(key, data.content_type)
+                urls = urls_partes_r2(key, upload_id, math.ceil(data.tamano / tamano_parte), segundos)
+                partes = [{"numero": numero, "url": url_parte} for numero, url_parte in enumerate(urls, start=1)]
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Error preparando la subida de {key}: {e}")
+            raise HTTPException(502, "No se pudo preparar la subida en el almacenamiento")
+
+        pendiente = EvidenciaPendiente(
+            key=key,
+            upload_id=upload_id,
+            tipo=data.tipo.value,
+            descripcion=data.descripcion,
+            tipo_entidad=data.tipo_entidad.value,
+            entidad_id=data.entidad_id,
+            content_type=data.content_type,
+            tamano=data.tamano,
+            blob_id=blob.id if blob else None,
+            sha256=data.sha256,
+            usuario_id=usuario.id,
+            fecha_expiracion=datetime.utcnow() + timedelta(seconds=segundos),
+        )
+        db.add(pendiente)
+        db.commit()
+        db.refresh(pendiente)
+
+        return {
+            "id": pendiente.id,
+            "key": key,
+            "metodo": "existente" if blob else "multipart" if upload_id else "put",
+            "url": url,
+            "partes": partes,
+            "tamano_parte": tamano_parte if upload_id else None,
+            "content_type": data.content_type,
+            "checksum_sha256": sha256_base64(data.sha256) if url and data.sha256 else None,
+            "fecha_expiracion": pendiente.fecha_expiracion,
+        }
+
+    @staticmethod
+    def completar(db: Session, subida_id: int, partes: List[ParteCompletada], usuario) -> Evidencia:
+        """
+        Verificar el objeto subido y crear la Evidencia. Repetir la llamada sobre una subida
+        ya completada devuelve la misma evidencia.
+        """
+        pendiente = _obtener_subida(db, subida_id, usuario)
+
+        if pendiente.estado == "completada" and pendiente.evidencia_id:
+            evidencia = db.query(Evidencia).filter(Evidencia.id == pendiente.evidencia_id).first()
+            if evidencia:
+                _cargar_relaciones_evidencia(db, evidencia)
+                return evidencia
+        if not _disponible(db, pendiente):
+            if pendiente.estado == "completando":
+                raise HTTPException(409, "La subida ya se está completando")
+            raise HTTPException(409, f"La subida está en estado {pendiente.estado}")
+        if pendiente.fecha_expiracion < datetime.utcnow():
+            raise HTTPException(410, "La subida expiró; inicie una nueva")
+
+        # Tomar la subida: si llegan dos completaciones a la vez, solo una avanza
+        tomada = db.query(EvidenciaPendiente).filter(
+            EvidenciaPendiente.id == pendiente.id,
+            or_(EvidenciaPendiente.estado == "pendiente", _toma_vencida())
+        ).update({"estado": "completando", "fecha_toma": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        if not tomada:
+            raise HTTPException(409, "La subida ya se está completando")
+
+        try:
+            return SubidaEvidenciaService._completar_tomada(db, pendiente, partes, usuario)
+        except Exception:
+            # Cualquier fallo que no la cerró (p. ej. un error de la base de datos) la devuelve
+            # a pendiente, para reintentar o cancelar
+            try:
+                db.rollback()
+                if pendiente.estado == "completando":
+                    _liberar(db, pendiente)
+            except Exception as e:
+                logger.error(f"No se pudo liberar la subida {pendiente.id}: {e}")
+            raise
+
+    @staticmethod
+    def _completar_tomada(db: Session, pendiente: EvidenciaPendiente, partes: List[ParteCompletada], usuario) -> Evidencia:
+        if pendiente.blob_id:
+            return SubidaEvidenciaService._crear_evidencia(db, pendiente, db.get(Blob, pendiente.blob_id), usuario)
+
+        try:
+            if pendiente.upload_id:
+                if not partes:
+                    raise HTTPException(400, "Faltan las partes (número y ETag) de la subida multipart")
+                completar_multipart_r2(
+                    pendiente.key, pendiente.upload_id,
+                    [{"PartNumber": parte.numero, "ETag": parte.etag} for parte in partes]
+                )
+            metadatos = metadatos_r2(pendiente.key)
+        except HTTPException:
+            _liberar(db, pendiente)
+            raise
+        except ClientError as e:
+            _liberar(db, pendiente)
+            raise HTTPException(400, f"No se pudo completar la subida: {e.response.get('Error', {}).get('Message', e)}")
+        except BotoCoreError as e:
+            _liberar(db, pendiente)
+            logger.error(f"Error verificando {pendiente.key} en R2: {e}")
+            raise HTTPException(502, "No se pudo verificar el archivo en el almacenamiento")
+
+        if metadatos is None:
+            _liberar(db, pendiente)
+            raise HTTPException(400, "El archivo todavía no está en el almacenamiento")
+
+        tamano, content_type, sha256 = metadatos
+        errores = []
+        if tamano != pendiente.tamano:
+            errores.append(f"tamaño {tamano} bytes en lugar de {pendiente.tamano}")
+        if (content_type or "").lower() != pendiente.content_type:
+            errores.append(f"tipo {content_type} en lugar de {pendiente.content_type}")
+        if sha256 and pendiente.sha256 and sha256 != pendiente.sha256:
+            errores.append("sha256 distinto del declarado")
+        if errores:
+            _descartar_objeto(pendiente)
+            _liberar(db, pendiente, "rechazada")
+            raise HTTPException(400, f"El archivo subido no coincide con lo declarado: {', '.join(errores)}")
+
+        if not sha256:
+            # Sin hash verificado por R2: la evidencia usa la key temporal y el contenido se
+            # consolida en segundo plano
+            evidencia = SubidaEvidenciaService._crear_evidencia(db, pendiente, None, usuario)
+            consolidador_blobs.programar(pendiente.id)
+            return evidencia
+
+        try:
+            # Desde aquí el objeto vive en su key por contenido; la temporal ya no existe
+            blob, duplicado = BlobService.consolidar_r2(db, pendiente.key, pendiente.content_type, sha256, tamano)
+        except (BotoCoreError, ClientError) as e:
+            _liberar(db, pendiente)
+            logger.error(f"Error consolidando {pendiente.key} en R2: {e}")
+            raise HTTPException(502, "No se pudo guardar el archivo en el almacenamiento")
+        if duplicado:
+            logger.info(f"Subida {pendiente.id}: contenido repetido, se reutiliza {blob.key}")
+        return SubidaEvidenciaService._crear_evidencia(db, pendiente, blob, usuario)
+
+    @staticmethod
+    def _crear_evidencia(db: Session, pendiente: EvidenciaPendiente, blob: Optional[Blob], usuario) -> Evidencia:
+        """Crear la evidencia con el blob o, si es None, con la key temporal aún sin consolidar"""
+        datos = EvidenciaCreate(
+            tipo=pendiente.tipo,
+            descripcion=pendiente.descripcion,
+            url_archivo=BlobService.url(blob) if blob else url_publica_r2(pendiente.key),
+            tipo_entidad=pendiente.tipo_entidad,
+            entidad_id=pendiente.entidad_id,
+            usuario_id=pendiente.usuario_id,
+        )
+        # Se confirma junto con la evidencia (crear_evidencia_crud hace commit)
+        pendiente.estado = "completada"
+        pendiente.blob_id = blob.id if blob else None
+        try:
+            evidencia = crear_evidencia_crud(db, datos, usuario)
+        except HTTPException:
+            # La entidad se eliminó mientras se subía el archivo
+            db.rollback()
+            _liberar(db, pendiente, "rechazada")
+            if blob:
+                BlobService.liberar(db, blob.id)
+            else:
+                _descartar_objeto(pendiente)
+            raise
+
+        pendiente.evidencia_id = evidencia.id
+        db.commit()
+        return evidencia
+
+    @staticmethod
+    def cancelar(db: Session, subida_id: int, usuario) -> dict:
+        pendiente = _obtener_subida(db, subida_id, usuario)
+        if not _disponible(db, pendiente):
+            raise HTTPException(409, f"La subida está en estado {pendiente.estado}")
+        _descartar_objeto(pendiente)
+        _liberar(db, pendiente, "cancelada")
+        return {"message": "✅ Subida cancelada"}
@@ -1,5 +1,9 @@
+import os
+import hashlib
+import tempfile
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 
 class FileService:
@@ -9,12 +13,34 @@ class FileService:
         if not file.filename:
             raise HTTPException(status_code=400, detail="Archivo inválido")
 
-        file_path = Path(settings.UPLOAD_DIR) / file.filename
+        return await run_in_threadpool(FileService._guardar_por_contenido, file.file, file.filename)
 
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
+    @staticmethod
+    def _guardar_por_contenido(origen, filename: str) -> str:
+        """
+        Copiar por bloques a un temporal calculando el sha256 y dejarlo como <sha256><ext>.
+        Un archivo repetido no ocupa más espacio y dos archivos con el mismo nombre no se pisan.
+        """
+        directorio = Path(settings.UPLOAD_DIR)
+        digest = hashlib.sha256()
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix=".part")
+        try:
+            with os.fdopen(descriptor, "wb") as buffer:
+                for bloque in iter(lambda: origen.read(1024 * 1024), b""):
+                    digest.update(bloque)
+                    buffer.write(bloque)
 
-        return file.filename
+            nombre = f"{digest.hexdigest()}{Path(filename).suffix.lower()[:10]}"
+            destino = directorio / nombre
+            if destino.exists():
+                os.remove(temporal)
+            else:
+                os.replace(temporal, destino)
+            return nombre
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
 
     @staticmethod
     def get_file_path(filename: str) -> Path:
@@ -0,0 +1,442 @@
+"""
+Ledger de inventario: snapshots diarios por herramienta/insumo, saldos en una fecha,
+consumos mensuales y conciliación de cantidad_disponible contra los movimientos.
+
+Convención de fechas: un snapshot con fecha_corte C (medianoche UTC) refleja todos los
+movimientos con fecha_movimiento < C. El delta entre dos instantes A <= B son los
+movimientos con A <= fecha_movimiento < B.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, case, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import (
+    Herramienta, Insumo, MovimientoHerramienta, MovimientoInsumo, SnapshotInventario
+)
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (modelo del recurso, modelo de movimientos, columna del recurso en el movimiento)
+RECURSOS = {
+    "herramienta": (Herramienta, MovimientoHerramienta, MovimientoHerramienta.herramienta_id),
+    "insumo": (Insumo, MovimientoInsumo, MovimientoInsumo.insumo_id),
+}
+
+TOLERANCIA = 1e-6
+TAMANO_LOTE_INSERCION = 1000
+
+
+def _inicio_dia(fecha: datetime) -> datetime:
+    return datetime(fecha.year, fecha.month, fecha.day)
+
+
+def _a_fecha(valor) -> date:
+    # func.date() devuelve date en Postgres y texto 'YYYY-MM-DD' en SQLite
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+def _sumas(movimiento):
+    """SUM de salidas y de entradas de un modelo de movimientos"""
+    salidas = func.coalesce(func.sum(case(
+        (movimiento.tipo_movimiento == "salida", movimiento.cantidad), else_=0
+    )), 0)
+    entradas = func.coalesce(func.sum(case(
+        (movimiento.tipo_movimiento == "entrada", movimiento.cantidad), else_=0
+    )), 0)
+    return salidas, entradas
+
+
+def _recurso(tipo: str):
+    if tipo not in RECURSOS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tipo de recurso inválido: {tipo}")
+    return RECURSOS[tipo]
+
+
+def _ultimos_snapshots(db: Session, tipo: str, hasta: Optional[datetime] = None, recursos: Optional[List[int]] = None):
+    """Subconsulta con el último snapshot (fecha_corte <= hasta) de cada recurso"""
+    query = db.query(
+        SnapshotInventario.recurso_id.label("recurso_id"),
+        func.max(SnapshotInventario.fecha_corte).label("fecha_corte")
+    ).filter(SnapshotInventario.tipo_recurso == tipo)
+    if hasta is not None:
+        query = query.filter(SnapshotInventario.fecha_corte <= hasta)
+    if recursos is not None:
+        query = query.filter(SnapshotInventario.recurso_id.in_(recursos))
+    return query.group_by(SnapshotInventario.recurso_id).subquery()
+
+
+class InventarioService:
+
+    # ==================== SNAPSHOTS ====================
+
+    @classmethod
+    def generar_snapshots(cls, db: Session, hasta: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Generar los snapshots diarios pendientes hasta el corte de hoy (o de `hasta`),
+        rellenando los días que falten desde el último corte. Es idempotente: si otro
+        proceso ya generó el mismo corte, la restricción única lo evita.
+        """
+        corte_final = _inicio_dia(hasta or datetime.utcnow())
+        return {tipo: cls._generar_tipo(db, tipo, corte_final) for tipo in RECURSOS}
+
+    @staticmethod
+    def _generar_tipo(db: Session, tipo: str, corte_final: datetime) -> int:
+        modelo, movimiento, columna = RECURSOS[tipo]
+
+        actuales = dict(db.query(modelo.id, modelo.cantidad_disponible).all())
+        if not actuales:
+            return 0
+
+        ultimos = _ultimos_snapshots(db, tipo)
+        previos = {
+            snapshot.recurso_id: snapshot
+            for snapshot in db.query(SnapshotInventario).join(ultimos, and_(
+                SnapshotInventario.recurso_id == ultimos.c.recurso_id,
+                SnapshotInventario.fecha_corte == ultimos.c.fecha_corte,
+            )).filter(SnapshotInventario.tipo_recurso == tipo).all()
+        }
+        # Salidas y entradas por recurso y día: desde el último snapshot de cada recurso,
+        # o toda la historia para los recursos que aún no tienen snapshot
+        sin_snapshot = [recurso_id for recurso_id in actuales if recurso_id not in previos]
+        ventana = min((previos[recurso_id].fecha_corte for recurso_id in actuales if recurso_id in previos), default=None)
+        salidas, entradas = _sumas(movimiento)
+        dia = func.date(movimiento.fecha_movimiento)
+        query = db.query(columna, dia, salidas, entradas).filter(columna.in_(list(actuales)))
+        if ventana and sin_snapshot:
+            query = query.filter(or_(movimiento.fecha_movimiento >= ventana, columna.in_(sin_snapshot)))
+        elif ventana:
+            query = query.filter(movimiento.fecha_movimiento >= ventana)
+        por_dia = defaultdict(dict)
+        for recurso_id, fecha, total_salidas, total_entradas in query.group_by(columna, dia).all():
+            por_dia[recurso_id][_a_fecha(fecha)] = (float(total_salidas), float(total_entradas))
+
+        # Primer corte pendiente de cada recurso: el día siguiente a su último snapshot, o al de
+        # su primer movimiento (hoy si no tiene movimientos)
+        primeros = {}
+        for recurso_id in actuales:
+            if recurso_id in previos:
+                primero = previos[recurso_id].fecha_corte + timedelta(days=1)
+            elif por_dia.get(recurso_id):
+                primero = min(datetime.combine(min(por_dia[recurso_id]), datetime.min.time()) + timedelta(days=1), corte_final)
+            else:
+                primero = corte_final
+            if primero <= corte_final:
+                primeros[recurso_id] = primero
+        if not primeros:
+            return 0
+
+        filas = []
+        for recurso_id, primer_corte in primeros.items():
+            cortes = [primer_corte + timedelta(days=i) for i in range((corte_final - primer_corte).days + 1)]
+            dias = por_dia.get(recurso_id, {})
+            neto = lambda d: dias.get(d, (0.0, 0.0))[1] - dias.get(d, (0.0, 0.0))[0]
+
+            # Cantidad en cada corte: hacia atrás desde la disponibilidad actual
+            cantidad = float(actuales[recurso_id] or 0) - sum(neto(d) for d in dias if d >= corte_final.date())
+            cantidades = {}
+            for corte in reversed(cortes):
+                cantidades[corte] = cantidad
+                cantidad -= neto((corte - timedelta(days=1)).date())
+
+            # Acumulados: hacia adelante desde el snapshot previo (o desde el primer movimiento)
+            previo = previos.get(recurso_id)
+            if previo:
+                acumulado_salidas, acumulado_entradas = previo.salidas_acumuladas, previo.entradas_acumuladas
+                dia_actual = previo.fecha_corte.date()
+            else:
+                acumulado_salidas = acumulado_entradas = 0.0
+                dia_actual = min(dias, default=cortes[0].date())
+            for indice, corte in enumerate(cortes):
+                while dia_actual < corte.date():
+                    dia_salidas, dia_entradas = dias.get(dia_actual, (0.0, 0.0))
+                    acumulado_salidas += dia_salidas
+                    acumulado_entradas += dia_entradas
+                    dia_actual += timedelta(days=1)
+
+                # Lo que cambió fuera de movimientos desde el snapshot previo se registra en el primer corte nuevo
+                ajuste = 0.0
+                if indice == 0 and previo:
+                    esperado = previo.cantidad + neto(previo.fecha_corte.date())
+                    ajuste = cantidades[corte] - esperado
+                filas.append({
+                    "tipo_recurso": tipo,
+                    "recurso_id": recurso_id,
+                    "fecha_corte": corte,
+                    "cantidad": cantidades[corte],
+                    "salidas_acumuladas": acumulado_salidas,
+                    "entradas_acumuladas": acumulado_entradas,
+                    "ajuste": ajuste if abs(ajuste) > TOLERANCIA else 0.0,
+                    "fecha_creacion": datetime.utcnow(),
+                })
+
+        try:
+            for inicio in range(0, len(filas), TAMANO_LOTE_INSERCION):
+                db.execute(insert(SnapshotInventario), filas[inicio:inicio + TAMANO_LOTE_INSERCION])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            logger.info(f"Snapshots de {tipo} hasta {corte_final:%Y-%m-%d} ya generados por otro proceso")
+            return 0
+
+        logger.info(f"Snapshots de {tipo}: {len(filas)} filas para {len(primeros)} recursos")
+        return len(filas)
+
+    # ==================== CONSULTAS ====================
+
+    @staticmethod
+    def saldo_en(db: Session, tipo: str, recurso_id: int, fecha: datetime) -> Dict:
+        """
+        Disponibilidad de un recurso en una fecha: se parte del punto conocido más cercano
+        (snapshot anterior, snapshot posterior o el valor actual) y se aplican los movimientos
+        entre ese punto y la fecha pedida.
+        """
+        modelo, movimiento, columna = _recurso(tipo)
+        actual = db.query(modelo.cantidad_disponible).filter(modelo.id == recurso_id).scalar()
+        if actual is None and not db.query(modelo.id).filter(modelo.id == recurso_id).first():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{tipo.capitalize()} no encontrado")
+
+        base = SnapshotInventario.tipo_recurso == tipo, SnapshotInventario.recurso_id == recurso_id
+        anterior = db.query(SnapshotInventario).filter(*base, SnapshotInventario.fecha_corte <= fecha)\
+            .order_by(SnapshotInventario.fecha_corte.desc()).first()
+        siguiente = db.query(SnapshotInventario).filter(*base, SnapshotInventario.fecha_corte > fecha)\
+            .order_by(SnapshotInventario.fecha_corte).first()
+
+        candidatos = [("actual", datetime.utcnow(), float(actual or 0))]
+        candidatos += [("snapshot", s.fecha_corte, s.cantidad) for s in (anterior, siguiente) if s]
+        origen, fecha_base, cantidad_base = min(candidatos, key=lambda c: abs((c[1] - fecha).total_seconds()))
+
+        desde, hasta = sorted((fecha_base, fecha))
+        salidas, entradas = _sumas(movimiento)
+        total_salidas, total_entradas, cantidad_movimientos = db.query(salidas, entradas, func.count(movimiento.id)).filter(
+            columna == recurso_id,
+            movimiento.fecha_movimiento >= desde,
+            movimiento.fecha_movimiento < hasta,
+        ).one()
+        delta = float(total_entradas) - float(total_salidas)
+
+        return {
+            "tipo_recurso": tipo,
+            "recurso_id": recurso_id,
+            "fecha": fecha,
+            "cantidad": cantidad_base + delta if fecha_base <= fecha else cantidad_base - delta,
+            "origen": origen,
+            "fecha_base": fecha_base,
+            "cantidad_base": cantidad_base,
+            "movimientos_aplicados": cantidad_movimientos,
+        }
+
+    @staticmethod
+    def acumulados_en(db: Session, tipo: str, fecha: datetime, recursos: Optional[List[int]] = None) -> Dict[int, Tuple[float, float]]:
+        """Salidas y entradas acumuladas de cada recurso antes de `fecha`"""
+        modelo, movimiento, columna = _recurso(tipo)
+        ultimos = _ultimos_snapshots(db, tipo, hasta=fecha, recursos=recursos)
+
+        resultado = {
+            recurso: (snapshot_salidas, snapshot_entradas)
+            for recurso, snapshot_salidas, snapshot_entradas in db.query(
+                SnapshotInventario.recurso_id, SnapshotInventario.salidas_acumuladas, SnapshotInventario.entradas_acumuladas
+            ).join(ultimos, and_(
+                SnapshotInventario.recurso_id == ultimos.c.recurso_id,
+                SnapshotInventario.fecha_corte == ultimos.c.fecha_corte,
+            )).filter(SnapshotInventario.tipo_recurso == tipo).all()
+        }
+
+        # Movimientos entre el snapshot de cada recurso y la fecha (usa el índice recurso + fecha)
+        salidas, entradas = _sumas(movimiento)
+        deltas = db.query(columna, salidas, entradas)\
+            .join(ultimos, ultimos.c.recurso_id == columna)\
+            .filter(movimiento.fecha_movimiento >= ultimos.c.fecha_corte, movimiento.fecha_movimiento < fecha)\
+            .group_by(columna).all()
+
+        # Recursos sin snapshot anterior a la fecha: todos sus movimientos previos
+        if recursos is None:
+            recursos = [recurso for (recurso,) in db.query(modelo.id).all()]
+        sin_snapshot = [recurso for recurso in recursos if recurso not in resultado]
+        if sin_snapshot:
+            deltas += db.query(columna, salidas, entradas).filter(
+                columna.in_(sin_snapshot), movimiento.fecha_movimiento < fecha
+            ).group_by(columna).all()
+
+        for recurso, delta_salidas, delta_entradas in deltas:
+            base_salidas, base_entradas = resultado.get(recurso, (0.0, 0.0))
+            resultado[recurso] = (base_salidas + float(delta_salidas), base_entradas + float(delta_entradas))
+        return resultado
+
+    @classmethod
+    def consumo_mensual(cls, db: Session, tipo: str, desde: date, hasta: date, recurso_id: Optional[int] = None) -> Dict:
+        """
+        Salidas, entradas y consumo neto por recurso y mes, como diferencia de acumulados
+        en los inicios de mes. Los límites con snapshot exacto no consultan movimientos.
+        """
+        modelo, _, _ = _recurso(tipo)
+        if (hasta.year, hasta.month) < (desde.year, desde.month):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El mes final es anterior al inicial")
+
+        # Inicios de mes desde `desde` hasta el mes siguiente a `hasta` (límite superior del último mes)
+        limites = []
+        anio, mes = desde.year, desde.month
+        while (anio, mes) <= (hasta.year, hasta.month):
+            limites.append(datetime(anio, mes, 1))
+            anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        limites.append(datetime(anio, mes, 1))
+        ahora = datetime.utcnow()
+
+        recursos_query = db.query(modelo.id, modelo.nombre)
+        if recurso_id is not None:
+            recursos_query = recursos_query.filter(modelo.id == recurso_id)
+        nombres = dict(recursos_query.all())
+
+        exactos = defaultdict(dict)
+        snapshots = db.query(
+            SnapshotInventario.fecha_corte, SnapshotInventario.recurso_id,
+            SnapshotInventario.salidas_acumuladas, SnapshotInventario.entradas_acumuladas
+        ).filter(
+            SnapshotInventario.tipo_recurso == tipo,
+            SnapshotInventario.fecha_corte.in_([limite for limite in limites if limite <= ahora])
+        )
+        if recurso_id is not None:
+            snapshots = snapshots.filter(SnapshotInventario.recurso_id == recurso_id)
+        for corte, recurso, acumulado_salidas, acumulado_entradas in snapshots.all():
+            exactos[corte][recurso] = (acumulado_salidas, acumulado_entradas)
+
+        acumulados = {}
+        for limite in limites:
+            # Solo los recursos sin snapshot exacto en el límite se calculan desde movimientos
+            acumulados[limite] = dict(exactos.get(limite, {}))
+            faltantes = [recurso for recurso in nombres if recurso not in acumulados[limite]]
+            if faltantes:
+                acumulados[limite].update(cls.acumulados_en(db, tipo, min(limite, ahora), faltantes))
+
+        items = []
+        for recurso, nombre in nombres.items():
+            meses = []
+            for inicio, fin in zip(limites, limites[1:]):
+                salidas_inicio, entradas_inicio = acumulados[inicio].get(recurso, (0.0, 0.0))
+                salidas_fin, entradas_fin = acumulados[fin].get(recurso, (0.0, 0.0))
+                salidas, entradas = salidas_fin - salidas_inicio, entradas_fin - entradas_inicio
+                meses.append({
+                    "mes": inicio.strftime("%Y-%m"),
+                    "salidas": salidas,
+                    "entradas": entradas,
+                    "consumo_neto": salidas - entradas,
+                })
+            items.append({"recurso_id": recurso, "nombre": nombre, "meses": meses})
+
+        return {"tipo_recurso": tipo, "desde": limites[0].strftime("%Y-%m"), "hasta": limites[-2].strftime("%Y-%m"), "items": items}
+
+    # ==================== CONCILIACIÓN ====================
+
+    @staticmethod
+    def conciliar(db: Session, tipo: Optional[str] = None) -> Dict:
+        """
+        Comparar cantidad_disponible con lo que predice el ledger (último snapshot más los
+        movimientos posteriores). Una diferencia indica cambios hechos fuera de movimientos.
+        """
+        diferencias: List[Dict] = []
+        revisados = sin_snapshot = 0
+        for tipo_recurso in ([tipo] if tipo else list(RECURSOS)):
+            modelo, movimiento, columna = _recurso(tipo_recurso)
+            ultimos = _ultimos_snapshots(db, tipo_recurso)
+
+            snapshots = {
+                recurso: (fecha_corte, cantidad)
+                for recurso, fecha_corte, cantidad in db.query(
+                    SnapshotInventario.recurso_id, SnapshotInventario.fecha_corte, SnapshotInventario.cantidad
+                ).join(ultimos, and_(
+                    SnapshotInventario.recurso_id == ultimos.c.recurso_id,
+                    SnapshotInventario.fecha_corte == ultimos.c.fecha_corte,
+                )).filter(SnapshotInventario.tipo_recurso == tipo_recurso).all()
+            }
+
+            salidas, entradas = _sumas(movimiento)
+            deltas = {
+                recurso: float(total_entradas) - float(total_salidas)
+                for recurso, total_salidas, total_entradas in db.query(columna, salidas, entradas)
+                    .join(ultimos, ultimos.c.recurso_id == columna)
+                    .filter(movimiento.fecha_movimiento >= ultimos.c.fecha_corte)
+                    .group_by(columna).all()
+            }
+
+            for recurso, nombre, disponible in db.query(modelo.id, modelo.nombre, modelo.cantidad_disponible).all():
+                revisados += 1
+                if recurso not in snapshots:
+                    sin_snapshot += 1
+                    continue
+                fecha_corte, cantidad = snapshots[recurso]
+                esperado = cantidad + deltas.get(recurso, 0.0)
+                diferencia = float(disponible or 0) - esperado
+                if abs(diferencia) > TOLERANCIA:
+                    diferencias.append({
+                        "tipo_recurso": tipo_recurso,
+                        "recurso_id": recurso,
+                        "nombre": nombre,
+                        "cantidad_disponible": float(disponible or 0),
+                        "esperado": esperado,
+                        "diferencia": diferencia,
+                        "fecha_snapshot": fecha_corte,
+                    })
+
+        return {
+            "revisados": revisados,
+            "sin_snapshot": sin_snapshot,
+            "con_diferencia": len(diferencias),
+            "diferencias": diferencias,
+            "fecha": datetime.utcnow(),
+        }
+
+
+class ProgramadorSnapshots:
+    """Hilo que genera los snapshots pendientes y concilia cada cierto intervalo"""
+
+    def __init__(self, session_factory, intervalo_minutos: int):
+        self.session_factory = session_factory
+        self.intervalo_minutos = intervalo_minutos
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self.intervalo_minutos <= 0 or self._hilo:
+            return
+        self._hilo = threading.Thread(target=self._ciclo, name="snapshots-inventario", daemon=True)
+        self._hilo.start()
+        logger.info(f"Snapshots de inventario programados cada {self.intervalo_minutos} min")
+
+    def detener(self):
+        self._detener.set()
+
+    def ejecutar(self):
+        db = self.session_factory()
+        try:
+            generados = InventarioService.generar_snapshots(db)
+            conciliacion = InventarioService.conciliar(db)
+            if conciliacion["con_diferencia"]:
+                logger.warning(
+                    f"Conciliación de inventario: {conciliacion['con_diferencia']} recursos no coinciden con el ledger"
+                )
+            return generados, conciliacion
+        finally:
+            db.close()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                self.ejecutar()
+            except Exception as e:
+                logger.error(f"Error generando snapshots de inventario: {str(e)}")
+            self._detener.wait(self.intervalo_minutos * 60)
+
+
+def _nueva_sesion():
+    from app.db.database import SessionLocal
+    return SessionLocal()
+
+
+programador_snapshots = ProgramadorSnapshots(_nueva_sesion, settings.INVENTARIO_SNAPSHOT_REVISION_MINUTOS)
@@ -0,0 +1,156 @@
+import time
+import random
+import logging
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Herramienta, Insumo, MovimientoHerramienta, MovimientoInsumo
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATE de Postgres que indican un conflicto pasajero: serialización, deadlock, lock no disponible
+SQLSTATE_REINTENTABLES = {"40001", "40P01", "55P03"}
+
+NO_ENCONTRADO = {Herramienta: "Herramienta no encontrada", Insumo: "Insumo no encontrado"}
+
+
+def _es_reintentable(error: DBAPIError) -> bool:
+    original = error.orig
+    sqlstate = getattr(original, "pgcode", None) or getattr(original, "sqlstate", None)
+    if sqlstate in SQLSTATE_REINTENTABLES:
+        return True
+    # SQLite (desarrollo) responde "database is locked" cuando otro escritor tiene la base
+    return "database is locked" in str(original)
+
+
+class StockService:
+    """
+    Cambios de disponibilidad de herramientas e insumos.
+
+    Cada descuento es un UPDATE condicional (WHERE cantidad_disponible >= :n RETURNING),
+    así la verificación y la resta ocurren en la misma sentencia: no hay ventana entre leer
+    y escribir en la que otra petición pueda vender el mismo stock, y la fila solo queda
+    bloqueada desde el UPDATE hasta el commit. Todos los movimientos pasan por aquí.
+    """
+
+    # ==================== OPERACIONES ATÓMICAS ====================
+
+    @staticmethod
+    def intentar_descontar(db: Session, modelo, recurso_id: int, cantidad) -> Optional[float]:
+        """Descontar si alcanza; devuelve la nueva disponibilidad o None si no alcanzó o no existe"""
+        stmt = (
+            update(modelo)
+            .where(modelo.id == recurso_id, modelo.cantidad_disponible >= cantidad)
+            .values(cantidad_disponible=modelo.cantidad_disponible - cantidad)
+            .returning(modelo.cantidad_disponible)
+        )
+        return db.execute(stmt).scalar_one_or_none()
+
+    @staticmethod
+    def disponible(db: Session, modelo, recurso_id: int) -> Optional[float]:
+        return db.query(modelo.cantidad_disponible).filter(modelo.id == recurso_id).scalar()
+
+    @classmethod
+    def descontar(cls, db: Session, modelo, recurso_id: int, cantidad) -> float:
+        nuevo = cls.intentar_descontar(db, modelo, recurso_id, cantidad)
+        if nuevo is not None:
+            return nuevo
+
+        disponible = cls.disponible(db, modelo, recurso_id)
+        if disponible is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NO_ENCONTRADO[modelo])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No hay suficiente disponibilidad. Disponible: {disponible}"
+        )
+
+    @staticmethod
+    def reponer(db: Session, modelo, recurso_id: int, cantidad) -> Optional[float]:
+        """Sumar a la disponibilidad (devoluciones); None si el recurso ya no existe"""
+        stmt = (
+            update(modelo)
+            .where(modelo.id == recurso_id)
+            .values(cantidad_disponible=modelo.cantidad_disponible + cantidad)
+            .returning(modelo.cantidad_disponible)
+        )
+        return db.execute(stmt).scalar_one_or_none()
+
+    # ==================== MOVIMIENTOS ====================
+
+    @classmethod
+    def salida_herramienta(cls, db: Session, herramienta_id: int, labor_id: int, cantidad: int, observaciones: str):
+        cls.descontar(db, Herramienta, herramienta_id, cantidad)
+        db.add(MovimientoHerramienta(
+            herramienta_id=herramienta_id,
+            labor_id=labor_id,
+            cantidad=cantidad,
+            tipo_movimiento="salida",
+            observaciones=observaciones
+        ))
+
+    @classmethod
+    def salida_insumo(cls, db: Session, insumo_id: int, labor_id: int, cantidad: float, observaciones: str):
+        cls.descontar(db, Insumo, insumo_id, cantidad)
+        db.add(MovimientoInsumo(
+            insumo_id=insumo_id,
+            labor_id=labor_id,
+            cantidad=cantidad,
+            tipo_movimiento="salida",
+            observaciones=observaciones
+        ))
+
+    @classmethod
+    def entrada_herramienta(cls, db: Session, herramienta_id: int, labor_id: int, cantidad: int, observaciones: str):
+        cls.reponer(db, Herramienta, herramienta_id, cantidad)
+        db.add(MovimientoHerramienta(
+            herramienta_id=herramienta_id,
+            labor_id=labor_id,
+            cantidad=cantidad,
+            tipo_movimiento="entrada",
+            observaciones=observaciones
+        ))
+
+    @classmethod
+    def entrada_insumo(cls, db: Session, insumo_id: int, labor_id: int, cantidad: float, observaciones: str):
+        cls.reponer(db, Insumo, insumo_id, cantidad)
+        db.add(MovimientoInsumo(
+            insumo_id=insumo_id,
+            labor_id=labor_id,
+            cantidad=cantidad,
+            tipo_movimiento="entrada",
+            observaciones=observaciones
+        ))
+
+    # ==================== TRANSACCIÓN CON REINTENTOS ====================
+
+    @staticmethod
+    def ejecutar_con_reintentos(db: Session, operacion: Callable[[], T], intentos: Optional[int] = None) -> T:
+        """
+        Ejecutar operacion() y hacer commit. Ante un conflicto pasajero de la base
+        (deadlock, fallo de serialización, lock ocupado) se hace rollback y se repite
+        la operación completa con espera exponencial. Cualquier otro error hace rollback
+        y se propaga. Como el rollback expira la sesión, operacion debe trabajar con ids.
+        """
+        intentos = intentos or settings.STOCK_MAX_REINTENTOS
+        for intento in range(1, intentos + 1):
+            try:
+                resultado = operacion()
+                db.commit()
+                return resultado
+            except DBAPIError as e:
+                db.rollback()
+                if intento == intentos or not _es_reintentable(e):
+                    raise
+                espera = settings.STOCK_REINTENTO_ESPERA_MS / 1000 * 2 ** (intento - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Conflicto actualizando stock (intento {intento}/{intentos}), reintentando en {espera:.3f}s")
+                time.sleep(espera)
+            except Exception:
+                db.rollback()
+                raise
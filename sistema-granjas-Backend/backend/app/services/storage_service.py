@@ -1,31 +1,173 @@
 from app.core.r2_config import get_r2_client, get_r2_bucket
+from app.core.config import settings
 import os
+import base64
+import hashlib
+import logging
 from io import BytesIO
+from typing import BinaryIO
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
 s3 = get_r2_client()
 bucket_name = get_r2_bucket()
 
 PUBLIC_R2_URL = os.getenv("R2_PUBLIC_URL")
 
+# S3/R2 exige partes de al menos 5 MiB (salvo la última)
+TAMANO_MINIMO_PARTE = 5 * 1024 * 1024
+
+
+def _tamano_parte() -> int:
+    return max(settings.R2_TAMANO_PARTE_MB * 1024 * 1024, TAMANO_MINIMO_PARTE)
+
+
+def subir_stream_r2(file_obj: BinaryIO, file_name: str, content_type: str) -> str:
+    """
+    Subir un archivo leyendo de file_obj por partes de R2_TAMANO_PARTE_MB. Si cabe en una
+    parte se hace un solo PUT; si no, multipart upload. En memoria solo hay una parte a
+    la vez. Es bloqueante: desde un endpoint async debe correr en el threadpool.
+    """
+    tamano_parte = _tamano_parte()
+    extra = {"ContentType": content_type} if content_type else {}
 
-def upload_file_r2(file_bytes: bytes, file_name: str, content_type: str):
     try:
-        # Convertir bytes → objeto con .read()
-        file_obj = BytesIO(file_bytes)
-
-        s3.upload_fileobj(
-            Fileobj=file_obj,
-            Bucket=bucket_name,
-            Key=file_name,
-            ExtraArgs={"ContentType": content_type}
-        )
-        print(f"Archivo {PUBLIC_R2_URL} subido correctamente a R2.")
-        url = f"{PUBLIC_R2_URL}/{file_name}"
+        parte = file_obj.read(tamano_parte)
+
+        if len(parte) < tamano_parte:
+            s3.put_object(Bucket=bucket_name, Key=file_name, Body=parte, **extra)
+        else:
+            upload_id = s3.create_multipart_upload(Bucket=bucket_name, Key=file_name, **extra)["UploadId"]
+            partes = []
+            try:
+                numero = 1
+                while parte:
+                    respuesta = s3.upload_part(
+                        Bucket=bucket_name, Key=file_name, UploadId=upload_id, PartNumber=numero, Body=parte
+                    )
+                    partes.append({"PartNumber": numero, "ETag": respuesta["ETag"]})
+                    # Liberar la parte enviada antes de leer la siguiente
+                    parte = None
+                    parte = file_obj.read(tamano_parte)
+                    numero += 1
+
+                s3.complete_multipart_upload(
+                    Bucket=bucket_name, Key=file_name, UploadId=upload_id, MultipartUpload={"Parts": partes}
+                )
+            except Exception:
+                # Sin abort, R2 conserva (y cobra) las partes huérfanas
+                s3.abort_multipart_upload(Bucket=bucket_name, Key=file_name, UploadId=upload_id)
+                raise
+            logger.info(f"Archivo {file_name} subido a R2 en {len(partes)} partes")
 
-        return url
+        return f"{PUBLIC_R2_URL}/{file_name}"
 
     except Exception as e:
         raise Exception(f"Error subiendo archivo a R2: {str(e)}")
+
+
+def upload_file_r2(file_bytes: bytes, file_name: str, content_type: str):
+    """Subir un archivo que ya está en memoria (para archivos grandes usar subir_stream_r2)"""
+    return subir_stream_r2(BytesIO(file_bytes), file_name, content_type)
+
+
+# ==================== SUBIDA DIRECTA (URLs PREFIRMADAS) ====================
+
+def url_publica_r2(file_name: str) -> str:
+    return f"{PUBLIC_R2_URL}/{file_name}"
+
+
+def key_de_url_r2(url: str):
+    """Key del objeto si la URL apunta a nuestro bucket público; None si es externa"""
+    prefijo = f"{PUBLIC_R2_URL}/"
+    return url[len(prefijo):] if url and url.startswith(prefijo) else None
+
+
+def sha256_base64(sha256_hex: str) -> str:
+    """sha256 en el formato de x-amz-checksum-sha256"""
+    return base64.b64encode(bytes.fromhex(sha256_hex)).decode()
+
+
+def url_subida_r2(file_name: str, content_type: str, expira_segundos: int, sha256: str = None) -> str:
+    """
+    URL prefirmada para un PUT directo; el cliente debe enviar el mismo Content-Type y,
+    si se firmó con sha256, el header x-amz-checksum-sha256: R2 rechaza un cuerpo que no
+    coincida, así el hash queda verificado sin que la API lea el archivo
+    """
+    params = {"Bucket": bucket_name, "Key": file_name, "ContentType": content_type}
+    if sha256:
+        params["ChecksumSHA256"] = sha256_base64(sha256)
+    return s3.generate_presigned_url("put_object", Params=params, ExpiresIn=expira_segundos)
+
+
+def iniciar_multipart_r2(file_name: str, content_type: str) -> str:
+    return s3.create_multipart_upload(Bucket=bucket_name, Key=file_name, ContentType=content_type)["UploadId"]
+
+
+def urls_partes_r2(file_name: str, upload_id: str, total_partes: int, expira_segundos: int) -> list:
+    return [
+        s3.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket_name, "Key": file_name, "UploadId": upload_id, "PartNumber": numero},
+            ExpiresIn=expira_segundos
+        )
+        for numero in range(1, total_partes + 1)
+    ]
+
+
+def completar_multipart_r2(file_name: str, upload_id: str, partes: list):
+    """partes: [{"PartNumber": n, "ETag": "..."}] con los ETag que devolvió R2 a cada PUT"""
+    s3.complete_multipart_upload(
+        Bucket=bucket_name, Key=file_name, UploadId=upload_id,
+        MultipartUpload={"Parts": sorted(partes, key=lambda parte: parte["PartNumber"])}
+    )
+
+
+def abortar_multipart_r2(file_name: str, upload_id: str):
+    s3.abort_multipart_upload(Bucket=bucket_name, Key=file_name, UploadId=upload_id)
+
+
+def metadatos_r2(file_name: str):
+    """
+    (tamaño en bytes, content type, sha256 hex) del objeto, o None si no existe. El sha256
+    es el que verificó R2 al recibir un PUT firmado con checksum; None si no lo tiene (o
+    es el compuesto por partes de un multipart, que no es el hash del archivo)
+    """
+    try:
+        respuesta = s3.head_object(Bucket=bucket_name, Key=file_name, ChecksumMode="ENABLED")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    checksum = respuesta.get("ChecksumSHA256")
+    sha256 = base64.b64decode(checksum).hex() if checksum and "-" not in checksum else None
+    return respuesta["ContentLength"], respuesta.get("ContentType"), sha256
+
+
+def descargar_r2(file_name: str) -> bytes:
+    return s3.get_object(Bucket=bucket_name, Key=file_name)["Body"].read()
+
+
+def sha256_r2(file_name: str):
+    """
+    (sha256 hex, tamaño) del objeto, leyéndolo por bloques sin cargarlo entero. Descarga
+    el objeto completo: solo para tareas en segundo plano, nunca dentro de una petición
+    """
+    digest = hashlib.sha256()
+    tamano = 0
+    for bloque in s3.get_object(Bucket=bucket_name, Key=file_name)["Body"].iter_chunks(1024 * 1024):
+        digest.update(bloque)
+        tamano += len(bloque)
+    return digest.hexdigest(), tamano
+
+
+def copiar_r2(origen: str, destino: str):
+    """Copia dentro del bucket (del lado de R2, sin pasar los bytes por la API)"""
+    s3.copy_object(Bucket=bucket_name, Key=destino, CopySource={"Bucket": bucket_name, "Key": origen})
+
+
+def eliminar_r2(file_name: str):
+    s3.delete_object(Bucket=bucket_name, Key=file_name)
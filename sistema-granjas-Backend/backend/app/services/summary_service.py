@@ -0,0 +1,39 @@
+from typing import Dict
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Granja, Lote, Diagnostico, Recomendacion,
+    Labor, Usuario, Insumo, Herramienta, Programa
+)
+
+
+class SystemSummary:
+    """Totales globales del sistema, calculados en un solo SELECT de subconsultas escalares"""
+
+    @staticmethod
+    def _conteos():
+        return {
+            "total_granjas": select(func.count(Granja.id)),
+            "total_lotes": select(func.count(Lote.id)),
+            "total_diagnosticos": select(func.count(Diagnostico.id)),
+            "total_recomendaciones": select(func.count(Recomendacion.id)),
+            "total_labores": select(func.count(Labor.id)),
+            "total_usuarios": select(func.count(Usuario.id)),
+            "total_insumos": select(func.count(Insumo.id)),
+            "total_herramientas": select(func.count(Herramienta.id)),
+            "total_programas": select(func.count(Programa.id)),
+            "labores_completadas": select(func.count(Labor.id)).where(Labor.estado == "completada"),
+            "recomendaciones_aprobadas": select(func.count(Recomendacion.id)).where(Recomendacion.estado == "aprobada"),
+            "usuarios_activos": select(func.count(Usuario.id)).where(Usuario.activo == True),
+        }
+
+    @classmethod
+    def obtener(cls, db: Session) -> Dict[str, int]:
+        """Obtener todos los totales con un único viaje a la base de datos"""
+        stmt = select(*[
+            consulta.scalar_subquery().label(nombre)
+            for nombre, consulta in cls._conteos().items()
+        ])
+        fila = db.execute(stmt).one()
+        return {nombre: valor or 0 for nombre, valor in fila._mapping.items()}
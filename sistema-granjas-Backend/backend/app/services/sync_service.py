@@ -0,0 +1,239 @@
+"""
+Ingesta de los registros creados offline en el frontend (IndexedDB).
+
+Un lote se procesa en una sola transacción:
+1. Se descartan los ítems repetidos dentro del lote y los ya aplicados antes
+   (sync_operaciones, único por usuario + cliente_id).
+2. Cada ítem se valida con el schema de su tipo; los inválidos se rechazan sin
+   afectar al resto.
+3. Cada tipo se aplica en bloque: las referencias se verifican con una consulta por
+   tabla y las filas se insertan o actualizan en una sola sentencia executemany.
+4. Se registran las operaciones aplicadas y se hace commit.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models import Diagnostico, Labor, Lote, Rol, SyncOperacion, Usuario
+from app.CRUD.labores import _aplicar_avance
+from app.schemas.diagnostico_schema import DiagnosticoCreate
+from app.schemas.sync_schema import AvanceLaborSync, SyncItem
+
+logger = logging.getLogger(__name__)
+
+# Resultado de aplicar un ítem: ("aplicado", recurso_id) o ("rechazado", mensaje)
+Resultado = Tuple[str, object]
+Entrada = Tuple[int, SyncItem, BaseModel]
+
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in detalle['loc']) or 'data'}: {detalle['msg']}"
+        for detalle in error.errors()
+    )
+
+
+def _fecha_cliente(item: SyncItem):
+    """createdAt del dispositivo en UTC naive, sin aceptar fechas futuras"""
+    if not item.createdAt:
+        return None
+    fecha = item.createdAt
+    if fecha.tzinfo:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(fecha, datetime.utcnow())
+
+
+# ==================== PROCESADORES POR TIPO ====================
+
+def _aplicar_diagnosticos(db: Session, usuario, entradas: List[Entrada]) -> Dict[int, Resultado]:
+    if usuario.rol.nombre not in ["estudiante", "docente", "admin", "asesor"]:
+        return {indice: ("rechazado", "No tiene permiso para crear diagnósticos") for indice, _, _ in entradas}
+
+    lotes = {lote_id for (lote_id,) in db.query(Lote.id).filter(
+        Lote.id.in_({datos.lote_id for _, _, datos in entradas})
+    )}
+    ids_usuarios = {datos.estudiante_id for _, _, datos in entradas} | {
+        datos.docente_id for _, _, datos in entradas if datos.docente_id
+    }
+    roles = dict(db.query(Usuario.id, Rol.nombre).join(Rol, Usuario.rol_id == Rol.id).filter(Usuario.id.in_(ids_usuarios)))
+
+    resultados, filas, indices = {}, [], []
+    for indice, item, datos in entradas:
+        if usuario.rol.nombre == "estudiante" and datos.estudiante_id != usuario.id:
+            resultados[indice] = ("rechazado", "Solo puede crear diagnósticos para su propio usuario")
+        elif datos.estudiante_id not in roles:
+            resultados[indice] = ("rechazado", "Estudiante no encontrado")
+        elif datos.lote_id not in lotes:
+            resultados[indice] = ("rechazado", "Lote no encontrado")
+        elif datos.docente_id and datos.docente_id not in roles:
+            resultados[indice] = ("rechazado", "Docente no encontrado")
+        elif datos.docente_id and roles[datos.docente_id] not in ["docente", "asesor"]:
+            resultados[indice] = ("rechazado", "El usuario asignado no es docente ó asesor")
+        else:
+            fila = datos.model_dump(mode="json")
+            fila["fecha_creacion"] = _fecha_cliente(item) or datetime.utcnow()
+            filas.append(fila)
+            indices.append(indice)
+
+    if filas:
+        ids = db.execute(
+            insert(Diagnostico).returning(Diagnostico.id, sort_by_parameter_order=True), filas
+        ).scalars().all()
+        resultados.update({indice: ("aplicado", recurso_id) for indice, recurso_id in zip(indices, ids)})
+    return resultados
+
+
+def _aplicar_avances_labor(db: Session, usuario, entradas: List[Entrada]) -> Dict[int, Resultado]:
+    labores = {
+        fila.id: SimpleNamespace(**fila._asdict())
+        for fila in db.query(
+            Labor.id, Labor.trabajador_id, Labor.estado, Labor.avance_porcentaje,
+            Labor.comentario, Labor.fecha_finalizacion
+        ).filter(Labor.id.in_({datos.labor_id for _, _, datos in entradas}))
+    }
+
+    # Varios avances de la misma labor se aplican en el orden del lote; se escribe el estado final
+    resultados, modificadas = {}, set()
+    for indice, _, datos in entradas:
+        labor = labores.get(datos.labor_id)
+        if not labor:
+            resultados[indice] = ("rechazado", "Labor no encontrada")
+        elif labor.trabajador_id != usuario.id:
+            resultados[indice] = ("rechazado", "Solo el trabajador asignado puede registrar avance")
+        else:
+            _aplicar_avance(labor, datos)
+            modificadas.add(labor.id)
+            resultados[indice] = ("aplicado", labor.id)
+
+    if modificadas:
+        db.execute(update(Labor), [
+            {
+                "id": labor_id,
+                "avance_porcentaje": labores[labor_id].avance_porcentaje,
+                "comentario": labores[labor_id].comentario,
+                "estado": labores[labor_id].estado,
+                "fecha_finalizacion": labores[labor_id].fecha_finalizacion,
+            }
+            for labor_id in modificadas
+        ])
+    return resultados
+
+
+# tipo -> (schema de data, función que aplica el grupo). Los grupos se aplican en este orden.
+PROCESADORES: Dict[str, Tuple[type, Callable[[Session, object, List[Entrada]], Dict[int, Resultado]]]] = {
+    "diagnostico": (DiagnosticoCreate, _aplicar_diagnosticos),
+    "avance_labor": (AvanceLaborSync, _aplicar_avances_labor),
+}
+
+
+class SyncService:
+
+    @classmethod
+    def procesar_lote(cls, db: Session, usuario, items: List[SyncItem]) -> Dict:
+        """
+        Aplicar un lote de ítems offline y devolver el resultado de cada uno, en el orden
+        recibido. Si otro proceso registra los mismos cliente_id a la vez, la restricción
+        única hace fallar el commit y el lote se reprocesa: esos ítems salen como duplicados.
+        """
+        for intento in (1, 2):
+            try:
+                return cls._procesar(db, usuario, items)
+            except IntegrityError:
+                db.rollback()
+                if intento == 2:
+                    raise
+                logger.info("Lote de sincronización concurrente con otro envío, reprocesando")
+            except Exception:
+                db.rollback()
+                raise
+
+    @staticmethod
+    def _procesar(db: Session, usuario, items: List[SyncItem]) -> Dict:
+        resultados: List[Dict] = [None] * len(items)
+
+        def resultado(indice, estado, recurso_id=None, error=None):
+            resultados[indice] = {
+                "cliente_id": items[indice].cliente_id, "tipo": items[indice].tipo,
+                "estado": estado, "recurso_id": recurso_id, "error": error,
+            }
+
+        # 1. Duplicados dentro del lote y contra lo ya aplicado
+        primeros, repetidos = {}, {}
+        for indice, item in enumerate(items):
+            if item.cliente_id in primeros:
+                repetidos[indice] = primeros[item.cliente_id]
+            else:
+                primeros[item.cliente_id] = indice
+
+        aplicados_antes = dict(db.query(SyncOperacion.cliente_id, SyncOperacion.recurso_id).filter(
+            SyncOperacion.usuario_id == usuario.id,
+            SyncOperacion.cliente_id.in_(list(primeros))
+        ))
+
+        # 2. Validación y agrupación por tipo
+        grupos = defaultdict(list)
+        for cliente_id, indice in primeros.items():
+            item = items[indice]
+            if cliente_id in aplicados_antes:
+                resultado(indice, "duplicado", aplicados_antes[cliente_id])
+                continue
+            if item.tipo not in PROCESADORES:
+                resultado(indice, "rechazado", error=f"Tipo no soportado: {item.tipo}")
+                continue
+            esquema, _ = PROCESADORES[item.tipo]
+            try:
+                grupos[item.tipo].append((indice, item, esquema.model_validate(item.data)))
+            except ValidationError as e:
+                resultado(indice, "rechazado", error=_mensaje_validacion(e))
+
+        # 3. Aplicación en bloque por tipo
+        operaciones = []
+        for tipo, (_, aplicar) in PROCESADORES.items():
+            if not grupos.get(tipo):
+                continue
+            for indice, (estado, valor) in aplicar(db, usuario, grupos[tipo]).items():
+                if estado == "aplicado":
+                    resultado(indice, "aplicado", valor)
+                    operaciones.append({
+                        "usuario_id": usuario.id,
+                        "cliente_id": items[indice].cliente_id,
+                        "tipo": tipo,
+                        "recurso_id": valor,
+                        "fecha_cliente": _fecha_cliente(items[indice]),
+                        "fecha_recepcion": datetime.utcnow(),
+                    })
+                else:
+                    resultado(indice, "rechazado", error=valor)
+
+        # 4. Registro de operaciones aplicadas y commit
+        if operaciones:
+            db.execute(insert(SyncOperacion), operaciones)
+        db.commit()
+
+        for indice, primero in repetidos.items():
+            original = resultados[primero]
+            if original["estado"] == "rechazado":
+                resultado(indice, "rechazado", error=original["error"])
+            else:
+                resultado(indice, "duplicado", original["recurso_id"])
+
+        conteo = defaultdict(int)
+        for fila in resultados:
+            conteo[fila["estado"]] += 1
+        if conteo["rechazado"]:
+            logger.info(f"Sincronización de usuario {usuario.id}: {conteo['rechazado']} de {len(items)} ítems rechazados")
+
+        return {
+            "procesados": len(items),
+            "aplicados": conteo["aplicado"],
+            "duplicados": conteo["duplicado"],
+            "rechazados": conteo["rechazado"],
+            "resultados": resultados,
+        }
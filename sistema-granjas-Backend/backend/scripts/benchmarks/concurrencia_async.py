@@ -0,0 +1,131 @@
+"""
+Benchmark de concurrencia: endpoints de lectura async (get_async_db) frente a la
+versión sync equivalente, que FastAPI ejecuta en su threadpool (40 hilos por defecto).
+
+Las rutas sync de referencia se registran solo dentro de este script y llaman al
+mismo CRUD que las async. Las peticiones se hacen en el mismo proceso con
+httpx.AsyncClient sobre la app ASGI, así que se mide el servidor y no la red.
+
+Uso:
+    python scripts/benchmarks/concurrencia_async.py [--email admin@ucaldas.edu.co]
+        [--clientes 200] [--peticiones 5]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.db.database import get_db, async_engine
+from app.core.dependencies import require_any_role
+from app.core.security import create_access_token
+from app.CRUD.labores import listar_labores_crud
+from app.CRUD.recomendaciones import listar_recomendaciones
+from app.api.diagnosticos import _listar_diagnosticos
+from app.schemas.recomendacion_schema import RecomendacionListResponse
+
+TODOS = ["admin", "talento_humano", "estudiante", "docente", "asesor", "trabajador"]
+
+
+# ==================== RUTAS SYNC DE REFERENCIA ====================
+
+def _labores_sync(db: Session = Depends(get_db), usuario = Depends(require_any_role(TODOS))):
+    return listar_labores_crud(db, 0, 50, usuario=usuario)
+
+
+def _diagnosticos_sync(db: Session = Depends(get_db), usuario = Depends(require_any_role(TODOS))):
+    return _listar_diagnosticos(db, 0, 50, None, None, None, None, None, usuario)
+
+
+def _recomendaciones_sync(db: Session = Depends(get_db), usuario = Depends(require_any_role(TODOS))):
+    return RecomendacionListResponse.model_validate(listar_recomendaciones(db, 0, 50, usuario=usuario))
+
+
+app.add_api_route("/benchmark/sync/labores", _labores_sync)
+app.add_api_route("/benchmark/sync/diagnosticos", _diagnosticos_sync)
+app.add_api_route("/benchmark/sync/recomendaciones", _recomendaciones_sync)
+
+CASOS = [
+    ("labores", "/benchmark/sync/labores", "/api/labores/?limit=50"),
+    ("diagnosticos", "/benchmark/sync/diagnosticos", "/api/diagnosticos/?limit=50"),
+    ("recomendaciones", "/benchmark/sync/recomendaciones", "/api/recomendaciones/?limit=50"),
+]
+
+
+# ==================== MEDICIÓN ====================
+
+async def medir(cliente: httpx.AsyncClient, url: str, clientes: int, peticiones: int):
+    latencias = []
+    errores = 0
+
+    async def cliente_virtual():
+        nonlocal errores
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(url)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code != 200:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente_virtual() for _ in range(clientes)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "rps": len(latencias) / duracion,
+        "p50": statistics.median(latencias),
+        "p95": latencias[int(len(latencias) * 0.95) - 1],
+        "errores": errores,
+    }
+
+
+async def main_async(args):
+    token = create_access_token({"sub": args.email})
+    transporte = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transporte,
+            base_url="http://benchmark",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=None,
+        ) as cliente:
+            # Calentar conexiones y la caché del usuario
+            for _, url_sync, url_async in CASOS:
+                for url in (url_sync, url_async):
+                    respuesta = await cliente.get(url)
+                    if respuesta.status_code != 200:
+                        print(f"❌ {url} respondió {respuesta.status_code}: {respuesta.text[:200]}")
+                        return
+
+            print(f"{args.clientes} clientes concurrentes x {args.peticiones} peticiones\n")
+            print(f"{'endpoint':<18}{'modo':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>9}")
+            for nombre, url_sync, url_async in CASOS:
+                for modo, url in (("sync", url_sync), ("async", url_async)):
+                    r = await medir(cliente, url, args.clientes, args.peticiones)
+                    print(f"{nombre:<18}{modo:<8}{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['errores']:>9}")
+    finally:
+        # Sin esto los hilos de aiosqlite mantienen vivo el proceso
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", default="admin@ucaldas.edu.co", help="Usuario con el que se hacen las peticiones")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--peticiones", type=int, default=5, help="Peticiones por cliente")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Registro de consultas lentas sobre el dataset de scripts/generar_dataset.py: baja el umbral,
+pide las rutas sospechosas (búsqueda de usuarios con ilike y listado de labores con el
+alcance de cada rol) y muestra el resumen por consulta normalizada y los planes capturados.
+
+Uso:
+    python scripts/benchmarks/consultas_lentas.py [--umbral 20] [--repeticiones 5] [--planes 3]
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+DOMINIO = "dataset.granjas"  # el de scripts/generar_dataset.py
+
+# (nombre, rol, ruta, parámetros). Las búsquedas no coinciden con nadie a propósito: el
+# ilike '%...%' recorre la tabla igual y la respuesta no depende de los nombres sintéticos
+PEDIDOS = [
+    ("búsqueda de usuarios", "admin", "/api/usuarios/", {"search": "sin-coincidencias"}),
+    ("búsqueda de usuarios talento_humano", "talento_humano", "/api/usuarios/", {"search": "zz@ejemplo"}),
+    ("labores talento_humano", "talento_humano", "/api/labores/", {"limit": 50}),
+    ("labores docente", "docente", "/api/labores/", {"limit": 50}),
+    ("labores trabajador", "trabajador", "/api/labores/", {"limit": 50}),
+    ("labores en progreso talento_humano", "talento_humano", "/api/labores/", {"limit": 50, "estado": "en_progreso"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--umbral", type=int, default=20, help="CONSULTAS_LENTAS_UMBRAL_MS para la corrida")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--planes", type=int, default=3, help="Planes a mostrar (las consultas de mayor tiempo total)")
+    args = parser.parse_args()
+
+    # Antes de importar la app: la configuración se lee al importarla
+    os.environ["CONSULTAS_LENTAS_UMBRAL_MS"] = str(args.umbral)
+
+    import logging
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.security import create_access_token
+    from app.db.database import SessionLocal, engine
+    from app.db.models import Usuario, Rol
+    from app.db.consultas_lentas import consultas_lentas
+
+    logging.disable(logging.WARNING)
+    db = SessionLocal()
+    try:
+        headers = {}
+        for rol in {rol for _, rol, _, _ in PEDIDOS}:
+            usuario = db.query(Usuario).join(Rol).filter(Rol.nombre == rol, Usuario.email.like(f"%@{DOMINIO}"))\
+                .order_by(Usuario.id).first()
+            if not usuario:
+                sys.exit(f"No hay dataset sintético (falta un usuario {rol}); use scripts/generar_dataset.py")
+            headers[rol] = {"Authorization": f"Bearer {create_access_token({'sub': usuario.email})}"}
+    finally:
+        db.close()
+
+    print(f"{engine.dialect.name}: umbral {args.umbral} ms, {args.repeticiones} pedidos por ruta\n")
+    consultas_lentas.limpiar()
+    with TestClient(app, raise_server_exceptions=False) as cliente:
+        for nombre, rol, ruta, parametros in PEDIDOS:
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                respuesta = cliente.get(ruta, headers=headers[rol], params=parametros)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if respuesta.status_code != 200:
+                    print(f"{nombre}: HTTP {respuesta.status_code}")
+                    break
+            else:
+                print(f"{nombre:<38}{sorted(tiempos)[len(tiempos) // 2]:>9.1f} ms")
+
+        # Los planes se toman en segundo plano
+        limite = time.monotonic() + 60
+        while any(e["estado_plan"] == "pendiente" for e in consultas_lentas.entradas(limite=10000)) \
+                and time.monotonic() < limite:
+            time.sleep(0.2)
+
+    resumen = consultas_lentas.resumen()
+    print(f"\n{len(resumen)} consultas normalizadas sobre el umbral")
+    print(f"{'huella':<14}{'veces':>6}{'prom ms':>9}{'max ms':>9}  rutas / SQL")
+    for fila in resumen:
+        print(f"{fila['huella']:<14}{fila['veces']:>6}{fila['promedio_ms']:>9.1f}{fila['max_ms']:>9.1f}  "
+              f"{', '.join(fila['rutas'])}")
+        print(f"{'':<38}{fila['sql'][:160]}")
+
+    for fila in resumen[:args.planes]:
+        con_plan = next((e for e in consultas_lentas.entradas(huella=fila["huella"], limite=10000)
+                         if e["plan"] or e["estado_plan"].startswith("error")), None)
+        if con_plan is None:
+            continue
+        print(f"\n=== {fila['huella']} ({con_plan['duracion_ms']:.1f} ms, parámetros {con_plan['parametros']}) ===")
+        print(con_plan["plan"] or f"(plan {con_plan['estado_plan']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark del reporte de consumo mensual: recorrer todos los movimientos del período
+frente al ledger (diferencia de acumulados entre snapshots de inicio de mes).
+
+Crea herramientas temporales con movimientos repartidos en los últimos meses, genera
+sus snapshots, mide ambos caminos, verifica que den lo mismo y elimina todo al terminar.
+
+Uso:
+    python scripts/benchmarks/consumo_inventario.py [--herramientas 50]
+        [--movimientos 2000] [--meses 12] [--repeticiones 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import insert
+
+from app.db.database import SessionLocal
+from app.db.models import Herramienta, MovimientoHerramienta, SnapshotInventario
+from app.services.inventario_service import InventarioService
+
+OBSERVACION = "benchmark consumo_inventario"
+
+
+def crear_datos(db, herramientas: int, movimientos: int, meses: int):
+    ahora = datetime.utcnow()
+    ids = []
+    for i in range(herramientas):
+        herramienta = Herramienta(
+            nombre=f"Benchmark consumo {i}", cantidad_total=10 ** 6, cantidad_disponible=10 ** 6, estado="disponible"
+        )
+        db.add(herramienta)
+        db.flush()
+        ids.append(herramienta.id)
+
+    netos = defaultdict(int)
+    filas = []
+    for herramienta_id in ids:
+        for _ in range(movimientos):
+            tipo = random.choice(["salida", "salida", "entrada"])
+            cantidad = random.randint(1, 5)
+            netos[herramienta_id] += cantidad if tipo == "entrada" else -cantidad
+            filas.append({
+                "herramienta_id": herramienta_id,
+                "cantidad": cantidad,
+                "tipo_movimiento": tipo,
+                "fecha_movimiento": ahora - timedelta(days=random.uniform(0, meses * 30)),
+                "observaciones": OBSERVACION,
+            })
+    for inicio in range(0, len(filas), 5000):
+        db.execute(insert(MovimientoHerramienta), filas[inicio:inicio + 5000])
+    for herramienta_id, neto in netos.items():
+        db.query(Herramienta).filter(Herramienta.id == herramienta_id).update(
+            {"cantidad_disponible": Herramienta.cantidad_disponible + neto}
+        )
+    db.commit()
+    return ids
+
+
+def consumo_recorriendo(db, ids, desde: datetime, hasta: datetime):
+    """Esquema anterior: traer los movimientos del período y agruparlos en Python"""
+    resultado = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0]))
+    movimientos = db.query(
+        MovimientoHerramienta.herramienta_id, MovimientoHerramienta.fecha_movimiento,
+        MovimientoHerramienta.tipo_movimiento, MovimientoHerramienta.cantidad
+    ).filter(
+        MovimientoHerramienta.herramienta_id.in_(ids),
+        MovimientoHerramienta.fecha_movimiento >= desde,
+        MovimientoHerramienta.fecha_movimiento < hasta,
+    )
+    for herramienta_id, fecha, tipo, cantidad in movimientos:
+        resultado[herramienta_id][fecha.strftime("%Y-%m")][0 if tipo == "salida" else 1] += cantidad
+    return resultado
+
+
+def medir(funcion, repeticiones: int):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return resultado, min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--herramientas", type=int, default=50)
+    parser.add_argument("--movimientos", type=int, default=2000, help="Movimientos por herramienta")
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    ids = []
+    try:
+        print(f"Creando {args.herramientas} herramientas x {args.movimientos} movimientos en {args.meses} meses...")
+        ids = crear_datos(db, args.herramientas, args.movimientos, args.meses)
+
+        inicio = time.perf_counter()
+        generados = InventarioService.generar_snapshots(db)
+        print(f"Snapshots generados: {generados['herramienta']} en {time.perf_counter() - inicio:.2f}s\n")
+
+        ahora = datetime.utcnow()
+        desde = datetime(ahora.year, ahora.month, 1) - timedelta(days=(args.meses - 1) * 31)
+        desde = datetime(desde.year, desde.month, 1)
+        hasta = (datetime(ahora.year, ahora.month, 1) + timedelta(days=32)).replace(day=1)
+
+        anterior, ms_anterior = medir(lambda: consumo_recorriendo(db, ids, desde, hasta), args.repeticiones)
+
+        def ledger():
+            return [
+                InventarioService.consumo_mensual(db, "herramienta", desde.date(), ahora.date(), herramienta_id)
+                for herramienta_id in ids
+            ]
+        reporte, ms_ledger_por_recurso = medir(ledger, args.repeticiones)
+        _, ms_ledger_todos = medir(
+            lambda: InventarioService.consumo_mensual(db, "herramienta", desde.date(), ahora.date()), args.repeticiones
+        )
+
+        coincide = all(
+            abs(mes["salidas"] - anterior[item["recurso_id"]][mes["mes"]][0]) < 1e-6
+            and abs(mes["entradas"] - anterior[item["recurso_id"]][mes["mes"]][1]) < 1e-6
+            for reporte_recurso in reporte for item in reporte_recurso["items"] for mes in item["meses"]
+        )
+
+        print(f"{'camino':<34}{'ms (mejor)':>12}")
+        print(f"{'recorrer movimientos':<34}{ms_anterior:>12.1f}")
+        print(f"{'ledger, una consulta por recurso':<34}{ms_ledger_por_recurso:>12.1f}")
+        print(f"{'ledger, todos los recursos':<34}{ms_ledger_todos:>12.1f}")
+        print(f"\nResultados coinciden: {coincide}")
+    finally:
+        if ids:
+            db.query(SnapshotInventario).filter(
+                SnapshotInventario.tipo_recurso == "herramienta", SnapshotInventario.recurso_id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.query(MovimientoHerramienta).filter(MovimientoHerramienta.herramienta_id.in_(ids)).delete(synchronize_session=False)
+            db.query(Herramienta).filter(Herramienta.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
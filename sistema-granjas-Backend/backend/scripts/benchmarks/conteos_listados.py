@@ -0,0 +1,126 @@
+"""
+Totales de /labores para talento_humano (alcance por usuario_programa): inserta labores
+sintéticas y compara el costo del listado con COUNT exacto en cada pedido, con la caché
+de conteos y con la estimación del planner (solo PostgreSQL). Verifica que crear una
+labor invalide el total cacheado. Las labores de prueba se eliminan al terminar.
+
+Uso:
+    python scripts/benchmarks/conteos_listados.py [--filas 200000] [--repeticiones 20] [--email th@correo]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.db.models import Labor, Recomendacion, TipoLabor, Usuario, Rol
+from app.db.cache_conteos import cache_conteos
+from app.CRUD.labores import listar_labores_crud
+
+MARCA = "benchmark-conteos"
+ESTADOS = ["pendiente", "en_progreso", "completada", "cancelada"]
+
+
+def insertar_labores(db, trabajadores, recomendacion_id: int, tipo_labor_id: int, filas: int):
+    lote = []
+    for _ in range(filas):
+        lote.append({
+            "estado": random.choice(ESTADOS), "avance_porcentaje": 0, "comentario": MARCA,
+            "recomendacion_id": recomendacion_id, "trabajador_id": random.choice(trabajadores),
+            "tipo_labor_id": tipo_labor_id,
+        })
+        if len(lote) == 10000:
+            db.execute(Labor.__table__.insert(), lote)
+            lote = []
+    if lote:
+        db.execute(Labor.__table__.insert(), lote)
+    db.commit()
+    if db.get_bind().dialect.name == "postgresql":
+        # Estadísticas al día para el planner (en producción las mantiene autovacuum)
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mediana en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return sorted(tiempos)[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--email", default=None, help="Usuario talento_humano (por defecto, el primero con programas)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Usuario).join(Rol).filter(Rol.nombre == "talento_humano")
+        usuario = query.filter(Usuario.email == args.email).first() if args.email else \
+            next((u for u in query.all() if u.programas), None)
+        trabajadores = [u.id for u in db.query(Usuario).join(Rol).filter(Rol.nombre == "trabajador").all()]
+        recomendacion, tipo_labor = db.query(Recomendacion).first(), db.query(TipoLabor).first()
+        if not usuario or not usuario.programas or not trabajadores or not recomendacion or not tipo_labor:
+            sys.exit("Se necesita un talento_humano con programas, trabajadores, una recomendación y un tipo de labor")
+        programa_ids = {p.id for p in usuario.programas}
+        propio = next(u.id for u in db.query(Usuario).filter(Usuario.id.in_(trabajadores)).all()
+                      if programa_ids & {p.id for p in u.programas})
+
+        insertar_labores(db, trabajadores, recomendacion.id, tipo_labor.id, args.filas)
+        motor = db.get_bind().dialect.name
+        print(f"{db.query(Labor).count()} labores ({args.filas} sintéticas) en {motor}; "
+              f"talento_humano {usuario.email}, página de 50\n")
+
+        def pagina(**kw):
+            return listar_labores_crud(db, 0, 50, usuario=usuario, **kw)
+
+        ttl = cache_conteos.ttl_segundos
+        cache_conteos.ttl_segundos = 0
+        sin_cache = medir(pagina, args.repeticiones)
+        sin_total = medir(lambda: pagina(con_total=False, cursor=""), args.repeticiones)
+        cache_conteos.ttl_segundos = ttl
+        cache_conteos.limpiar()
+        exacto = pagina()["total"]
+        con_cache = medir(pagina, args.repeticiones)
+
+        cache_conteos.limpiar()
+        estimada = pagina(cursor="")
+        con_estimacion = medir(lambda: (cache_conteos.limpiar(), pagina(cursor="")), args.repeticiones)
+
+        print(f"{'modo':<34}{'ms':>8}")
+        print(f"{'COUNT exacto en cada pedido':<34}{sin_cache:>8.1f}")
+        print(f"{'caché de conteos (acierto)':<34}{con_cache:>8.1f}")
+        print(f"{'estimación del planner':<34}{con_estimacion:>8.1f}")
+        print(f"{'sin total':<34}{sin_total:>8.1f}")
+        if estimada["total_estimado"]:
+            error = abs(estimada["total"] - exacto) / max(exacto, 1) * 100
+            print(f"\nTotal exacto {exacto}, estimado {estimada['total']} (error {error:.1f}%)")
+        else:
+            print(f"\nTotal exacto {exacto}; {motor} no tiene estimación (total {estimada['total']})")
+
+        # Invalidación: una labor nueva del programa cambia el total cacheado
+        pagina()
+        db.add(Labor(estado="pendiente", comentario=MARCA, recomendacion_id=recomendacion.id,
+                     trabajador_id=propio, tipo_labor_id=tipo_labor.id))
+        db.commit()
+        despues = pagina()["total"]
+        print(f"Tras crear una labor: total {despues} (esperado {exacto + 1}) -> {'ok' if despues == exacto + 1 else 'DESACTUALIZADO'}")
+        print(f"Caché: {cache_conteos.estadisticas()}")
+    finally:
+        db.rollback()
+        db.query(Labor).filter(Labor.comentario == MARCA).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
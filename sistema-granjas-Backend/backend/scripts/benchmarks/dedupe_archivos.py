@@ -0,0 +1,258 @@
+"""
+Almacenamiento por contenido contra un S3 local (moto en modo servidor): sube el mismo
+archivo varias veces por /api/files/upload y por subida directa (con y sin sha256
+declarado), crea evidencias con él y compara los objetos y bytes del bucket con los que
+habría sin deduplicar. Mide también los bytes que la API lee del bucket dentro de las
+peticiones (deben ser 0: el hash de las subidas directas sin sha256 verificado se calcula
+en segundo plano). Al final elimina las evidencias y verifica que el objeto se borre solo
+con la última, y no mientras /files/upload lo tenga reservado.
+
+Requiere moto[server] (solo para esta prueba): pip install "moto[server]"
+
+Uso:
+    python scripts/benchmarks/dedupe_archivos.py [--mb 4] [--repeticiones 5]
+"""
+import os
+import sys
+import time
+import socket
+import hashlib
+import logging
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import boto3
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.security import create_access_token
+from app.db.database import SessionLocal
+from app.db.models import Blob, Evidencia, EvidenciaPendiente, Labor, Usuario, Rol
+from app.services import storage_service
+from app.services.blob_service import BlobService
+
+BUCKET = "benchmark-evidencias"
+# Hilos de segundo plano que leen del bucket (consolidación de blobs y derivados)
+HILOS_SEGUNDO_PLANO = ("blobs", "derivados")
+
+
+class LecturasBucket:
+    """Suma los bytes que la app descarga del bucket (GetObject), según el hilo que los pide"""
+
+    def __init__(self):
+        self.en_peticiones = 0
+        self.en_segundo_plano = 0
+
+    def __call__(self, parsed, **kwargs):
+        tamano = parsed.get("ContentLength") or 0
+        if threading.current_thread().name.startswith(HILOS_SEGUNDO_PLANO):
+            self.en_segundo_plano += tamano
+        else:
+            self.en_peticiones += tamano
+
+
+lecturas = LecturasBucket()
+
+
+def iniciar_moto():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(puerto)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    cliente = boto3.client(
+        "s3", endpoint_url=f"http://127.0.0.1:{puerto}", region_name="us-east-1",
+        aws_access_key_id="prueba", aws_secret_access_key="prueba"
+    )
+    cliente.create_bucket(Bucket=BUCKET)
+    cliente.meta.events.register("after-call.s3.GetObject", lecturas)
+    storage_service.s3 = cliente
+    storage_service.bucket_name = BUCKET
+    return proceso
+
+
+def objetos_bucket():
+    objetos = storage_service.s3.list_objects_v2(Bucket=BUCKET).get("Contents", [])
+    return {o["Key"]: o["Size"] for o in objetos}
+
+
+def esperar_consolidacion(db, evidencias, segundos=120):
+    """Esperar a que las subidas directas de esas evidencias queden asociadas a su blob"""
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        db.expire_all()
+        sin_consolidar = db.query(EvidenciaPendiente.id).filter(
+            EvidenciaPendiente.evidencia_id.in_(evidencias),
+            EvidenciaPendiente.estado == "completada",
+            EvidenciaPendiente.blob_id.is_(None)
+        ).count()
+        if not sin_consolidar:
+            return
+        time.sleep(0.2)
+    sys.exit("Las subidas directas no se consolidaron a tiempo")
+
+
+def url_actual(db, evidencia_id: int) -> str:
+    db.expire_all()
+    return db.query(Evidencia.url_archivo).filter(Evidencia.id == evidencia_id).scalar()
+
+
+def subida_directa(api, bucket, headers, contenido: bytes, labor_id: int, sha256: str = None):
+    """Flujo de /evidencias/subidas; devuelve (metodo, bytes enviados al bucket, respuesta)"""
+    datos = {
+        "tipo": "documento",
+        "descripcion": "Documento de prueba de deduplicación",
+        "tipo_entidad": "labor",
+        "entidad_id": labor_id,
+        "nombre_archivo": "informe.pdf",
+        "content_type": "application/pdf",
+        "tamano": len(contenido),
+    }
+    if sha256:
+        datos["sha256"] = sha256
+    sesion = api.post("/api/evidencias/subidas", headers=headers, json=datos)
+    assert sesion.status_code == 200, sesion.text
+    sesion = sesion.json()
+
+    enviados = 0
+    if sesion["metodo"] == "put":
+        cabeceras = {"Content-Type": "application/pdf"}
+        if sesion.get("checksum_sha256"):
+            cabeceras["x-amz-checksum-sha256"] = sesion["checksum_sha256"]
+        respuesta = bucket.put(sesion["url"], content=contenido, headers=cabeceras)
+        assert respuesta.status_code == 200, respuesta.text
+        enviados = len(contenido)
+    assert sesion["metodo"] != "multipart", "Use --mb menor que R2_TAMANO_PARTE_MB"
+
+    completar = api.post(f"/api/evidencias/subidas/{sesion['id']}/completar", headers=headers, json={"partes": []})
+    assert completar.status_code == 200, completar.text
+    return sesion["metodo"], enviados, completar.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=4, help="Tamaño del archivo repetido")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Subidas del mismo archivo por cada vía")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    db = SessionLocal()
+    labor = db.query(Labor).first()
+    usuario = db.query(Usuario).join(Rol).filter(Rol.nombre == "admin").first()
+    if not labor or not usuario:
+        sys.exit("Se necesita al menos una labor y un usuario admin")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': usuario.email})}"}
+
+    proceso = iniciar_moto()
+    api = TestClient(app)
+    evidencias = []
+    try:
+        with httpx.Client(timeout=None) as bucket:
+            contenido = os.urandom(args.mb * 1024 * 1024)
+            sha256 = hashlib.sha256(contenido).hexdigest()
+            subidas = 0
+
+            # 1. /files/upload repetido (p. ej. reintentos de una conexión inestable)
+            duplicados, urls = 0, set()
+            for _ in range(args.repeticiones):
+                respuesta = api.post("/api/files/upload", files={"file": ("informe.pdf", contenido, "application/pdf")})
+                assert respuesta.status_code == 200, respuesta.text
+                duplicados += respuesta.json()["duplicado"]
+                urls.add(respuesta.json()["url"])
+                subidas += 1
+            print(f"/files/upload x{args.repeticiones}: {duplicados} duplicados, {len(urls)} URL distinta(s)")
+
+            # Otro contenido con el mismo nombre no pisa al anterior
+            otro = api.post("/api/files/upload", files={"file": ("informe.pdf", os.urandom(1024), "application/pdf")}).json()
+            print(f"Mismo nombre, otro contenido: URL distinta {otro['url'] not in urls}")
+
+            for url in urls:
+                creada = api.post("/api/evidencias/", headers=headers, json={
+                    "tipo": "documento", "descripcion": "Documento subido por la API",
+                    "url_archivo": url, "tipo_entidad": "labor", "entidad_id": labor.id,
+                    "usuario_id": usuario.id,
+                })
+                assert creada.status_code == 200, creada.text
+                evidencias.append(creada.json()["id"])
+
+            # 2. Subida directa sin sha256: se sube y, al consolidarla en segundo plano, se
+            # descarta por repetida
+            enviados_sin_hash, directas = 0, []
+            for _ in range(args.repeticiones):
+                metodo, enviados, evidencia = subida_directa(api, bucket, headers, contenido, labor.id)
+                enviados_sin_hash += enviados
+                directas.append(evidencia["id"])
+                subidas += 1
+            leidos_en_peticiones = lecturas.en_peticiones
+            esperar_consolidacion(db, directas)
+            evidencias.extend(directas)
+            urls.update(url_actual(db, evidencia_id) for evidencia_id in directas)
+            print(f"Directa sin sha256 x{args.repeticiones}: {enviados_sin_hash / 2**20:.0f} MB al bucket, "
+                  f"URLs distintas en total {len(urls)} (tras consolidar)")
+            print(f"  leídos del bucket: {leidos_en_peticiones / 2**20:.1f} MB dentro de las peticiones, "
+                  f"{lecturas.en_segundo_plano / 2**20:.1f} MB en segundo plano")
+
+            # 3. Subida directa declarando el sha256: no se sube nada
+            enviados_con_hash, metodos = 0, set()
+            for _ in range(args.repeticiones):
+                metodo, enviados, evidencia = subida_directa(api, bucket, headers, contenido, labor.id, sha256)
+                enviados_con_hash += enviados
+                metodos.add(metodo)
+                evidencias.append(evidencia["id"])
+                urls.add(evidencia["url_archivo"])
+                subidas += 1
+            print(f"Directa con sha256 x{args.repeticiones}: {enviados_con_hash / 2**20:.0f} MB al bucket, "
+                  f"método {', '.join(sorted(metodos))}, URLs distintas en total {len(urls)}")
+
+            print(f"Leídos del bucket dentro de las peticiones en total: {lecturas.en_peticiones / 2**20:.1f} MB")
+
+            objetos = objetos_bucket()
+            print(f"\n{'':<18}{'objetos':>9}{'MB':>9}")
+            print(f"{'sin deduplicar':<18}{subidas + 1:>9}{(subidas * len(contenido) + 1024) / 2**20:>9.1f}")
+            print(f"{'por contenido':<18}{len(objetos):>9}{sum(objetos.values()) / 2**20:>9.1f}")
+            registradas = {key for key, in db.query(Blob.key).filter(Blob.key.in_(list(objetos)))}
+            temporales = [k for k in objetos if k not in registradas]
+            print(f"Keys temporales de subidas directas que quedaron: {len(temporales)}")
+
+            # 4. El objeto se borra con la última evidencia que lo usa, pero no mientras siga
+            # reservado por /files/upload (quien lo subió puede no haber creado su evidencia)
+            key = storage_service.key_de_url_r2(urls.pop())
+            antes_del_final = True
+            for numero, evidencia_id in enumerate(evidencias, start=1):
+                respuesta = api.delete(f"/api/evidencias/{evidencia_id}", headers=headers)
+                assert respuesta.status_code == 200, respuesta.text
+                if numero < len(evidencias):
+                    antes_del_final = antes_del_final and key in objetos_bucket()
+            evidencias = []
+            reservado = key in objetos_bucket()
+            db.query(Blob).filter(Blob.key == key).update({"reservado_hasta": datetime.utcnow()})
+            db.commit()
+            BlobService.liberar_vencidos(db)
+            print(f"\nAl eliminar {numero} evidencias: el objeto sigue hasta la última {antes_del_final}, "
+                  f"tras ella sigue por la reserva de /files/upload {reservado}, "
+                  f"se borra al vencer la reserva {key not in objetos_bucket()}")
+    finally:
+        for evidencia_id in evidencias:
+            api.delete(f"/api/evidencias/{evidencia_id}", headers=headers)
+        # El blob del archivo de un solo uso no tiene evidencia que lo libere
+        db.query(Blob).filter(Blob.key.in_(list(objetos_bucket()))).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
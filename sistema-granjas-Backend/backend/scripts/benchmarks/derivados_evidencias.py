@@ -0,0 +1,163 @@
+"""
+Derivados de evidencias contra un S3 local (moto en modo servidor): sube fotos sintéticas
+del tamaño de las de un celular (con EXIF de orientación y GPS), las lista por
+/api/evidencias para que se generen en segundo plano y compara los bytes que descarga un
+listado con miniaturas frente al de los originales. Verifica que los derivados no tengan
+EXIF y respeten la orientación.
+
+Requiere moto[server] (solo para esta prueba): pip install "moto[server]"
+
+Uso:
+    python scripts/benchmarks/derivados_evidencias.py [--fotos 12] [--lado 4032]
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import subprocess
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import boto3
+from PIL import Image
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.security import create_access_token
+from app.db.database import SessionLocal
+from app.db.models import Evidencia, Labor, Usuario, Rol
+from app.services import storage_service
+from app.core.imagenes import generar_derivados
+from app.services.derivados_service import generador_derivados
+
+BUCKET = "benchmark-evidencias"
+
+
+def iniciar_moto():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(puerto)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    cliente = boto3.client(
+        "s3", endpoint_url=f"http://127.0.0.1:{puerto}", region_name="us-east-1",
+        aws_access_key_id="prueba", aws_secret_access_key="prueba"
+    )
+    cliente.create_bucket(Bucket=BUCKET)
+    storage_service.s3 = cliente
+    storage_service.bucket_name = BUCKET
+    return proceso
+
+
+def foto_sintetica(lado: int) -> bytes:
+    """JPEG apaisado 4:3 con textura (comprime como una foto) y EXIF: rotar 90° y GPS"""
+    ancho, alto = lado, lado * 3 // 4
+    ruido = Image.frombytes("RGB", (ancho // 3, alto // 3), os.urandom((ancho // 3) * (alto // 3) * 3))
+    imagen = ruido.resize((ancho, alto), Image.BICUBIC)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: la foto se tomó con el celular vertical
+    exif[0x010F] = "Celular de prueba"
+    exif[0x8825] = {1: "N", 2: (4.0, 35.0, 12.5), 3: "W", 4: (74.0, 4.0, 33.1)}  # GPSInfo
+    salida = BytesIO()
+    imagen.save(salida, "JPEG", quality=95, exif=exif)
+    return salida.getvalue()
+
+
+def tamano_objeto(url: str) -> int:
+    return storage_service.metadatos_r2(storage_service.key_de_url_r2(url))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fotos", type=int, default=12)
+    parser.add_argument("--lado", type=int, default=4032, help="Ancho en px de cada foto")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    proceso = iniciar_moto()
+    db = SessionLocal()
+    ids = []
+    try:
+        labor = db.query(Labor).first()
+        usuario = db.query(Usuario).join(Rol).filter(Rol.nombre == "admin").first()
+        if not labor or not usuario:
+            sys.exit("Se necesita al menos una labor y un usuario admin")
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': usuario.email})}"}
+
+        foto = foto_sintetica(args.lado)
+        for numero in range(args.fotos):
+            key = f"evidencias/labor/{labor.id}/benchmark-{numero}.jpg"
+            url = storage_service.subir_stream_r2(BytesIO(foto), key, "image/jpeg")
+            evidencia = Evidencia(
+                tipo="imagen", descripcion="Foto de prueba de derivados", url_archivo=url,
+                labor_id=labor.id, usuario_id=usuario.id
+            )
+            db.add(evidencia)
+            db.flush()
+            ids.append(evidencia.id)
+        db.commit()
+        print(f"{args.fotos} fotos de {len(foto) / 2**20:.1f} MB ({args.lado} px)\n")
+
+        # Con spawn cada proceso hijo vuelve a importar este script (y con él app.main); bajo
+        # uvicorn el __main__ es el de uvicorn y el arranque es inmediato. Se mide aparte.
+        inicio = time.perf_counter()
+        procesos, _ = generador_derivados._pools()
+        pequena = BytesIO()
+        Image.new("RGB", (8, 8)).save(pequena, "JPEG")
+        list(procesos.map(generar_derivados, [pequena.getvalue()] * 4, [{"x": (4, 50)}] * 4))
+        print(f"Arranque del pool de procesos: {time.perf_counter() - inicio:.1f} s")
+
+        api = TestClient(app)
+        inicio = time.perf_counter()
+        api.get(f"/api/evidencias/labor/{labor.id}", headers=headers)
+        latencia = (time.perf_counter() - inicio) * 1000
+        # El listado no espera a los derivados: se generan en el pool de procesos
+        while True:
+            pendientes = db.query(Evidencia).filter(Evidencia.id.in_(ids), Evidencia.url_miniatura.is_(None)).count()
+            if not pendientes:
+                break
+            time.sleep(0.2)
+            db.expire_all()
+        generacion = time.perf_counter() - inicio
+        print(f"Primer listado: {latencia:.0f} ms (sin esperar derivados); "
+              f"derivados de {args.fotos} fotos listos en {generacion:.1f} s")
+
+        items = [e for e in api.get(f"/api/evidencias/labor/{labor.id}", headers=headers).json()["items"] if e["id"] in ids]
+        originales = sum(tamano_objeto(e["url_archivo"]) for e in items)
+        miniaturas = sum(tamano_objeto(e["url_miniatura"]) for e in items)
+        vistas = sum(tamano_objeto(e["url_vista_previa"]) for e in items)
+        print(f"\n{'listado con':<16}{'MB':>10}{'vs original':>14}")
+        print(f"{'originales':<16}{originales / 2**20:>10.2f}{1:>13.0f}x")
+        print(f"{'vistas previas':<16}{vistas / 2**20:>10.2f}{originales / vistas:>13.0f}x")
+        print(f"{'miniaturas':<16}{miniaturas / 2**20:>10.2f}{originales / miniaturas:>13.0f}x")
+
+        key = storage_service.key_de_url_r2(items[0]["url_miniatura"])
+        with Image.open(BytesIO(storage_service.descargar_r2(key))) as miniatura:
+            sin_exif = not miniatura.getexif() and "exif" not in miniatura.info
+            vertical = miniatura.height > miniatura.width
+            print(f"\nMiniatura {miniatura.format} {miniatura.size}: sin EXIF {sin_exif}, orientación aplicada {vertical}")
+
+        labor_api = api.get(f"/api/labores/{labor.id}", headers=headers).json()
+        con_miniatura = sum(1 for e in labor_api["evidencias"] if e["id"] in ids and e["url_miniatura"])
+        print(f"/api/labores/{labor.id}: {con_miniatura}/{len(ids)} evidencias con url_miniatura")
+    finally:
+        generador_derivados.cerrar()
+        db.query(Evidencia).filter(Evidencia.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Suite de rendimiento de los endpoints más usados, a través de la app ASGI (TestClient) y
+sobre el dataset de scripts/generar_dataset.py: para cada motor (una URL de base de datos
+por --motor) pide cada endpoint con el usuario del rol que más lo usa y reporta latencia
+p50/p95/p99 y consultas SQL por pedido.
+
+Cada motor se mide en un subproceso, porque el engine se crea al importar la app con
+DATABASE_URL. --generar regenera el dataset en cada motor antes de medir, así las
+corridas con la misma semilla son comparables entre sí.
+
+El motor PostgreSQL es un servidor local cualquiera con una base vacía (el driver ya está
+en requirements.txt); --generar crea las tablas. Por ejemplo:
+    docker run -d --name granjas-bench -p 5433:5432 -e POSTGRES_HOST_AUTH_METHOD=trust postgres:16
+    docker exec granjas-bench createdb -U postgres granjas_bench
+    --motor postgresql://postgres@127.0.0.1:5433/granjas_bench
+
+Uso:
+    python scripts/benchmarks/endpoints.py [--motor sqlite:////tmp/bench.db] [--motor postgresql://...]
+        [--generar 100k] [--repeticiones 50] [--json resultados.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GENERADOR = os.path.join(RAIZ, "scripts", "generar_dataset.py")
+# Marcas de scripts/generar_dataset.py (importarlo cargaría la configuración de la app en este proceso)
+MARCA = "dataset-sintetico"
+DOMINIO = "dataset.granjas"
+
+# (nombre, rol, ruta, parámetros); ruta y parámetros pueden usar {recomendacion_id}, {labor_id},
+# {herramienta_id} y {hoy}
+ENDPOINTS = [
+    ("labores", "admin", "/api/labores/", {"limit": 50}),
+    ("labores por cursor", "admin", "/api/labores/", {"limit": 50, "cursor": ""}),
+    ("labores talento_humano", "talento_humano", "/api/labores/", {"limit": 50}),
+    ("mis labores", "trabajador", "/api/labores/trabajador/mis-labores", {}),
+    ("labores de recomendación", "docente", "/api/labores/recomendacion/{recomendacion_id}", {}),
+    ("estadísticas de labores", "admin", "/api/labores/estadisticas/resumen", {}),
+    ("recomendaciones docente", "docente", "/api/recomendaciones/", {"limit": 50}),
+    ("vista completa recomendación", "docente", "/api/recomendaciones/{recomendacion_id}/vista-completa", {}),
+    ("diagnósticos docente", "docente", "/api/diagnosticos/", {"limit": 50}),
+    ("evidencias de labor", "trabajador", "/api/evidencias/labor/{labor_id}", {}),
+    ("movimientos de herramientas", "admin", "/api/movimientos/herramientas", {"limit": 50}),
+    ("lotes", "admin", "/api/lotes/", {}),
+    ("dashboard", "admin", "/api/dashboard/resumen", {}),
+    ("saldo de herramienta", "admin", "/api/inventario/saldo",
+     {"tipo": "herramienta", "recurso_id": "{herramienta_id}", "fecha": "{hoy}"}),
+    ("sync completo trabajador", "trabajador", "/api/sync/changes", {}),
+]
+
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano"""
+    return ordenados[max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))]
+
+
+# ==================== SUBPROCESO: MEDIR UN MOTOR ====================
+
+def _contexto(db):
+    """Usuarios del dataset por rol e ids para las rutas con parámetros"""
+    from app.db.models import Usuario, Rol, Herramienta, Recomendacion, Labor, Evidencia
+
+    usuarios = {}
+    for rol in {rol for _, rol, _, _ in ENDPOINTS}:
+        usuario = db.query(Usuario).join(Rol).filter(Rol.nombre == rol, Usuario.email.like(f"%@{DOMINIO}"))\
+            .order_by(Usuario.id).first()
+        if not usuario:
+            sys.exit(f"No hay dataset sintético (falta un usuario {rol}); use --generar o scripts/generar_dataset.py")
+        usuarios[rol] = usuario
+    trabajador = usuarios["trabajador"]
+    recomendacion_id = db.query(Recomendacion.id).join(Labor)\
+        .filter(Recomendacion.docente_id == usuarios["docente"].id).order_by(Recomendacion.id).limit(1).scalar()
+    labor_id = db.query(Labor.id).join(Evidencia, Evidencia.labor_id == Labor.id)\
+        .filter(Labor.trabajador_id == trabajador.id).order_by(Labor.id).limit(1).scalar()
+    ids = {
+        "recomendacion_id": recomendacion_id,
+        "labor_id": labor_id or db.query(Labor.id).filter(Labor.trabajador_id == trabajador.id).limit(1).scalar(),
+        "herramienta_id": db.query(Herramienta.id).filter(Herramienta.descripcion == MARCA)
+        .order_by(Herramienta.id).limit(1).scalar(),
+        "hoy": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    return {rol: usuario.email for rol, usuario in usuarios.items()}, ids
+
+
+def medir_motor(repeticiones: int, calentamiento: int) -> dict:
+    import logging
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.security import create_access_token
+    from app.db.database import SessionLocal, engine
+    from app.db.models import Labor
+    from app.db.consultas_metricas import medir_consultas
+
+    logging.disable(logging.WARNING)
+    db = SessionLocal()
+    try:
+        emails, ids = _contexto(db)
+        labores = db.query(Labor).count()
+    finally:
+        db.close()
+    headers = {rol: {"Authorization": f"Bearer {create_access_token({'sub': email})}"} for rol, email in emails.items()}
+
+    resultados = []
+    # Como context manager: un solo event loop para todo (lo exige asyncpg)
+    with TestClient(app, raise_server_exceptions=False) as cliente:
+        for nombre, rol, ruta, parametros in ENDPOINTS:
+            url = ruta.format(**ids)
+            parametros = {clave: str(valor).format(**ids) for clave, valor in parametros.items()}
+            tiempos, por_pedido, estado = [], [], 200
+            for numero in range(calentamiento + repeticiones):
+                with medir_consultas() as medicion:
+                    inicio = time.perf_counter()
+                    respuesta = cliente.get(url, headers=headers[rol], params=parametros)
+                    duracion = (time.perf_counter() - inicio) * 1000
+                if respuesta.status_code != 200:
+                    estado = respuesta.status_code
+                    break
+                if numero >= calentamiento:
+                    tiempos.append(duracion)
+                    # La medición de la propia petición, tomada por el middleware
+                    por_pedido.append(medicion.peticiones[-1][2].consultas)
+            if estado != 200:
+                resultados.append({"nombre": nombre, "estado": estado})
+                continue
+            tiempos.sort()
+            por_pedido.sort()
+            resultados.append({
+                "nombre": nombre, "estado": estado,
+                "p50": percentil(tiempos, 50), "p95": percentil(tiempos, 95), "p99": percentil(tiempos, 99),
+                "consultas": por_pedido[len(por_pedido) // 2],
+                "consultas_min": por_pedido[0], "consultas_max": por_pedido[-1],
+            })
+    return {"motor": engine.dialect.name, "labores": labores, "repeticiones": repeticiones, "endpoints": resultados}
+
+
+# ==================== PROCESO PRINCIPAL ====================
+
+def _ocultar_url(url: str) -> str:
+    """La URL sin la contraseña, para mostrarla"""
+    if "@" in url and "://" in url:
+        esquema, resto = url.split("://", 1)
+        credenciales, servidor = resto.rsplit("@", 1)
+        return f"{esquema}://{credenciales.split(':')[0]}@{servidor}"
+    return url
+
+
+def imprimir(url: str, resultado: dict):
+    print(f"\n{resultado['motor']} ({_ocultar_url(url)}): {resultado['labores']} labores, "
+          f"{resultado['repeticiones']} pedidos por endpoint")
+    print(f"{'endpoint':<32}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}")
+    for fila in resultado["endpoints"]:
+        if fila["estado"] != 200:
+            print(f"{fila['nombre']:<32}{'HTTP ' + str(fila['estado']):>27}")
+            continue
+        consultas = str(fila["consultas"]) if fila["consultas_min"] == fila["consultas_max"] \
+            else f"{fila['consultas_min']}-{fila['consultas_max']}"
+        print(f"{fila['nombre']:<32}{fila['p50']:>9.1f}{fila['p95']:>9.1f}{fila['p99']:>9.1f}{consultas:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--motor", action="append", help="URL de base de datos (repetible); por defecto DATABASE_URL")
+    parser.add_argument("--generar", metavar="TAMANO", help="Regenerar el dataset antes de medir (1k, 100k, 1m...)")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--calentamiento", type=int, default=3, help="Pedidos descartados antes de medir")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--medir-en", help=argparse.SUPPRESS)  # modo subproceso
+    args = parser.parse_args()
+
+    if args.medir_en:
+        with open(args.medir_en, "w") as archivo:
+            json.dump(medir_motor(args.repeticiones, args.calentamiento), archivo)
+        return
+
+    motores = args.motor or [os.environ.get("DATABASE_URL")]
+    if not all(motores):
+        sys.exit("Indique --motor o defina DATABASE_URL")
+
+    resultados = {}
+    for url in motores:
+        entorno = {**os.environ, "DATABASE_URL": url}
+        if args.generar:
+            subprocess.run([sys.executable, GENERADOR, "--limpiar", "--crear-tablas"], env=entorno, check=True)
+            subprocess.run([sys.executable, GENERADOR, "--labores", args.generar, "--semilla", str(args.semilla)],
+                           env=entorno, check=True)
+        with tempfile.NamedTemporaryFile(suffix=".json") as salida:
+            subprocess.run([
+                sys.executable, os.path.abspath(__file__), "--medir-en", salida.name,
+                "--repeticiones", str(args.repeticiones), "--calentamiento", str(args.calentamiento),
+            ], env=entorno, check=True)
+            resultados[_ocultar_url(url)] = json.load(salida)
+        imprimir(url, resultados[_ocultar_url(url)])
+
+    if args.json:
+        with open(args.json, "w") as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de los endpoints de estadísticas (labores, recomendaciones, diagnósticos).
+
+Compara el esquema anterior (un COUNT por estado y por tipo) con el GROUP BY
+único de app/CRUD/estadisticas.py, contando consultas SQL y midiendo el tiempo.
+
+Uso:
+    python scripts/benchmarks/estadisticas.py [--email admin@ucaldas.edu.co] [--repeticiones 20]
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import func
+
+from app.db.database import SessionLocal
+from app.db.consultas_metricas import medir_consultas
+from app.db.models import Labor, Recomendacion, Diagnostico
+from app.CRUD.usuarios import get_usuario_by_email
+from app.CRUD.labores import obtener_estadisticas_labores_crud, _filtrar_labores_por_rol
+from app.CRUD.recomendaciones import obtener_estadisticas_recomendaciones
+from app.api.diagnosticos import obtener_estadisticas as obtener_estadisticas_diagnosticos
+
+
+# ==================== ESQUEMA ANTERIOR (referencia) ====================
+
+def _labores_por_estado(db, usuario):
+    query = _filtrar_labores_por_rol(db.query(Labor), usuario)
+    query.count()
+    for estado in ["pendiente", "en_progreso", "completada", "cancelada"]:
+        query.filter(Labor.estado == estado).count()
+    query.with_entities(func.avg(Labor.avance_porcentaje)).scalar()
+
+
+def _recomendaciones_por_estado(db, usuario):
+    query = db.query(Recomendacion)
+    if usuario.rol.nombre == "docente":
+        query = query.filter(Recomendacion.docente_id == usuario.id)
+    query.count()
+    for estado in ["pendiente", "aprobada", "en_ejecucion", "completada", "cancelada"]:
+        query.filter(Recomendacion.estado == estado).count()
+    for (tipo,) in db.query(Recomendacion.tipo).distinct().all():
+        if tipo:
+            query.filter(Recomendacion.tipo == tipo).count()
+
+
+def _diagnosticos_por_estado(db, usuario):
+    query = db.query(Diagnostico)
+    if usuario.rol.nombre not in ["docente", "asesor"]:
+        query = query.filter(Diagnostico.docente_id == usuario.id)
+    query.count()
+    for estado in ["abierto", "en_revision", "cerrado"]:
+        query.filter(Diagnostico.estado == estado).count()
+    for (tipo,) in db.query(Diagnostico.tipo).distinct():
+        if tipo:
+            query.filter(Diagnostico.tipo == tipo).count()
+
+
+CASOS = [
+    ("labores", _labores_por_estado, lambda db, u: obtener_estadisticas_labores_crud(db, u)),
+    ("recomendaciones", _recomendaciones_por_estado, lambda db, u: obtener_estadisticas_recomendaciones(db, u)),
+    ("diagnosticos", _diagnosticos_por_estado, lambda db, u: obtener_estadisticas_diagnosticos(db=db, user=u)),
+]
+
+
+def medir(funcion, db, usuario, repeticiones):
+    with medir_consultas() as medicion:
+        funcion(db, usuario)
+    consultas = medicion.consultas
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(db, usuario)
+    return consultas, (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", default="admin@ucaldas.edu.co", help="Usuario con el que se calculan las estadísticas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        usuario = get_usuario_by_email(db, args.email)
+        if not usuario:
+            print(f"❌ No existe el usuario {args.email}")
+            return
+        # Precargar relaciones usadas por los filtros de rol para no contarlas
+        _ = usuario.rol.nombre, list(usuario.programas)
+
+        print(f"Usuario: {usuario.email} ({usuario.rol.nombre}), {args.repeticiones} repeticiones\n")
+        print(f"{'estadística':<18}{'consultas antes':>16}{'consultas ahora':>16}{'ms antes':>12}{'ms ahora':>12}")
+        for nombre, anterior, actual in CASOS:
+            consultas_antes, ms_antes = medir(anterior, db, usuario, args.repeticiones)
+            consultas_ahora, ms_ahora = medir(actual, db, usuario, args.repeticiones)
+            print(f"{nombre:<18}{consultas_antes:>16}{consultas_ahora:>16}{ms_antes:>12.2f}{ms_ahora:>12.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Paginación por offset frente a cursor en /movimientos/herramientas: inserta movimientos
+sintéticos (cantidad 0, no alteran saldos), mide cuánto cuesta pedir la página N de cada
+forma y verifica que recorrer por cursor entregue las mismas filas, en el mismo orden y sin
+repetidas. Los movimientos de prueba se eliminan al terminar.
+
+Uso:
+    python scripts/benchmarks/paginacion_cursor.py [--filas 200000] [--limit 50] [--paginas 1 100 500 2000]
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.db.database import SessionLocal
+from app.db.models import Herramienta, MovimientoHerramienta
+from app.CRUD.movimientos import listar_movimientos_herramientas_crud
+
+MARCA = "benchmark-paginacion"
+
+
+def insertar_movimientos(db, herramienta_id: int, filas: int):
+    inicio = datetime.utcnow() - timedelta(days=365)
+    lote = []
+    for numero in range(filas):
+        lote.append({
+            "herramienta_id": herramienta_id, "cantidad": 0, "tipo_movimiento": "entrada",
+            # Varias filas por segundo: el id tiene que desempatar
+            "fecha_movimiento": inicio + timedelta(seconds=numero // 3),
+            "observaciones": MARCA,
+        })
+        if len(lote) == 10000:
+            db.execute(MovimientoHerramienta.__table__.insert(), lote)
+            lote = []
+    if lote:
+        db.execute(MovimientoHerramienta.__table__.insert(), lote)
+    db.commit()
+
+
+def medir(funcion, repeticiones: int = 5) -> float:
+    """Mediana en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return sorted(tiempos)[len(tiempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1, 100, 500, 2000])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        herramienta = db.query(Herramienta).first()
+        if not herramienta:
+            sys.exit("Se necesita al menos una herramienta")
+        insertar_movimientos(db, herramienta.id, args.filas)
+        total = db.query(MovimientoHerramienta).count()
+        print(f"{total} movimientos de herramientas ({args.filas} sintéticos), {args.limit} por página\n")
+
+        # Cursores de las páginas pedidas, recorriendo una vez (y verificando el recorrido)
+        objetivo = max(args.paginas)
+        cursores, vistos, cursor, pagina = {1: ""}, [], "", 1
+        while cursor is not None and pagina <= objetivo:
+            resultado = listar_movimientos_herramientas_crud(db, limit=args.limit, cursor=cursor)
+            vistos.extend(m["id"] for m in resultado["items"])
+            cursor = resultado["siguiente_cursor"]
+            pagina += 1
+            cursores[pagina] = cursor
+
+        por_offset = []
+        for numero in range(0, min(len(vistos), 1000 * args.limit), 1000):
+            por_offset.extend(m["id"] for m in listar_movimientos_herramientas_crud(db, skip=numero, limit=1000)["items"])
+        coinciden = vistos[:len(por_offset)] == por_offset[:len(vistos)]
+        print(f"Recorrido por cursor: {len(vistos)} filas, sin repetidas {len(set(vistos)) == len(vistos)}, "
+              f"mismo orden que por offset {coinciden}\n")
+
+        listar_movimientos_herramientas_crud(db, limit=args.limit)  # calentar conexión y caché
+        print(f"{'página':>8}{'offset+count ms':>18}{'offset ms':>12}{'cursor ms':>12}")
+        for numero in args.paginas:
+            if cursores.get(numero) is None:
+                continue
+            skip = (numero - 1) * args.limit
+            con_count = medir(lambda: listar_movimientos_herramientas_crud(db, skip=skip, limit=args.limit))
+            sin_count = medir(lambda: listar_movimientos_herramientas_crud(db, skip=skip, limit=args.limit, con_total=False))
+            keyset = medir(lambda: listar_movimientos_herramientas_crud(db, limit=args.limit, cursor=cursores[numero]))
+            print(f"{numero:>8}{con_count:>18.1f}{sin_count:>12.1f}{keyset:>12.1f}")
+    finally:
+        db.rollback()
+        db.query(MovimientoHerramienta).filter(MovimientoHerramienta.observaciones == MARCA).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Prueba de estrés de los descuentos de stock con muchos hilos sobre la misma herramienta.
+
+Compara el esquema anterior (leer cantidad_disponible, verificar en Python y restar el
+atributo ORM) con StockService (UPDATE ... WHERE cantidad_disponible >= :n RETURNING).
+Cada hilo asigna una unidad por vez hasta que se agota el stock. Se reporta cuántas
+asignaciones se registraron, si hubo sobreventa y el throughput.
+
+Crea una herramienta temporal y la elimina al terminar (junto con sus movimientos).
+
+Uso:
+    python scripts/benchmarks/stock_concurrencia.py [--hilos 16] [--stock 200]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from app.db.database import SessionLocal
+from app.db.models import Herramienta, MovimientoHerramienta
+from app.services.stock_service import StockService
+
+OBSERVACION = "benchmark stock_concurrencia"
+
+
+# ==================== ESQUEMA ANTERIOR (referencia) ====================
+
+def asignar_anterior(db, herramienta_id: int) -> bool:
+    herramienta = db.query(Herramienta).filter(Herramienta.id == herramienta_id).first()
+    if herramienta.cantidad_disponible < 1:
+        return False
+    db.add(MovimientoHerramienta(
+        herramienta_id=herramienta_id, cantidad=1, tipo_movimiento="salida", observaciones=OBSERVACION
+    ))
+    herramienta.cantidad_disponible -= 1
+    db.commit()
+    return True
+
+
+def asignar_servicio(db, herramienta_id: int) -> bool:
+    try:
+        StockService.ejecutar_con_reintentos(db, lambda: StockService.salida_herramienta(
+            db, herramienta_id, None, 1, OBSERVACION
+        ))
+        return True
+    except HTTPException:
+        return False
+
+
+# ==================== EJECUCIÓN ====================
+
+def correr(nombre: str, asignar, hilos: int, stock: int):
+    db = SessionLocal()
+    herramienta = Herramienta(
+        nombre=f"Benchmark stock {nombre}", cantidad_total=stock, cantidad_disponible=stock, estado="disponible"
+    )
+    db.add(herramienta)
+    db.commit()
+    herramienta_id = herramienta.id
+    db.close()
+
+    errores = []
+
+    def trabajador():
+        sesion = SessionLocal()
+        try:
+            while True:
+                try:
+                    if not asignar(sesion, herramienta_id):
+                        return
+                except DBAPIError as e:
+                    sesion.rollback()
+                    errores.append(type(e.orig).__name__)
+        finally:
+            sesion.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracion = time.perf_counter() - inicio
+
+    db = SessionLocal()
+    try:
+        asignadas = db.query(MovimientoHerramienta).filter(MovimientoHerramienta.herramienta_id == herramienta_id).count()
+        disponible = db.get(Herramienta, herramienta_id).cantidad_disponible
+
+        db.query(MovimientoHerramienta).filter(MovimientoHerramienta.herramienta_id == herramienta_id).delete()
+        db.query(Herramienta).filter(Herramienta.id == herramienta_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "asignadas": asignadas,
+        "sobreventa": max(asignadas - stock, 0),
+        "disponible_final": disponible,
+        "consistente": asignadas + disponible == stock,
+        "ops_s": asignadas / duracion if duracion else 0.0,
+        "errores": len(errores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--stock", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.hilos} hilos compitiendo por {args.stock} unidades de una herramienta\n")
+    print(f"{'modo':<12}{'asignadas':>11}{'sobreventa':>12}{'disp. final':>13}{'consistente':>13}{'ops/s':>10}{'errores':>9}")
+    for nombre, asignar in (("anterior", asignar_anterior), ("servicio", asignar_servicio)):
+        r = correr(nombre, asignar, args.hilos, args.stock)
+        print(
+            f"{nombre:<12}{r['asignadas']:>11}{r['sobreventa']:>12}{r['disponible_final']:>13}"
+            f"{str(r['consistente']):>13}{r['ops_s']:>10.1f}{r['errores']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Subida directa de evidencias al bucket (URLs prefirmadas) contra un S3 local (moto en
+modo servidor): PUT simple, multipart, rechazo de archivos que no coinciden con lo
+declarado y completación repetida. Compara los bytes que recibe la API con los del
+archivo subido, y cuenta los que lee del bucket dentro de la petición (deben ser 0: el
+sha256 lo verifica R2 con el checksum firmado o se calcula en segundo plano).
+
+Requiere moto[server] (solo para esta prueba): pip install "moto[server]"
+
+Uso:
+    python scripts/benchmarks/subida_directa.py [--mb 20] [--email admin@correo]
+"""
+import os
+import sys
+import time
+import socket
+import hashlib
+import logging
+import argparse
+import threading
+import subprocess
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import boto3
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.security import create_access_token
+from app.db.database import SessionLocal
+from app.db.models import Labor, Usuario, Rol
+from app.services import storage_service
+
+BUCKET = "benchmark-evidencias"
+# Hilos de segundo plano que leen del bucket (consolidación de blobs y derivados)
+HILOS_SEGUNDO_PLANO = ("blobs", "derivados")
+
+
+class LecturasBucket:
+    """Suma los bytes que la app descarga del bucket (GetObject), según el hilo que los pide"""
+
+    def __init__(self):
+        self.en_peticiones = 0
+        self.en_segundo_plano = 0
+
+    def __call__(self, parsed, **kwargs):
+        tamano = parsed.get("ContentLength") or 0
+        if threading.current_thread().name.startswith(HILOS_SEGUNDO_PLANO):
+            self.en_segundo_plano += tamano
+        else:
+            self.en_peticiones += tamano
+
+
+lecturas = LecturasBucket()
+
+
+def iniciar_moto():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(puerto)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    cliente = boto3.client(
+        "s3", endpoint_url=f"http://127.0.0.1:{puerto}", region_name="us-east-1",
+        aws_access_key_id="prueba", aws_secret_access_key="prueba"
+    )
+    cliente.create_bucket(Bucket=BUCKET)
+    cliente.meta.events.register("after-call.s3.GetObject", lecturas)
+    storage_service.s3 = cliente
+    storage_service.bucket_name = BUCKET
+    return proceso
+
+
+class ContadorBytes:
+    """Middleware ASGI que suma los bytes de cuerpo recibidos por la API"""
+
+    def __init__(self, app):
+        self.app = app
+        self.total = 0
+
+    async def __call__(self, scope, receive, send):
+        async def contar():
+            mensaje = await receive()
+            self.total += len(mensaje.get("body", b""))
+            return mensaje
+        await self.app(scope, contar if scope["type"] == "http" else receive, send)
+
+
+def subir(api, bucket, headers, contenido: bytes, content_type: str, labor_id: int, enviado: bytes = None,
+          declarar_sha256: bool = False):
+    """Flujo completo; `enviado` permite subir algo distinto de lo declarado"""
+    datos_sesion = {
+        "tipo": "video" if content_type.startswith("video/") else "imagen",
+        "descripcion": "Evidencia de prueba subida directo al bucket",
+        "tipo_entidad": "labor",
+        "entidad_id": labor_id,
+        "nombre_archivo": "prueba.mp4" if content_type.startswith("video/") else "prueba.jpg",
+        "content_type": content_type,
+        "tamano": len(contenido),
+    }
+    if declarar_sha256:
+        datos_sesion["sha256"] = hashlib.sha256(contenido).hexdigest()
+    sesion = api.post("/api/evidencias/subidas", headers=headers, json=datos_sesion)
+    assert sesion.status_code == 200, sesion.text
+    sesion = sesion.json()
+    datos = contenido if enviado is None else enviado
+
+    partes = []
+    if sesion["metodo"] == "put":
+        cabeceras = {"Content-Type": content_type}
+        if sesion.get("checksum_sha256"):
+            cabeceras["x-amz-checksum-sha256"] = sesion["checksum_sha256"]
+        respuesta = bucket.put(sesion["url"], content=datos, headers=cabeceras)
+        assert respuesta.status_code == 200, respuesta.text
+    else:
+        tamano = sesion["tamano_parte"]
+        for parte in sesion["partes"]:
+            inicio = (parte["numero"] - 1) * tamano
+            respuesta = bucket.put(parte["url"], content=datos[inicio:inicio + tamano])
+            assert respuesta.status_code == 200, respuesta.text
+            partes.append({"numero": parte["numero"], "etag": respuesta.headers["ETag"]})
+
+    completar = api.post(f"/api/evidencias/subidas/{sesion['id']}/completar", headers=headers, json={"partes": partes})
+    return sesion, partes, completar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=20, help="Tamaño del archivo multipart")
+    parser.add_argument("--email", default=None, help="Usuario con el que se sube (por defecto, un admin)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    db = SessionLocal()
+    labor = db.query(Labor).first()
+    query = db.query(Usuario)
+    usuario = query.filter(Usuario.email == args.email).first() if args.email else \
+        query.join(Rol).filter(Rol.nombre == "admin").first()
+    db.close()
+    if not labor or not usuario:
+        sys.exit("Se necesita al menos una labor y un usuario")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': usuario.email})}"}
+
+    proceso = iniciar_moto()
+    contador = ContadorBytes(app)
+    try:
+        with TestClient(contador) as api, httpx.Client(timeout=None) as bucket:
+            pequeno = os.urandom(512 * 1024)
+            grande = os.urandom(args.mb * 1024 * 1024)
+
+            print(f"{'caso':<28}{'estado':>8}{'archivo MB':>12}{'a la API KB':>13}{'leído bucket KB':>17}")
+            casos = [
+                ("put simple", pequeno, "image/jpeg", None, False),
+                ("put con sha256", os.urandom(512 * 1024), "image/jpeg", None, True),
+                ("multipart", grande, "video/mp4", None, False),
+                ("tamaño distinto", pequeno, "image/jpeg", pequeno[:-10], False),
+            ]
+            for nombre, contenido, content_type, enviado, declarar_sha256 in casos:
+                antes, leidos_antes = contador.total, lecturas.en_peticiones
+                sesion, partes, completar = subir(api, bucket, headers, contenido, content_type, labor.id, enviado,
+                                                  declarar_sha256)
+                print(f"{nombre:<28}{completar.status_code:>8}{len(contenido) / 2**20:>12.1f}"
+                      f"{(contador.total - antes) / 1024:>13.1f}{(lecturas.en_peticiones - leidos_antes) / 1024:>17.1f}")
+                if nombre == "multipart":
+                    repetida = api.post(f"/api/evidencias/subidas/{sesion['id']}/completar", headers=headers, json={"partes": partes})
+                    misma = repetida.status_code == 200 and repetida.json()["id"] == completar.json()["id"]
+                    print(f"{'completar de nuevo':<28}{repetida.status_code:>8}   misma evidencia: {misma}")
+                    key = storage_service.key_de_url_r2(completar.json()["url_archivo"])
+                    objeto = storage_service.descargar_r2(key)
+                    print(f"{'objeto idéntico':<28}{str(objeto == grande):>8}")
+                if nombre == "tamaño distinto":
+                    print(f"{'':<28}{completar.json()['detail']}")
+
+            # El hash de las subidas sin sha256 verificado se calcula después, fuera de la petición
+            limite = time.monotonic() + 60
+            while lecturas.en_segundo_plano < len(pequeno) + len(grande) and time.monotonic() < limite:
+                time.sleep(0.2)
+            print(f"\nLeídos del bucket en segundo plano: {lecturas.en_segundo_plano / 2**20:.1f} MB")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
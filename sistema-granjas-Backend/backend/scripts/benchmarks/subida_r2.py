@@ -0,0 +1,184 @@
+"""
+Subidas a R2 contra un S3 local (moto en modo servidor, en otro proceso):
+
+1. Memoria: pico de tracemalloc al subir un archivo leyéndolo entero (esquema anterior:
+   bytes + BytesIO + upload_fileobj) frente a subir_stream_r2 por partes. Se verifica
+   que el objeto subido sea idéntico (tamaño y MD5).
+2. Event loop: latencia de /api/health mientras llegan varias subidas concurrentes al
+   endpoint anterior (await file.read() y boto3 en el loop) y a /api/files/upload.
+
+Requiere moto[server] (solo para esta prueba): pip install "moto[server]"
+
+Uso:
+    python scripts/benchmarks/subida_r2.py [--mb 64] [--parte-mb 8] [--concurrentes 3]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import hashlib
+import logging
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from io import BytesIO
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import boto3
+import httpx
+from fastapi import UploadFile, File
+
+from app.main import app
+from app.core.config import settings
+from app.services import storage_service
+
+BUCKET = "benchmark-evidencias"
+
+
+# ==================== S3 LOCAL ====================
+
+def iniciar_moto():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "moto.server", "-p", str(puerto)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    cliente = boto3.client(
+        "s3", endpoint_url=f"http://127.0.0.1:{puerto}", region_name="us-east-1",
+        aws_access_key_id="prueba", aws_secret_access_key="prueba"
+    )
+    cliente.create_bucket(Bucket=BUCKET)
+    # El servicio usa el cliente y bucket del módulo
+    storage_service.s3 = cliente
+    storage_service.bucket_name = BUCKET
+    return proceso, cliente
+
+
+def crear_archivo(mb: int) -> str:
+    descriptor, ruta = tempfile.mkstemp(suffix=".bin")
+    with os.fdopen(descriptor, "wb") as archivo:
+        for _ in range(mb):
+            archivo.write(os.urandom(1024 * 1024))
+    return ruta
+
+
+def md5_archivo(ruta: str) -> str:
+    md5 = hashlib.md5()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+            md5.update(bloque)
+    return md5.hexdigest()
+
+
+def md5_objeto(cliente, key: str) -> str:
+    md5 = hashlib.md5()
+    for bloque in cliente.get_object(Bucket=BUCKET, Key=key)["Body"].iter_chunks(1024 * 1024):
+        md5.update(bloque)
+    return md5.hexdigest()
+
+
+# ==================== MEMORIA ====================
+
+def subir_anterior(ruta: str, key: str):
+    with open(ruta, "rb") as archivo:
+        contenido = archivo.read()
+    storage_service.s3.upload_fileobj(
+        Fileobj=BytesIO(contenido), Bucket=BUCKET, Key=key, ExtraArgs={"ContentType": "video/mp4"}
+    )
+
+
+def subir_streaming(ruta: str, key: str):
+    with open(ruta, "rb") as archivo:
+        storage_service.subir_stream_r2(archivo, key, "video/mp4")
+
+
+def pico_memoria(funcion, *args) -> float:
+    tracemalloc.start()
+    try:
+        funcion(*args)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+# ==================== EVENT LOOP ====================
+
+async def _upload_anterior(file: UploadFile = File(...)):
+    contents = await file.read()
+    return {"url": storage_service.upload_file_r2(contents, file.filename, file.content_type)}
+
+app.add_api_route("/benchmark/upload-anterior", _upload_anterior, methods=["POST"])
+
+
+async def latencia_health(url_subida: str, ruta: str, concurrentes: int):
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=None) as cliente:
+        with open(ruta, "rb") as archivo:
+            contenido = archivo.read()
+        latencias, terminado = [], asyncio.Event()
+
+        async def sondear():
+            while not terminado.is_set():
+                inicio = time.perf_counter()
+                await cliente.get("/api/health")
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                await asyncio.sleep(0.02)
+
+        async def subir(indice):
+            respuesta = await cliente.post(
+                url_subida, files={"file": (f"benchmark-loop-{indice}.mp4", contenido, "video/mp4")}
+            )
+            return respuesta.status_code
+
+        sonda = asyncio.create_task(sondear())
+        inicio = time.perf_counter()
+        estados = await asyncio.gather(*(subir(i) for i in range(concurrentes)))
+        duracion = time.perf_counter() - inicio
+        terminado.set()
+        await sonda
+        return max(latencias), len(latencias), duracion, estados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=64, help="Tamaño del archivo de prueba")
+    parser.add_argument("--parte-mb", type=int, default=settings.R2_TAMANO_PARTE_MB)
+    parser.add_argument("--concurrentes", type=int, default=3)
+    args = parser.parse_args()
+    settings.R2_TAMANO_PARTE_MB = args.parte_mb
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    proceso, cliente = iniciar_moto()
+    ruta = crear_archivo(args.mb)
+    try:
+        md5 = md5_archivo(ruta)
+        print(f"Archivo de {args.mb} MB, partes de {args.parte_mb} MB\n")
+        print(f"{'modo':<12}{'pico MB':>10}{'idéntico':>10}")
+        for nombre, funcion in (("anterior", subir_anterior), ("streaming", subir_streaming)):
+            key = f"benchmark-{nombre}.bin"
+            pico = pico_memoria(funcion, ruta, key)
+            print(f"{nombre:<12}{pico:>10.1f}{str(md5_objeto(cliente, key) == md5):>10}")
+
+        print(f"\n{args.concurrentes} subidas concurrentes; latencia de /api/health durante las subidas")
+        print(f"{'modo':<12}{'máx ms':>10}{'sondeos':>10}{'duración s':>12}{'estados':>16}")
+        for nombre, url in (("anterior", "/benchmark/upload-anterior"), ("streaming", "/api/files/upload")):
+            maximo, sondeos, duracion, estados = asyncio.run(latencia_health(url, ruta, args.concurrentes))
+            print(f"{nombre:<12}{maximo:>10.1f}{sondeos:>10}{duracion:>12.2f}{str(estados):>16}")
+    finally:
+        os.remove(ruta)
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
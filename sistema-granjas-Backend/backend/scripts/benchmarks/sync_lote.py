@@ -0,0 +1,94 @@
+"""
+Benchmark de /api/sync/batch: tiempo de un lote de diagnósticos creados offline y de
+su reenvío (todos duplicados), frente a enviar los mismos ítems de a uno a /api/sync.
+
+Los diagnósticos y operaciones creados se eliminan al terminar.
+
+Uso:
+    python scripts/benchmarks/sync_lote.py --email estudiante@ucaldas.edu.co --lote-id 1
+        [--items 1000]
+"""
+import os
+import sys
+import time
+import uuid
+import logging
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import Diagnostico, SyncOperacion, Usuario
+from app.core.security import create_access_token
+
+
+def generar_items(cantidad: int, estudiante_id: int, lote_id: int):
+    return [{
+        "cliente_id": str(uuid.uuid4()),
+        "tipo": "diagnostico",
+        "createdAt": "2026-01-15T10:00:00Z",
+        "data": {
+            "tipo": "plagas",
+            "descripcion": f"Registro de benchmark de sincronización {i}",
+            "estudiante_id": estudiante_id,
+            "lote_id": lote_id,
+        },
+    } for i in range(cantidad)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True, help="Usuario que sincroniza (se usa como estudiante de los diagnósticos)")
+    parser.add_argument("--lote-id", type=int, required=True)
+    parser.add_argument("--items", type=int, default=1000)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    db = SessionLocal()
+    usuario_id = db.query(Usuario.id).filter(Usuario.email == args.email).scalar()
+    db.close()
+    if not usuario_id:
+        print(f"❌ No existe el usuario {args.email}")
+        return
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': args.email})}"}
+    ids_clientes = []
+    try:
+        with TestClient(app) as cliente:
+            print(f"{'caso':<28}{'items':>7}{'ms':>10}{'aplicados':>11}{'duplicados':>12}")
+
+            items = generar_items(args.items, usuario_id, args.lote_id)
+            ids_clientes += [item["cliente_id"] for item in items]
+            for caso in ("lote", "reenvío del lote"):
+                inicio = time.perf_counter()
+                respuesta = cliente.post("/api/sync/batch", json={"items": items}, headers=headers).json()
+                ms = (time.perf_counter() - inicio) * 1000
+                print(f"{caso:<28}{args.items:>7}{ms:>10.1f}{respuesta['aplicados']:>11}{respuesta['duplicados']:>12}")
+
+            individuales = generar_items(min(args.items, 200), usuario_id, args.lote_id)
+            ids_clientes += [item["cliente_id"] for item in individuales]
+            inicio = time.perf_counter()
+            aplicados = sum(
+                cliente.post("/api/sync", json=item, headers=headers).json()["estado"] == "aplicado"
+                for item in individuales
+            )
+            ms = (time.perf_counter() - inicio) * 1000
+            print(f"{'de a uno (/api/sync)':<28}{len(individuales):>7}{ms:>10.1f}{aplicados:>11}{0:>12}")
+    finally:
+        db = SessionLocal()
+        try:
+            operaciones = db.query(SyncOperacion).filter(
+                SyncOperacion.usuario_id == usuario_id, SyncOperacion.cliente_id.in_(ids_clientes)
+            )
+            recursos = [operacion.recurso_id for operacion in operaciones]
+            operaciones.delete(synchronize_session=False)
+            db.query(Diagnostico).filter(Diagnostico.id.in_(recursos)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+Dataset sintético para pruebas de rendimiento: programas, usuarios de cada rol, granjas,
+lotes, diagnósticos, recomendaciones, labores y sus movimientos de inventario y
+evidencias, enlazados como en producción (la labor es del lote de su recomendación, el
+trabajador es de un programa del lote, las fechas avanzan diagnóstico → recomendación →
+labor → movimientos y el estado depende de la antigüedad).
+
+El tamaño se da en labores (1k, 100k, 1m o un número); el resto escala con él. Las filas
+se insertan por lotes con ids explícitos, así la misma semilla da el mismo dataset. Todo
+lo generado queda marcado (usuarios @dataset.granjas, descripción/ubicación MARCA) y
+--limpiar lo elimina.
+
+Uso:
+    python scripts/generar_dataset.py --labores 100k [--semilla 7] [--crear-tablas]
+    python scripts/generar_dataset.py --limpiar
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, delete, func, or_, select, text
+
+from app.db.database import Base, SessionLocal, engine
+from app.CRUD.inicializacion import inicializar_tipos_lote, inicializar_categorias_inventario
+from app.db.models import (
+    Rol, Usuario, Programa, Granja, Lote, TipoLote, CategoriaInventario, Herramienta, Insumo,
+    TipoLabor, Diagnostico, Recomendacion, Labor, Evidencia, EvidenciaPendiente,
+    MovimientoHerramienta, MovimientoInsumo, AsignacionHerramienta, SyncOperacion,
+    usuario_granja, granja_programa, usuario_programa
+)
+
+MARCA = "dataset-sintetico"
+DOMINIO = "dataset.granjas"
+TAMANOS = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+TAMANO_LOTE = 10_000
+DIAS = 730
+
+ROLES = {
+    "admin": 100, "docente": 50, "asesor": 40, "talento_humano": 30, "estudiante": 20, "trabajador": 10,
+}
+PROGRAMAS = [("Café", "agricola"), ("Plátano", "agricola"), ("Aguacate", "agricola"), ("Porcinos", "pecuario")]
+TIPOS_LABOR = ["Fertilización", "Riego", "Poda", "Cosecha", "Control de arvenses", "Fumigación", "Siembra", "Monitoreo"]
+TIPOS_DIAGNOSTICO = ["nutricional", "plagas", "controladores_biológicos", "fenología"]
+TIPOS_RECOMENDACION = [
+    "Aplicación al suelo", "Aplicación foliar", "podas", "Cosecha y saneamiento",
+    "Manejo de arvenses", "Censo poblacional", "Hormiga arriera", "otro",
+]
+HERRAMIENTAS = ["Machete", "Pala", "Azadón", "Bomba de espalda", "Tijera de poda", "Guadaña", "Carretilla", "Palín"]
+INSUMOS = [("Urea", "kg"), ("DAP", "kg"), ("Cal dolomita", "kg"), ("Fungicida cúprico", "L"), ("Insecticida", "L")]
+
+
+def parsear_tamano(valor: str) -> int:
+    valor = valor.strip().lower()
+    if valor in TAMANOS:
+        return TAMANOS[valor]
+    try:
+        return int(valor.replace("_", ""))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamaño inválido: {valor} (use {', '.join(TAMANOS)} o un número)")
+
+
+class Insertador:
+    """Acumula filas por tabla y las inserta por lotes, respetando el orden de las FK"""
+
+    def __init__(self, db, orden: list):
+        self.db = db
+        self.pendientes = {tabla: [] for tabla in orden}
+        self.insertadas = defaultdict(int)
+
+    def agregar(self, tabla, fila: dict):
+        self.pendientes[tabla].append(fila)
+        if len(self.pendientes[tabla]) >= TAMANO_LOTE:
+            self.vaciar()
+
+    def vaciar(self):
+        # Padres antes que hijos
+        for tabla, filas in self.pendientes.items():
+            if filas:
+                self.db.execute(tabla.insert(), filas)
+                self.insertadas[tabla.name] += len(filas)
+                filas.clear()
+        self.db.commit()
+
+
+class GeneradorDataset:
+
+    def __init__(self, db, labores: int, semilla: int):
+        self.db = db
+        self.labores = labores
+        self.rnd = random.Random(semilla)
+        self.ahora = datetime.utcnow().replace(microsecond=0)
+        self.insertador = Insertador(db, [
+            getattr(modelo, "__table__", modelo) for modelo in (
+                Programa, TipoLabor, Usuario, usuario_programa, Granja, granja_programa, usuario_granja, Lote,
+                Herramienta, Insumo, Diagnostico, Recomendacion, Labor, MovimientoHerramienta, MovimientoInsumo, Evidencia,
+            )
+        ])
+        self._ids = {}
+
+    def _nuevo_id(self, modelo) -> int:
+        tabla = modelo.__table__.name
+        if tabla not in self._ids:
+            self._ids[tabla] = (self.db.query(func.max(modelo.id)).scalar() or 0)
+        self._ids[tabla] += 1
+        return self._ids[tabla]
+
+    def _fecha(self, desde: datetime = None, max_dias: float = None) -> datetime:
+        """Fecha aleatoria en la ventana, o hasta max_dias después de `desde` (sin pasar de hoy)"""
+        if desde is None:
+            return self.ahora - timedelta(seconds=self.rnd.uniform(0, DIAS * 86400))
+        fecha = desde + timedelta(seconds=self.rnd.uniform(0, max_dias * 86400))
+        return min(fecha, self.ahora)
+
+    def _estado(self, fecha: datetime, recientes: list, antiguos: list) -> str:
+        """Lo reciente suele estar abierto; lo de hace más de 60 días, cerrado"""
+        estados, pesos = zip(*(antiguos if (self.ahora - fecha).days > 60 else recientes))
+        return self.rnd.choices(estados, pesos)[0]
+
+    def _insertar(self, modelo, fila: dict) -> int:
+        if "id" not in fila:
+            fila["id"] = self._nuevo_id(modelo)
+        self.insertador.agregar(getattr(modelo, "__table__", modelo), fila)
+        return fila["id"]
+
+    # ==================== CATÁLOGOS Y USUARIOS ====================
+
+    def _roles(self) -> dict:
+        roles = {rol.nombre: rol.id for rol in self.db.query(Rol).all()}
+        for nombre, nivel in ROLES.items():
+            if nombre not in roles:
+                rol = Rol(nombre=nombre, descripcion=f"Rol {nombre}", nivel_permiso=nivel)
+                self.db.add(rol)
+                self.db.flush()
+                roles[nombre] = rol.id
+        self.db.commit()
+        return roles
+
+    def _catalogos(self):
+        inicializar_tipos_lote(self.db)
+        inicializar_categorias_inventario(self.db)
+        self.tipo_lote_id = self.db.query(TipoLote.id).order_by(TipoLote.id).limit(1).scalar()
+        self.categorias = dict(self.db.query(CategoriaInventario.nombre, CategoriaInventario.id).all())
+        self.programas = [
+            self._insertar(Programa, {"nombre": f"{nombre} (sintético)", "tipo": tipo, "descripcion": MARCA,
+                                      "activo": True, "fecha_creacion": self.ahora - timedelta(days=DIAS)})
+            for nombre, tipo in PROGRAMAS
+        ]
+        self.tipos_labor = [
+            self._insertar(TipoLabor, {"nombre": nombre, "descripcion": MARCA}) for nombre in TIPOS_LABOR
+        ]
+
+    def _usuarios(self):
+        roles = self._roles()
+        n = self.labores
+        cantidades = {
+            "admin": 1, "docente": max(2, n // 5000), "asesor": 1, "estudiante": max(4, n // 1000),
+            "trabajador": max(4, n // 200), "talento_humano": len(self.programas),
+        }
+        self.usuarios = defaultdict(list)
+        self.programas_de = {}
+        self.trabajadores_por_programa = defaultdict(list)
+        for rol, cantidad in cantidades.items():
+            for numero in range(cantidad):
+                usuario_id = self._insertar(Usuario, {
+                    "nombre": f"{rol.replace('_', ' ').title()} {numero + 1}",
+                    "email": f"{rol}{numero + 1}@{DOMINIO}", "rol_id": roles[rol], "activo": True,
+                    "auth_provider": "traditional", "fecha_creacion": self.ahora - timedelta(days=DIAS),
+                })
+                self.usuarios[rol].append(usuario_id)
+                # Uno o, a veces, dos programas por persona; talento_humano, uno cada uno
+                programas = [self.programas[numero % len(self.programas)]]
+                if rol != "talento_humano" and self.rnd.random() < 0.1:
+                    programas.append(self.rnd.choice(self.programas))
+                self.programas_de[usuario_id] = set(programas)
+                for programa_id in self.programas_de[usuario_id]:
+                    self.insertador.agregar(usuario_programa, {"usuario_id": usuario_id, "programa_id": programa_id})
+                    if rol == "trabajador":
+                        self.trabajadores_por_programa[programa_id].append(usuario_id)
+
+    # ==================== GRANJAS, LOTES E INVENTARIO ====================
+
+    def _granjas_y_lotes(self):
+        lotes = max(4, self.labores // 250)
+        self.granjas = [
+            self._insertar(Granja, {"nombre": f"Granja sintética {numero + 1}", "ubicacion": MARCA,
+                                    "activo": True, "fecha_creacion": self.ahora - timedelta(days=DIAS)})
+            for numero in range(max(2, lotes // 80))
+        ]
+        programas_granja = defaultdict(set)
+        self.lotes = []  # (id, programa_id)
+        for numero in range(lotes):
+            granja_id = self.granjas[numero % len(self.granjas)]
+            programa_id = self.programas[numero % len(self.programas)]
+            programas_granja[granja_id].add(programa_id)
+            lote_id = self._insertar(Lote, {
+                "nombre": f"Lote {numero + 1}", "tipo_lote_id": self.tipo_lote_id, "granja_id": granja_id,
+                "programa_id": programa_id, "nombre_cultivo": PROGRAMAS[self.programas.index(programa_id)][0],
+                "fecha_inicio": self.ahora - timedelta(days=DIAS), "estado": "activo",
+                "fecha_actualizacion": self.ahora - timedelta(days=self.rnd.uniform(0, DIAS)),
+            })
+            self.lotes.append((lote_id, programa_id))
+        for granja_id, programas in programas_granja.items():
+            for programa_id in programas:
+                self.insertador.agregar(granja_programa, {"granja_id": granja_id, "programa_id": programa_id})
+        for rol in ("docente", "estudiante", "trabajador", "talento_humano"):
+            for usuario_id in self.usuarios[rol]:
+                self.insertador.agregar(usuario_granja, {"usuario_id": usuario_id, "granja_id": self.rnd.choice(self.granjas)})
+
+        self.herramientas = [
+            self._insertar(Herramienta, {"nombre": nombre, "descripcion": MARCA,
+                                         "categoria_id": self.categorias.get("herramienta"),
+                                         "cantidad_total": 0, "cantidad_disponible": 0, "estado": "disponible",
+                                         "fecha_actualizacion": self.ahora})
+            for nombre in HERRAMIENTAS
+        ]
+        self.insumos_por_programa = {
+            programa_id: [
+                self._insertar(Insumo, {"nombre": nombre, "descripcion": MARCA, "programa_id": programa_id,
+                                        "cantidad_total": 0.0, "cantidad_disponible": 0.0, "unidad_medida": unidad,
+                                        "nivel_alerta": 10.0, "estado": "disponible", "fecha_actualizacion": self.ahora})
+                for nombre, unidad in INSUMOS
+            ]
+            for programa_id in self.programas
+        }
+        self.insertador.vaciar()
+
+    # ==================== DIAGNÓSTICOS Y RECOMENDACIONES ====================
+
+    def _evidencia(self, usuario_id: int, fecha: datetime, labor_id=None, diagnostico_id=None, recomendacion_id=None):
+        tipo = self.rnd.choices(["imagen", "documento", "video"], [8, 1, 1])[0]
+        extension = {"imagen": "jpg", "documento": "pdf", "video": "mp4"}[tipo]
+        evidencia_id = self._nuevo_id(Evidencia)
+        self._insertar(Evidencia, {
+            "id": evidencia_id, "tipo": tipo, "descripcion": f"Registro de campo {evidencia_id}",
+            "url_archivo": f"https://{DOMINIO}/evidencias/{evidencia_id}.{extension}",
+            "labor_id": labor_id, "diagnostico_id": diagnostico_id, "recomendacion_id": recomendacion_id,
+            "usuario_id": usuario_id, "fecha_creacion": fecha,
+        })
+
+    def _diagnosticos(self):
+        self.diagnosticos = []  # (id, lote_id, docente_id, fecha)
+        for _ in range(max(1, self.labores // 8)):
+            lote_id, _programa = self.rnd.choice(self.lotes)
+            fecha = self._fecha()
+            estado = self._estado(fecha, [("abierto", 5), ("en_revision", 3), ("cerrado", 2)],
+                                  [("en_revision", 1), ("cerrado", 9)])
+            docente_id, estudiante_id = self.rnd.choice(self.usuarios["docente"]), self.rnd.choice(self.usuarios["estudiante"])
+            diagnostico_id = self._insertar(Diagnostico, {
+                "tipo": self.rnd.choice(TIPOS_DIAGNOSTICO),
+                "descripcion": "Observación en campo de síntomas en hojas y frutos del lote",
+                "estudiante_id": estudiante_id, "docente_id": docente_id, "lote_id": lote_id, "estado": estado,
+                "fecha_creacion": fecha,
+                "fecha_revision": self._fecha(fecha, 10) if estado != "abierto" else None,
+                "observaciones": "Revisado por el docente" if estado == "cerrado" else None,
+            })
+            self.diagnosticos.append((diagnostico_id, lote_id, docente_id, fecha))
+            if self.rnd.random() < 0.5:
+                self._evidencia(estudiante_id, fecha, diagnostico_id=diagnostico_id)
+
+        self.recomendaciones = []  # (id, lote_id, programa_id, fecha)
+        programa_de_lote = dict(self.lotes)
+        for _ in range(max(1, self.labores // 4)):
+            diagnostico_id = None
+            if self.rnd.random() < 0.6:
+                diagnostico_id, lote_id, docente_id, origen = self.rnd.choice(self.diagnosticos)
+                fecha = self._fecha(origen, 15)
+            else:
+                lote_id, docente_id, fecha = self.rnd.choice(self.lotes)[0], self.rnd.choice(self.usuarios["docente"]), self._fecha()
+            estado = self._estado(fecha, [("pendiente", 3), ("aprobada", 3), ("en_ejecucion", 3), ("completada", 1)],
+                                  [("completada", 8), ("cancelada", 1), ("en_ejecucion", 1)])
+            recomendacion_id = self._insertar(Recomendacion, {
+                "titulo": f"{self.rnd.choice(TIPOS_RECOMENDACION)} en lote {lote_id}",
+                "descripcion": "Aplicar según el plan técnico y registrar el avance en cada labor",
+                "tipo": self.rnd.choice(TIPOS_RECOMENDACION), "estado": estado, "docente_id": docente_id,
+                "lote_id": lote_id, "diagnostico_id": diagnostico_id, "fecha_creacion": fecha,
+                "fecha_aprobacion": self._fecha(fecha, 5) if estado != "pendiente" else None,
+            })
+            self.recomendaciones.append((recomendacion_id, lote_id, programa_de_lote[lote_id], fecha))
+            if self.rnd.random() < 0.1:
+                self._evidencia(docente_id, fecha, recomendacion_id=recomendacion_id)
+        self.insertador.vaciar()
+
+    # ==================== LABORES, MOVIMIENTOS Y EVIDENCIAS ====================
+
+    def _labores(self):
+        salidas_herramientas, entradas_herramientas, salidas_insumos = defaultdict(int), defaultdict(int), defaultdict(float)
+        for numero in range(self.labores):
+            recomendacion_id, lote_id, programa_id, origen = self.rnd.choice(self.recomendaciones)
+            trabajador_id = self.rnd.choice(self.trabajadores_por_programa[programa_id] or self.usuarios["trabajador"])
+            asignacion = self._fecha(origen, 20)
+            estado = self._estado(asignacion, [("pendiente", 4), ("en_progreso", 4), ("completada", 2)],
+                                  [("completada", 8), ("cancelada", 1), ("en_progreso", 1)])
+            finalizacion = self._fecha(asignacion, 10) if estado == "completada" else None
+            labor_id = self._insertar(Labor, {
+                "estado": estado, "tipo_labor_id": self.rnd.choice(self.tipos_labor),
+                "avance_porcentaje": {"completada": 100, "pendiente": 0}.get(estado, self.rnd.randint(5, 95)),
+                "comentario": "Labor registrada en campo" if estado != "pendiente" else None,
+                "fecha_asignacion": asignacion, "fecha_finalizacion": finalizacion,
+                "fecha_actualizacion": finalizacion or asignacion,
+                "recomendacion_id": recomendacion_id, "trabajador_id": trabajador_id, "lote_id": lote_id,
+            })
+
+            if estado != "pendiente" and self.rnd.random() < 0.35:
+                herramienta_id, cantidad = self.rnd.choice(self.herramientas), self.rnd.randint(1, 2)
+                salida = self._fecha(asignacion, 1)
+                self._insertar(MovimientoHerramienta, {
+                    "herramienta_id": herramienta_id, "labor_id": labor_id, "cantidad": cantidad,
+                    "tipo_movimiento": "salida", "fecha_movimiento": salida, "observaciones": "Asignada a la labor",
+                })
+                salidas_herramientas[herramienta_id] += cantidad
+                if finalizacion:
+                    self._insertar(MovimientoHerramienta, {
+                        "herramienta_id": herramienta_id, "labor_id": labor_id, "cantidad": cantidad,
+                        "tipo_movimiento": "entrada", "fecha_movimiento": max(salida, finalizacion),
+                        "observaciones": "Devolución al completar",
+                    })
+                    entradas_herramientas[herramienta_id] += cantidad
+            if estado != "pendiente" and self.rnd.random() < 0.5:
+                insumo_id, cantidad = self.rnd.choice(self.insumos_por_programa[programa_id]), float(self.rnd.randint(1, 20))
+                self._insertar(MovimientoInsumo, {
+                    "insumo_id": insumo_id, "labor_id": labor_id, "cantidad": cantidad, "tipo_movimiento": "salida",
+                    "fecha_movimiento": self._fecha(asignacion, 2), "observaciones": "Consumo de la labor",
+                })
+                salidas_insumos[insumo_id] += cantidad
+            if estado != "pendiente" and self.rnd.random() < 0.3:
+                self._evidencia(trabajador_id, finalizacion or asignacion, labor_id=labor_id)
+
+            if (numero + 1) % 100_000 == 0:
+                print(f"   {numero + 1} labores...")
+        self.insertador.vaciar()
+
+        # Existencias coherentes con los movimientos: lo prestado y lo consumido ya salió
+        herramientas = [
+            {"b_id": herramienta_id, "total": total, "disponible": total - salidas_herramientas[herramienta_id] + entradas_herramientas[herramienta_id]}
+            for herramienta_id in self.herramientas
+            for total in [salidas_herramientas[herramienta_id] - entradas_herramientas[herramienta_id] + self.rnd.randint(10, 50)]
+        ]
+        self.db.execute(
+            Herramienta.__table__.update().where(Herramienta.__table__.c.id == bindparam("b_id"))
+            .values(cantidad_total=bindparam("total"), cantidad_disponible=bindparam("disponible")),
+            herramientas
+        )
+        insumos = [
+            {"b_id": insumo_id, "total": salidas_insumos[insumo_id] + existencia, "disponible": existencia}
+            for ids in self.insumos_por_programa.values() for insumo_id in ids
+            for existencia in [float(self.rnd.randint(0, 500))]
+        ]
+        self.db.execute(
+            Insumo.__table__.update().where(Insumo.__table__.c.id == bindparam("b_id"))
+            .values(cantidad_total=bindparam("total"), cantidad_disponible=bindparam("disponible")),
+            insumos
+        )
+        self.db.commit()
+
+    def _ajustar_secuencias(self):
+        """Con ids explícitos las secuencias de PostgreSQL quedan atrás: llevarlas al máximo"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        for tabla in self._ids:
+            self.db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), (SELECT MAX(id) FROM {tabla}))"
+            ))
+        self.db.commit()
+
+    def generar(self) -> dict:
+        self._catalogos()
+        self._usuarios()
+        self._granjas_y_lotes()
+        print(f"   {len(self.lotes)} lotes en {len(self.granjas)} granjas, {sum(map(len, self.usuarios.values()))} usuarios")
+        self._diagnosticos()
+        print(f"   {len(self.diagnosticos)} diagnósticos, {len(self.recomendaciones)} recomendaciones")
+        self._labores()
+        self._ajustar_secuencias()
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Estadísticas al día para el planner (en producción las mantiene autovacuum)
+            self.db.execute(text("ANALYZE"))
+            self.db.commit()
+        return dict(self.insertador.insertadas)
+
+
+def limpiar(db) -> dict:
+    """Eliminar todo lo generado (y lo que cuelgue de ello), hijos antes que padres"""
+    usuarios = select(Usuario.id).where(Usuario.email.like(f"%@{DOMINIO}"))
+    granjas = select(Granja.id).where(Granja.ubicacion == MARCA)
+    programas = select(Programa.id).where(Programa.descripcion == MARCA)
+    lotes = select(Lote.id).where(Lote.granja_id.in_(granjas))
+    diagnosticos = select(Diagnostico.id).where(Diagnostico.lote_id.in_(lotes))
+    recomendaciones = select(Recomendacion.id).where(Recomendacion.lote_id.in_(lotes))
+    labores = select(Labor.id).where(Labor.recomendacion_id.in_(recomendaciones))
+    herramientas = select(Herramienta.id).where(Herramienta.descripcion == MARCA)
+    insumos = select(Insumo.id).where(Insumo.descripcion == MARCA)
+
+    pasos = [
+        delete(Evidencia).where(or_(
+            Evidencia.labor_id.in_(labores), Evidencia.diagnostico_id.in_(diagnosticos),
+            Evidencia.recomendacion_id.in_(recomendaciones), Evidencia.usuario_id.in_(usuarios),
+        )),
+        delete(EvidenciaPendiente).where(EvidenciaPendiente.usuario_id.in_(usuarios)),
+        delete(MovimientoHerramienta).where(or_(MovimientoHerramienta.labor_id.in_(labores),
+                                                MovimientoHerramienta.herramienta_id.in_(herramientas))),
+        delete(MovimientoInsumo).where(or_(MovimientoInsumo.labor_id.in_(labores), MovimientoInsumo.insumo_id.in_(insumos))),
+        delete(AsignacionHerramienta).where(or_(AsignacionHerramienta.labor_id.in_(labores),
+                                                AsignacionHerramienta.herramienta_id.in_(herramientas))),
+        delete(Labor).where(Labor.id.in_(labores)),
+        delete(Recomendacion).where(Recomendacion.id.in_(recomendaciones)),
+        delete(Diagnostico).where(Diagnostico.id.in_(diagnosticos)),
+        delete(Lote).where(Lote.id.in_(lotes)),
+        delete(Herramienta).where(Herramienta.descripcion == MARCA),
+        delete(Insumo).where(Insumo.descripcion == MARCA),
+        delete(TipoLabor).where(TipoLabor.descripcion == MARCA),
+        delete(SyncOperacion).where(SyncOperacion.usuario_id.in_(usuarios)),
+        delete(usuario_granja).where(or_(usuario_granja.c.usuario_id.in_(usuarios), usuario_granja.c.granja_id.in_(granjas))),
+        delete(usuario_programa).where(or_(usuario_programa.c.usuario_id.in_(usuarios),
+                                           usuario_programa.c.programa_id.in_(programas))),
+        delete(granja_programa).where(or_(granja_programa.c.granja_id.in_(granjas),
+                                          granja_programa.c.programa_id.in_(programas))),
+        delete(Usuario).where(Usuario.email.like(f"%@{DOMINIO}")),
+        delete(Granja).where(Granja.ubicacion == MARCA),
+        delete(Programa).where(Programa.descripcion == MARCA),
+    ]
+    eliminadas = {}
+    for paso in pasos:
+        eliminadas[paso.table.name] = eliminadas.get(paso.table.name, 0) + db.execute(paso, execution_options={"synchronize_session": False}).rowcount
+    db.commit()
+    return eliminadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labores", type=parsear_tamano, default=TAMANOS["1k"], help="1k, 10k, 100k, 1m o un número")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--crear-tablas", action="store_true", help="Crear las tablas que falten (base de datos vacía)")
+    parser.add_argument("--limpiar", action="store_true", help="Eliminar el dataset generado y salir")
+    args = parser.parse_args()
+
+    if args.crear_tablas:
+        Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if args.limpiar:
+            eliminadas = limpiar(db)
+            print(f"🧹 Dataset eliminado: {sum(eliminadas.values())} filas")
+            for tabla, filas in eliminadas.items():
+                if filas:
+                    print(f"   {tabla}: {filas}")
+            return
+
+        if db.query(Usuario.id).filter(Usuario.email.like(f"%@{DOMINIO}")).first():
+            sys.exit("❌ Ya hay un dataset sintético en esta base de datos; elimínelo antes con --limpiar")
+
+        print(f"🌱 Generando dataset de {args.labores} labores en {engine.dialect.name} (semilla {args.semilla})...")
+        inicio = time.perf_counter()
+        insertadas = GeneradorDataset(db, args.labores, args.semilla).generar()
+        duracion = time.perf_counter() - inicio
+        print(f"✅ {sum(insertadas.values())} filas en {duracion:.1f} s")
+        for tabla, filas in insertadas.items():
+            print(f"   {tabla}: {filas}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
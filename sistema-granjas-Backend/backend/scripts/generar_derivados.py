@@ -0,0 +1,58 @@
+"""
+Generar miniatura y vista previa de las evidencias de imagen que aún no las tienen
+(p. ej. las subidas antes de existir los derivados).
+
+Uso:
+    python scripts/generar_derivados.py [--limite 500]
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Evidencia
+from app.services.derivados_service import generador_derivados
+
+
+def _generar(evidencia_id: int) -> bool:
+    try:
+        return generador_derivados.generar(evidencia_id)
+    except Exception as e:
+        print(f"❌ Evidencia {evidencia_id}: {e}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de evidencias a procesar")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Evidencia.id).filter(
+            Evidencia.tipo == "imagen",
+            or_(Evidencia.url_miniatura.is_(None), Evidencia.url_vista_previa.is_(None))
+        ).order_by(Evidencia.id)
+        if args.limite:
+            query = query.limit(args.limite)
+        ids = [fila.id for fila in query]
+    finally:
+        db.close()
+
+    print(f"🖼️  Evidencias de imagen sin derivados: {len(ids)}")
+    try:
+        with ThreadPoolExecutor(max(1, settings.EVIDENCIA_DERIVADOS_WORKERS)) as hilos:
+            generados = sum(hilos.map(_generar, ids))
+    finally:
+        generador_derivados.cerrar()
+    print(f"✅ Generados: {generados}; sin generar (externas, no legibles o con error): {len(ids) - generados}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Generar los snapshots pendientes del ledger de inventario y conciliar.
+
+Pensado para un cron cuando el hilo de la app está desactivado
+(INVENTARIO_SNAPSHOT_REVISION_MINUTOS=0). Sale con código 1 si la conciliación
+encuentra diferencias.
+
+Uso:
+    python scripts/snapshot_inventario.py
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.services.inventario_service import InventarioService
+
+
+def main():
+    db = SessionLocal()
+    try:
+        generados = InventarioService.generar_snapshots(db)
+        for tipo, cantidad in generados.items():
+            print(f"📦 Snapshots de {tipo}: {cantidad}")
+
+        conciliacion = InventarioService.conciliar(db)
+        print(f"🔎 Recursos revisados: {conciliacion['revisados']} (sin snapshot: {conciliacion['sin_snapshot']})")
+        if not conciliacion["diferencias"]:
+            print("✅ cantidad_disponible coincide con el ledger")
+            return 0
+
+        for diferencia in conciliacion["diferencias"]:
+            print(
+                f"⚠️  {diferencia['tipo_recurso']} {diferencia['recurso_id']} ({diferencia['nombre']}): "
+                f"disponible {diferencia['cantidad_disponible']}, esperado {diferencia['esperado']}, "
+                f"diferencia {diferencia['diferencia']:+}"
+            )
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
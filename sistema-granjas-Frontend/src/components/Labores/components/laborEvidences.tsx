@@ -42,6 +42,16 @@ const LaborEvidences: React.FC<LaborEvidencesProps> = ({ evidencias }) => {
                                     </p>
                                 )}
                             </div>
+                            {e.url_miniatura && (
+                                <a href={e.url_vista_previa || e.url_archivo} target="_blank" rel="noopener noreferrer">
+                                    <img
+                                        src={e.url_miniatura}
+                                        alt={e.descripcion}
+                                        loading="lazy"
+                                        className="w-full h-40 object-cover bg-gray-100"
+                                    />
+                                </a>
+                            )}
                             <div className="p-3">
                                 <a
                                     href={e.url_archivo}
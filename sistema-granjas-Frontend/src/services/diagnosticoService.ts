@@ -7,6 +7,7 @@ import type {
   Evidencia,
   DiagnosticoDetalle
 } from '../types/diagnosticoTypes';
+import { subirEvidencia } from './evidenciaUploadService';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
@@ -61,7 +62,7 @@ export const diagnosticoService = {
     return handleResponse(response);
   },
 
-  async crearDiagnostico(datos: CrearDiagnosticoDTO, user: any): Promise<DiagnosticoItem> {
+  async crearDiagnostico(datos: CrearDiagnosticoDTO, _user: any): Promise<DiagnosticoItem> {
     try {
     
     // 1. Primero crea el diagnóstico
@@ -83,49 +84,13 @@ export const diagnosticoService = {
       await Promise.all(
         datos.evidencias.map(async (ev) => {
           try {
-            // Subir archivo
-            const formData = new FormData();
-            formData.append('file', ev.file);
-
-            const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-              method: 'POST',
-              headers: { 
-                'Authorization': `Bearer ${localStorage.getItem('token')}` 
-              },
-              body: formData
-            });
-
-            if (!uploadRes.ok) {
-              const errorText = await uploadRes.text();
-              console.error(`❌ Error subiendo archivo ${ev.file.name}:`, errorText);
-              throw new Error(`Error subiendo archivo ${ev.file.name}`);
-            }
-
-            const fileData = await uploadRes.json();
-
-            // Crear registro de evidencia
-            const evidenciaPayload = {
+            // Subir el archivo directo al bucket y registrar la evidencia
+            const evidenciaCreada = await subirEvidencia(ev.file, {
               tipo: ev.tipo || 'imagen',
               descripcion: ev.descripcion || `Evidencia para diagnóstico ${diagnosticoCreado.id}`,
-              url_archivo: fileData.url || fileData.filename || fileData.file_url,
               tipo_entidad: 'diagnostico',
               entidad_id: diagnosticoCreado.id,
-              usuario_id: user.id || 1 // Usar ID del usuario autenticado
-            };
-
-            const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-              method: 'POST',
-              headers: getHeaders(),
-              body: JSON.stringify(evidenciaPayload)
             });
-
-            if (!evidenciaRes.ok) {
-              const errorData = await evidenciaRes.json().catch(() => ({}));
-              console.error(`❌ Error creando evidencia:`, errorData);
-              throw new Error(`Error creando registro de evidencia`);
-            }
-
-            const evidenciaCreada = await evidenciaRes.json();
             console.log('✅ Evidencia creada:', evidenciaCreada);
 
             return evidenciaCreada;
@@ -148,7 +113,7 @@ export const diagnosticoService = {
   }
   },
 
-  async actualizarDiagnostico(id: number, datos: ActualizarDiagnosticoDTO, user: any): Promise<DiagnosticoItem> {
+  async actualizarDiagnostico(id: number, datos: ActualizarDiagnosticoDTO, _user: any): Promise<DiagnosticoItem> {
     try {
     // 1. Actualizar diagnóstico
     const response = await fetch(`${API_BASE_URL}/diagnosticos/${id}`, {
@@ -171,52 +136,13 @@ export const diagnosticoService = {
       await Promise.all(
         datos.evidencias.map(async (ev) => {
           try {
-            // Subir archivo
-            const formData = new FormData();
-            formData.append("file", ev.file);
-
-            const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-              method: "POST",
-              headers: {
-                Authorization: `Bearer ${localStorage.getItem("token")}`,
-              },
-              body: formData,
-            });
-
-            if (!uploadRes.ok) {
-              const errorText = await uploadRes.text();
-              console.error(`ACTUALIZACION Error subiendo archivo ${ev.file.name}:`, errorText);
-              throw new Error(`Error subiendo archivo ${ev.file.name}`);
-            }
-
-            const fileData = await uploadRes.json();
-
-            // Crear registro de evidencia
-            const evidenciaPayload = {
+            // Subir el archivo directo al bucket y registrar la evidencia
+            const evidenciaCreada = await subirEvidencia(ev.file, {
               tipo: ev.tipo || "imagen",
-              descripcion:
-                ev.descripcion ||
-                `Evidencia actualizada para diagnóstico ${diagnosticoActualizado.id}`,
-              url_archivo:
-                fileData.url || fileData.filename || fileData.file_url,
+              descripcion: ev.descripcion || `Evidencia actualizada para diagnóstico ${diagnosticoActualizado.id}`,
               tipo_entidad: "diagnostico",
               entidad_id: diagnosticoActualizado.id,
-              usuario_id: user.id || 1,
-            };
-            console.log("📄 Payload de evidencia (actualización):", evidenciaPayload);
-            const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-              method: "POST",
-              headers: getHeaders(),
-              body: JSON.stringify(evidenciaPayload),
             });
-
-            if (!evidenciaRes.ok) {
-              const errorData = await evidenciaRes.json().catch(() => ({}));
-              console.error(`❌ Error creando evidencia:`, errorData);
-              throw new Error("Error creando registro de evidencia");
-            }
-
-            const evidenciaCreada = await evidenciaRes.json();
             console.log("✅ Evidencia creada (actualización):", evidenciaCreada);
 
             return evidenciaCreada;
@@ -0,0 +1,126 @@
+// src/services/evidenciaUploadService.ts
+// Subida de evidencias directa al bucket: la API solo firma las URLs y registra la
+// evidencia al final; los bytes del archivo no pasan por el backend. Si el contenido
+// ya está guardado (mismo SHA-256), no se sube de nuevo.
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+
+export interface DatosEvidencia {
+    tipo: string;
+    descripcion: string;
+    tipo_entidad: 'labor' | 'diagnostico' | 'recomendacion';
+    entidad_id: number;
+}
+
+interface SesionSubida {
+    id: number;
+    key: string;
+    metodo: 'put' | 'multipart' | 'existente';
+    url?: string;
+    partes: { numero: number; url: string }[];
+    tamano_parte?: number;
+    content_type: string;
+    // PUT firmado con el SHA-256 declarado: R2 rechaza un archivo que no coincida
+    checksum_sha256?: string | null;
+}
+
+// Mismos prefijos que valida el backend para cada tipo de evidencia
+const TIPOS_CONTENIDO: Record<string, string[] | null> = {
+    imagen: ['image/'],
+    video: ['video/'],
+    audio: ['audio/'],
+    documento: ['application/pdf', 'application/msword', 'application/vnd.', 'text/'],
+    otro: null,
+};
+
+const headersJson = (): HeadersInit => {
+    const token = localStorage.getItem('token');
+    const headers: HeadersInit = { 'Content-Type': 'application/json' };
+    if (token) headers['Authorization'] = `Bearer ${token}`;
+    return headers;
+};
+
+const errorDe = async (response: Response, mensaje: string) => {
+    const errorData = await response.json().catch(() => ({}));
+    return new Error(errorData.detail || `${mensaje} (${response.status})`);
+};
+
+// Si el tipo elegido no corresponde al archivo (p. ej. un PDF marcado como imagen), se deduce del archivo
+const tipoPara = (tipo: string, contentType: string): string => {
+    const prefijos = TIPOS_CONTENIDO[tipo];
+    if (prefijos === null || prefijos?.some(p => contentType.startsWith(p))) return tipo;
+    const deducido = Object.keys(TIPOS_CONTENIDO).find(t =>
+        TIPOS_CONTENIDO[t]?.some(p => contentType.startsWith(p))
+    );
+    return deducido || 'otro';
+};
+
+// Hasta este tamaño se calcula el SHA-256 en el navegador (lee el archivo completo en memoria)
+const MAXIMO_HASH_BYTES = 100 * 1024 * 1024;
+
+const sha256De = async (file: File): Promise<string | undefined> => {
+    // crypto.subtle solo existe en contextos seguros (https o localhost)
+    if (file.size > MAXIMO_HASH_BYTES || !globalThis.crypto?.subtle) return undefined;
+    try {
+        const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    } catch {
+        return undefined;
+    }
+};
+
+export async function subirEvidencia(file: File, datos: DatosEvidencia) {
+    const contentType = (file.type || 'application/octet-stream').toLowerCase();
+
+    // 1. Pedir las URLs firmadas
+    const sesionRes = await fetch(`${API_BASE_URL}/evidencias/subidas`, {
+        method: 'POST',
+        headers: headersJson(),
+        body: JSON.stringify({
+            ...datos,
+            tipo: tipoPara(datos.tipo, contentType),
+            nombre_archivo: file.name,
+            content_type: contentType,
+            tamano: file.size,
+            sha256: await sha256De(file),
+        }),
+    });
+    if (!sesionRes.ok) throw await errorDe(sesionRes, `Error iniciando la subida de ${file.name}`);
+    const sesion: SesionSubida = await sesionRes.json();
+
+    // 2. Subir directo al bucket (nada que subir si el contenido ya existe)
+    const partes: { numero: number; etag: string }[] = [];
+    try {
+        if (sesion.metodo === 'put') {
+            const headers: Record<string, string> = { 'Content-Type': sesion.content_type };
+            if (sesion.checksum_sha256) headers['x-amz-checksum-sha256'] = sesion.checksum_sha256;
+            const res = await fetch(sesion.url!, { method: 'PUT', headers, body: file });
+            if (!res.ok) throw new Error(`Error subiendo ${file.name} (${res.status})`);
+        } else if (sesion.metodo === 'multipart') {
+            const tamano = sesion.tamano_parte!;
+            for (const parte of sesion.partes) {
+                const inicio = (parte.numero - 1) * tamano;
+                const res = await fetch(parte.url, { method: 'PUT', body: file.slice(inicio, inicio + tamano) });
+                // El bucket debe exponer el header ETag en su configuración CORS
+                const etag = res.headers.get('ETag');
+                if (!res.ok || !etag) throw new Error(`Error subiendo la parte ${parte.numero} de ${file.name}`);
+                partes.push({ numero: parte.numero, etag });
+            }
+        }
+    } catch (error) {
+        await fetch(`${API_BASE_URL}/evidencias/subidas/${sesion.id}`, {
+            method: 'DELETE',
+            headers: headersJson(),
+        }).catch(() => undefined);
+        throw error;
+    }
+
+    // 3. Confirmar: el backend verifica el archivo y crea la evidencia
+    const completarRes = await fetch(`${API_BASE_URL}/evidencias/subidas/${sesion.id}/completar`, {
+        method: 'POST',
+        headers: headersJson(),
+        body: JSON.stringify({ partes }),
+    });
+    if (!completarRes.ok) throw await errorDe(completarRes, `Error registrando la evidencia ${file.name}`);
+    return completarRes.json();
+}
@@ -23,6 +23,8 @@ export const addPending = async (data: PendingData) => {
   const db = await getDB();
   const record = {
     ...data,
+    // Id único del registro: el backend lo usa para no aplicarlo dos veces si se reenvía
+    cliente_id: crypto.randomUUID(),
     synced: false,
     createdAt: new Date(),
   };
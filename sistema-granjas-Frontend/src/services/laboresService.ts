@@ -11,6 +11,7 @@ import type {
     MovimientoHerramienta, 
     Evidencia
 } from '../types/laboresTypes';
+import { subirEvidencia } from './evidenciaUploadService';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
@@ -89,49 +90,13 @@ export const laborService = {
                 await Promise.all(
                     datos.evidencias.map(async (ev: any) => {
                         try {
-                            // Subir archivo
-                            const formData = new FormData();
-                            formData.append('file', ev.file);
-
-                            const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-                                method: 'POST',
-                                headers: {
-                                    'Authorization': `Bearer ${localStorage.getItem('token')}`
-                                },
-                                body: formData
-                            });
-
-                            if (!uploadRes.ok) {
-                                const errorText = await uploadRes.text();
-                                console.error(`❌ Error subiendo archivo ${ev.file.name}:`, errorText);
-                                throw new Error(`Error subiendo archivo ${ev.file.name}`);
-                            }
-
-                            const fileData = await uploadRes.json();
-
-                            // Crear registro de evidencia
-                            const evidenciaPayload = {
+                            // Subir el archivo directo al bucket y registrar la evidencia
+                            return await subirEvidencia(ev.file, {
                                 tipo: ev.tipo || 'imagen',
                                 descripcion: ev.descripcion || `Evidencia para labor ${laborCreada.id}`,
-                                url_archivo: fileData.url || fileData.filename || fileData.file_url,
                                 tipo_entidad: 'labor',
                                 entidad_id: laborCreada.id,
-                                usuario_id: user.id || 1
-                            };
-
-                            const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-                                method: 'POST',
-                                headers: getHeaders(),
-                                body: JSON.stringify(evidenciaPayload)
                             });
-
-                            if (!evidenciaRes.ok) {
-                                const errorData = await evidenciaRes.json().catch(() => ({}));
-                                console.error(`❌ Error creando evidencia:`, errorData);
-                                throw new Error(`Error creando registro de evidencia`);
-                            }
-
-                            return await evidenciaRes.json();
                         } catch (error) {
                             console.error(`❌ Error procesando evidencia:`, error);
                             return null;
@@ -174,49 +139,13 @@ export const laborService = {
                 await Promise.all(
                     evidenciasParaSubir.map(async (ev: any) => {
                         try {
-                            // Subir archivo
-                            const formData = new FormData();
-                            formData.append('file', ev.file);
-
-                            const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-                                method: 'POST',
-                                headers: {
-                                    'Authorization': `Bearer ${localStorage.getItem('token')}`
-                                },
-                                body: formData
-                            });
-
-                            if (!uploadRes.ok) {
-                                const errorText = await uploadRes.text();
-                                console.error(`❌ Error subiendo archivo ${ev.file.name}:`, errorText);
-                                throw new Error(`Error subiendo archivo ${ev.file.name}`);
-                            }
-
-                            const fileData = await uploadRes.json();
-
-                            // Crear registro de evidencia
-                            const evidenciaPayload = {
+                            // Subir el archivo directo al bucket y registrar la evidencia
+                            const evidenciaCreada = await subirEvidencia(ev.file, {
                                 tipo: ev.tipo || 'imagen',
                                 descripcion: ev.descripcion || `Evidencia para labor ${id}`,
-                                url_archivo: fileData.url || fileData.filename || fileData.file_url,
                                 tipo_entidad: 'labor',
                                 entidad_id: id,
-                                usuario_id: user.id || parseInt(localStorage.getItem('userId') || '1')
-                            };
-
-                            const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-                                method: 'POST',
-                                headers: getHeaders(),
-                                body: JSON.stringify(evidenciaPayload)
                             });
-
-                            if (!evidenciaRes.ok) {
-                                const errorData = await evidenciaRes.json().catch(() => ({}));
-                                console.error(`❌ Error creando evidencia:`, errorData);
-                                throw new Error(`Error creando registro de evidencia`);
-                            }
-
-                            const evidenciaCreada = await evidenciaRes.json();
                             console.log(`✅ Evidencia creada: ${evidenciaCreada.id}`);
                             return evidenciaCreada;
                         } catch (error) {
@@ -7,6 +7,7 @@ import type {
   RecomendacionFilters,
   Evidencia
 } from '../types/recomendacionTypes';
+import { subirEvidencia } from './evidenciaUploadService';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
@@ -61,7 +62,7 @@ export const recomendacionService = {
     return handleResponse(response);
   },
 
-  async crearRecomendacion(datos: CreateRecomendacionDto, user: any): Promise<Recomendacion> {
+  async crearRecomendacion(datos: CreateRecomendacionDto, _user: any): Promise<Recomendacion> {
     try {
       // 1. Primero crear la recomendación
       const response = await fetch(`${API_BASE_URL}/recomendaciones/`, {
@@ -82,49 +83,13 @@ export const recomendacionService = {
         await Promise.all(
           datos.evidencias.map(async (ev: any) => {
             try {
-              // Subir archivo
-              const formData = new FormData();
-              formData.append('file', ev.file);
-
-              const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-                method: 'POST',
-                headers: { 
-                  'Authorization': `Bearer ${localStorage.getItem('token')}` 
-                },
-                body: formData
-              });
-
-              if (!uploadRes.ok) {
-                const errorText = await uploadRes.text();
-                console.error(`❌ Error subiendo archivo ${ev.file.name}:`, errorText);
-                throw new Error(`Error subiendo archivo ${ev.file.name}`);
-              }
-
-              const fileData = await uploadRes.json();
-
-              // Crear registro de evidencia
-              const evidenciaPayload = {
+              // Subir el archivo directo al bucket y registrar la evidencia
+              const evidenciaCreada = await subirEvidencia(ev.file, {
                 tipo: ev.tipo || 'imagen',
                 descripcion: ev.descripcion || `Evidencia para recomendación ${recomendacionCreada.id}`,
-                url_archivo: fileData.url || fileData.filename || fileData.file_url,
                 tipo_entidad: 'recomendacion',
                 entidad_id: recomendacionCreada.id,
-                usuario_id: user.id || 1
-              };
-
-              const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-                method: 'POST',
-                headers: getHeaders(),
-                body: JSON.stringify(evidenciaPayload)
               });
-
-              if (!evidenciaRes.ok) {
-                const errorData = await evidenciaRes.json().catch(() => ({}));
-                console.error(`❌ Error creando evidencia:`, errorData);
-                throw new Error(`Error creando registro de evidencia`);
-              }
-
-              const evidenciaCreada = await evidenciaRes.json();
               console.log('✅ Evidencia creada:', evidenciaCreada);
 
               return evidenciaCreada;
@@ -146,7 +111,7 @@ export const recomendacionService = {
     }
   },
 
-  async actualizarRecomendacion(id: number, datos: UpdateRecomendacionDto, user: any): Promise<Recomendacion> {
+  async actualizarRecomendacion(id: number, datos: UpdateRecomendacionDto, _user: any): Promise<Recomendacion> {
     try {
       // 1. Actualizar recomendación
       const response = await fetch(`${API_BASE_URL}/recomendaciones/${id}`, {
@@ -169,52 +134,13 @@ export const recomendacionService = {
         await Promise.all(
           datos.evidencias.map(async (ev: any) => {
             try {
-              // Subir archivo
-              const formData = new FormData();
-              formData.append("file", ev.file);
-
-              const uploadRes = await fetch(`${API_BASE_URL}/files/upload`, {
-                method: "POST",
-                headers: {
-                  Authorization: `Bearer ${localStorage.getItem("token")}`,
-                },
-                body: formData,
-              });
-
-              if (!uploadRes.ok) {
-                const errorText = await uploadRes.text();
-                console.error(`ACTUALIZACION Error subiendo archivo ${ev.file.name}:`, errorText);
-                throw new Error(`Error subiendo archivo ${ev.file.name}`);
-              }
-
-              const fileData = await uploadRes.json();
-
-              // Crear registro de evidencia
-              const evidenciaPayload = {
+              // Subir el archivo directo al bucket y registrar la evidencia
+              const evidenciaCreada = await subirEvidencia(ev.file, {
                 tipo: ev.tipo || "imagen",
-                descripcion:
-                  ev.descripcion ||
-                  `Evidencia actualizada para recomendación ${recomendacionActualizada.id}`,
-                url_archivo:
-                  fileData.url || fileData.filename || fileData.file_url,
+                descripcion: ev.descripcion || `Evidencia actualizada para recomendación ${recomendacionActualizada.id}`,
                 tipo_entidad: "recomendacion",
                 entidad_id: recomendacionActualizada.id,
-                usuario_id: user.id || 1,
-              };
-
-              const evidenciaRes = await fetch(`${API_BASE_URL}/evidencias/`, {
-                method: "POST",
-                headers: getHeaders(),
-                body: JSON.stringify(evidenciaPayload),
               });
-
-              if (!evidenciaRes.ok) {
-                const errorData = await evidenciaRes.json().catch(() => ({}));
-                console.error(`❌ Error creando evidencia:`, errorData);
-                throw new Error("Error creando registro de evidencia");
-              }
-
-              const evidenciaCreada = await evidenciaRes.json();
               console.log("✅ Evidencia creada (actualización):", evidenciaCreada);
 
               return evidenciaCreada;
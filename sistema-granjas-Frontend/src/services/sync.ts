@@ -1,7 +1,23 @@
 import { getAllPending, deletePending } from './indexedDB';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
-const API_URL = `${API_BASE_URL}/sync`; // Ajusta según tu backend real
+const API_URL = `${API_BASE_URL}/sync/batch`;
+const TAMANO_LOTE = 500;
+
+interface ResultadoSync {
+  cliente_id: string;
+  estado: 'aplicado' | 'duplicado' | 'rechazado';
+  error?: string | null;
+}
+
+const getHeaders = (): HeadersInit => {
+  const token = localStorage.getItem('token');
+  const headers: HeadersInit = { 'Content-Type': 'application/json' };
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`;
+  }
+  return headers;
+};
 
 export const syncPendingData = async () => {
   try {
@@ -13,19 +29,36 @@ export const syncPendingData = async () => {
 
     console.log(`🔄 Sincronizando ${pendientes.length} registros...`);
 
-    for (const item of pendientes) {
+    for (let inicio = 0; inicio < pendientes.length; inicio += TAMANO_LOTE) {
+      const lote = pendientes.slice(inicio, inicio + TAMANO_LOTE);
+      const items = lote.map((item) => ({
+        cliente_id: item.cliente_id ?? `idb-${item.id}-${new Date(item.createdAt).getTime()}`,
+        tipo: item.tipo,
+        data: item.data,
+        createdAt: item.createdAt,
+      }));
+
       const response = await fetch(API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(item),
+        headers: getHeaders(),
+        body: JSON.stringify({ items }),
       });
 
-      if (response.ok) {
-        await deletePending(item.id);
-        console.log(`✅ Registro sincronizado y eliminado localmente: ${item.id}`);
-      } else {
-        console.warn(`⚠️ Error al sincronizar el registro ${item.id}`);
+      if (!response.ok) {
+        console.warn(`⚠️ Error al sincronizar el lote (${response.status}), se reintentará luego`);
+        return;
+      }
+
+      const { resultados } = await response.json() as { resultados: ResultadoSync[] };
+      for (let i = 0; i < lote.length; i++) {
+        const resultado = resultados[i];
+        if (resultado.estado === 'rechazado') {
+          console.warn(`⚠️ Registro ${lote[i].id} rechazado: ${resultado.error}`);
+          continue;
+        }
+        await deletePending(lote[i].id);
       }
+      console.log(`✅ Lote sincronizado: ${lote.length} registros`);
     }
   } catch (error) {
     console.error('❌ Error en la sincronización:', error);
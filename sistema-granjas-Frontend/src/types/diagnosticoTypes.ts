@@ -62,6 +62,8 @@ export interface Evidencia {
   tipo: string;
   descripcion: string;
   url_archivo: string;
+  url_miniatura?: string | null; // WebP pequeño; null mientras se genera
+  url_vista_previa?: string | null;
   usuario_id: number;
   fecha_creacion: string;
 }
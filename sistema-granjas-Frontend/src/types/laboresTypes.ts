@@ -67,6 +67,8 @@ export interface Evidencia {
     tipo: string;
     descripcion: string;
     url_archivo: string;
+    url_miniatura?: string | null; // WebP pequeño; null mientras se genera
+    url_vista_previa?: string | null;
     fecha_creacion: string;
     usuario_nombre?: string;
 }
@@ -23,6 +23,8 @@ export interface Evidencia {
   tipo: string;
   descripcion: string;
   url_archivo: string;
+  url_miniatura?: string | null; // WebP pequeño; null mientras se genera
+  url_vista_previa?: string | null;
   recomendacion_id?: number;
   usuario_id: number;
   usuario_nombre?: string;